@@ -0,0 +1,6 @@
+"""ASGI entry point: run with ``uvicorn asgi:app --port 3044``."""
+
+from llmselect import create_app
+from llmselect.asgi import create_asgi_app
+
+app = create_asgi_app(create_app())
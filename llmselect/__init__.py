@@ -1,3 +1,4 @@
+import atexit
 import os
 from datetime import datetime
 
@@ -80,6 +81,8 @@ def create_app() -> Flask:
 
     services = create_service_container(app)
     app.extensions["services"] = services
+    # Drain write-behind persistence on interpreter exit (the ASGI lifespan closes it earlier)
+    atexit.register(services.persistence.close)
     app.extensions["key_encryption"] = KeyEncryptionService(app.config["ENCRYPTION_KEY"])
 
     @jwt.user_lookup_loader
@@ -210,5 +213,9 @@ def create_app() -> Flask:
 
     with app.app_context():
         db.create_all()
+        services.search.ensure_index()
+        services.comparisons.delete_stale_reservations(
+            app.config.get("COMPARISON_RESERVATION_TTL", 3600)
+        )
 
     return app
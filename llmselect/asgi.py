@@ -0,0 +1,429 @@
+"""ASGI serving mode with native async handlers for the SSE endpoints.
+
+``/api/v1/chat/stream`` and ``/api/v1/compare/stream`` are still dispatched through
+Flask first (in a worker thread), so JWT auth, CSRF, rate limits, validation,
+CORS and error handlers behave exactly as under WSGI. Instead of a generator the
+views hand back their prepared stream plan, and the stream itself is produced on
+the event loop: an open SSE connection costs a coroutine, not a worker thread.
+Every other route is served by the unchanged Flask app in a worker thread, with
+the response buffered and sent in one piece.
+"""
+
+import asyncio
+import io
+import sys
+from time import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Flask
+
+from .routes.chat import (
+    _STREAM_END,
+    ASGI_STREAM_PLAN_KEY,
+    CHAT_STREAM_ERROR,
+    ChatStreamPlan,
+    CompareStreamPlan,
+    _chat_done_event,
+    _finish_comparison_stream,
+    _log_chat_stream_failure,
+    _log_provider_stream_failure,
+    _provider_chunk_event,
+    _provider_complete_event,
+    _provider_start_event,
+    _save_chat_reply,
+    _sse_event,
+    _stream_error_event,
+)
+from .models.message import MESSAGE_ABORTED
+from .services.providers import LLMResult
+
+STREAM_PATHS = frozenset({"/api/v1/chat/stream", "/api/v1/compare/stream"})
+# Connection management belongs to the ASGI server, not the application
+HOP_BY_HOP_HEADERS = frozenset({"connection", "keep-alive", "transfer-encoding"})
+
+
+async def _in_app_context(app: Flask, func: Callable, *args):
+    """Run blocking ``func`` in a worker thread inside an application context."""
+
+    def call():
+        with app.app_context():
+            return func(*args)
+
+    return await asyncio.to_thread(call)
+
+
+async def _persist(app: Flask, func: Callable, *args):
+    """Run ``func``, which submits write-behind writes, without blocking the event loop.
+
+    With write-behind enabled a submit only queues the write and runs in place; when
+    writes are applied inline it needs a worker thread and an application context.
+    """
+    if app.extensions["services"].persistence.enabled:
+        return func(*args)
+    return await _in_app_context(app, func, *args)
+
+
+async def chat_stream_events(app: Flask, plan: ChatStreamPlan):
+    """Async counterpart of ``routes.chat._chat_stream_events``."""
+    services = app.extensions["services"]
+    llm_service = services.llm
+    checkpointer = services.conversations.checkpointer(services.persistence, plan.draft)
+    provider = plan.provider
+    model = plan.model
+    full_response = ""
+    result = None
+    saved = False
+    try:
+        start_time = time()
+        first_token_time = None
+        chunk_count = 0
+
+        async for chunk in llm_service.ainvoke_stream(
+            provider,
+            model,
+            plan.messages,
+            plan.api_key,
+            use_cache=plan.use_cache,
+            deadline=plan.deadline,
+        ):
+            if isinstance(chunk, LLMResult):
+                result = chunk
+                continue
+            if first_token_time is None:
+                first_token_time = time()
+                ttft = (first_token_time - start_time) * 1000  # Convert to ms
+                app.logger.info(
+                    f"[Streaming] Time to first token: {ttft:.2f}ms "
+                    f"(provider={provider}, model={model})"
+                )
+
+            full_response += chunk
+            chunk_count += 1
+            if checkpointer.add(chunk):
+                await _persist(app, checkpointer.checkpoint)
+            yield _sse_event({"content": chunk})
+
+        total_time = (time() - start_time) * 1000  # Convert to ms
+        app.logger.info(
+            f"[Streaming] Complete: {total_time:.2f}ms total, {chunk_count} chunks "
+            f"(provider={provider}, model={model})"
+        )
+
+        await _persist(app, _save_chat_reply, app, plan, full_response, result)
+        saved = True
+
+        yield _chat_done_event(plan)
+
+    except Exception as exc:
+        _log_chat_stream_failure(app, plan, exc)
+        await _persist(app, _save_chat_reply, app, plan, full_response, result, MESSAGE_ABORTED)
+        saved = True
+        yield _sse_event({"error": CHAT_STREAM_ERROR})
+    finally:
+        if not saved:
+            # The client went away mid-stream
+            await _persist(app, _save_chat_reply, app, plan, full_response, result, MESSAGE_ABORTED)
+
+
+async def compare_stream_events(app: Flask, plan: CompareStreamPlan):
+    """Async counterpart of ``routes.chat._compare_stream_events``.
+
+    Provider streams run as tasks on the event loop and are multiplexed through
+    one bounded ``asyncio.Queue``.
+    """
+    llm_service = app.extensions["services"].llm
+    results = {}
+    metrics = []
+    wall_start = time()
+
+    yield _sse_event({"event": "start", "total": plan.total})
+
+    for error_data in plan.key_errors:
+        yield _sse_event(error_data)
+
+    events: asyncio.Queue = asyncio.Queue(maxsize=app.config.get("COMPARE_STREAM_QUEUE_SIZE", 256))
+    tasks = [
+        asyncio.create_task(
+            _stream_provider(
+                app,
+                llm_service,
+                job,
+                plan.messages,
+                events,
+                metrics,
+                wall_start,
+                plan.use_cache,
+                plan.deadline,
+            )
+        )
+        for job in plan.jobs
+    ]
+    try:
+        remaining = len(tasks)
+        while remaining:
+            index, chunk_data = await events.get()
+            if chunk_data is _STREAM_END:
+                remaining -= 1
+                continue
+
+            yield _sse_event(chunk_data)
+
+            if chunk_data.get("event") == "complete":
+                results[index] = chunk_data.get("data", {})
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    done_data = await _in_app_context(
+        app, _finish_comparison_stream, app, plan, results, metrics, time() - wall_start
+    )
+    yield _sse_event(done_data)
+
+
+async def _stream_provider(
+    app, llm_service, job, messages, events, metrics, origin, use_cache=True, deadline=None
+):
+    """Drain a single provider stream into the shared fan-in queue.
+
+    The stream waits for a slot from the provider executor first, so the per-provider
+    caps and back-pressure of ``/compare/stream`` under WSGI apply here too.
+    """
+    index, provider, model, api_key = job
+    executor = app.extensions["services"].provider_executor
+    try:
+        async with executor.admit(provider):
+            start_time = time()
+            first_token_time = None
+            await events.put((index, _provider_start_event(provider, model)))
+
+            full_response = ""
+            first_chunk = True
+            result = None
+            async for chunk in llm_service.ainvoke_stream(
+                provider, model, messages, api_key, use_cache=use_cache, deadline=deadline
+            ):
+                if isinstance(chunk, LLMResult):
+                    result = chunk
+                    continue
+                elapsed = time() - start_time
+                if first_token_time is None:
+                    first_token_time = elapsed
+                full_response += chunk
+                await events.put(
+                    (index, _provider_chunk_event(provider, model, chunk, elapsed, first_chunk))
+                )
+                first_chunk = False
+
+            elapsed_time = time() - start_time
+            await events.put(
+                (
+                    index,
+                    _provider_complete_event(
+                        app, provider, model, full_response, elapsed_time, first_token_time, result
+                    ),
+                )
+            )
+            metrics.append(
+                {
+                    "index": index,
+                    "provider": provider,
+                    "model": model,
+                    "started_at": start_time - origin,
+                    "ttft": first_token_time,
+                    "time": elapsed_time,
+                }
+            )
+    except asyncio.CancelledError:
+        # The consumer has gone away; nobody is waiting for the end marker
+        raise
+    except Exception as exc:  # noqa: BLE001 - includes ProviderBusyError from admission
+        _log_provider_stream_failure(app, provider, model, exc)
+        await events.put((index, _stream_error_event(provider, model, exc)))
+
+    await events.put((index, _STREAM_END))
+
+
+STREAM_HANDLERS: Dict[type, Callable] = {
+    ChatStreamPlan: chat_stream_events,
+    CompareStreamPlan: compare_stream_events,
+}
+
+
+def _build_environ(scope: dict, body: bytes) -> dict:
+    """Translate an ASGI HTTP scope into a WSGI environ for Flask dispatch."""
+    server_name, server_port = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("127.0.0.1", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("ascii"),
+        "SERVER_NAME": server_name,
+        "SERVER_PORT": str(server_port),
+        "REMOTE_ADDR": client[0],
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        # The body is fully buffered, so its length is known even for chunked uploads
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for raw_name, raw_value in scope.get("headers", []):
+        name = raw_name.decode("latin1").upper().replace("-", "_")
+        value = raw_value.decode("latin1")
+        if name == "CONTENT_LENGTH":
+            continue
+        if name == "CONTENT_TYPE":
+            environ["CONTENT_TYPE"] = value
+            continue
+        key = f"HTTP_{name}"
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+class StreamingASGIApp:
+    """ASGI application serving the SSE endpoints natively and mounting Flask for the rest."""
+
+    def __init__(self, flask_app: Flask):
+        self.flask_app = flask_app
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in STREAM_PATHS:
+            await self._stream(scope, receive, send)
+            return
+        if scope["type"] == "http":
+            await self._serve(scope, receive, send)
+            return
+        if scope["type"] == "websocket":
+            # No websocket routes: closing before accepting rejects the handshake (403)
+            await receive()
+            await send({"type": "websocket.close", "code": 1000})
+            return
+        raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self.flask_app.extensions["services"].llm.async_engine is None:
+                    self.flask_app.logger.warning(
+                        "Serving SSE streams with LLM_ENGINE=sync: each open stream holds a "
+                        "blocking bridge thread (LLM_BLOCKING_BRIDGE_WORKERS). "
+                        "Set LLM_ENGINE=async to serve them as coroutines."
+                    )
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                services = self.flask_app.extensions["services"]
+                # Commit queued stream results before the process goes away
+                await asyncio.to_thread(services.persistence.close)
+                services.provider_executor.shutdown(wait=False)
+                if services.llm.hedger is not None:
+                    services.llm.hedger.shutdown()
+                services.llm.close()
+                if services.llm.async_engine is not None:
+                    await asyncio.to_thread(services.llm.async_engine.close)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _dispatch(self, environ: dict) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+        """Run a Flask view and capture its buffered response."""
+        captured = {}
+
+        def start_response(status, headers, exc_info=None):
+            captured["status"] = int(status.split(" ", 1)[0])
+            captured["headers"] = [
+                (name.lower().encode("latin1"), value.encode("latin1"))
+                for name, value in headers
+                if name.lower() not in HOP_BY_HOP_HEADERS
+            ]
+
+        body_iter = self.flask_app(environ, start_response)
+        try:
+            body = b"".join(body_iter)
+        finally:
+            if hasattr(body_iter, "close"):
+                body_iter.close()
+        return captured["status"], captured["headers"], body
+
+    async def _serve(self, scope: dict, receive: Callable, send: Callable) -> None:
+        # Not asgiref's WsgiToAsgi: it runs every request on one shared thread
+        body = await _read_body(receive)
+        status, headers, response_body = await asyncio.to_thread(
+            self._dispatch, _build_environ(scope, body)
+        )
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": response_body})
+
+    async def _stream(self, scope: dict, receive: Callable, send: Callable) -> None:
+        body = await _read_body(receive)
+        environ = _build_environ(scope, body)
+        environ[ASGI_STREAM_PLAN_KEY] = None
+
+        status, headers, response_body = await asyncio.to_thread(self._dispatch, environ)
+        plan = environ.get(ASGI_STREAM_PLAN_KEY)
+        handler = STREAM_HANDLERS.get(type(plan))
+
+        if handler is None or status != 200:
+            # Auth, validation and rate limit failures: send Flask's response as is
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": response_body})
+            return
+
+        # The placeholder response's Content-Length: 0 does not apply to the stream
+        headers = [(name, value) for name, value in headers if name != b"content-length"]
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await _send_until_disconnect(handler(self.flask_app, plan), receive, send)
+
+
+async def _read_body(receive: Callable) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def _send_until_disconnect(events, receive: Callable, send: Callable) -> None:
+    """Send SSE frames until the stream ends or the client disconnects."""
+
+    async def send_events():
+        try:
+            async for frame in events:
+                await send(
+                    {"type": "http.response.body", "body": frame.encode(), "more_body": True}
+                )
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+        finally:
+            await events.aclose()
+
+    async def wait_for_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    sender = asyncio.create_task(send_events())
+    watcher = asyncio.create_task(wait_for_disconnect())
+    done, pending = await asyncio.wait({sender, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    if sender in done:
+        sender.result()
+
+
+def create_asgi_app(flask_app: Optional[Flask] = None) -> StreamingASGIApp:
+    if flask_app is None:
+        from . import create_app
+
+        flask_app = create_app()
+    return StreamingASGIApp(flask_app)
@@ -1,6 +1,6 @@
 import os
 from datetime import timedelta
-from typing import List
+from typing import Dict, List
 
 from cryptography.fernet import Fernet, InvalidToken
 
@@ -13,6 +13,15 @@ def _split_csv(value: str) -> List[str]:
     return [item.strip() for item in value.split(",") if item.strip()]
 
 
+def _parse_limits(value: str) -> Dict[str, int]:
+    """Parse ``"openai=16,anthropic=8"`` into ``{"openai": 16, "anthropic": 8}``."""
+    limits = {}
+    for item in _split_csv(value):
+        name, _, limit = item.partition("=")
+        limits[name.strip()] = int(limit)
+    return limits
+
+
 def _validate_encryption_key(key: str) -> None:
     try:
         Fernet(key)
@@ -59,6 +68,11 @@ class BaseConfig:
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=int(os.getenv("REFRESH_TOKEN_EXPIRES_DAYS", "7")))
 
     RATE_LIMIT = os.getenv("API_RATE_LIMIT", "60 per minute")
+    # Turn off every rate limit, e.g. for local load tests (scripts/load_test.py)
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"
+    # Per-user budget of submitted prompt tokens on chat and compare, e.g. "200000 per
+    # hour"; counted with each model's tokenizer. Empty disables it
+    TOKEN_RATE_LIMIT = os.getenv("TOKEN_RATE_LIMIT", "")
     CORS_ORIGINS = _split_csv(
         os.getenv("CORS_ORIGINS", "http://localhost:3044,http://localhost:3000")
     )
@@ -72,6 +86,88 @@ class BaseConfig:
 
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "1000"))
+    # Provider HTTP engine: "sync" (requests, default) or "async" (httpx on a shared event loop)
+    LLM_ENGINE = os.getenv("LLM_ENGINE", "sync").lower()
+    LLM_HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS_PER_HOST", "100"))
+    LLM_HTTP_KEEPALIVE_PER_HOST = int(os.getenv("LLM_HTTP_KEEPALIVE_PER_HOST", "20"))
+    # Under asgi:app with LLM_ENGINE=sync, every open SSE stream holds one of these threads
+    # while it waits for its next chunk; they are separate from request dispatch threads
+    LLM_BLOCKING_BRIDGE_WORKERS = int(os.getenv("LLM_BLOCKING_BRIDGE_WORKERS", "64"))
+    # Per-attempt provider timeouts (seconds); for streams the read timeout is the idle
+    # time allowed between chunks
+    LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+    LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+    LLM_STREAM_IDLE_TIMEOUT = float(os.getenv("LLM_STREAM_IDLE_TIMEOUT", "30"))
+    # Total budget of one request's provider call, retries included
+    LLM_REQUEST_DEADLINE = float(os.getenv("LLM_REQUEST_DEADLINE", "60"))
+    # Send every provider call to this base URL instead of the public APIs, e.g. the
+    # mock provider server (python -m llmselect.mock_provider) for load tests
+    LLM_PROVIDER_BASE_URL = os.getenv("LLM_PROVIDER_BASE_URL") or None
+    # Most recent stored messages sent as history with a delta-mode chat request's message
+    CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "25"))
+    # A streaming chat reply is checkpointed into its draft message once this many bytes
+    # or seconds have gone by since the previous checkpoint
+    STREAM_CHECKPOINT_BYTES = int(os.getenv("STREAM_CHECKPOINT_BYTES", "2048"))
+    STREAM_CHECKPOINT_INTERVAL = float(os.getenv("STREAM_CHECKPOINT_INTERVAL", "2"))
+    # Context window assumed for models the registry does not know; chat histories are
+    # trimmed to fit it minus LLM_MAX_TOKENS
+    LLM_DEFAULT_CONTEXT_WINDOW = int(os.getenv("LLM_DEFAULT_CONTEXT_WINDOW", "8192"))
+    # Directory of vendored tokenizer vocab files (scripts/fetch_tokenizer_vocab.py);
+    # defaults to llmselect/tokenizer_data
+    TOKENIZER_VOCAB_DIR = os.getenv("TOKENIZER_VOCAB_DIR") or None
+    # Write-behind persistence of streamed chat replies and comparisons: committed in
+    # batches by a background worker, retrying transient database errors
+    PERSISTENCE_WRITE_BEHIND = os.getenv("PERSISTENCE_WRITE_BEHIND", "true").lower() == "true"
+    PERSISTENCE_BATCH_SIZE = int(os.getenv("PERSISTENCE_BATCH_SIZE", "50"))
+    PERSISTENCE_MAX_RETRIES = int(os.getenv("PERSISTENCE_MAX_RETRIES", "3"))
+    PERSISTENCE_RETRY_BACKOFF = float(os.getenv("PERSISTENCE_RETRY_BACKOFF", "0.2"))
+    # How long a read waits for pending writes of its conversation or comparison
+    PERSISTENCE_WAIT_TIMEOUT = float(os.getenv("PERSISTENCE_WAIT_TIMEOUT", "5"))
+    # Reserved comparisons still pending after this many seconds (their process died or
+    # their results could not be stored) are deleted at startup
+    COMPARISON_RESERVATION_TTL = int(os.getenv("COMPARISON_RESERVATION_TTL", "3600"))
+    # Max buffered SSE events shared by all provider streams of one comparison
+    COMPARE_STREAM_QUEUE_SIZE = int(os.getenv("COMPARE_STREAM_QUEUE_SIZE", "256"))
+    # App-wide pool shared by every comparison's provider calls
+    PROVIDER_EXECUTOR_MAX_WORKERS = int(os.getenv("PROVIDER_EXECUTOR_MAX_WORKERS", "32"))
+    # Calls allowed to wait for a worker before new ones block, then fail with 503
+    PROVIDER_EXECUTOR_MAX_QUEUE = int(os.getenv("PROVIDER_EXECUTOR_MAX_QUEUE", "128"))
+    PROVIDER_EXECUTOR_QUEUE_TIMEOUT = float(os.getenv("PROVIDER_EXECUTOR_QUEUE_TIMEOUT", "5"))
+    # Exact-match LLM response cache (opt-in); backend "memory" or "flask" (Flask-Caching)
+    LLM_RESPONSE_CACHE_ENABLED = os.getenv("LLM_RESPONSE_CACHE_ENABLED", "false").lower() == "true"
+    LLM_RESPONSE_CACHE_BACKEND = os.getenv("LLM_RESPONSE_CACHE_BACKEND", "memory").lower()
+    LLM_RESPONSE_CACHE_TTL = int(os.getenv("LLM_RESPONSE_CACHE_TTL", "3600"))
+    LLM_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("LLM_RESPONSE_CACHE_MAX_ENTRIES", "1000"))
+    # Share one upstream call among identical concurrent LLM requests
+    LLM_SINGLE_FLIGHT_ENABLED = os.getenv("LLM_SINGLE_FLIGHT_ENABLED", "true").lower() == "true"
+    # Per provider/model circuit breaker over a rolling window of finished calls
+    LLM_CIRCUIT_BREAKER_ENABLED = os.getenv("LLM_CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    LLM_CIRCUIT_BREAKER_WINDOW_SECONDS = float(
+        os.getenv("LLM_CIRCUIT_BREAKER_WINDOW_SECONDS", "60")
+    )
+    LLM_CIRCUIT_BREAKER_MIN_REQUESTS = int(os.getenv("LLM_CIRCUIT_BREAKER_MIN_REQUESTS", "10"))
+    LLM_CIRCUIT_BREAKER_ERROR_RATE = float(os.getenv("LLM_CIRCUIT_BREAKER_ERROR_RATE", "0.5"))
+    LLM_CIRCUIT_BREAKER_SLOW_CALL_SECONDS = float(
+        os.getenv("LLM_CIRCUIT_BREAKER_SLOW_CALL_SECONDS", "20")
+    )
+    LLM_CIRCUIT_BREAKER_SLOW_CALL_RATE = float(
+        os.getenv("LLM_CIRCUIT_BREAKER_SLOW_CALL_RATE", "0.8")
+    )
+    LLM_CIRCUIT_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_CIRCUIT_BREAKER_OPEN_SECONDS", "30"))
+    LLM_CIRCUIT_BREAKER_HALF_OPEN_PROBES = int(
+        os.getenv("LLM_CIRCUIT_BREAKER_HALF_OPEN_PROBES", "2")
+    )
+    # Hedge slow non-streaming calls: a second attempt once a call outlasts this percentile
+    # of the model's recent latency, capped at LLM_HEDGE_BUDGET extra requests
+    LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+    LLM_HEDGE_BUDGET = float(os.getenv("LLM_HEDGE_BUDGET", "0.05"))
+    LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+    # Threads for hedged blocking calls; when all are busy, calls run unhedged in place
+    LLM_HEDGE_MAX_WORKERS = int(os.getenv("LLM_HEDGE_MAX_WORKERS", "32"))
+    # Per-provider concurrency caps, e.g. "openai=16,anthropic=8"; unlisted providers
+    # may use every worker
+    PROVIDER_CONCURRENCY_LIMITS = _parse_limits(os.getenv("PROVIDER_CONCURRENCY_LIMITS", ""))
 
     # Azure AI Foundry configuration
     AZURE_AI_FOUNDRY_ENDPOINT = os.getenv("AZURE_AI_FOUNDRY_ENDPOINT")
@@ -138,6 +234,7 @@ class TestingConfig(BaseConfig):
     SQLALCHEMY_DATABASE_URI = "sqlite:///:memory:"
     WTF_CSRF_ENABLED = False
     RATELIMIT_ENABLED = False  # Disable rate limiting in tests
+    PERSISTENCE_WRITE_BEHIND = False  # Persist stream results inline in tests
     JWT_COOKIE_CSRF_PROTECT = False  # Disable CSRF protection for JWT in tests
 
 
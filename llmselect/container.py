@@ -1,9 +1,31 @@
 from dataclasses import dataclass
+from typing import Optional
 
+from .extensions import cache
+from .services.circuit_breaker import CircuitBreakerRegistry
 from .services.comparisons import ComparisonService
-from .services.conversations import ConversationService
+from .services.context_budget import DEFAULT_CONTEXT_WINDOW, ContextBudget
+from .services.conversations import (
+    DEFAULT_CHECKPOINT_BYTES,
+    DEFAULT_CHECKPOINT_INTERVAL,
+    ConversationService,
+)
+from .services.deadline import ProviderTimeouts
+from .services.hedging import Hedger
 from .services.llm import LLMService
 from .services.model_registry import ModelRegistryService
+from .services.provider_executor import ProviderExecutor
+from .services.response_cache import (
+    BACKENDS as RESPONSE_CACHE_BACKENDS,
+    FlaskCacheBackend,
+    MemoryCacheBackend,
+    ResponseCache,
+)
+from .services.search import SearchService
+from .services.single_flight import SingleFlight
+from .services.tokens import TokenCounter
+from .services.write_behind import WriteBehindQueue
+from .utils.errors import AppError
 
 
 @dataclass
@@ -12,6 +34,41 @@ class ServiceContainer:
     conversations: ConversationService
     comparisons: ComparisonService
     model_registry: ModelRegistryService
+    provider_executor: ProviderExecutor
+    search: SearchService
+    context_budget: ContextBudget
+    tokens: TokenCounter
+    persistence: WriteBehindQueue
+
+
+def _build_response_cache(app) -> Optional[ResponseCache]:
+    if not app.config.get("LLM_RESPONSE_CACHE_ENABLED", False):
+        return None
+
+    backend_name = app.config.get("LLM_RESPONSE_CACHE_BACKEND", "memory")
+    if backend_name not in RESPONSE_CACHE_BACKENDS:
+        raise AppError(f"Unsupported response cache backend '{backend_name}'")
+    if backend_name == "flask":
+        backend = FlaskCacheBackend(app.extensions["cache"][cache])
+    else:
+        backend = MemoryCacheBackend(
+            max_entries=app.config.get("LLM_RESPONSE_CACHE_MAX_ENTRIES", 1000)
+        )
+    return ResponseCache(backend, ttl=app.config.get("LLM_RESPONSE_CACHE_TTL", 3600))
+
+
+def _build_circuit_breakers(app) -> Optional[CircuitBreakerRegistry]:
+    if not app.config.get("LLM_CIRCUIT_BREAKER_ENABLED", False):
+        return None
+    return CircuitBreakerRegistry(
+        window_seconds=app.config.get("LLM_CIRCUIT_BREAKER_WINDOW_SECONDS", 60.0),
+        min_requests=app.config.get("LLM_CIRCUIT_BREAKER_MIN_REQUESTS", 10),
+        error_rate=app.config.get("LLM_CIRCUIT_BREAKER_ERROR_RATE", 0.5),
+        slow_call_seconds=app.config.get("LLM_CIRCUIT_BREAKER_SLOW_CALL_SECONDS", 20.0),
+        slow_call_rate=app.config.get("LLM_CIRCUIT_BREAKER_SLOW_CALL_RATE", 0.8),
+        open_seconds=app.config.get("LLM_CIRCUIT_BREAKER_OPEN_SECONDS", 30.0),
+        half_open_probes=app.config.get("LLM_CIRCUIT_BREAKER_HALF_OPEN_PROBES", 2),
+    )
 
 
 def create_service_container(app=None) -> ServiceContainer:
@@ -21,6 +78,22 @@ def create_service_container(app=None) -> ServiceContainer:
     azure_api_key = None
     azure_api_version = None
     azure_deployment_mappings = {}
+    engine = "sync"
+    async_engine_options = {}
+    executor_options = {}
+    response_cache = None
+    single_flight = None
+    circuit_breakers = None
+    hedger = None
+    timeouts = None
+    request_deadline = 60.0
+    provider_base_url = None
+    history_window = 25
+    checkpoint_bytes = DEFAULT_CHECKPOINT_BYTES
+    checkpoint_interval = DEFAULT_CHECKPOINT_INTERVAL
+    default_context_window = DEFAULT_CONTEXT_WINDOW
+    tokenizer_vocab_dir = None
+    persistence = WriteBehindQueue(enabled=False)
 
     if app and hasattr(app.config, "get"):
         max_tokens = app.config.get("LLM_MAX_TOKENS", 1000)
@@ -29,7 +102,57 @@ def create_service_container(app=None) -> ServiceContainer:
         azure_api_key = app.config.get("AZURE_AI_FOUNDRY_KEY")
         azure_api_version = app.config.get("AZURE_AI_FOUNDRY_API_VERSION")
         azure_deployment_mappings = app.config.get("AZURE_DEPLOYMENT_MAPPINGS", {})
+        engine = app.config.get("LLM_ENGINE", "sync")
+        async_engine_options = {
+            "max_connections_per_host": app.config.get("LLM_HTTP_MAX_CONNECTIONS_PER_HOST", 100),
+            "max_keepalive_per_host": app.config.get("LLM_HTTP_KEEPALIVE_PER_HOST", 20),
+        }
+        executor_options = {
+            "max_workers": app.config.get("PROVIDER_EXECUTOR_MAX_WORKERS", 32),
+            "max_queue": app.config.get("PROVIDER_EXECUTOR_MAX_QUEUE", 128),
+            "queue_timeout": app.config.get("PROVIDER_EXECUTOR_QUEUE_TIMEOUT", 5.0),
+            "provider_limits": app.config.get("PROVIDER_CONCURRENCY_LIMITS", {}),
+        }
+        response_cache = _build_response_cache(app)
+        if app.config.get("LLM_SINGLE_FLIGHT_ENABLED", False):
+            single_flight = SingleFlight()
+        circuit_breakers = _build_circuit_breakers(app)
+        if app.config.get("LLM_HEDGING_ENABLED", False):
+            hedger = Hedger(
+                percentile=app.config.get("LLM_HEDGE_PERCENTILE", 95.0),
+                budget=app.config.get("LLM_HEDGE_BUDGET", 0.05),
+                min_samples=app.config.get("LLM_HEDGE_MIN_SAMPLES", 20),
+                max_workers=app.config.get("LLM_HEDGE_MAX_WORKERS", 32),
+            )
+        timeouts = ProviderTimeouts(
+            connect=app.config.get("LLM_CONNECT_TIMEOUT", 5.0),
+            read=app.config.get("LLM_READ_TIMEOUT", 30.0),
+            stream_idle=app.config.get("LLM_STREAM_IDLE_TIMEOUT", 30.0),
+        )
+        request_deadline = app.config.get("LLM_REQUEST_DEADLINE", 60.0)
+        provider_base_url = app.config.get("LLM_PROVIDER_BASE_URL")
+        history_window = app.config.get("CHAT_HISTORY_WINDOW", 25)
+        checkpoint_bytes = app.config.get("STREAM_CHECKPOINT_BYTES", DEFAULT_CHECKPOINT_BYTES)
+        checkpoint_interval = app.config.get(
+            "STREAM_CHECKPOINT_INTERVAL", DEFAULT_CHECKPOINT_INTERVAL
+        )
+        default_context_window = app.config.get(
+            "LLM_DEFAULT_CONTEXT_WINDOW", DEFAULT_CONTEXT_WINDOW
+        )
+        tokenizer_vocab_dir = app.config.get("TOKENIZER_VOCAB_DIR")
+        persistence = WriteBehindQueue(
+            app,
+            enabled=app.config.get("PERSISTENCE_WRITE_BEHIND", True),
+            batch_size=app.config.get("PERSISTENCE_BATCH_SIZE", 50),
+            max_retries=app.config.get("PERSISTENCE_MAX_RETRIES", 3),
+            retry_backoff=app.config.get("PERSISTENCE_RETRY_BACKOFF", 0.2),
+            wait_timeout=app.config.get("PERSISTENCE_WAIT_TIMEOUT", 5.0),
+        )
 
+    search = SearchService()
+    model_registry = ModelRegistryService()
+    tokens = TokenCounter(tokenizer_vocab_dir)
+    tokens.check_vocab()
     return ServiceContainer(
         llm=LLMService(
             max_tokens=max_tokens,
@@ -38,8 +161,34 @@ def create_service_container(app=None) -> ServiceContainer:
             azure_api_key=azure_api_key,
             azure_api_version=azure_api_version,
             azure_deployment_mappings=azure_deployment_mappings,
+            engine=engine,
+            async_engine_options=async_engine_options,
+            response_cache=response_cache,
+            single_flight=single_flight,
+            circuit_breakers=circuit_breakers,
+            hedger=hedger,
+            timeouts=timeouts,
+            request_deadline=request_deadline,
+            provider_base_url=provider_base_url,
+            blocking_bridge_workers=app.config.get("LLM_BLOCKING_BRIDGE_WORKERS", 64),
+        ),
+        conversations=ConversationService(
+            search=search,
+            history_window=history_window,
+            token_counter=tokens,
+            checkpoint_bytes=checkpoint_bytes,
+            checkpoint_interval=checkpoint_interval,
         ),
-        conversations=ConversationService(),
         comparisons=ComparisonService(),
-        model_registry=ModelRegistryService(),
+        model_registry=model_registry,
+        provider_executor=ProviderExecutor(**executor_options),
+        search=search,
+        context_budget=ContextBudget(
+            model_registry,
+            max_tokens=max_tokens,
+            default_context_window=default_context_window,
+            token_counter=tokens,
+        ),
+        tokens=tokens,
+        persistence=persistence,
     )
@@ -0,0 +1,490 @@
+"""Mock LLM provider server for load tests and offline benchmarks.
+
+An ASGI app speaking the wire formats ``LLMService`` uses: OpenAI and Mistral
+chat completions, Anthropic messages, Gemini ``generateContent`` and Azure AI
+Foundry deployments, each streaming and non-streaming, with the usage blocks
+the real APIs report. Time to first token, the delay between tokens, response
+size and error rate are configurable, so latency and throughput runs are
+reproducible on a laptop without network access or provider quota.
+
+Run it and point the app at it::
+
+    python -m llmselect.mock_provider --port 8900 --ttft 0.3 --token-delay 0.02
+    LLM_PROVIDER_BASE_URL=http://127.0.0.1:8900 python app.py
+
+Any API key is accepted. Under plain uvicorn (``uvicorn llmselect.mock_provider:app``)
+the settings come from ``MOCK_PROVIDER_*`` environment variables. ``GET /stats``
+reports request counts.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Mapping, NamedTuple, Optional, Tuple
+
+_GEMINI_PATH = re.compile(r"^/v1beta/models/([^/:]+):(generateContent|streamGenerateContent)$")
+_AZURE_PATH = re.compile(r"^/openai/deployments/([^/]+)/chat/completions$")
+
+# Generated answers cycle through these words, one token each
+_WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua"
+).split()
+
+_JSON_HEADERS = [(b"content-type", b"application/json")]
+_SSE_HEADERS = [(b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache")]
+
+
+@dataclass
+class MockProviderConfig:
+    ttft: float = 0.2  # seconds before the first token
+    token_delay: float = 0.02  # seconds between tokens
+    jitter: float = 0.0  # +/- fraction applied to each delay
+    response_tokens: int = 200  # tokens per answer, unless max_tokens is lower
+    error_rate: float = 0.0  # fraction of requests answered with error_status
+    error_status: int = 503
+    seed: Optional[int] = None
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "MockProviderConfig":
+        seed = environ.get("MOCK_PROVIDER_SEED")
+        return cls(
+            ttft=float(environ.get("MOCK_PROVIDER_TTFT", cls.ttft)),
+            token_delay=float(environ.get("MOCK_PROVIDER_TOKEN_DELAY", cls.token_delay)),
+            jitter=float(environ.get("MOCK_PROVIDER_JITTER", cls.jitter)),
+            response_tokens=int(environ.get("MOCK_PROVIDER_RESPONSE_TOKENS", cls.response_tokens)),
+            error_rate=float(environ.get("MOCK_PROVIDER_ERROR_RATE", cls.error_rate)),
+            error_status=int(environ.get("MOCK_PROVIDER_ERROR_STATUS", cls.error_status)),
+            seed=int(seed) if seed else None,
+        )
+
+
+class Reply(NamedTuple):
+    """One generated answer, ready to be rendered in a provider's wire format."""
+
+    model: str
+    tokens: List[str]
+    prompt_tokens: int
+    truncated: bool  # cut at the request's max tokens
+    include_usage: bool  # OpenAI ``stream_options.include_usage``
+
+    @property
+    def text(self) -> str:
+        return "".join(self.tokens)
+
+
+def _dumps(data: dict) -> bytes:
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _data(data: dict) -> bytes:
+    return b"data: " + _dumps(data) + b"\n\n"
+
+
+def _count_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+# ----------------------------------------------------------------------
+# Wire formats
+# ----------------------------------------------------------------------
+
+
+class OpenAIFormat:
+    """OpenAI chat completions; also served for Mistral and Azure AI Foundry."""
+
+    @staticmethod
+    def parse(payload: dict) -> Tuple[int, Optional[int], bool]:
+        """Return the prompt tokens, max tokens and include_usage of a request."""
+        prompt = sum(_count_tokens(str(m.get("content", ""))) for m in payload.get("messages", []))
+        max_tokens = payload.get("max_completion_tokens") or payload.get("max_tokens")
+        include_usage = bool((payload.get("stream_options") or {}).get("include_usage"))
+        return prompt, max_tokens, include_usage
+
+    @staticmethod
+    def _usage(reply: Reply) -> dict:
+        completion = len(reply.tokens)
+        return {
+            "prompt_tokens": reply.prompt_tokens,
+            "completion_tokens": completion,
+            "total_tokens": reply.prompt_tokens + completion,
+        }
+
+    @staticmethod
+    def _finish_reason(reply: Reply) -> str:
+        return "length" if reply.truncated else "stop"
+
+    @classmethod
+    def body(cls, reply: Reply) -> dict:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": reply.model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": reply.text},
+                    "finish_reason": cls._finish_reason(reply),
+                }
+            ],
+            "usage": cls._usage(reply),
+        }
+
+    @staticmethod
+    def _chunk(reply: Reply, delta: dict, finish_reason: Optional[str] = None) -> dict:
+        return {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "model": reply.model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+
+    @classmethod
+    def head(cls, reply: Reply) -> List[bytes]:
+        return [_data(cls._chunk(reply, {"role": "assistant", "content": ""}))]
+
+    @classmethod
+    def token(cls, reply: Reply, index: int) -> bytes:
+        return _data(cls._chunk(reply, {"content": reply.tokens[index]}))
+
+    @classmethod
+    def tail(cls, reply: Reply) -> List[bytes]:
+        final = cls._chunk(reply, {}, cls._finish_reason(reply))
+        if reply.include_usage:
+            usage = {**cls._chunk(reply, {}), "choices": [], "usage": cls._usage(reply)}
+            return [_data(final), _data(usage), b"data: [DONE]\n\n"]
+        # Mistral reports usage on its last chunk without being asked
+        final["usage"] = cls._usage(reply)
+        return [_data(final), b"data: [DONE]\n\n"]
+
+    @staticmethod
+    def error(status: int) -> dict:
+        return {"error": {"message": "Mock provider error", "type": "server_error", "code": status}}
+
+
+class AnthropicFormat:
+    @staticmethod
+    def parse(payload: dict) -> Tuple[int, Optional[int], bool]:
+        prompt = _count_tokens(str(payload.get("system", ""))) + sum(
+            _count_tokens(str(m.get("content", ""))) for m in payload.get("messages", [])
+        )
+        return prompt, payload.get("max_tokens"), False
+
+    @staticmethod
+    def _stop_reason(reply: Reply) -> str:
+        return "max_tokens" if reply.truncated else "end_turn"
+
+    @classmethod
+    def body(cls, reply: Reply) -> dict:
+        return {
+            "id": "msg_mock",
+            "type": "message",
+            "role": "assistant",
+            "model": reply.model,
+            "content": [{"type": "text", "text": reply.text}],
+            "stop_reason": cls._stop_reason(reply),
+            "usage": {"input_tokens": reply.prompt_tokens, "output_tokens": len(reply.tokens)},
+        }
+
+    @staticmethod
+    def _event(event_type: str, data: dict) -> bytes:
+        return f"event: {event_type}\n".encode("utf-8") + _data({"type": event_type, **data})
+
+    @classmethod
+    def head(cls, reply: Reply) -> List[bytes]:
+        message = {
+            "id": "msg_mock",
+            "type": "message",
+            "role": "assistant",
+            "model": reply.model,
+            "content": [],
+            "stop_reason": None,
+            "usage": {"input_tokens": reply.prompt_tokens, "output_tokens": 1},
+        }
+        return [
+            cls._event("message_start", {"message": message}),
+            cls._event(
+                "content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}}
+            ),
+            cls._event("ping", {}),
+        ]
+
+    @classmethod
+    def token(cls, reply: Reply, index: int) -> bytes:
+        delta = {"type": "text_delta", "text": reply.tokens[index]}
+        return cls._event("content_block_delta", {"index": 0, "delta": delta})
+
+    @classmethod
+    def tail(cls, reply: Reply) -> List[bytes]:
+        return [
+            cls._event("content_block_stop", {"index": 0}),
+            cls._event(
+                "message_delta",
+                {
+                    "delta": {"stop_reason": cls._stop_reason(reply), "stop_sequence": None},
+                    "usage": {"output_tokens": len(reply.tokens)},
+                },
+            ),
+            cls._event("message_stop", {}),
+        ]
+
+    @staticmethod
+    def error(status: int) -> dict:
+        error_type = "rate_limit_error" if status == 429 else "overloaded_error"
+        return {"type": "error", "error": {"type": error_type, "message": "Mock provider error"}}
+
+
+class GeminiFormat:
+    @staticmethod
+    def parse(payload: dict) -> Tuple[int, Optional[int], bool]:
+        prompt = sum(
+            _count_tokens(str(part.get("text", "")))
+            for content in payload.get("contents", [])
+            for part in content.get("parts", [])
+        )
+        max_tokens = (payload.get("generationConfig") or {}).get("maxOutputTokens")
+        return prompt, max_tokens, False
+
+    @staticmethod
+    def _candidate(text: str, finish_reason: Optional[str] = None) -> dict:
+        candidate = {"content": {"parts": [{"text": text}], "role": "model"}, "index": 0}
+        if finish_reason:
+            candidate["finishReason"] = finish_reason
+        return candidate
+
+    @staticmethod
+    def _usage(reply: Reply, completion: int) -> dict:
+        return {
+            "promptTokenCount": reply.prompt_tokens,
+            "candidatesTokenCount": completion,
+            "totalTokenCount": reply.prompt_tokens + completion,
+        }
+
+    @staticmethod
+    def _finish_reason(reply: Reply) -> str:
+        return "MAX_TOKENS" if reply.truncated else "STOP"
+
+    @classmethod
+    def body(cls, reply: Reply) -> dict:
+        return {
+            "candidates": [cls._candidate(reply.text, cls._finish_reason(reply))],
+            "usageMetadata": cls._usage(reply, len(reply.tokens)),
+        }
+
+    @staticmethod
+    def head(reply: Reply) -> List[bytes]:
+        return []
+
+    @classmethod
+    def token(cls, reply: Reply, index: int) -> bytes:
+        # Every event carries the running usage totals
+        return _data(
+            {
+                "candidates": [cls._candidate(reply.tokens[index])],
+                "usageMetadata": cls._usage(reply, index + 1),
+            }
+        )
+
+    @classmethod
+    def tail(cls, reply: Reply) -> List[bytes]:
+        return [
+            _data(
+                {
+                    "candidates": [cls._candidate("", cls._finish_reason(reply))],
+                    "usageMetadata": cls._usage(reply, len(reply.tokens)),
+                }
+            )
+        ]
+
+    @staticmethod
+    def error(status: int) -> dict:
+        error = {"code": status, "message": "Mock provider error", "status": "UNAVAILABLE"}
+        return {"error": error}
+
+
+# ----------------------------------------------------------------------
+# ASGI app
+# ----------------------------------------------------------------------
+
+
+class MockProviderApp:
+    def __init__(self, config: Optional[MockProviderConfig] = None):
+        self.config = config or MockProviderConfig()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.streams = 0
+        self.errors = 0
+        self.in_flight = 0
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            while (await receive())["type"] != "lifespan.shutdown":
+                await send({"type": "lifespan.startup.complete"})
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+        if scope["type"] != "http":
+            return
+
+        path = scope["path"]
+        if scope["method"] == "GET" and path in ("/health", "/stats"):
+            await self._send_json(send, 200, self.stats())
+            return
+        route = self._route(scope)
+        if scope["method"] != "POST" or route is None:
+            await self._send_json(send, 404, {"error": {"message": f"No mock route for {path}"}})
+            return
+
+        wire, model, stream = route
+        try:
+            payload = json.loads(await _read_body(receive) or b"{}")
+        except ValueError:
+            await self._send_json(send, 400, {"error": {"message": "Invalid JSON body"}})
+            return
+        model = model or payload.get("model") or "mock-model"
+        stream = stream if stream is not None else bool(payload.get("stream"))
+
+        self._count(stream)
+        try:
+            if self._fail():
+                status = self.config.error_status
+                await asyncio.sleep(self._delay(self.config.ttft))
+                await self._send_json(send, status, wire.error(status))
+                return
+            reply = self._reply(wire, model, payload)
+            if stream:
+                await self._stream(send, wire, reply)
+            else:
+                delay = self.config.ttft + self.config.token_delay * max(0, len(reply.tokens) - 1)
+                await asyncio.sleep(self._delay(delay))
+                await self._send_json(send, 200, wire.body(reply))
+        except OSError:
+            # The client went away mid-response
+            pass
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "streams": self.streams,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+            }
+
+    @staticmethod
+    def _route(scope: dict) -> Optional[Tuple[type, Optional[str], Optional[bool]]]:
+        """Return the wire format, the model named by the path and whether it streams."""
+        path = scope["path"]
+        if path == "/v1/chat/completions" or _AZURE_PATH.match(path):
+            return OpenAIFormat, None, None
+        if path == "/v1/messages":
+            return AnthropicFormat, None, None
+        match = _GEMINI_PATH.match(path)
+        if match:
+            return GeminiFormat, match.group(1), match.group(2) == "streamGenerateContent"
+        return None
+
+    def _reply(self, wire, model: str, payload: dict) -> Reply:
+        prompt_tokens, max_tokens, include_usage = wire.parse(payload)
+        count = self.config.response_tokens
+        truncated = bool(max_tokens) and max_tokens < count
+        if truncated:
+            count = max_tokens
+        tokens = [_WORDS[i % len(_WORDS)] + " " for i in range(count)]
+        return Reply(model, tokens, prompt_tokens, truncated, include_usage)
+
+    async def _stream(self, send: Callable, wire, reply: Reply) -> None:
+        await send({"type": "http.response.start", "status": 200, "headers": _SSE_HEADERS})
+        await asyncio.sleep(self._delay(self.config.ttft))
+        frames = wire.head(reply)
+        for index in range(len(reply.tokens)):
+            if index:
+                await asyncio.sleep(self._delay(self.config.token_delay))
+            frames.append(wire.token(reply, index))
+            await send({"type": "http.response.body", "body": b"".join(frames), "more_body": True})
+            frames = []
+        body = b"".join(frames + wire.tail(reply))
+        await send({"type": "http.response.body", "body": body, "more_body": False})
+
+    @staticmethod
+    async def _send_json(send: Callable, status: int, data: dict) -> None:
+        await send({"type": "http.response.start", "status": status, "headers": _JSON_HEADERS})
+        await send({"type": "http.response.body", "body": _dumps(data)})
+
+    def _count(self, stream: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.streams += int(stream)
+            self.in_flight += 1
+
+    def _fail(self) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        with self._lock:
+            failed = self._random.random() < self.config.error_rate
+            self.errors += int(failed)
+        return failed
+
+    def _delay(self, seconds: float) -> float:
+        if seconds <= 0 or self.config.jitter <= 0:
+            return max(0.0, seconds)
+        with self._lock:
+            factor = self._random.uniform(1 - self.config.jitter, 1 + self.config.jitter)
+        return max(0.0, seconds * factor)
+
+
+async def _read_body(receive: Callable) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+app = MockProviderApp(MockProviderConfig.from_env())
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import uvicorn
+
+    defaults = MockProviderConfig.from_env()
+    parser = argparse.ArgumentParser(description="Mock LLM provider server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--ttft", type=float, default=defaults.ttft)
+    parser.add_argument("--token-delay", type=float, default=defaults.token_delay)
+    parser.add_argument("--jitter", type=float, default=defaults.jitter)
+    parser.add_argument("--response-tokens", type=int, default=defaults.response_tokens)
+    parser.add_argument("--error-rate", type=float, default=defaults.error_rate)
+    parser.add_argument("--error-status", type=int, default=defaults.error_status)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    args = parser.parse_args(argv)
+
+    config = MockProviderConfig(
+        ttft=args.ttft,
+        token_delay=args.token_delay,
+        jitter=args.jitter,
+        response_tokens=args.response_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        seed=args.seed,
+    )
+    uvicorn.run(MockProviderApp(config), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
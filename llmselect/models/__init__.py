@@ -2,7 +2,7 @@ from .api_key import APIKey
 from .base import TimestampMixin
 from .comparison_result import ComparisonResult
 from .conversation import Conversation
-from .message import Message
+from .message import Message, MessageChunk
 from .user import User
 
 PROVIDERS = {"openai", "anthropic", "gemini", "mistral"}
@@ -12,6 +12,7 @@ __all__ = [
     "ComparisonResult",
     "Conversation",
     "Message",
+    "MessageChunk",
     "PROVIDERS",
     "TimestampMixin",
     "User",
@@ -1,12 +1,18 @@
 from ..extensions import db
 from .base import TimestampMixin
 
+# ComparisonResult.status: a streamed comparison's row is reserved "pending" when its
+# providers start streaming and becomes "complete" once its results are stored
+COMPARISON_PENDING = "pending"
+COMPARISON_COMPLETE = "complete"
+
 
 class ComparisonResult(db.Model, TimestampMixin):
     """Stores comparison results for multi-model comparisons."""
 
     __tablename__ = "comparison_results"
-    __table_args__ = (db.Index("idx_comparison_user_created", "user_id", "created_at"),)
+    # Matches the history's keyset ordering (created_at DESC, id DESC)
+    __table_args__ = (db.Index("idx_comparison_user_created_id", "user_id", "created_at", "id"),)
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
@@ -19,12 +25,23 @@ class ComparisonResult(db.Model, TimestampMixin):
     #     "model": "gpt-4",
     #     "response": "...",
     #     "time": 1.2,
-    #     "tokens": 245,
+    #     "tokens": 245,  # completion tokens; estimated when not reported
+    #     "prompt_tokens": 12,  # null when the provider reported no usage
+    #     "completion_tokens": 245,
+    #     "finish_reason": "stop",
+    #     "latency": 1.1,  # provider time in seconds
+    #     "cached": false,
     # }
     results = db.Column(db.JSON, nullable=False)
 
     # Optional: User's preference (model index or null)
     preferred_index = db.Column(db.Integer, nullable=True)
+    status = db.Column(
+        db.String(16),
+        nullable=False,
+        default=COMPARISON_COMPLETE,
+        server_default=COMPARISON_COMPLETE,
+    )
 
     # Relationships
     user = db.relationship("User", backref=db.backref("comparisons", lazy="dynamic"))
@@ -4,12 +4,16 @@ from uuid import uuid4
 from ..extensions import db
 from .base import TimestampMixin
 
+PREVIEW_LENGTH = 100
+
 
 class Conversation(db.Model, TimestampMixin):
     __tablename__ = "conversations"
     __table_args__ = (
         db.Index("idx_conversation_user_created", "user_id", "created_at"),
         db.Index("idx_conversations_user_provider", "user_id", "provider"),
+        # Matches the list's keyset ordering (last_message_at DESC, id DESC)
+        db.Index("idx_conversations_user_last_message", "user_id", "last_message_at", "id"),
     )
 
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid4()))
@@ -18,6 +22,12 @@ class Conversation(db.Model, TimestampMixin):
     title = db.Column(db.String(255), nullable=True)
     last_message_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
 
+    # Denormalized from messages by ConversationService.append_message so the
+    # conversation list never has to load message rows
+    message_count = db.Column(db.Integer, nullable=False, default=0, server_default="0")
+    last_user_preview = db.Column(db.String(PREVIEW_LENGTH), nullable=True)
+    last_message_role = db.Column(db.String(20), nullable=True)
+
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
     user = db.relationship("User", back_populates="conversations")
     messages = db.relationship(
@@ -1,6 +1,12 @@
 from ..extensions import db
 from .base import TimestampMixin
 
+# Message.status: an assistant reply is a "streaming" draft from the moment its stream
+# starts until it is stored "complete", or "aborted" if the stream broke off
+MESSAGE_STREAMING = "streaming"
+MESSAGE_COMPLETE = "complete"
+MESSAGE_ABORTED = "aborted"
+
 
 class Message(db.Model, TimestampMixin):
     __tablename__ = "messages"
@@ -12,5 +18,49 @@ class Message(db.Model, TimestampMixin):
     role = db.Column(db.String(20), nullable=False)
     content = db.Column(db.Text, nullable=False)
 
+    # Usage reported by the provider for assistant replies; NULL when unknown
+    # (user messages, cached answers, providers that report nothing)
+    prompt_tokens = db.Column(db.Integer, nullable=True)
+    completion_tokens = db.Column(db.Integer, nullable=True)
+    finish_reason = db.Column(db.String(32), nullable=True)
+    latency = db.Column(db.Float, nullable=True)  # seconds
+    # Token count of ``content`` used for context budgeting; NULL until counted
+    token_count = db.Column(db.Integer, nullable=True)
+    status = db.Column(
+        db.String(16), nullable=False, default=MESSAGE_COMPLETE, server_default=MESSAGE_COMPLETE
+    )
+
     conversation_id = db.Column(db.String(36), db.ForeignKey("conversations.id"), nullable=False)
     conversation = db.relationship("Conversation", back_populates="messages")
+    # Checkpointed text of a streaming draft, folded into ``content`` when it finishes
+    chunks = db.relationship(
+        "MessageChunk", cascade="all, delete-orphan", order_by="MessageChunk.seq"
+    )
+
+    def visible_content(self) -> str:
+        """The content, or for a draft still marked streaming, its checkpointed text."""
+        if self.status == MESSAGE_STREAMING and not self.content:
+            return "".join(chunk.content for chunk in self.chunks)
+        return self.content
+
+    def usage(self):
+        """Serialize the reported usage, or ``None`` for messages without any."""
+        if self.completion_tokens is None and self.latency is None:
+            return None
+        return {
+            "promptTokens": self.prompt_tokens,
+            "completionTokens": self.completion_tokens,
+            "finishReason": self.finish_reason,
+            "latency": self.latency,
+        }
+
+
+class MessageChunk(db.Model):
+    """One checkpoint of a streaming draft's text; appended, never rewritten."""
+
+    __tablename__ = "message_chunks"
+
+    id = db.Column(db.Integer, primary_key=True)
+    message_id = db.Column(db.Integer, db.ForeignKey("messages.id"), nullable=False, index=True)
+    seq = db.Column(db.Integer, nullable=False)
+    content = db.Column(db.Text, nullable=False)
@@ -0,0 +1,148 @@
+"""Read-only projections of conversations, messages and comparisons.
+
+Routes serialize these instead of ORM instances, and services cache them: they are
+plain tuples of JSON-ready values (timestamps already formatted), so they pickle
+compactly for any cache backend, carry no session state or lazy attributes, and a
+cached read builds a response without hydrating a single model.
+"""
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from .models import ComparisonResult, Conversation, Message
+from .models.message import MESSAGE_COMPLETE
+
+
+def _timestamp(value) -> str:
+    return value.isoformat() + "Z"
+
+
+def _title(conversation: Conversation) -> str:
+    return conversation.title or f"{conversation.provider} - {conversation.model}"
+
+
+class MessageView(NamedTuple):
+    id: int
+    role: str
+    content: str
+    created_at: str
+    usage: Optional[Dict[str, Any]]
+    # Defaulted so views cached before the field existed still unpickle
+    status: str = MESSAGE_COMPLETE
+
+    @classmethod
+    def from_model(cls, message: Message) -> "MessageView":
+        return cls(
+            message.id,
+            message.role,
+            message.visible_content(),
+            _timestamp(message.created_at),
+            message.usage(),
+            message.status,
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "role": self.role,
+            "content": self.content,
+            "createdAt": self.created_at,
+            "usage": self.usage,
+            "status": self.status,
+        }
+
+
+class ConversationSummary(NamedTuple):
+    """A conversation list row; needs only the denormalized summary columns."""
+
+    id: str
+    title: str
+    provider: str
+    model: str
+    last_message_at: str
+    message_count: int
+    preview: str
+
+    @classmethod
+    def from_model(cls, conversation: Conversation) -> "ConversationSummary":
+        return cls(
+            conversation.id,
+            _title(conversation),
+            conversation.provider,
+            conversation.model,
+            _timestamp(conversation.last_message_at),
+            conversation.message_count,
+            conversation.last_user_preview or "",
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "provider": self.provider,
+            "model": self.model,
+            "lastMessageAt": self.last_message_at,
+            "messageCount": self.message_count,
+            "preview": self.preview,
+        }
+
+
+class ConversationView(NamedTuple):
+    """A conversation with its full transcript."""
+
+    id: str
+    title: str
+    provider: str
+    model: str
+    last_message_at: str
+    messages: Tuple[MessageView, ...]
+
+    @classmethod
+    def from_model(cls, conversation: Conversation) -> "ConversationView":
+        return cls(
+            conversation.id,
+            _title(conversation),
+            conversation.provider,
+            conversation.model,
+            _timestamp(conversation.last_message_at),
+            tuple(MessageView.from_model(message) for message in conversation.messages),
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "title": self.title,
+            "provider": self.provider,
+            "model": self.model,
+            "lastMessageAt": self.last_message_at,
+            "messages": [message.to_json() for message in self.messages],
+        }
+
+
+class ComparisonView(NamedTuple):
+    id: int
+    prompt: str
+    results: List[Dict[str, Any]]
+    preferred_index: Optional[int]
+    created_at: str
+    updated_at: str
+
+    @classmethod
+    def from_model(cls, comparison: ComparisonResult) -> "ComparisonView":
+        # Same shape as ComparisonResult.to_dict(), whose timestamps carry no "Z"
+        return cls(
+            comparison.id,
+            comparison.prompt,
+            comparison.results,
+            comparison.preferred_index,
+            comparison.created_at.isoformat(),
+            comparison.updated_at.isoformat(),
+        )
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "prompt": self.prompt,
+            "results": self.results,
+            "preferred_index": self.preferred_index,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+        }
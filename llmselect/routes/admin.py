@@ -44,6 +44,9 @@ def clear_cache():
 
     # Clear all caches
     cache.clear()
+    response_cache = current_app.extensions["services"].llm.response_cache
+    if response_cache is not None:
+        response_cache.clear()
 
     return (
         jsonify(
@@ -68,6 +71,8 @@ def cache_stats():
     """
     require_admin()
 
+    response_cache = current_app.extensions["services"].llm.response_cache
+
     # SimpleCache doesn't provide detailed stats, but we can show config
     return (
         jsonify(
@@ -75,6 +80,9 @@ def cache_stats():
                 "cache_type": current_app.config.get("CACHE_TYPE", "unknown"),
                 "default_timeout": current_app.config.get("CACHE_DEFAULT_TIMEOUT", "unknown"),
                 "threshold": current_app.config.get("CACHE_THRESHOLD", "unknown"),
+                "llm_response_cache": (
+                    response_cache.stats() if response_cache is not None else {"enabled": False}
+                ),
                 "message": "Cache is operational",
             }
         ),
@@ -85,7 +93,7 @@ def cache_stats():
 @bp.route("/health/detailed", methods=["GET"])
 @jwt_required()
 def detailed_health():
-    """Get detailed health information including database pool stats.
+    """Get detailed health information including database pool and provider executor stats.
 
     Admin endpoint for comprehensive system health monitoring.
 
@@ -117,4 +125,20 @@ def detailed_health():
         current_app.logger.exception("Unexpected error in health_check database pool stats")
         health_info["database"]["pool"] = "Error retrieving stats"
 
+    services = current_app.extensions["services"]
+    health_info["provider_executor"] = services.provider_executor.stats()
+    health_info["providers"] = services.llm.providers.capabilities()
+    single_flight = services.llm.single_flight
+    if single_flight is not None:
+        health_info["llm_single_flight"] = single_flight.stats()
+    hedger = services.llm.hedger
+    if hedger is not None:
+        health_info["llm_hedging"] = hedger.stats()
+    circuit_breakers = services.llm.circuit_breakers
+    if circuit_breakers is not None:
+        breakers = circuit_breakers.stats()
+        health_info["circuit_breakers"] = breakers
+        if any(breaker["state"] != "closed" for breaker in breakers):
+            health_info["status"] = "degraded"
+
     return jsonify(health_info), 200
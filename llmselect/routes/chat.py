@@ -1,7 +1,10 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import as_completed
+from dataclasses import dataclass, field
 import json
+import queue
+import threading
 from time import time
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 
 from flask import (
     Blueprint,
@@ -15,35 +18,124 @@ from flask import (
 from flask_jwt_extended import current_user, jwt_required
 
 from ..extensions import limiter
+from ..models.message import MESSAGE_ABORTED, MESSAGE_COMPLETE
 from ..services.api_keys import get_api_key
+from ..services.comparisons import ComparisonReservation
+from ..services.context_budget import ContextFit
+from ..services.conversations import DraftWrite
+from ..services.deadline import Deadline
+from ..services.providers import USAGE_FIELDS, LLMResult
 from ..schemas import ChatRequestSchema, CompareRequestSchema
+from ..utils.errors import AppError, ProviderBusyError, ProviderUnavailableError
 
 bp = Blueprint("chat", __name__, url_prefix="/api/v1")
 
 chat_schema = ChatRequestSchema()
 compare_schema = CompareRequestSchema()
 
+# WSGI environ key set by the ASGI entry point; streaming views store their plan in it
+ASGI_STREAM_PLAN_KEY = "llmselect.asgi_stream_plan"
+CHAT_STREAM_ERROR = "Streaming failed. Please check your API key and try again."
+PROVIDER_UNAVAILABLE_ERROR = "Provider is temporarily unavailable. Please try again shortly."
+
+# Sentinel pushed by a fan-in worker once its provider stream has finished
+_STREAM_END = object()
+# How long a fan-in worker blocks on a full queue before re-checking cancellation
+_FAN_IN_PUT_TIMEOUT = 0.1
+
 
 def _rate_limit():
     return current_app.config["RATE_LIMIT"]
 
 
-def _estimate_tokens(text: str) -> int:
-    """Rough token estimation: ~4 characters per token for English text.
+def _token_rate_limit():
+    return current_app.config.get("TOKEN_RATE_LIMIT", "")
+
 
-    Note: This is a simple heuristic that may be less accurate for:
-    - Non-English languages (especially CJK languages)
-    - Code and technical content
-    - Text with many special characters
+def _token_rate_limit_key():
+    # Kept apart from the request-count limit's counters, which are keyed by address
+    return f"tokens:{current_user.id}"
 
-    For production use, consider using provider-specific tokenizers.
+
+def _request_token_cost() -> int:
+    """Tokens of the text a chat or compare request submits, charged to the token limit.
+
+    Counted with each target model's tokenizer; a comparison is charged once per
+    provider it fans out to. The limiter runs before the view, so the body is
+    validated here first: only text within the schemas' length caps is tokenized,
+    and bodies that fail validation cost one token.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return 1
+    schema = compare_schema if "providers" in payload else chat_schema
+    if schema.validate(payload):
+        return 1
+    if "providers" in payload:
+        targets = payload["providers"]
+        texts = [payload["prompt"]]
+    else:
+        targets = [payload]
+        if payload.get("message") is not None:
+            texts = [payload["message"]]
+        else:
+            texts = [message["content"] for message in payload["messages"]]
+    tokens = current_app.extensions["services"].tokens
+    cost = 0
+    for target in targets:
+        cost += sum(tokens.count_many(target["provider"], target["model"], texts))
+    return max(1, cost)
+
+
+def _estimate_tokens(app, provider: str, model: str, text: str) -> int:
+    """Token count used when the provider reported no usage, e.g. for cached answers."""
+    return app.extensions["services"].tokens.count(provider, model, text)
+
+
+def _usage_fields(app, provider, model, text: str, result: Optional[LLMResult]) -> dict:
+    """Usage entries of a provider result; ``tokens`` falls back to a local count."""
+    usage = (result or LLMResult(text)).usage()
+    tokens = usage["completion_tokens"]
+    if tokens is None:
+        tokens = _estimate_tokens(app, provider, model, text)
+    return {"tokens": tokens, **usage}
+
+
+def _record_user_turn(services, conversation, payload) -> ContextFit:
+    """Fit the request's messages into the model's context window, then store its user turn.
+
+    In delta mode (``message``) the history is assembled from the stored
+    conversation, so the request stays the same size however long it gets. In full
+    mode the client's ``messages`` are used and only their last user turn is stored.
+    Nothing is stored when the messages cannot fit.
     """
-    return max(1, len(text) // 4)
+    conversation_service = services.conversations
+    # The previous turn's reply may still be in the write-behind queue
+    services.persistence.wait_for(conversation.id)
+    if payload["message"] is not None:
+        content = payload["message"]
+        messages = conversation_service.get_history(conversation)
+        messages.append({"role": "user", "content": content})
+    else:
+        messages = payload["messages"]
+        content = messages[-1]["content"] if messages[-1].get("role") == "user" else None
+
+    fit = services.context_budget.fit(payload["provider"], payload["model"], messages)
+    if content is not None:
+        conversation_service.append_message(conversation, "user", content)
+    return fit
+
+
+def _chat_done_event(plan: "ChatStreamPlan") -> str:
+    return _sse_event(
+        {"done": True, "conversationId": str(plan.conversation_id), "context": plan.context}
+    )
 
 
 @bp.post("/chat")
 @jwt_required()
 @limiter.limit(_rate_limit)
+@limiter.limit(_token_rate_limit, key_func=_token_rate_limit_key, cost=_request_token_cost)
 def send_chat_message():
     payload = chat_schema.load(request.get_json() or {})
     provider = payload["provider"]
@@ -53,6 +145,7 @@ def send_chat_message():
     conversation_service = services.conversations
     llm_service = services.llm
     encryption_service = current_app.extensions["key_encryption"]
+    deadline = llm_service.new_deadline()
 
     conversation_id_value: Optional[str] = None
     if payload.get("conversation_id"):
@@ -66,24 +159,30 @@ def send_chat_message():
     )
     g.conversation_id = conversation.id
 
-    messages = payload["messages"]
-    if messages:
-        latest_message = messages[-1]
-        if latest_message.get("role") == "user":
-            conversation_service.append_message(conversation, "user", latest_message["content"])
+    fit = _record_user_turn(services, conversation, payload)
 
     api_key = get_api_key(current_user, provider, encryption_service)
 
-    response_text = llm_service.invoke(provider, model, messages, api_key)
+    result = llm_service.invoke(
+        provider, model, fit.messages, api_key, use_cache=payload["cache"], deadline=deadline
+    )
 
-    conversation_service.append_message(conversation, "assistant", response_text)
+    conversation_service.append_message(conversation, "assistant", result.text, result)
 
-    return jsonify({"response": response_text, "conversationId": conversation.id})
+    return jsonify(
+        {
+            "response": result.text,
+            "conversationId": conversation.id,
+            "usage": result.usage(),
+            "context": fit.report(),
+        }
+    )
 
 
 @bp.post("/chat/stream")
 @jwt_required()
 @limiter.limit(_rate_limit)
+@limiter.limit(_token_rate_limit, key_func=_token_rate_limit_key, cost=_request_token_cost)
 def stream_chat():
     """Stream single-model chat response via SSE."""
     payload = chat_schema.load(request.get_json() or {})
@@ -92,8 +191,8 @@ def stream_chat():
 
     services = current_app.extensions["services"]
     conversation_service = services.conversations
-    llm_service = services.llm
     encryption_service = current_app.extensions["key_encryption"]
+    deadline = services.llm.new_deadline()
 
     conversation_id_value: Optional[str] = None
     if payload.get("conversation_id"):
@@ -107,65 +206,32 @@ def stream_chat():
     )
     g.conversation_id = conversation.id
 
-    messages = payload["messages"]
-    if messages:
-        latest_message = messages[-1]
-        if latest_message.get("role") == "user":
-            conversation_service.append_message(conversation, "user", latest_message["content"])
+    fit = _record_user_turn(services, conversation, payload)
 
     api_key = get_api_key(current_user, provider, encryption_service)
 
-    def generate():
-        """Generator function for SSE stream."""
-        try:
-            full_response = ""
-            start_time = time()
-            first_token_time = None
-            chunk_count = 0
-
-            # Stream from provider
-            for chunk in llm_service.invoke_stream(provider, model, messages, api_key):
-                if first_token_time is None:
-                    first_token_time = time()
-                    ttft = (first_token_time - start_time) * 1000  # Convert to ms
-                    current_app.logger.info(
-                        f"[Streaming] Time to first token: {ttft:.2f}ms "
-                        f"(provider={provider}, model={model})"
-                    )
-
-                full_response += chunk
-                chunk_count += 1
-                yield f"data: {json.dumps({'content': chunk})}\n\n"
-
-            # Log streaming metrics
-            total_time = (time() - start_time) * 1000  # Convert to ms
-            current_app.logger.info(
-                f"[Streaming] Complete: {total_time:.2f}ms total, {chunk_count} chunks "
-                f"(provider={provider}, model={model})"
-            )
-
-            # Save assistant response after streaming completes
-            conversation_service.append_message(conversation, "assistant", full_response)
-
-            # Send completion event
-            yield f"data: {json.dumps({'done': True, 'conversationId': str(conversation.id)})}\n\n"
-
-        except Exception as exc:
-            current_app.logger.error(
-                "Chat streaming failed",
-                extra={
-                    "provider": provider,
-                    "model": model,
-                    "error_type": type(exc).__name__,
-                },
-            )
-            error_msg = "Streaming failed. Please check your API key " "and try again."
-            yield f"data: {json.dumps({'error': error_msg})}\n\n"
+    # The reply is stored as a streaming draft up front and checkpointed as it streams,
+    # so an interrupted generation is kept
+    draft = conversation_service.draft_write(conversation.id, current_user.id)
+    services.persistence.submit(draft)
 
-    return Response(
-        stream_with_context(generate()),
-        mimetype="text/event-stream",
-        headers={
+    plan = ChatStreamPlan(
+        provider=provider,
+        model=model,
+        messages=fit.messages,
+        api_key=api_key,
+        conversation_id=conversation.id,
+        user_id=current_user.id,
+        use_cache=payload["cache"],
+        deadline=deadline,
+        context=fit.report(),
+        draft=draft,
+    )
+    app = current_app._get_current_object()
+    return _stream_response(
+        plan,
+        lambda: _chat_stream_events(app, plan),
+        {
             "Cache-Control": "no-cache",
             "X-Accel-Buffering": "no",
             "Connection": "keep-alive",  # Add keep-alive header
@@ -173,9 +239,134 @@ def stream_chat():
     )
 
 
+@dataclass
+class ChatStreamPlan:
+    """Everything a chat stream needs once the request has been authorized."""
+
+    provider: str
+    model: str
+    messages: List[Dict[str, str]]
+    api_key: str
+    conversation_id: str
+    user_id: int
+    use_cache: bool = True
+    deadline: Optional[Deadline] = None
+    # ContextFit.report() of the messages, sent with the done event
+    context: Optional[dict] = None
+    # Write-behind draft of the reply, submitted when the stream starts
+    draft: Optional[DraftWrite] = None
+
+
+def _stream_response(plan, events, headers) -> Response:
+    """Build the SSE response for a prepared stream.
+
+    Under the ASGI entry point (see ``llmselect.asgi``) the plan is handed back
+    through the WSGI environ and streamed by a native async handler, so only the
+    response headers are produced here.
+    """
+    if ASGI_STREAM_PLAN_KEY in request.environ:
+        request.environ[ASGI_STREAM_PLAN_KEY] = plan
+        return Response(status=200, mimetype="text/event-stream", headers=headers)
+    return Response(stream_with_context(events()), mimetype="text/event-stream", headers=headers)
+
+
+def _save_chat_reply(
+    app,
+    plan: ChatStreamPlan,
+    text: str,
+    result: Optional[LLMResult] = None,
+    status: str = MESSAGE_COMPLETE,
+) -> None:
+    """Queue the assistant reply of a finished or aborted chat stream into its draft."""
+    services = app.extensions["services"]
+    services.persistence.submit(
+        services.conversations.reply_write(
+            plan.conversation_id, plan.user_id, text, result, plan.draft, status
+        )
+    )
+
+
+def _log_chat_stream_failure(app, plan: ChatStreamPlan, exc: Exception) -> None:
+    app.logger.error(
+        "Chat streaming failed",
+        extra={
+            "provider": plan.provider,
+            "model": plan.model,
+            "error_type": type(exc).__name__,
+        },
+    )
+
+
+def _chat_stream_events(app, plan: ChatStreamPlan):
+    """Generator function for SSE stream."""
+    services = app.extensions["services"]
+    llm_service = services.llm
+    checkpointer = services.conversations.checkpointer(services.persistence, plan.draft)
+    provider = plan.provider
+    model = plan.model
+    full_response = ""
+    result = None
+    saved = False
+    try:
+        start_time = time()
+        first_token_time = None
+        chunk_count = 0
+
+        # Stream from provider
+        for chunk in llm_service.invoke_stream(
+            provider,
+            model,
+            plan.messages,
+            plan.api_key,
+            use_cache=plan.use_cache,
+            deadline=plan.deadline,
+        ):
+            if isinstance(chunk, LLMResult):
+                result = chunk
+                continue
+            if first_token_time is None:
+                first_token_time = time()
+                ttft = (first_token_time - start_time) * 1000  # Convert to ms
+                app.logger.info(
+                    f"[Streaming] Time to first token: {ttft:.2f}ms "
+                    f"(provider={provider}, model={model})"
+                )
+
+            full_response += chunk
+            chunk_count += 1
+            if checkpointer.add(chunk):
+                checkpointer.checkpoint()
+            yield _sse_event({"content": chunk})
+
+        # Log streaming metrics
+        total_time = (time() - start_time) * 1000  # Convert to ms
+        app.logger.info(
+            f"[Streaming] Complete: {total_time:.2f}ms total, {chunk_count} chunks "
+            f"(provider={provider}, model={model})"
+        )
+
+        # Save assistant response after streaming completes
+        _save_chat_reply(app, plan, full_response, result)
+        saved = True
+
+        # Send completion event
+        yield _chat_done_event(plan)
+
+    except Exception as exc:
+        _log_chat_stream_failure(app, plan, exc)
+        _save_chat_reply(app, plan, full_response, result, MESSAGE_ABORTED)
+        saved = True
+        yield _sse_event({"error": CHAT_STREAM_ERROR})
+    finally:
+        if not saved:
+            # The client went away mid-stream
+            _save_chat_reply(app, plan, full_response, result, MESSAGE_ABORTED)
+
+
 @bp.post("/compare")
 @jwt_required()
 @limiter.limit(_rate_limit)
+@limiter.limit(_token_rate_limit, key_func=_token_rate_limit_key, cost=_request_token_cost)
 def compare():
     payload = compare_schema.load(request.get_json() or {})
     prompt = payload["prompt"]
@@ -184,65 +375,61 @@ def compare():
     services = current_app.extensions["services"]
     llm_service = services.llm
     comparison_service = services.comparisons
+    executor = services.provider_executor
     encryption_service = current_app.extensions["key_encryption"]
+    # One budget for the whole comparison, including time spent queued for a worker
+    deadline = llm_service.new_deadline()
 
     results = []
     messages = [{"role": "user", "content": prompt}]
 
     user = current_user
 
-    with ThreadPoolExecutor(max_workers=len(providers)) as executor:
-        futures = {}
+    # Resolve API keys here: pool workers run outside the request context
+    futures = {}
+    try:
         for entry in providers:
             provider_name = entry["provider"]
             model = entry["model"]
-            futures[
-                executor.submit(
-                    _invoke_provider_with_timing,
-                    encryption_service,
-                    llm_service,
-                    user,
-                    provider_name,
-                    model,
-                    messages,
-                )
-            ] = (provider_name, model)
-
-        for future in as_completed(futures):
-            provider_name, model = futures[future]
             try:
-                response_text, elapsed_time = future.result()
-                results.append(
-                    {
-                        "provider": provider_name,
-                        "model": model,
-                        "response": response_text,
-                        "time": elapsed_time,
-                        "tokens": _estimate_tokens(response_text),
-                    }
-                )
-            except Exception as exc:  # noqa: PERF203
-                # Log the full exception for debugging but don't expose details to user
-                current_app.logger.error(
-                    f"Provider {provider_name} failed",
-                    extra={
-                        "provider": provider_name,
-                        "model": model,
-                        "error": str(exc),
-                    },
-                )
-                results.append(
-                    {
-                        "provider": provider_name,
-                        "model": model,
-                        "response": (
-                            "Provider request failed. Please check your " "API key and try again."
-                        ),
-                        "time": 0,
-                        "tokens": 0,
-                        "error": True,
-                    }
-                )
+                api_key = get_api_key(user, provider_name, encryption_service)
+                # An open circuit fails this provider now instead of tying up a worker
+                llm_service.check_available(provider_name, model)
+            except AppError as exc:
+                results.append(_provider_failure_result(provider_name, model, exc))
+                continue
+            future = executor.submit(
+                provider_name,
+                _invoke_provider_with_timing,
+                llm_service,
+                provider_name,
+                model,
+                messages,
+                api_key,
+                payload["cache"],
+                deadline,
+            )
+            futures[future] = (provider_name, model)
+    except ProviderBusyError:
+        for future in futures:
+            future.cancel()
+        raise
+
+    for future in as_completed(futures):
+        provider_name, model = futures[future]
+        try:
+            result, elapsed_time = future.result()
+            results.append(
+                {
+                    "provider": provider_name,
+                    "model": model,
+                    "response": result.text,
+                    "time": elapsed_time,
+                    **_usage_fields(current_app, provider_name, model, result.text, result),
+                }
+            )
+        except Exception as exc:  # noqa: PERF203
+            results.append(_provider_failure_result(provider_name, model, exc))
 
     # Save comparison to database
     comparison = comparison_service.save_comparison(user_id=user.id, prompt=prompt, results=results)
@@ -250,188 +437,428 @@ def compare():
     return jsonify({"id": comparison.id, "results": results, "prompt": prompt})
 
 
-def _invoke_provider_with_timing(encryption_service, llm_service, user, provider, model, messages):
+def _invoke_provider_with_timing(
+    llm_service, provider, model, messages, api_key, use_cache, deadline
+):
     """Invoke provider and measure elapsed time."""
-    api_key = get_api_key(user, provider, encryption_service)
     start_time = time()
-    response = llm_service.invoke(provider, model, messages, api_key)
+    result = llm_service.invoke(
+        provider, model, messages, api_key, use_cache=use_cache, deadline=deadline
+    )
     elapsed_time = time() - start_time
-    return response, elapsed_time
+    return result, elapsed_time
+
+
+def _provider_failure_result(provider_name, model, exc):
+    # Log the full exception for debugging but don't expose details to user
+    current_app.logger.error(
+        f"Provider {provider_name} failed",
+        extra={
+            "provider": provider_name,
+            "model": model,
+            "error": str(exc),
+        },
+    )
+    return {
+        "provider": provider_name,
+        "model": model,
+        "response": (
+            PROVIDER_UNAVAILABLE_ERROR
+            if isinstance(exc, ProviderUnavailableError)
+            else "Provider request failed. Please check your API key and try again."
+        ),
+        "time": 0,
+        "tokens": 0,
+        "error": True,
+    }
 
 
 @bp.post("/compare/stream")
 @jwt_required()
 @limiter.limit(_rate_limit)
+@limiter.limit(_token_rate_limit, key_func=_token_rate_limit_key, cost=_request_token_cost)
 def compare_stream():
-    """Stream comparison results from multiple providers in real-time using SSE."""
+    """Stream comparison results from multiple providers in real-time using SSE.
+
+    Every provider stream is drained by a worker from the app-wide provider
+    executor into a shared bounded queue, so chunks from all providers are
+    interleaved as they arrive instead of one provider being read after another.
+    """
     payload = compare_schema.load(request.get_json() or {})
     prompt = payload["prompt"]
     providers = payload["providers"]
 
+    app = current_app._get_current_object()
     services = current_app.extensions["services"]
     llm_service = services.llm
-    comparison_service = services.comparisons
     encryption_service = current_app.extensions["key_encryption"]
     user = current_user
+    deadline = llm_service.new_deadline()
+
+    # Resolve API keys up front: worker threads run outside the request context
+    # and must not touch the database session.
+    jobs = []
+    key_errors = []
+    for index, entry in enumerate(providers):
+        provider_name = entry["provider"]
+        model = entry["model"]
+        try:
+            api_key = get_api_key(user, provider_name, encryption_service)
+            llm_service.check_available(provider_name, model)
+        except AppError as exc:
+            app.logger.error(
+                f"Provider {provider_name} streaming failed",
+                extra={
+                    "provider": provider_name,
+                    "model": model,
+                    "error_type": type(exc).__name__,
+                },
+            )
+            key_errors.append(_stream_error_event(provider_name, model, exc))
+            continue
+        jobs.append((index, provider_name, model, api_key))
+
+    plan = CompareStreamPlan(
+        prompt=prompt,
+        total=len(providers),
+        messages=[{"role": "user", "content": prompt}],
+        jobs=jobs,
+        key_errors=key_errors,
+        user_id=user.id,
+        use_cache=payload["cache"],
+        deadline=deadline,
+    )
+    if jobs:
+        # Reserved while the providers stream, so the done event need not wait for it
+        plan.reservation = services.comparisons.reserve_comparison(user.id, prompt)
+        services.persistence.submit(plan.reservation)
+    return _stream_response(
+        plan,
+        lambda: _compare_stream_events(app, plan),
+        {
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+    )
 
-    def generate():
-        """Generator function for SSE stream."""
-        results = {}
-        completed_count = 0
-        total_providers = len(providers)
-
-        # Send initial event
-        yield f"data: {json.dumps({'event': 'start', 'total': total_providers})}\n\n"
-
-        with ThreadPoolExecutor(max_workers=len(providers)) as executor:
-            futures = {}
-            for entry in providers:
-                provider_name = entry["provider"]
-                model = entry["model"]
-                futures[
-                    executor.submit(
-                        _stream_provider,
-                        encryption_service,
-                        llm_service,
-                        user,
-                        provider_name,
-                        model,
-                        [{"role": "user", "content": prompt}],
-                    )
-                ] = (provider_name, model)
-
-            # Process results as they complete
-            for future in as_completed(futures):
-                provider_name, model = futures[future]
-                try:
-                    for chunk_data in future.result():
-                        # Stream each chunk
-                        yield f"data: {json.dumps(chunk_data)}\n\n"
-
-                        # Track completion
-                        if chunk_data.get("event") == "complete":
-                            completed_count += 1
-                            if provider_name not in results:
-                                results[provider_name] = chunk_data.get("data", {})
-
-                except Exception as exc:  # noqa: PERF203
-                    error_details = {
-                        "provider": provider_name,
-                        "model": model,
-                        "error_type": type(exc).__name__,
-                        "error_message": str(exc),
-                    }
-                    # Try to extract API error details if available
-                    if hasattr(exc, "extra"):
-                        error_details["api_error"] = exc.extra
-
-                    current_app.logger.error(
-                        f"Provider {provider_name} streaming failed",
-                        extra=error_details,
-                    )
-                    error_data = {
-                        "event": "error",
-                        "provider": provider_name,
-                        "model": model,
-                        "error": ("Streaming failed. Please check your " "API key and try again."),
-                    }
-                    yield f"data: {json.dumps(error_data)}\n\n"
-                    completed_count += 1
-
-        # Save comparison to database after all streams complete
-        comparison_id = None
-        if results:
-            comparison = comparison_service.save_comparison(
-                user_id=user.id,
-                prompt=prompt,
+
+@dataclass
+class CompareStreamPlan:
+    """Everything a comparison stream needs once the request has been authorized."""
+
+    prompt: str
+    total: int
+    messages: List[Dict[str, str]]
+    # (index, provider, model, api_key) for every provider with a usable key
+    jobs: List[Tuple[int, str, str, str]]
+    key_errors: List[dict] = field(default_factory=list)
+    user_id: Optional[int] = None
+    use_cache: bool = True
+    deadline: Optional[Deadline] = None
+    # Write-behind reservation of the comparison's id, submitted when the stream starts
+    reservation: Optional[ComparisonReservation] = None
+
+
+def _compare_stream_events(app, plan: CompareStreamPlan):
+    """Generator function for SSE stream."""
+    llm_service = app.extensions["services"].llm
+    results = {}
+    metrics = []
+    wall_start = time()
+
+    # Send initial event
+    yield _sse_event({"event": "start", "total": plan.total})
+
+    for error_data in plan.key_errors:
+        yield _sse_event(error_data)
+
+    fan_in = _fan_in_provider_streams(
+        app,
+        llm_service,
+        plan.jobs,
+        plan.messages,
+        metrics,
+        use_cache=plan.use_cache,
+        deadline=plan.deadline,
+    )
+    for index, chunk_data in fan_in:
+        yield _sse_event(chunk_data)
+
+        # Track completion
+        if chunk_data.get("event") == "complete":
+            results[index] = chunk_data.get("data", {})
+
+    yield _sse_event(_finish_comparison_stream(app, plan, results, metrics, time() - wall_start))
+
+
+def _finish_comparison_stream(app, plan: CompareStreamPlan, results, metrics, wall_time):
+    """Log stream metrics, queue the comparison for saving and build the final ``done`` event."""
+    stream_metrics = _summarize_stream_metrics(metrics, wall_time)
+    app.logger.info(
+        f"[Streaming] Comparison complete: {wall_time * 1000:.2f}ms wall time, "
+        f"overlap {stream_metrics['overlap']:.2f}x",
+        extra={"event": "compare_stream_metrics", **stream_metrics},
+    )
+
+    # Queued for write-behind persistence; the id was reserved when the stream started
+    services = app.extensions["services"]
+    comparison_id = None
+    if results or plan.reservation is not None:
+        services.persistence.submit(
+            services.comparisons.comparison_write(
+                user_id=plan.user_id,
+                prompt=plan.prompt,
                 results=[
                     {
-                        "provider": provider,
+                        "provider": data.get("provider", ""),
                         "model": data.get("model", ""),
                         "response": data.get("response", ""),
                         "time": data.get("time", 0),
                         "tokens": data.get("tokens", 0),
+                        **{key: data.get(key) for key in USAGE_FIELDS},
                     }
-                    for provider, data in results.items()
+                    for _, data in sorted(results.items())
                 ],
+                reservation=plan.reservation,
             )
-            comparison_id = comparison.id
+        )
+    if results and plan.reservation is not None:
+        comparison_id = _reserved_comparison_id(app, plan.reservation)
 
-        # Send completion event
-        done_data = {"event": "done"}
-        if comparison_id:
-            done_data["comparisonId"] = comparison_id
-        yield f"data: {json.dumps(done_data)}\n\n"
-
-    return Response(
-        stream_with_context(generate()),
-        mimetype="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "X-Accel-Buffering": "no",
-        },
-    )
+    # Send completion event
+    done_data = {"event": "done", "metrics": stream_metrics}
+    if comparison_id:
+        done_data["comparisonId"] = comparison_id
+    return done_data
 
 
-def _stream_provider(encryption_service, llm_service, user, provider, model, messages):
-    """Stream results from a single provider."""
+def _reserved_comparison_id(app, reservation: ComparisonReservation) -> Optional[int]:
+    """The reserved comparison id, or ``None`` if the reservation failed or is still queued."""
+    timeout = app.extensions["services"].persistence.wait_timeout
     try:
-        api_key = get_api_key(user, provider, encryption_service)
-        start_time = time()
+        return reservation.future.result(timeout=timeout)
+    except Exception:  # noqa: BLE001
+        app.logger.warning(
+            "Comparison id reservation unavailable", extra={"event": "comparison_reservation"}
+        )
+        return None
+
+
+def _sse_event(data) -> str:
+    """Serialize a payload as a single SSE ``data:`` frame."""
+    return f"data: {json.dumps(data)}\n\n"
+
+
+def _stream_error_event(provider, model, exc=None):
+    return {
+        "event": "error",
+        "provider": provider,
+        "model": model,
+        "error": (
+            PROVIDER_UNAVAILABLE_ERROR
+            if isinstance(exc, ProviderUnavailableError)
+            else CHAT_STREAM_ERROR
+        ),
+    }
+
+
+def _summarize_stream_metrics(metrics, wall_time):
+    """Aggregate per-provider timings for one comparison stream.
 
+    ``overlap`` is the sum of per-provider stream durations divided by the wall
+    time of the whole comparison: ~1.0 means providers ran back to back, while
+    values close to the number of providers mean they ran fully in parallel.
+    """
+    busy_time = sum(entry["time"] for entry in metrics)
+    return {
+        "wall_time": wall_time,
+        "overlap": busy_time / wall_time if wall_time > 0 else 0.0,
+        "providers": sorted(metrics, key=lambda entry: entry["index"]),
+    }
+
+
+def _put_event(events, item, cancelled) -> bool:
+    """Put ``item`` on the bounded queue, giving up once the consumer has gone away."""
+    while not cancelled.is_set():
+        try:
+            events.put(item, timeout=_FAN_IN_PUT_TIMEOUT)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _fan_in_provider_streams(
+    app, llm_service, jobs, messages, metrics, use_cache=True, deadline=None
+):
+    """Run every provider stream concurrently and yield ``(index, event)`` pairs.
+
+    Each job is drained by a worker from the app-wide provider executor that
+    pushes events into one shared bounded queue; this generator multiplexes them
+    in arrival order. Per-provider timings are appended to ``metrics`` once a
+    stream completes. When the consumer stops early (client disconnect), workers
+    are told to stop at their next chunk instead of blocking on a full queue.
+    """
+    if not jobs:
+        return
+
+    events = queue.Queue(maxsize=app.config.get("COMPARE_STREAM_QUEUE_SIZE", 256))
+    cancelled = threading.Event()
+    origin = time()
+    executor = app.extensions["services"].provider_executor
+    futures = []
+    try:
+        remaining = 0
+        for job in jobs:
+            index, provider, model, _ = job
+            try:
+                future = executor.submit(
+                    provider,
+                    _stream_provider,
+                    app,
+                    llm_service,
+                    job,
+                    messages,
+                    events,
+                    cancelled,
+                    metrics,
+                    origin,
+                    use_cache,
+                    deadline,
+                )
+            except ProviderBusyError as exc:
+                _log_provider_stream_failure(app, provider, model, exc)
+                yield index, _stream_error_event(provider, model)
+                continue
+            futures.append(future)
+            remaining += 1
+
+        while remaining:
+            index, chunk_data = events.get()
+            if chunk_data is _STREAM_END:
+                remaining -= 1
+                continue
+            yield index, chunk_data
+    finally:
+        cancelled.set()
+        # Streams still waiting for a worker never start; running ones stop at their next chunk
+        for future in futures:
+            future.cancel()
+
+
+def _stream_provider(
+    app,
+    llm_service,
+    job,
+    messages,
+    events,
+    cancelled,
+    metrics,
+    origin,
+    use_cache=True,
+    deadline=None,
+):
+    """Drain a single provider stream into the shared fan-in queue."""
+    index, provider, model, api_key = job
+    start_time = time()
+    first_token_time = None
+
+    def emit(chunk_data):
+        return _put_event(events, (index, chunk_data), cancelled)
+
+    try:
         # Send start event for this provider
-        yield {
-            "event": "chunk",
-            "provider": provider,
-            "model": model,
-            "chunk": "",
-            "time": 0,
-        }
+        if not emit(_provider_start_event(provider, model)):
+            return
 
         full_response = ""
         first_chunk = True
+        result = None
 
         # Stream from provider
-        for chunk in llm_service.invoke_stream(provider, model, messages, api_key):
-            full_response += chunk
+        for chunk in llm_service.invoke_stream(
+            provider, model, messages, api_key, use_cache=use_cache, deadline=deadline
+        ):
+            if isinstance(chunk, LLMResult):
+                result = chunk
+                continue
             elapsed = time() - start_time
+            if first_token_time is None:
+                first_token_time = elapsed
+            full_response += chunk
 
-            yield {
-                "event": "chunk",
-                "provider": provider,
-                "model": model,
-                "chunk": chunk,
-                "time": elapsed,
-                "first_chunk": first_chunk,
-            }
+            if not emit(_provider_chunk_event(provider, model, chunk, elapsed, first_chunk)):
+                return
             first_chunk = False
 
         # Send completion event
         elapsed_time = time() - start_time
-        yield {
-            "event": "complete",
-            "provider": provider,
-            "model": model,
-            "data": {
+        emit(
+            _provider_complete_event(
+                app, provider, model, full_response, elapsed_time, first_token_time, result
+            )
+        )
+        metrics.append(
+            {
+                "index": index,
                 "provider": provider,
                 "model": model,
-                "response": full_response,
+                "started_at": start_time - origin,
+                "ttft": first_token_time,
                 "time": elapsed_time,
-                "tokens": _estimate_tokens(full_response),
-            },
-        }
-
-    except Exception as exc:
-        # Log error type but not full exception message to avoid leaking sensitive data
-        current_app.logger.error(
-            f"Provider {provider} streaming failed",
-            extra={
-                "provider": provider,
-                "model": model,
-                "error_type": type(exc).__name__,
-            },
+            }
         )
-        raise
+
+    except Exception as exc:  # noqa: BLE001
+        _log_provider_stream_failure(app, provider, model, exc)
+        emit(_stream_error_event(provider, model, exc))
+    finally:
+        # Always tell the consumer this provider is finished
+        _put_event(events, (index, _STREAM_END), cancelled)
+
+
+def _provider_start_event(provider, model):
+    return {"event": "chunk", "provider": provider, "model": model, "chunk": "", "time": 0}
+
+
+def _provider_chunk_event(provider, model, chunk, elapsed, first_chunk):
+    return {
+        "event": "chunk",
+        "provider": provider,
+        "model": model,
+        "chunk": chunk,
+        "time": elapsed,
+        "first_chunk": first_chunk,
+    }
+
+
+def _provider_complete_event(app, provider, model, full_response, elapsed_time, ttft, result=None):
+    return {
+        "event": "complete",
+        "provider": provider,
+        "model": model,
+        "data": {
+            "provider": provider,
+            "model": model,
+            "response": full_response,
+            "time": elapsed_time,
+            "ttft": ttft,
+            **_usage_fields(app, provider, model, full_response, result),
+        },
+    }
+
+
+def _log_provider_stream_failure(app, provider, model, exc):
+    # Log error type but not full exception message to avoid leaking sensitive data
+    error_details = {
+        "provider": provider,
+        "model": model,
+        "error_type": type(exc).__name__,
+    }
+    # Try to extract API error details if available
+    if hasattr(exc, "extra"):
+        error_details["api_error"] = exc.extra
+    app.logger.error(f"Provider {provider} streaming failed", extra=error_details)
 
 
 @bp.post("/compare/analyze")
@@ -440,23 +867,23 @@ def _stream_provider(encryption_service, llm_service, user, provider, model, mes
 def analyze_comparison():
     """Generate AI-powered analysis comparing multiple model outputs."""
     payload = request.get_json() or {}
-    
+
     if not payload.get("outputs") or not isinstance(payload["outputs"], list):
         return jsonify({"error": "outputs array is required"}), 400
-    
+
     if len(payload["outputs"]) < 2:
         return jsonify({"error": "At least 2 outputs are required for comparison"}), 400
-    
+
     prompt = payload.get("prompt", "")
     outputs = payload["outputs"]
-    
+
     # Build the comparison prompt
     comparison_prompt = f"""You are an expert AI analyst. Compare the following {len(outputs)} AI model outputs that all responded to the same prompt.
 
 Original Prompt: "{prompt}"
 
 """
-    
+
     for i, output in enumerate(outputs, 1):
         model_name = output.get("label", output.get("model", f"Model {i}"))
         response_text = output.get("response", "")
@@ -467,7 +894,7 @@ OUTPUT {i}: {model_name}
 {response_text}
 
 """
-    
+
     comparison_prompt += """
 Please provide a comprehensive comparison analysis covering:
 
@@ -485,38 +912,40 @@ Please provide a comprehensive comparison analysis covering:
 
 Present your analysis in a clear, structured format with headings. Be specific and cite examples from the outputs.
 """
-    
+
     services = current_app.extensions["services"]
     llm_service = services.llm
     encryption_service = current_app.extensions["key_encryption"]
-    
+    deadline = llm_service.new_deadline()
+
     # Use GPT-4o for the analysis (or user's preferred model if specified)
     analysis_provider = payload.get("analysis_provider", "openai")
     analysis_model = payload.get("analysis_model", "gpt-4o")
-    
+
     try:
         api_key = get_api_key(current_user, analysis_provider, encryption_service)
-        
+
         messages = [
             {
                 "role": "system",
-                "content": "You are an expert AI analyst specializing in comparing and evaluating LLM outputs. Provide detailed, objective, and actionable comparisons."
+                "content": "You are an expert AI analyst specializing in comparing and evaluating LLM outputs. Provide detailed, objective, and actionable comparisons.",
             },
+            {"role": "user", "content": comparison_prompt},
+        ]
+
+        analysis = llm_service.invoke(
+            analysis_provider, analysis_model, messages, api_key, deadline=deadline
+        )
+
+        return jsonify(
             {
-                "role": "user",
-                "content": comparison_prompt
+                "analysis": analysis.text,
+                "provider": analysis_provider,
+                "model": analysis_model,
+                "outputs_compared": len(outputs),
             }
-        ]
-        
-        analysis = llm_service.invoke(analysis_provider, analysis_model, messages, api_key)
-        
-        return jsonify({
-            "analysis": analysis,
-            "provider": analysis_provider,
-            "model": analysis_model,
-            "outputs_compared": len(outputs)
-        })
-        
+        )
+
     except Exception as e:
         current_app.logger.error(
             f"Comparison analysis failed: {type(e).__name__}",
@@ -2,6 +2,7 @@ from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import current_user, jwt_required
 
 from ..extensions import limiter
+from ..projections import ComparisonView
 from ..schemas import VotePreferenceSchema
 
 bp = Blueprint("comparisons", __name__, url_prefix="/api/v1/comparisons")
@@ -17,22 +18,41 @@ def _rate_limit():
 @jwt_required()
 @limiter.limit(_rate_limit)
 def list_comparisons():
-    """Get user's comparison history."""
-    limit = min(int(request.args.get("limit", 50)), 100)
-    offset = int(request.args.get("offset", 0))
-
+    """Get user's comparison history, newest first.
+
+    Keyset paginated: pass the returned ``nextCursor`` back as ``cursor`` for the
+    next page, and ``includeTotal=true`` to also get the total count. An ``offset``
+    parameter still selects the older OFFSET pagination.
+    """
+    limit = request.args.get("limit", 50, type=int)
+    if limit < 1 or limit > 100:
+        limit = 50
     services = current_app.extensions["services"]
-    comparisons = services.comparisons.get_user_comparisons(
-        user_id=current_user.id, limit=limit, offset=offset
-    )
 
-    return jsonify(
-        {
-            "comparisons": [c.to_dict() for c in comparisons],
-            "limit": limit,
-            "offset": offset,
-        }
+    if "offset" in request.args:
+        offset = max(request.args.get("offset", 0, type=int), 0)
+        comparisons = services.comparisons.get_user_comparisons(
+            user_id=current_user.id, limit=limit, offset=offset
+        )
+        return jsonify(
+            {
+                "comparisons": [c.to_json() for c in comparisons],
+                "limit": limit,
+                "offset": offset,
+            }
+        )
+
+    comparisons, next_cursor = services.comparisons.get_user_comparisons_page(
+        user_id=current_user.id, limit=limit, cursor=request.args.get("cursor") or None
     )
+    body = {
+        "comparisons": [c.to_json() for c in comparisons],
+        "limit": limit,
+        "nextCursor": next_cursor,
+    }
+    if request.args.get("includeTotal", "false").lower() == "true":
+        body["total"] = services.comparisons.count_user_comparisons(current_user.id)
+    return jsonify(body)
 
 
 @bp.post("/<int:comparison_id>/vote")
@@ -50,7 +70,7 @@ def vote_on_comparison(comparison_id: int):
         preferred_index=preferred_index,
     )
 
-    return jsonify(comparison.to_dict())
+    return jsonify(ComparisonView.from_model(comparison).to_json())
 
 
 @bp.delete("/<int:comparison_id>")
@@ -1,9 +1,18 @@
+import hashlib
+from urllib.parse import urlencode
+
 from flask import Blueprint, current_app, jsonify, request, Response
 from flask_jwt_extended import current_user, jwt_required
 from marshmallow import Schema, fields, validate
+from sqlalchemy.orm import load_only
 
 from ..extensions import limiter, db, cache
 from ..models import Conversation
+from ..models.message import MESSAGE_COMPLETE
+from ..projections import ConversationSummary
+from ..services.conversations import CONVERSATION_CACHE
+from ..utils.errors import AppError
+from ..utils.pagination import keyset_page
 
 bp = Blueprint("conversations", __name__, url_prefix="/api/v1/conversations")
 
@@ -12,13 +21,11 @@ def _rate_limit():
     return current_app.config["RATE_LIMIT"]
 
 
-def _invalidate_conversation_cache():
-    """Invalidate conversation list cache.
-
-    Note: This invalidates the entire cache regardless of user_id.
-    For production at scale, consider implementing user-specific cache keys.
-    """
-    cache.delete_memoized(list_conversations)
+def _list_cache_key(*args, **kwargs) -> str:
+    """Cache key of a listing: the user's namespace version plus the sorted query string."""
+    query = urlencode(sorted(request.args.items(multi=True)))
+    digest = hashlib.md5(query.encode()).hexdigest()
+    return CONVERSATION_CACHE.key(current_user.id, "list", digest)
 
 
 class UpdateConversationSchema(Schema):
@@ -31,20 +38,37 @@ update_schema = UpdateConversationSchema()
 @bp.get("")
 @jwt_required()
 @limiter.limit(_rate_limit)
-@cache.cached(timeout=300, query_string=True)  # Cache for 5 minutes based on query params
+@cache.cached(timeout=300, make_cache_key=_list_cache_key)  # Per user, for 5 minutes
 def list_conversations():
-    """List all conversations for the current user with pagination and search."""
-    page = request.args.get("page", 1, type=int)
+    """List the current user's conversations, most recent first, with search.
+
+    Pages are keyset paginated: pass the returned ``nextCursor`` back as ``cursor``
+    for the next page, and ``includeTotal=true`` to also get the total count. The
+    ``page`` parameter still selects the older OFFSET pagination, which counts on
+    every request.
+    """
     limit = request.args.get("limit", 20, type=int)
     search = request.args.get("search", "").strip()
+    cursor = request.args.get("cursor") or None
+    include_total = request.args.get("includeTotal", "false").lower() == "true"
 
     # Validate pagination parameters
-    if page < 1:
-        page = 1
     if limit < 1 or limit > 100:
         limit = 20
 
-    query = Conversation.query.filter_by(user_id=current_user.id)
+    # Only the sidebar columns: message counts and previews are denormalized onto
+    # the conversation, so no message rows are loaded
+    query = Conversation.query.filter_by(user_id=current_user.id).options(
+        load_only(
+            Conversation.id,
+            Conversation.title,
+            Conversation.provider,
+            Conversation.model,
+            Conversation.last_message_at,
+            Conversation.message_count,
+            Conversation.last_user_preview,
+        )
+    )
 
     # Apply search filter if provided
     if search:
@@ -56,45 +80,43 @@ def list_conversations():
             )
         )
 
+    if "page" in request.args:
+        return _list_conversations_by_offset(query, limit)
+
+    conversations, next_cursor = keyset_page(
+        query, Conversation.last_message_at, Conversation.id, limit, cursor
+    )
+    body = {
+        "conversations": _summaries(conversations),
+        "limit": limit,
+        "nextCursor": next_cursor,
+    }
+    if include_total:
+        if search:
+            body["total"] = query.count()
+        else:
+            services = current_app.extensions["services"]
+            body["total"] = services.conversations.count_conversations(current_user.id)
+    return jsonify(body)
+
+
+def _list_conversations_by_offset(query, limit: int):
+    page = max(request.args.get("page", 1, type=int), 1)
+
     # Order by most recent first
-    query = query.order_by(Conversation.last_message_at.desc())
+    query = query.order_by(Conversation.last_message_at.desc(), Conversation.id.desc())
 
     # Apply pagination
     offset = (page - 1) * limit
     conversations = query.limit(limit).offset(offset).all()
 
     # Calculate total for pagination info
-    total = query.count()
+    total = query.order_by(None).count()
     total_pages = (total + limit - 1) // limit if limit > 0 else 0
 
-    # Format response
-    result = []
-    for conv in conversations:
-        # Get message count and preview
-        message_count = len(conv.messages)
-        preview = ""
-        if conv.messages:
-            # Get the last user message as preview
-            for msg in reversed(conv.messages):
-                if msg.role == "user":
-                    preview = msg.content[:100]
-                    break
-
-        result.append(
-            {
-                "id": conv.id,
-                "title": conv.title or f"{conv.provider} - {conv.model}",
-                "provider": conv.provider,
-                "model": conv.model,
-                "lastMessageAt": conv.last_message_at.isoformat() + "Z",
-                "messageCount": message_count,
-                "preview": preview,
-            }
-        )
-
     return jsonify(
         {
-            "conversations": result,
+            "conversations": _summaries(conversations),
             "page": page,
             "limit": limit,
             "total": total,
@@ -103,38 +125,54 @@ def list_conversations():
     )
 
 
-@bp.get("/<conversation_id>")
+def _summaries(conversations) -> list:
+    return [ConversationSummary.from_model(conv).to_json() for conv in conversations]
+
+
+@bp.get("/search")
 @jwt_required()
 @limiter.limit(_rate_limit)
-def get_conversation(conversation_id):
-    """Get a single conversation with all messages."""
-    services = current_app.extensions["services"]
-    conversation_service = services.conversations
+def search_conversations():
+    """Full-text search over the current user's messages, best match first.
 
-    conversation = conversation_service.get_conversation(conversation_id, current_user.id)
+    Each result is one message with its conversation and an HTML-escaped snippet
+    whose matches are wrapped in ``<mark>``. Paginated with ``limit``/``offset``;
+    ``nextOffset`` is ``null`` on the last page.
+    """
+    query = request.args.get("q", "").strip()
+    limit = request.args.get("limit", 20, type=int)
+    offset = max(request.args.get("offset", 0, type=int), 0)
 
-    messages = [
-        {
-            "role": msg.role,
-            "content": msg.content,
-            "createdAt": msg.created_at.isoformat() + "Z",
-        }
-        for msg in conversation.messages
-    ]
+    if not query:
+        raise AppError("Search query is required", extra={"field": "q"})
+    if limit < 1 or limit > 50:
+        limit = 20
 
+    services = current_app.extensions["services"]
+    results, has_more = services.search.search(current_user.id, query, limit, offset)
     return jsonify(
         {
-            "id": conversation.id,
-            "title": conversation.title or f"{conversation.provider} - {conversation.model}",
-            "provider": conversation.provider,
-            "model": conversation.model,
-            "lastMessageAt": conversation.last_message_at.isoformat() + "Z",
-            "messages": messages,
-            "messageCount": len(messages),
+            "results": results,
+            "query": query,
+            "limit": limit,
+            "offset": offset,
+            "nextOffset": offset + limit if has_more else None,
         }
     )
 
 
+@bp.get("/<conversation_id>")
+@jwt_required()
+@limiter.limit(_rate_limit)
+def get_conversation(conversation_id):
+    """Get a single conversation with all messages."""
+    services = current_app.extensions["services"]
+    # Include a just-streamed reply still in the write-behind queue
+    services.persistence.wait_for(conversation_id)
+    view = services.conversations.get_conversation_view(conversation_id, current_user.id)
+    return jsonify({**view.to_json(), "messageCount": len(view.messages)})
+
+
 @bp.patch("/<conversation_id>")
 @jwt_required()
 @limiter.limit(_rate_limit)
@@ -144,6 +182,8 @@ def update_conversation(conversation_id):
 
     services = current_app.extensions["services"]
     conversation_service = services.conversations
+    # Let a queued reply land first rather than fail against a deleted conversation
+    services.persistence.wait_for(conversation_id)
 
     conversation = conversation_service.get_conversation(conversation_id, current_user.id)
     conversation.title = payload["title"]
@@ -151,7 +191,7 @@ def update_conversation(conversation_id):
     try:
         db.session.commit()
         # Invalidate cache after successful update
-        _invalidate_conversation_cache()
+        conversation_service.invalidate_conversation_cache(current_user.id)
     except Exception as exc:
         db.session.rollback()
         current_app.logger.error(f"Failed to update conversation: {exc}")
@@ -175,14 +215,18 @@ def delete_conversation(conversation_id):
     """Delete a conversation and all its messages."""
     services = current_app.extensions["services"]
     conversation_service = services.conversations
+    # Let a queued reply land first rather than fail against a deleted conversation
+    services.persistence.wait_for(conversation_id)
 
     conversation = conversation_service.get_conversation(conversation_id, current_user.id)
 
     try:
+        services.search.remove_conversation(conversation.id)
         db.session.delete(conversation)
         db.session.commit()
         # Invalidate cache after successful deletion
-        _invalidate_conversation_cache()
+        conversation_service.invalidate_conversation_cache(current_user.id)
+        conversation_service.invalidate_conversation_count(current_user.id)
     except Exception as exc:
         db.session.rollback()
         current_app.logger.error(f"Failed to delete conversation: {exc}")
@@ -202,40 +246,19 @@ def export_conversation(conversation_id):
         return jsonify({"error": "Invalid format. Must be 'markdown' or 'json'"}), 400
 
     services = current_app.extensions["services"]
-    conversation_service = services.conversations
-
-    conversation = conversation_service.get_conversation(conversation_id, current_user.id)
+    services.persistence.wait_for(conversation_id)
+    conversation = services.conversations.get_conversation_view(conversation_id, current_user.id)
 
     if format_type == "json":
-        # Export as JSON
-        messages = [
-            {
-                "role": msg.role,
-                "content": msg.content,
-                "createdAt": msg.created_at.isoformat() + "Z",
-            }
-            for msg in conversation.messages
-        ]
-
-        return jsonify(
-            {
-                "id": conversation.id,
-                "title": conversation.title or f"{conversation.provider} - {conversation.model}",
-                "provider": conversation.provider,
-                "model": conversation.model,
-                "lastMessageAt": conversation.last_message_at.isoformat() + "Z",
-                "messages": messages,
-            }
-        )
+        return jsonify(conversation.to_json())
     else:
         # Export as markdown
-        title = conversation.title or f"{conversation.provider} - {conversation.model}"
         lines = [
-            f"# {title}",
+            f"# {conversation.title}",
             "",
             f"**Provider:** {conversation.provider}",
             f"**Model:** {conversation.model}",
-            f"**Last Updated:** {conversation.last_message_at.isoformat()}",
+            f"**Last Updated:** {conversation.last_message_at}",
             "",
             "---",
             "",
@@ -243,6 +266,9 @@ def export_conversation(conversation_id):
 
         for msg in conversation.messages:
             role_label = "User" if msg.role == "user" else "Assistant"
+            if msg.status != MESSAGE_COMPLETE:
+                # An interrupted (or still streaming) reply
+                role_label += f" ({msg.status})"
             lines.append(f"## {role_label}")
             lines.append("")
             lines.append(msg.content)
@@ -1,4 +1,4 @@
-from marshmallow import Schema, fields, validate
+from marshmallow import Schema, ValidationError, fields, validate, validates_schema
 
 from .models import PROVIDERS
 
@@ -11,12 +11,22 @@ class MessageSchema(Schema):
 class ChatRequestSchema(Schema):
     provider = fields.String(required=True, validate=validate.OneOf(sorted(PROVIDERS)))
     model = fields.String(required=True, validate=validate.Length(min=1, max=100))
+    # Full mode: the client sends the transcript, of which only the last user turn is stored
     messages = fields.List(
         fields.Nested(MessageSchema),
-        required=True,
+        load_default=None,
         validate=validate.Length(min=1, max=25),
     )
+    # Delta mode: only the new user turn; the history comes from the conversation
+    message = fields.String(load_default=None, validate=validate.Length(min=1, max=4000))
     conversation_id = fields.UUID(load_default=None, data_key="conversationId", allow_none=True)
+    # Set to false to bypass the LLM response cache for this request
+    cache = fields.Boolean(load_default=True)
+
+    @validates_schema
+    def validate_mode(self, data, **kwargs):
+        if (data.get("messages") is None) == (data.get("message") is None):
+            raise ValidationError("Provide either messages or message.", "messages")
 
 
 class CompareProviderSchema(Schema):
@@ -31,6 +41,7 @@ class CompareRequestSchema(Schema):
         validate=validate.Length(min=1, max=4),
     )
     prompt = fields.String(required=True, validate=validate.Length(min=1, max=2000))
+    cache = fields.Boolean(load_default=True)
 
 
 class APIKeySchema(Schema):
@@ -0,0 +1,279 @@
+"""Per provider/model circuit breakers for LLM calls.
+
+Each breaker watches a rolling time window of finished calls. Once enough calls
+have been seen and too many of them failed or were slow, it opens: calls fail
+immediately with ``ProviderUnavailableError`` instead of waiting on a dead
+upstream through timeouts and retries. After ``open_seconds`` it turns half-open
+and lets a few probe calls through; if they all succeed it closes again, and any
+probe failure re-opens it.
+
+Client errors (4xx other than 429, e.g. an invalid API key) say nothing about
+provider health and are ignored.
+
+Model names come from request payloads, so the registry keeps at most
+``max_breakers`` breakers and evicts the least recently used closed one first;
+open and half-open breakers are only evicted when nothing else is left.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from time import monotonic
+from typing import AsyncIterator, Callable, Deque, Iterator, Optional, Tuple
+
+from ..utils.errors import AppError, ProviderUnavailableError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_MAX_BREAKERS = 256
+
+
+def is_provider_failure(exc: BaseException) -> Optional[bool]:
+    """Classify an exception from a provider call; ``None`` means it does not count."""
+    if isinstance(exc, (ProviderUnavailableError, asyncio.CancelledError)):
+        return None
+    if isinstance(exc, AppError):
+        status = exc.extra.get("status_code")
+        if status is not None and status < 500 and status != 429:
+            return None
+    return True
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        provider: str,
+        model: str,
+        window_seconds: float = 60.0,
+        min_requests: int = 10,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 20.0,
+        slow_call_rate: float = 0.8,
+        open_seconds: float = 30.0,
+        half_open_probes: int = 2,
+        clock: Callable[[], float] = monotonic,
+    ):
+        self.provider = provider
+        self.model = model
+        self.window_seconds = window_seconds
+        self.min_requests = min_requests
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self.state = CLOSED
+        # (finished_at, failed, slow) for calls inside the window
+        self._calls: Deque[Tuple[float, bool, bool]] = deque()
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self.rejected = 0
+
+    def before_call(self) -> None:
+        """Admit a call or raise ``ProviderUnavailableError`` while the circuit is open."""
+        with self._lock:
+            now = self._clock()
+            if self.state == OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    self.rejected += 1
+                    raise self._unavailable(remaining)
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self.rejected += 1
+                    raise self._unavailable(0)
+                self._probes_in_flight += 1
+
+    def check(self) -> None:
+        """Raise ``ProviderUnavailableError`` if the circuit is open, without using a probe."""
+        with self._lock:
+            if self.state != OPEN:
+                return
+            remaining = self._opened_at + self.open_seconds - self._clock()
+            if remaining > 0:
+                self.rejected += 1
+                raise self._unavailable(remaining)
+
+    def record(self, failed: Optional[bool], latency: float) -> None:
+        """Record a finished call admitted by ``before_call``; ``failed=None`` is neutral."""
+        slow = latency >= self.slow_call_seconds
+        with self._lock:
+            now = self._clock()
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if failed is None:
+                    return
+                if failed or slow:
+                    self._open(now)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self.state = CLOSED
+                    self._calls.clear()
+                return
+            if failed is None or self.state != CLOSED:
+                return
+
+            self._calls.append((now, failed, slow))
+            self._trim(now)
+            total = len(self._calls)
+            if total < self.min_requests:
+                return
+            failures = sum(1 for _, call_failed, _ in self._calls if call_failed)
+            slow_calls = sum(1 for _, _, call_slow in self._calls if call_slow)
+            if failures / total >= self.error_rate or slow_calls / total >= self.slow_call_rate:
+                self._open(now)
+
+    def call(self, fn: Callable, *args):
+        self.before_call()
+        start = self._clock()
+        try:
+            result = fn(*args)
+        except BaseException as exc:
+            self.record(is_provider_failure(exc), self._clock() - start)
+            raise
+        self.record(False, self._clock() - start)
+        return result
+
+    def guard_stream(self, stream: Iterator[str]) -> Iterator[str]:
+        """Wrap an upstream stream; its latency is the time to the first chunk."""
+        self.before_call()
+        start = self._clock()
+        ttft = None
+        outcome: Optional[bool] = None
+        try:
+            for chunk in stream:
+                if ttft is None:
+                    ttft = self._clock() - start
+                yield chunk
+            outcome = False
+        except GeneratorExit:
+            # The consumer went away; that says nothing about the provider
+            raise
+        except BaseException as exc:
+            outcome = is_provider_failure(exc)
+            raise
+        finally:
+            latency = ttft if ttft is not None else self._clock() - start
+            self.record(outcome, latency)
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    async def acall(self, fn: Callable, *args):
+        """Async counterpart of ``call`` for coroutine functions."""
+        self.before_call()
+        start = self._clock()
+        try:
+            result = await fn(*args)
+        except BaseException as exc:
+            self.record(is_provider_failure(exc), self._clock() - start)
+            raise
+        self.record(False, self._clock() - start)
+        return result
+
+    async def aguard_stream(self, stream: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Async counterpart of ``guard_stream``."""
+        self.before_call()
+        start = self._clock()
+        ttft = None
+        outcome: Optional[bool] = None
+        try:
+            async for chunk in stream:
+                if ttft is None:
+                    ttft = self._clock() - start
+                yield chunk
+            outcome = False
+        except GeneratorExit:
+            raise
+        except BaseException as exc:
+            outcome = is_provider_failure(exc)
+            raise
+        finally:
+            latency = ttft if ttft is not None else self._clock() - start
+            self.record(outcome, latency)
+            aclose = getattr(stream, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = self._clock()
+            self._trim(now)
+            total = len(self._calls)
+            failures = sum(1 for _, failed, _ in self._calls if failed)
+            snapshot = {
+                "provider": self.provider,
+                "model": self.model,
+                "state": self.state,
+                "window_requests": total,
+                "error_rate": failures / total if total else 0.0,
+                "rejected": self.rejected,
+            }
+            if self.state == OPEN:
+                snapshot["retry_after"] = max(0.0, self._opened_at + self.open_seconds - now)
+            return snapshot
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self._opened_at = now
+        self._probes_in_flight = 0
+
+    def _trim(self, now: float) -> None:
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def _unavailable(self, retry_after: float) -> ProviderUnavailableError:
+        return ProviderUnavailableError(
+            f"{self.provider} ({self.model}) is temporarily unavailable. Please try again shortly.",
+            extra={
+                "provider": self.provider,
+                "model": self.model,
+                "retryAfter": round(retry_after, 1),
+            },
+        )
+
+
+class CircuitBreakerRegistry:
+    """Lazily created breakers keyed by ``(provider, model)``, sharing one configuration."""
+
+    def __init__(self, max_breakers: int = DEFAULT_MAX_BREAKERS, **options):
+        self.max_breakers = max_breakers
+        self.options = options
+        self._breakers: "OrderedDict[Tuple[str, str], CircuitBreaker]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, model: str) -> CircuitBreaker:
+        key = (provider, model)
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is not None:
+                self._breakers.move_to_end(key)
+                return breaker
+            if len(self._breakers) >= self.max_breakers:
+                self._evict()
+            breaker = self._breakers[key] = CircuitBreaker(provider, model, **self.options)
+            return breaker
+
+    def stats(self) -> list:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return [breaker.snapshot() for breaker in breakers]
+
+    def _evict(self) -> None:
+        # Oldest closed breaker first: open ones still hold back a failing upstream
+        for key, breaker in self._breakers.items():
+            if breaker.state == CLOSED:
+                del self._breakers[key]
+                return
+        self._breakers.popitem(last=False)
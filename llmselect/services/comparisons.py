@@ -1,10 +1,82 @@
-from typing import List, Dict
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
 
 from sqlalchemy.exc import SQLAlchemyError
 
-from ..extensions import db
+from ..extensions import cache, db
 from ..models import ComparisonResult
+from ..models.comparison_result import COMPARISON_COMPLETE, COMPARISON_PENDING
+from ..projections import ComparisonView
+from ..utils.cache_namespace import CacheNamespace
 from ..utils.errors import AppError, NotFoundError
+from ..utils.pagination import keyset_page
+from .write_behind import PendingWrite
+
+# Totals only change on save/delete, which invalidate them explicitly
+COUNT_CACHE_TIMEOUT = 300
+
+# Per-user namespace for cached history pages; any save, vote or delete invalidates it
+COMPARISON_CACHE = CacheNamespace("comparisons")
+PAGE_CACHE_TIMEOUT = 300
+
+
+class ComparisonReservation(PendingWrite):
+    """Inserts a ``pending`` comparison with no results yet, so its id can be handed out early."""
+
+    def __init__(self, user_id: int, prompt: str):
+        self.user_id = user_id
+        self.prompt = prompt
+        self.comparison_id: Optional[int] = None
+
+    def stage(self) -> int:
+        comparison = ComparisonResult(
+            user_id=self.user_id, prompt=self.prompt, results=[], status=COMPARISON_PENDING
+        )
+        db.session.add(comparison)
+        db.session.flush()
+        self.comparison_id = comparison.id
+        return comparison.id
+
+
+class ComparisonWrite(PendingWrite):
+    """Stores a finished comparison's results in its reserved row (or a new one).
+
+    A reservation that ends up with no results is deleted again.
+    """
+
+    def __init__(
+        self,
+        service: "ComparisonService",
+        user_id: int,
+        prompt: str,
+        results: List[Dict],
+        reservation: Optional[ComparisonReservation] = None,
+    ):
+        self.service = service
+        self.user_id = user_id
+        self.prompt = prompt
+        self.results = results
+        self.reservation = reservation
+
+    def stage(self) -> Optional[int]:
+        comparison = None
+        if self.reservation is not None and self.reservation.comparison_id is not None:
+            comparison = db.session.get(ComparisonResult, self.reservation.comparison_id)
+        if not self.results:
+            if comparison is not None:
+                db.session.delete(comparison)
+            return None
+        if comparison is None:
+            comparison = ComparisonResult(user_id=self.user_id, prompt=self.prompt)
+            db.session.add(comparison)
+        comparison.results = self.results
+        comparison.status = COMPARISON_COMPLETE
+        db.session.flush()
+        return comparison.id
+
+    def after_commit(self) -> None:
+        self.service.invalidate_comparison_count(self.user_id)
+        COMPARISON_CACHE.invalidate(self.user_id)
 
 
 class ComparisonService:
@@ -28,14 +100,60 @@ class ComparisonService:
         try:
             db.session.add(comparison)
             db.session.commit()
+            self.invalidate_comparison_count(user_id)
+            COMPARISON_CACHE.invalidate(user_id)
             return comparison
         except SQLAlchemyError as exc:
             db.session.rollback()
             raise AppError("Unable to save comparison") from exc
 
+    def reserve_comparison(self, user_id: int, prompt: str) -> ComparisonReservation:
+        """A write-behind write reserving the id of a comparison that is still streaming.
+
+        The reserved row stays ``pending``, and out of the user's history, until
+        ``comparison_write`` fills in its results; reserving it does not invalidate
+        the user's cached history.
+        """
+        return ComparisonReservation(user_id, prompt)
+
+    def delete_stale_reservations(self, max_age: float) -> int:
+        """Delete reservations pending for longer than ``max_age`` seconds.
+
+        Run at startup: a reservation outlives its stream only when the process died
+        or its results could not be stored.
+
+        Returns:
+            The number of deleted reservations
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+        try:
+            deleted = ComparisonResult.query.filter(
+                ComparisonResult.status == COMPARISON_PENDING,
+                ComparisonResult.created_at < cutoff,
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            return deleted
+        except SQLAlchemyError as exc:
+            db.session.rollback()
+            raise AppError("Unable to delete stale comparison reservations") from exc
+
+    def _user_history(self, user_id: int):
+        """The user's comparisons as shown in their history: reservations are left out."""
+        return ComparisonResult.query.filter_by(user_id=user_id, status=COMPARISON_COMPLETE)
+
+    def comparison_write(
+        self,
+        user_id: int,
+        prompt: str,
+        results: List[Dict],
+        reservation: Optional[ComparisonReservation] = None,
+    ) -> ComparisonWrite:
+        """A write-behind write saving a finished comparison, into ``reservation`` if given."""
+        return ComparisonWrite(self, user_id, prompt, results, reservation)
+
     def get_user_comparisons(
         self, user_id: int, limit: int = 50, offset: int = 0
-    ) -> List[ComparisonResult]:
+    ) -> List[ComparisonView]:
         """Get comparison history for a user.
 
         Args:
@@ -44,15 +162,68 @@ class ComparisonService:
             offset: Number of results to skip (for pagination)
 
         Returns:
-            List of ComparisonResult objects ordered by creation date (newest first)
+            List of comparison projections ordered by creation date (newest first)
         """
-        return (
-            ComparisonResult.query.filter_by(user_id=user_id)
-            .order_by(ComparisonResult.created_at.desc())
+        comparisons = (
+            self._user_history(user_id)
+            .order_by(ComparisonResult.created_at.desc(), ComparisonResult.id.desc())
             .limit(min(limit, 100))
             .offset(offset)
             .all()
         )
+        return [ComparisonView.from_model(comparison) for comparison in comparisons]
+
+    def get_user_comparisons_page(
+        self, user_id: int, limit: int = 50, cursor: Optional[str] = None
+    ) -> Tuple[List[ComparisonView], Optional[str]]:
+        """Get one keyset-paginated page of a user's comparison history.
+
+        Pages are cached as projections until the user's history changes.
+
+        Args:
+            user_id: The ID of the user
+            limit: Maximum number of results to return (default 50, max 100)
+            cursor: ``next_cursor`` of the previous page; ``None`` for the first page
+
+        Returns:
+            The comparisons ordered newest first, and the cursor of the next page
+            (``None`` on the last page)
+
+        Raises:
+            AppError: If the cursor is malformed
+        """
+        cache_key = COMPARISON_CACHE.key(user_id, "page", limit, cursor)
+        page = cache.get(cache_key)
+        if page is None:
+            comparisons, next_cursor = keyset_page(
+                self._user_history(user_id),
+                ComparisonResult.created_at,
+                ComparisonResult.id,
+                min(limit, 100),
+                cursor,
+            )
+            page = ([ComparisonView.from_model(c) for c in comparisons], next_cursor)
+            cache.set(cache_key, page, timeout=PAGE_CACHE_TIMEOUT)
+        return page
+
+    def count_user_comparisons(self, user_id: int) -> int:
+        """Total number of a user's comparisons, cached apart from the pages.
+
+        Args:
+            user_id: The ID of the user
+
+        Returns:
+            The number of saved comparisons
+        """
+        cache_key = f"comparison_count_{user_id}"
+        total = cache.get(cache_key)
+        if total is None:
+            total = self._user_history(user_id).count()
+            cache.set(cache_key, total, timeout=COUNT_CACHE_TIMEOUT)
+        return total
+
+    def invalidate_comparison_count(self, user_id: int) -> None:
+        cache.delete(f"comparison_count_{user_id}")
 
     def get_comparison(self, comparison_id: int, user_id: int) -> ComparisonResult:
         """Get a specific comparison by ID.
@@ -65,9 +236,10 @@ class ComparisonService:
             ComparisonResult: The requested comparison
 
         Raises:
-            NotFoundError: If the comparison doesn't exist or doesn't belong to the user
+            NotFoundError: If the comparison doesn't exist, doesn't belong to the user
+                or is still pending
         """
-        comparison = ComparisonResult.query.filter_by(id=comparison_id, user_id=user_id).first()
+        comparison = self._user_history(user_id).filter_by(id=comparison_id).first()
         if comparison is None:
             raise NotFoundError("Comparison not found")
         return comparison
@@ -98,6 +270,7 @@ class ComparisonService:
         comparison.preferred_index = preferred_index
         try:
             db.session.commit()
+            COMPARISON_CACHE.invalidate(user_id)
             return comparison
         except SQLAlchemyError as exc:
             db.session.rollback()
@@ -119,6 +292,8 @@ class ComparisonService:
         try:
             db.session.delete(comparison)
             db.session.commit()
+            self.invalidate_comparison_count(user_id)
+            COMPARISON_CACHE.invalidate(user_id)
         except SQLAlchemyError as exc:
             db.session.rollback()
             raise AppError("Unable to delete comparison") from exc
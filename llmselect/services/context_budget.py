@@ -0,0 +1,106 @@
+"""Fit chat histories into the target model's context window before dispatch.
+
+The prompt budget is the model's context window (from ``ModelRegistryService``)
+minus the completion reserve, i.e. the ``max_tokens`` the request will ask for.
+Leading system messages and the newest message are always kept; the oldest turns
+are dropped until the rest fits, so an oversized history never costs a provider
+round trip just to be rejected. If even the kept messages do not fit, the request
+fails locally with ``ContextLengthError``.
+
+Messages may carry a precomputed ``tokens`` count (stored on message rows by
+``ConversationService``); the others are counted here in one batch with the
+model's tokenizer.
+"""
+
+from dataclasses import dataclass
+from typing import List, Mapping, Optional
+
+from ..utils.errors import ContextLengthError
+from .model_registry import ModelRegistryService
+from .tokens import TokenCounter
+
+# Role markers and separators that chat formats add around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+DEFAULT_CONTEXT_WINDOW = 8192
+
+
+@dataclass(frozen=True)
+class ContextFit:
+    messages: List[Mapping[str, str]]
+    prompt_tokens: int
+    dropped_messages: int
+    dropped_tokens: int
+    context_window: int
+
+    def report(self) -> dict:
+        return {
+            "promptTokens": self.prompt_tokens,
+            "droppedMessages": self.dropped_messages,
+            "droppedTokens": self.dropped_tokens,
+            "contextWindow": self.context_window,
+        }
+
+
+class ContextBudget:
+    def __init__(
+        self,
+        model_registry: ModelRegistryService,
+        max_tokens: int = 1000,
+        default_context_window: int = DEFAULT_CONTEXT_WINDOW,
+        token_counter: Optional[TokenCounter] = None,
+    ):
+        self.model_registry = model_registry
+        self.max_tokens = max_tokens
+        self.default_context_window = default_context_window
+        self.token_counter = token_counter or TokenCounter()
+
+    def message_tokens(self, provider: str, model: str, messages: List[Mapping]) -> List[int]:
+        """Per-message prompt cost, counting only messages without a stored count."""
+        uncounted = [message["content"] for message in messages if message.get("tokens") is None]
+        counted = iter(self.token_counter.count_many(provider, model, uncounted))
+        return [
+            (message["tokens"] if message.get("tokens") is not None else next(counted))
+            + MESSAGE_OVERHEAD_TOKENS
+            for message in messages
+        ]
+
+    def fit(self, provider: str, model: str, messages: List[Mapping]) -> ContextFit:
+        """Drop the oldest turns of ``messages`` until they fit ``model``'s prompt budget."""
+        limits = self.model_registry.get_model_limits(provider, model)
+        if limits is None:
+            context_window, reserve = self.default_context_window, self.max_tokens
+        else:
+            context_window, model_max_tokens = limits
+            reserve = min(self.max_tokens, model_max_tokens)
+        budget = context_window - reserve
+
+        counts = self.message_tokens(provider, model, messages)
+        total = sum(counts)
+        if total <= budget:
+            return ContextFit(list(messages), total, 0, 0, context_window)
+
+        # Pinned: the leading system prompt(s) and the message being answered
+        start = 0
+        while start < len(messages) - 1 and messages[start]["role"] == "system":
+            start += 1
+        last = len(messages) - 1
+
+        drop_end = start
+        while drop_end < last and (total > budget or messages[drop_end]["role"] == "assistant"):
+            # Past the point where it fits, keep dropping while the history would
+            # open with an assistant reply
+            total -= counts[drop_end]
+            drop_end += 1
+        if total > budget:
+            raise ContextLengthError(
+                "Message is too long for the model's context window",
+                extra={
+                    "promptTokens": total,
+                    "budgetTokens": budget,
+                    "contextWindow": context_window,
+                },
+            )
+
+        kept = list(messages[:start]) + list(messages[drop_end:])
+        dropped = sum(counts[start:drop_end])
+        return ContextFit(kept, total, drop_end - start, dropped, context_window)
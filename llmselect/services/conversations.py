@@ -1,15 +1,208 @@
 from datetime import datetime
-from typing import Optional, List
+from time import monotonic
+from typing import Dict, List, Optional, Union
 
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, load_only
 
 from ..extensions import db, cache
-from ..models import Conversation, Message
+from ..models import Conversation, Message, MessageChunk
+from ..models.conversation import PREVIEW_LENGTH
+from ..models.message import MESSAGE_COMPLETE, MESSAGE_STREAMING
+from ..projections import ConversationView
+from ..utils.cache_namespace import CacheNamespace
 from ..utils.errors import AppError, NotFoundError
+from .providers import LLMResult
+from .search import SearchService
+from .tokens import TokenCounter
+from .write_behind import PendingWrite, WriteBehindQueue
+
+# Totals only change on create/delete, which invalidate them explicitly
+COUNT_CACHE_TIMEOUT = 300
+
+# Per-user namespace for cached conversation listings and transcripts, service and
+# route level
+CONVERSATION_CACHE = CacheNamespace("conversations")
+VIEW_CACHE_TIMEOUT = 300
+
+DEFAULT_HISTORY_WINDOW = 25
+HISTORY_CACHE_TIMEOUT = 3600
+
+# A streaming reply is checkpointed into its draft once this much text or time has
+# gone by since the previous checkpoint
+DEFAULT_CHECKPOINT_BYTES = 2048
+DEFAULT_CHECKPOINT_INTERVAL = 2.0
+
+
+def _history_key(conversation_id: str) -> str:
+    return f"history_window_{conversation_id}"
+
+
+def _set_usage(message: Message, result: Optional[LLMResult]) -> None:
+    if result is not None:
+        message.prompt_tokens = result.prompt_tokens
+        message.completion_tokens = result.completion_tokens
+        message.finish_reason = result.finish_reason
+        message.latency = result.latency
+
+
+class DraftWrite(PendingWrite):
+    """Inserts the empty ``streaming`` assistant message a chat stream checkpoints into."""
+
+    def __init__(self, service: "ConversationService", conversation_id: str, user_id: int):
+        self.service = service
+        self.key = conversation_id
+        self.user_id = user_id
+        self.created_at = datetime.utcnow()
+        self.message_id: Optional[int] = None
+
+    def stage(self) -> int:
+        conversation = self.service.get_conversation(self.key, self.user_id)
+        message = self.service.stage_message(
+            conversation, "assistant", "", created_at=self.created_at, status=MESSAGE_STREAMING
+        )
+        self.message_id = message.id
+        return message.id
+
+    def after_commit(self) -> None:
+        self.service.draft_changed(self.key, self.user_id)
+
+
+class ChunkWrite(PendingWrite):
+    """Appends one checkpoint of streamed text to a draft; dropped if the draft never landed."""
+
+    def __init__(self, draft: DraftWrite, seq: int, content: str):
+        self.draft = draft
+        self.key = draft.key
+        self.seq = seq
+        self.content = content
+
+    def stage(self) -> None:
+        if self.draft.message_id is not None:
+            db.session.add(
+                MessageChunk(message_id=self.draft.message_id, seq=self.seq, content=self.content)
+            )
+
+    def after_commit(self) -> None:
+        # A cached transcript would otherwise keep showing the draft's older text
+        if self.draft.message_id is not None:
+            self.draft.service.draft_changed(self.key, self.draft.user_id)
+
+
+class MessageWrite(PendingWrite):
+    """Stores a message, or finishes ``draft`` with it when the draft was stored."""
+
+    def __init__(
+        self,
+        service: "ConversationService",
+        conversation_id: str,
+        user_id: int,
+        role: str,
+        content: str,
+        result: Optional[LLMResult] = None,
+        draft: Optional[DraftWrite] = None,
+        status: str = MESSAGE_COMPLETE,
+    ):
+        self.service = service
+        self.key = conversation_id
+        self.user_id = user_id
+        self.role = role
+        self.content = content
+        self.result = result
+        self.draft = draft
+        self.status = status
+        # Ordered by when the stream started (or finished, without a draft), not by
+        # when the write lands
+        self.created_at = draft.created_at if draft is not None else datetime.utcnow()
+        self.conversation: Optional[Conversation] = None
+        self.token_count: Optional[int] = None
+        self.finished_draft = False
+
+    def stage(self) -> int:
+        message = None
+        if self.draft is not None and self.draft.message_id is not None:
+            message = db.session.get(Message, self.draft.message_id)
+        if message is not None:
+            self.service.finish_draft(message, self.content, self.result, self.status)
+            self.finished_draft = True
+        else:
+            self.conversation = self.service.get_conversation(self.key, self.user_id)
+            message = self.service.stage_message(
+                self.conversation,
+                self.role,
+                self.content,
+                self.result,
+                self.created_at,
+                self.status,
+            )
+            self.token_count = message.token_count
+        return message.id
+
+    def after_commit(self) -> None:
+        if self.finished_draft:
+            self.service.draft_changed(self.key, self.user_id)
+        else:
+            self.service.message_committed(
+                self.conversation, self.role, self.content, self.token_count
+            )
+
+
+class DraftCheckpointer:
+    """Checkpoints a streaming reply into its draft every ``max_bytes`` or ``interval`` seconds.
+
+    Each checkpoint appends only the text streamed since the previous one, as a new
+    chunk row, through the write-behind queue.
+    """
+
+    def __init__(
+        self,
+        persistence: WriteBehindQueue,
+        draft: Optional[DraftWrite],
+        max_bytes: int = DEFAULT_CHECKPOINT_BYTES,
+        interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+    ):
+        self.persistence = persistence
+        self.draft = draft
+        self.max_bytes = max_bytes
+        self.interval = interval
+        self._seq = 0
+        self._buffer: List[str] = []
+        self._size = 0
+        self._last = monotonic()
+
+    def add(self, text: str) -> bool:
+        """Buffer streamed ``text``; ``True`` when a checkpoint is due."""
+        if self.draft is None:
+            return False
+        self._buffer.append(text)
+        self._size += len(text.encode("utf-8"))
+        return self._size >= self.max_bytes or monotonic() - self._last >= self.interval
+
+    def checkpoint(self) -> None:
+        if not self._buffer:
+            return
+        self.persistence.submit(ChunkWrite(self.draft, self._seq, "".join(self._buffer)))
+        self._seq += 1
+        self._buffer = []
+        self._size = 0
+        self._last = monotonic()
 
 
 class ConversationService:
+    def __init__(
+        self,
+        search: Optional[SearchService] = None,
+        history_window: int = DEFAULT_HISTORY_WINDOW,
+        token_counter: Optional[TokenCounter] = None,
+        checkpoint_bytes: int = DEFAULT_CHECKPOINT_BYTES,
+        checkpoint_interval: float = DEFAULT_CHECKPOINT_INTERVAL,
+    ):
+        self.search = search
+        self.history_window = history_window
+        self.token_counter = token_counter or TokenCounter()
+        self.checkpoint_bytes = checkpoint_bytes
+        self.checkpoint_interval = checkpoint_interval
+
     def get_conversation(self, conversation_id: str, user_id: int) -> Conversation:
         conversation = Conversation.query.filter_by(
             id=conversation_id, user_id=user_id
@@ -18,11 +211,23 @@ class ConversationService:
             raise NotFoundError("Conversation not found")
         return conversation
 
+    def get_conversation_view(self, conversation_id: str, user_id: int) -> ConversationView:
+        """The conversation and its transcript as a cached projection."""
+        cache_key = CONVERSATION_CACHE.key(user_id, "view", conversation_id)
+        view = cache.get(cache_key)
+        if view is None:
+            view = ConversationView.from_model(self.get_conversation(conversation_id, user_id))
+            cache.set(cache_key, view, timeout=VIEW_CACHE_TIMEOUT)
+        return view
+
     def get_user_conversations(
         self, user_id: int, limit: int = 50, offset: int = 0
-    ) -> List[Conversation]:
-        """Get user's conversations with eager-loaded messages to avoid N+1 queries."""
-        cache_key = f"conversations_{user_id}_{limit}_{offset}"
+    ) -> List[ConversationView]:
+        """Get user's conversations with their messages, cached as projections.
+
+        Messages are eager-loaded to avoid N+1 queries on a cache miss.
+        """
+        cache_key = CONVERSATION_CACHE.key(user_id, "recent", limit, offset)
 
         # Try to get from cache first
         cached = cache.get(cache_key)
@@ -38,17 +243,85 @@ class ConversationService:
             .all()
         )
 
+        views = [ConversationView.from_model(conversation) for conversation in conversations]
         # Cache for 1 hour
-        cache.set(cache_key, conversations, timeout=3600)
-        return conversations
+        cache.set(cache_key, views, timeout=3600)
+        return views
+
+    def get_history(self, conversation: Conversation) -> List[Dict[str, Union[str, int]]]:
+        """Up to the last ``history_window`` messages as provider input, oldest first.
+
+        Each message carries its stored ``tokens`` count for context budgeting. The
+        window is cached per conversation together with the message count it
+        reflects, and ``append_message`` extends it in place, so a chat turn does not
+        read message rows. A window whose count is stale is rebuilt from the database.
+        """
+        count = conversation.message_count
+        cached = cache.get(_history_key(conversation.id))
+        if cached is not None and cached[0] == count:
+            window = cached[1]
+        else:
+            rows = (
+                Message.query.filter_by(conversation_id=conversation.id)
+                .options(load_only(Message.role, Message.content, Message.token_count))
+                .order_by(Message.created_at.desc(), Message.id.desc())
+                .limit(self.history_window)
+                .all()
+            )
+            rows.reverse()
+            # Rows stored before counts were kept are counted in one batch
+            uncounted = [message.content for message in rows if message.token_count is None]
+            counted = iter(
+                self.token_counter.count_many(conversation.provider, conversation.model, uncounted)
+            )
+            window = tuple(
+                (
+                    message.role,
+                    message.content,
+                    message.token_count if message.token_count is not None else next(counted),
+                )
+                for message in rows
+            )
+            cache.set(_history_key(conversation.id), (count, window), timeout=HISTORY_CACHE_TIMEOUT)
+        # Empty replies (e.g. a stream that produced no text) are not valid provider
+        # input, and a window cut mid-turn must not open with an assistant reply
+        history = [
+            {"role": role, "content": content, "tokens": tokens}
+            for role, content, tokens in window
+            if content
+        ]
+        while history and history[0]["role"] == "assistant":
+            history.pop(0)
+        return history
+
+    def _extend_history(self, conversation: Conversation, entry: tuple) -> None:
+        key = _history_key(conversation.id)
+        cached = cache.get(key)
+        if cached is None:
+            return
+        count, window = cached
+        if conversation.message_count != count + 1:
+            # Another append got in between; rebuild on the next read
+            cache.delete(key)
+            return
+        window = (window + (entry,))[-self.history_window :]
+        cache.set(key, (count + 1, window), timeout=HISTORY_CACHE_TIMEOUT)
+
+    def count_conversations(self, user_id: int) -> int:
+        """Total number of the user's conversations, cached apart from the pages."""
+        cache_key = f"conversation_count_{user_id}"
+        total = cache.get(cache_key)
+        if total is None:
+            total = Conversation.query.filter_by(user_id=user_id).count()
+            cache.set(cache_key, total, timeout=COUNT_CACHE_TIMEOUT)
+        return total
+
+    def invalidate_conversation_count(self, user_id: int) -> None:
+        cache.delete(f"conversation_count_{user_id}")
 
     def invalidate_conversation_cache(self, user_id: int):
-        """Invalidate conversation cache for a user."""
-        # Clear all cache keys for this user (simplified approach)
-        # Common pagination limits
-        for limit in [10, 20, 50, 100, 200]:
-            for offset in range(0, 500, limit):
-                cache.delete(f"conversations_{user_id}_{limit}_{offset}")
+        """Invalidate every cached conversation listing of a user."""
+        CONVERSATION_CACHE.invalidate(user_id)
 
     def create_conversation(self, user_id: int, provider: str, model: str) -> Conversation:
         conversation = Conversation(user_id=user_id, provider=provider, model=model)
@@ -57,23 +330,128 @@ class ConversationService:
             db.session.commit()
             # Invalidate cache when creating new conversation
             self.invalidate_conversation_cache(user_id)
+            self.invalidate_conversation_count(user_id)
             return conversation
         except SQLAlchemyError as exc:
             db.session.rollback()
             raise AppError("Unable to create conversation") from exc
 
-    def append_message(self, conversation: Conversation, role: str, content: str) -> Message:
-        message = Message(conversation=conversation, role=role, content=content)
-        conversation.last_message_at = datetime.utcnow()
+    def append_message(
+        self,
+        conversation: Conversation,
+        role: str,
+        content: str,
+        result: Optional[LLMResult] = None,
+    ) -> Message:
         try:
-            db.session.add(message)
+            message = self.stage_message(conversation, role, content, result)
+            token_count = message.token_count
             db.session.commit()
-            # Invalidate cache when adding message
-            self.invalidate_conversation_cache(conversation.user_id)
-            return message
         except SQLAlchemyError as exc:
             db.session.rollback()
             raise AppError("Unable to persist message") from exc
+        self.message_committed(conversation, role, content, token_count)
+        return message
+
+    def stage_message(
+        self,
+        conversation: Conversation,
+        role: str,
+        content: str,
+        result: Optional[LLMResult] = None,
+        created_at: Optional[datetime] = None,
+        status: str = MESSAGE_COMPLETE,
+    ) -> Message:
+        """Add a message and its conversation's summary updates to the session, uncommitted.
+
+        Call ``message_committed`` once the transaction has committed. A
+        ``streaming`` draft is counted and indexed when ``finish_draft`` stores its text.
+        """
+        created_at = created_at or datetime.utcnow()
+        token_count = None
+        if status != MESSAGE_STREAMING:
+            token_count = self.token_counter.count(
+                conversation.provider, conversation.model, content
+            )
+        message = Message(
+            conversation=conversation,
+            role=role,
+            content=content,
+            token_count=token_count,
+            created_at=created_at,
+            status=status,
+        )
+        _set_usage(message, result)
+        conversation.last_message_at = created_at
+        # Counted in SQL so concurrent appends to one conversation don't lose updates
+        conversation.message_count = Conversation.message_count + 1
+        conversation.last_message_role = role
+        if role == "user":
+            conversation.last_user_preview = content[:PREVIEW_LENGTH]
+        db.session.add(message)
+        # Flushed per message so several staged in one transaction each count, and
+        # indexed in the same transaction so search never sees a missing message
+        db.session.flush()
+        if self.search is not None and status != MESSAGE_STREAMING:
+            self.search.index_message(message)
+        return message
+
+    def finish_draft(
+        self, message: Message, content: str, result: Optional[LLMResult], status: str
+    ) -> None:
+        """Store a draft's final text in place of its checkpoints, uncommitted.
+
+        Call ``draft_changed`` once the transaction has committed.
+        """
+        conversation = message.conversation
+        message.content = content
+        message.token_count = self.token_counter.count(
+            conversation.provider, conversation.model, content
+        )
+        message.status = status
+        _set_usage(message, result)
+        MessageChunk.query.filter_by(message_id=message.id).delete(synchronize_session=False)
+        db.session.flush()
+        if self.search is not None:
+            self.search.index_message(message)
+
+    def message_committed(
+        self, conversation: Conversation, role: str, content: str, token_count: int
+    ) -> None:
+        # Invalidate cache when adding message
+        self.invalidate_conversation_cache(conversation.user_id)
+        # Passed in rather than read back from the committed (expired) message row
+        self._extend_history(conversation, (role, content, token_count))
+
+    def draft_changed(self, conversation_id: str, user_id: int) -> None:
+        """Drop cached listings and the history window after a draft was stored or finished."""
+        self.invalidate_conversation_cache(user_id)
+        cache.delete(_history_key(conversation_id))
+
+    def draft_write(self, conversation_id: str, user_id: int) -> DraftWrite:
+        """A write-behind write storing the draft of a reply that starts streaming now."""
+        return DraftWrite(self, conversation_id, user_id)
+
+    def checkpointer(
+        self, persistence: WriteBehindQueue, draft: Optional[DraftWrite]
+    ) -> DraftCheckpointer:
+        return DraftCheckpointer(
+            persistence, draft, self.checkpoint_bytes, self.checkpoint_interval
+        )
+
+    def reply_write(
+        self,
+        conversation_id: str,
+        user_id: int,
+        content: str,
+        result: Optional[LLMResult],
+        draft: Optional[DraftWrite] = None,
+        status: str = MESSAGE_COMPLETE,
+    ) -> MessageWrite:
+        """A write-behind write storing an assistant reply, into ``draft`` if it was stored."""
+        return MessageWrite(
+            self, conversation_id, user_id, "assistant", content, result, draft, status
+        )
 
     def ensure_conversation(
         self,
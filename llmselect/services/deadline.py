@@ -0,0 +1,70 @@
+"""Request-scoped time budgets for provider calls.
+
+A route starts a ``Deadline`` when the request comes in and passes it down through
+``LLMService`` to the HTTP adapters. Each attempt gets separate connect and read
+timeouts capped by what is left of the budget, and a retry is only made while
+its backoff still fits, so a call gives up once the request's time is spent
+instead of after a fixed number of attempts with a fixed timeout each.
+
+For streams the read timeout is the idle time allowed between chunks. The
+deadline bounds connecting, retries and the wait for the response; once chunks
+flow, a long answer keeps streaming as long as it never stalls.
+"""
+
+from time import monotonic
+from typing import Callable, NamedTuple, Tuple
+
+from ..utils.errors import ProviderTimeoutError
+
+
+class Deadline:
+    __slots__ = ("seconds", "expires_at", "_clock")
+
+    def __init__(self, seconds: float, clock: Callable[[], float] = monotonic):
+        self.seconds = seconds
+        self.expires_at = clock() + seconds
+        self._clock = clock
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def cap(self, timeout: float) -> float:
+        """Shorten ``timeout`` so it ends no later than the deadline."""
+        return min(timeout, self.remaining())
+
+    def allows(self, delay: float) -> bool:
+        """Whether waiting ``delay`` seconds still leaves time for another attempt."""
+        return self.remaining() > delay
+
+    def check(self, label: str) -> None:
+        """Raise ``ProviderTimeoutError`` once the budget is spent."""
+        if self.expired:
+            raise self.exceeded(label)
+
+    def exceeded(self, label: str) -> ProviderTimeoutError:
+        return ProviderTimeoutError(
+            f"{label} did not respond within the request deadline",
+            extra={"deadline": self.seconds},
+        )
+
+
+class ProviderTimeouts(NamedTuple):
+    """Per-attempt socket timeouts in seconds."""
+
+    connect: float = 5.0
+    read: float = 30.0
+    # Longest allowed gap between two chunks of a stream
+    stream_idle: float = 30.0
+
+    def for_attempt(self, deadline: Deadline, stream: bool) -> Tuple[float, float]:
+        """``(connect, read)`` for the next attempt, both capped by ``deadline``."""
+        read = self.stream_idle if stream else self.read
+        return deadline.cap(self.connect), deadline.cap(read)
+
+
+def stream_stalled(label: str, idle: float) -> ProviderTimeoutError:
+    return ProviderTimeoutError(f"{label} stream stalled", extra={"idle_timeout": idle})
@@ -0,0 +1,239 @@
+"""Hedged requests for non-streaming LLM calls.
+
+Per provider/model latencies of recent successful calls are kept in a small ring
+buffer. Once a model has enough samples, a call that has not answered within
+the configured percentile of that model's latency gets a second, identical
+attempt; whichever finishes first wins and the other is cancelled. Hedges are
+capped by a budget (e.g. 5% extra requests) so a slow provider is never hit
+with double traffic.
+
+The asyncio engine cancels the losing attempt's HTTP request outright. With the
+blocking requests adapter a call that is already running cannot be interrupted,
+so the loser is abandoned: its worker finishes in the background and its result
+is discarded. Blocking attempts only run on the hedging pool while it has an idle
+worker; otherwise the call runs unhedged in the caller's thread, so the pool never
+queues calls (or caps their concurrency) and a hedge's delay always counts from
+when its primary actually started.
+
+Model names come from request payloads, so at most ``max_trackers`` latency
+trackers are kept, evicting the least recently used.
+"""
+
+import asyncio
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from time import monotonic
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple
+
+DEFAULT_MAX_TRACKERS = 256
+
+
+class LatencyTracker:
+    """Sliding sample of recent call latencies (seconds) for one provider/model."""
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        return self.percentiles(percent)[0]
+
+    def percentiles(self, *percents: float) -> List[Optional[float]]:
+        """Several percentiles from one sort of the samples."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return [None] * len(percents)
+        last = len(samples) - 1
+        return [samples[min(last, int(round(percent / 100 * last)))] for percent in percents]
+
+
+class Hedger:
+    def __init__(
+        self,
+        percentile: float = 95.0,
+        budget: float = 0.05,
+        min_samples: int = 20,
+        min_delay: float = 0.05,
+        max_workers: int = 32,
+        max_trackers: int = DEFAULT_MAX_TRACKERS,
+    ):
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.max_trackers = max_trackers
+
+        self._trackers: "OrderedDict[Tuple[str, str], LatencyTracker]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # One per pool worker: attempts are only submitted when a worker is idle
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    # ------------------------------------------------------------------
+    # Blocking calls (requests adapter)
+    # ------------------------------------------------------------------
+
+    def call(self, provider: str, model: str, attempt: Callable[[], str]) -> str:
+        tracker = self._tracker(provider, model)
+        delay = self._trigger_delay(tracker)
+        if delay is None or not self._slots.acquire(blocking=False):
+            return self._timed(tracker, attempt)
+
+        pool = self._executor()
+        primary = pool.submit(self._pooled, tracker, attempt)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._slots.acquire(blocking=False):
+            return primary.result()
+        if not self._take_hedge():
+            self._slots.release()
+            return primary.result()
+
+        hedge = pool.submit(self._pooled, tracker, attempt)
+        pending = {primary, hedge}
+        while True:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in done if future.exception() is None), None)
+            if winner is not None or not pending:
+                break
+        # Not interruptible once running: the loser finishes in the background
+        if winner is None:
+            return primary.result()  # both failed: surface the original error
+        if winner is hedge:
+            self._count_hedge_win()
+        return winner.result()
+
+    # ------------------------------------------------------------------
+    # Coroutine calls (asyncio engine)
+    # ------------------------------------------------------------------
+
+    async def acall(self, provider: str, model: str, attempt: Callable[[], Awaitable[str]]) -> str:
+        tracker = self._tracker(provider, model)
+        delay = self._trigger_delay(tracker)
+        if delay is None:
+            return await self._atimed(tracker, attempt)
+
+        primary = asyncio.ensure_future(self._atimed(tracker, attempt))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._take_hedge():
+            return await primary
+
+        hedge = asyncio.ensure_future(self._atimed(tracker, attempt))
+        pending = {primary, hedge}
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+        finally:
+            for task in pending:
+                task.cancel()
+        if winner is None:
+            return primary.result()
+        if winner is hedge:
+            self._count_hedge_win()
+        return winner.result()
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+
+    def stats(self) -> dict:
+        with self._lock:
+            trackers = dict(self._trackers)
+            stats = {
+                "percentile": self.percentile,
+                "budget": self.budget,
+                "calls": self.calls,
+                "hedges": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+        models = []
+        for (provider, model), tracker in trackers.items():
+            p50, p99 = tracker.percentiles(50, 99)
+            models.append(
+                {
+                    "provider": provider,
+                    "model": model,
+                    "samples": len(tracker),
+                    "p50": p50,
+                    "p99": p99,
+                }
+            )
+        stats["models"] = models
+        return stats
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _tracker(self, provider: str, model: str) -> LatencyTracker:
+        key = (provider, model)
+        with self._lock:
+            self.calls += 1
+            tracker = self._trackers.get(key)
+            if tracker is None:
+                if len(self._trackers) >= self.max_trackers:
+                    self._trackers.popitem(last=False)
+                tracker = self._trackers[key] = LatencyTracker()
+            else:
+                self._trackers.move_to_end(key)
+            return tracker
+
+    def _trigger_delay(self, tracker: LatencyTracker) -> Optional[float]:
+        if len(tracker) < self.min_samples:
+            return None
+        return max(self.min_delay, tracker.percentile(self.percentile))
+
+    def _take_hedge(self) -> bool:
+        """Reserve one hedge if it stays within the budget of extra requests."""
+        with self._lock:
+            if self.hedges + 1 > self.budget * self.calls:
+                return False
+            self.hedges += 1
+            return True
+
+    def _count_hedge_win(self) -> None:
+        with self._lock:
+            self.hedge_wins += 1
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="hedge"
+                    )
+        return self._pool
+
+    def _pooled(self, tracker: LatencyTracker, attempt: Callable[[], str]) -> str:
+        try:
+            return self._timed(tracker, attempt)
+        finally:
+            self._slots.release()
+
+    @staticmethod
+    def _timed(tracker: LatencyTracker, attempt: Callable[[], str]) -> str:
+        start = monotonic()
+        result = attempt()
+        tracker.record(monotonic() - start)
+        return result
+
+    @staticmethod
+    async def _atimed(tracker: LatencyTracker, attempt: Callable[[], Awaitable[str]]) -> str:
+        start = monotonic()
+        result = await attempt()
+        tracker.record(monotonic() - start)
+        return result
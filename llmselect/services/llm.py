@@ -1,12 +1,26 @@
-import json
+import asyncio
+import contextvars
+import functools
 import re
-from typing import List, Mapping, Optional
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from typing import AsyncIterator, Callable, Iterator, List, Mapping, Optional, Union
 
 import requests
-from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError, ReadTimeoutError
 
-from ..utils.errors import AppError
+from ..utils.errors import AppError, ProviderTimeoutError
+from .circuit_breaker import CircuitBreakerRegistry
+from .deadline import Deadline, ProviderTimeouts, stream_stalled
+from .hedging import Hedger
+from .llm_async import RETRY_STATUSES, STREAM_EVENT_FILTERS, AsyncLLMEngine, extract_stream_delta
+from .providers import LLMResult, ProviderRegistry, ProviderRequest
+from .response_cache import ResponseCache, response_cache_key
+from .single_flight import SingleFlight
+from .sse import iter_sse_json
+
+ENGINES = ("sync", "async")
 
 
 def _sanitize_message_content(content: str) -> str:
@@ -15,6 +29,21 @@ def _sanitize_message_content(content: str) -> str:
     return content
 
 
+def _sanitize_messages(messages: List[Mapping[str, str]]) -> List[dict]:
+    return [
+        {"role": message["role"], "content": _sanitize_message_content(message["content"])}
+        for message in messages
+    ]
+
+
+def _connect_failed(exc: requests.ConnectionError) -> bool:
+    """Whether a request failed before reaching the provider, so resending it is safe."""
+    reason = getattr(exc.args[0], "reason", None) if exc.args else None
+    return isinstance(exc, requests.ConnectTimeout) or isinstance(
+        reason, (NewConnectionError, ConnectTimeoutError)
+    )
+
+
 class LLMService:
     def __init__(
         self,
@@ -24,19 +53,30 @@ class LLMService:
         azure_api_key: Optional[str] = None,
         azure_api_version: Optional[str] = None,
         azure_deployment_mappings: Optional[dict] = None,
+        engine: str = "sync",
+        async_engine_options: Optional[dict] = None,
+        response_cache: Optional[ResponseCache] = None,
+        single_flight: Optional[SingleFlight] = None,
+        circuit_breakers: Optional[CircuitBreakerRegistry] = None,
+        hedger: Optional[Hedger] = None,
+        timeouts: Optional[ProviderTimeouts] = None,
+        request_deadline: float = 60.0,
+        max_retries: int = 3,
+        backoff_factor: float = 0.3,
+        providers: Optional[ProviderRegistry] = None,
+        provider_base_url: Optional[str] = None,
+        blocking_bridge_workers: int = 64,
     ):
+        if engine not in ENGINES:
+            raise AppError(f"Unsupported LLM engine '{engine}'")
+
+        # Retries happen per call in ``_post`` so they stop at the request deadline
         self.session = requests.Session()
-        retry = Retry(
-            total=3,
-            read=3,
-            connect=3,
-            backoff_factor=0.3,
-            status_forcelist=(429, 500, 502, 503, 504),
-        )
-        adapter = HTTPAdapter(max_retries=retry)
-        self.session.mount("https://", adapter)
-        self.session.mount("http://", adapter)
         self.max_tokens = max_tokens
+        self.timeouts = timeouts or ProviderTimeouts()
+        self.request_deadline = request_deadline
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
 
         # Azure AI Foundry configuration
         self.use_azure = use_azure
@@ -45,119 +85,134 @@ class LLMService:
         self.azure_api_version = azure_api_version or "2024-02-15-preview"
         self.azure_deployment_mappings = azure_deployment_mappings or {}
 
+        # One adapter per provider builds every request; with Azure configured the
+        # built-in providers are all served through it
+        if providers is None:
+            providers = ProviderRegistry.default(
+                max_tokens=max_tokens,
+                azure_endpoint=azure_endpoint if use_azure else None,
+                azure_api_key=azure_api_key,
+                azure_api_version=self.azure_api_version,
+                azure_deployment_mappings=self.azure_deployment_mappings,
+                base_url=provider_base_url,
+            )
+        self.providers = providers
+
+        # Optional asyncio engine; the requests-based adapter below stays the fallback
+        self.engine = engine
+        self.async_engine: Optional[AsyncLLMEngine] = None
+        if engine == "async":
+            engine_options = {"max_retries": max_retries, "backoff_factor": backoff_factor}
+            engine_options.update(async_engine_options or {})
+            self.async_engine = AsyncLLMEngine(
+                providers=providers,
+                timeouts=self.timeouts,
+                request_deadline=request_deadline,
+                **engine_options,
+            )
+
+        # Optional exact-match response cache; callers can bypass it per request
+        self.response_cache = response_cache
+        # Optional coalescing of identical in-flight calls
+        self.single_flight = single_flight
+        # Optional per provider/model circuit breakers around every upstream call
+        self.circuit_breakers = circuit_breakers
+        # Optional hedging of slow non-streaming calls
+        self.hedger = hedger
+
+        # Threads driving the blocking adapter for ``ainvoke``/``ainvoke_stream`` without
+        # the async engine. Kept apart from the event loop's default executor, which
+        # the ASGI entry point dispatches Flask requests on, so open streams cannot
+        # starve every other route
+        self.blocking_bridge_workers = blocking_bridge_workers
+        self._bridge: Optional[ThreadPoolExecutor] = None
+        self._bridge_lock = threading.Lock()
+
     def invoke(
-        self, provider: str, model: str, messages: List[Mapping[str, str]], api_key: str
-    ) -> str:
-        sanitized = [
-            {
-                "role": message["role"],
-                "content": _sanitize_message_content(message["content"]),
-            }
-            for message in messages
-        ]
-
-        # Route through Azure AI Foundry if configured
-        if self.use_azure and self.azure_endpoint and self.azure_api_key:
-            return self._call_azure_foundry(provider, model, sanitized)
-
-        if provider == "openai":
-            return self._call_openai(model, sanitized, api_key)
-        if provider == "anthropic":
-            return self._call_anthropic(model, sanitized, api_key)
-        if provider == "gemini":
-            return self._call_gemini(model, sanitized, api_key)
-        if provider == "mistral":
-            return self._call_mistral(model, sanitized, api_key)
-        raise AppError(f"Unsupported provider '{provider}'")
-
-    def _call_openai(self, model: str, messages, api_key: str) -> str:
-        # GPT-5+ models use max_completion_tokens, older models use max_tokens
-        token_param = (
-            "max_completion_tokens" if model.startswith(("gpt-5", "o3", "o4")) else "max_tokens"
+        self,
+        provider: str,
+        model: str,
+        messages: List[Mapping[str, str]],
+        api_key: str,
+        *,
+        use_cache: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> LLMResult:
+        sanitized = _sanitize_messages(messages)
+        deadline = deadline or self.new_deadline()
+
+        cache_key = self._cache_key(provider, model, sanitized) if use_cache else None
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return LLMResult(cached, cached=True)
+
+        def fetch():
+            result = self._invoke_uncached(provider, model, sanitized, api_key, deadline)
+            if cache_key is not None:
+                self.response_cache.set(cache_key, result.text)
+            return result
+
+        if self.single_flight is None:
+            return fetch()
+        return self.single_flight.do(self._flight_key(provider, model, sanitized, api_key), fetch)
+
+    def new_deadline(self) -> Deadline:
+        """Start the time budget of one request; routes call this as it arrives."""
+        return Deadline(self.request_deadline)
+
+    def check_available(self, provider: str, model: str) -> None:
+        """Fail fast with ``ProviderUnavailableError`` while the model's circuit is open."""
+        if self.circuit_breakers is not None:
+            self.circuit_breakers.get(provider, model).check()
+
+    def _invoke_uncached(
+        self, provider: str, model: str, sanitized: List[dict], api_key: str, deadline: Deadline
+    ) -> LLMResult:
+        if self.circuit_breakers is None:
+            return self._hedged_invoke(provider, model, sanitized, api_key, deadline)
+        breaker = self.circuit_breakers.get(provider, model)
+        return breaker.call(self._hedged_invoke, provider, model, sanitized, api_key, deadline)
+
+    def _hedged_invoke(
+        self, provider: str, model: str, sanitized: List[dict], api_key: str, deadline: Deadline
+    ) -> LLMResult:
+        if self.hedger is None:
+            return self._dispatch_invoke(provider, model, sanitized, api_key, deadline)
+        if self.async_engine is not None:
+            return self.async_engine.run(
+                self._ahedged_invoke(provider, model, sanitized, api_key, deadline)
+            )
+        return self.hedger.call(
+            provider,
+            model,
+            lambda: self._dispatch_invoke(provider, model, sanitized, api_key, deadline),
         )
 
-        response = self.session.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={"model": model, "messages": messages, token_param: 1000},
-            timeout=30,
+    async def _ahedged_invoke(
+        self, provider: str, model: str, sanitized: List[dict], api_key: str, deadline: Deadline
+    ) -> LLMResult:
+        """Native async invoke, hedged when enabled; the losing request is cancelled."""
+        if self.hedger is None:
+            return await self.async_engine.ainvoke(provider, model, sanitized, api_key, deadline)
+        return await self.hedger.acall(
+            provider,
+            model,
+            lambda: self.async_engine.ainvoke(provider, model, sanitized, api_key, deadline),
         )
-        return self._handle_response(response, "OpenAI")
-
-    def _call_anthropic(self, model: str, messages, api_key: str) -> str:
-        system_message = next((m for m in messages if m["role"] == "system"), None)
-        filtered = [m for m in messages if m["role"] != "system"]
-
-        payload = {"model": model, "max_tokens": 1000, "messages": filtered}
-        if system_message:
-            payload["system"] = system_message["content"]
-
-        response = self.session.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": api_key,
-                "Content-Type": "application/json",
-                "anthropic-version": "2023-06-01",
-            },
-            json=payload,
-            timeout=30,
-        )
-        data = self._parse_json(response, "Anthropic")
-        try:
-            return data["content"][0]["text"]
-        except (KeyError, IndexError) as exc:
-            raise AppError("Malformed response from Anthropic") from exc
-
-    def _call_gemini(self, model: str, messages, api_key: str) -> str:
-        contents = []
-        for message in messages:
-            if message["role"] == "system":
-                continue
-            contents.append(
-                {
-                    "role": "model" if message["role"] == "assistant" else "user",
-                    "parts": [{"text": message["content"]}],
-                }
-            )
 
-        response = self.session.post(
-            f"https://generativelanguage.googleapis.com/v1beta/models/{model}:generateContent",
-            headers={"Content-Type": "application/json"},
-            params={"key": api_key},
-            json={"contents": contents},
-            timeout=30,
-        )
-        data = self._parse_json(response, "Gemini")
-        try:
-            return data["candidates"][0]["content"]["parts"][0]["text"]
-        except (KeyError, IndexError) as exc:
-            raise AppError("Malformed response from Gemini") from exc
-
-    def _call_mistral(self, model: str, messages, api_key: str) -> str:
-        response = self.session.post(
-            "https://api.mistral.ai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={"model": model, "messages": messages, "max_tokens": 1000},
-            timeout=30,
-        )
-        data = self._parse_json(response, "Mistral")
-        try:
-            return data["choices"][0]["message"]["content"]
-        except (KeyError, IndexError) as exc:
-            raise AppError("Malformed response from Mistral") from exc
+    def _dispatch_invoke(
+        self, provider: str, model: str, sanitized: List[dict], api_key: str, deadline: Deadline
+    ) -> LLMResult:
+        if self.async_engine is not None:
+            return self.async_engine.invoke(provider, model, sanitized, api_key, deadline)
 
-    def _handle_response(self, response: requests.Response, provider_name: str) -> str:
-        data = self._parse_json(response, provider_name)
-        try:
-            return data["choices"][0]["message"]["content"]
-        except (KeyError, IndexError) as exc:
-            raise AppError(f"Malformed response from {provider_name}") from exc
+        adapter = self.providers.get(provider)
+        spec = adapter.build_request(model, sanitized, api_key, stream=False)
+        start = monotonic()
+        response = self._post(spec, deadline)
+        data = self._parse_json(response, spec.label)
+        return adapter.extract_result(data, latency=monotonic() - start)
 
     @staticmethod
     def _parse_json(response: requests.Response, provider_name: str) -> dict:
@@ -178,328 +233,328 @@ class LLMService:
         )
 
     def invoke_stream(
-        self, provider: str, model: str, messages: List[Mapping[str, str]], api_key: str
+        self,
+        provider: str,
+        model: str,
+        messages: List[Mapping[str, str]],
+        api_key: str,
+        *,
+        use_cache: bool = True,
+        deadline: Optional[Deadline] = None,
     ):
         """Stream response from LLM provider.
 
+        A cached answer is replayed in chunks; a fresh one is cached only if the
+        stream is read to the end. Identical concurrent streams share one upstream
+        call when single-flight is enabled.
+
         Yields:
-            str: Chunks of the response as they arrive
+            str: Chunks of the response as they arrive, then
+            LLMResult: the whole answer with its usage, once the stream has ended
         """
-        sanitized = [
-            {
-                "role": message["role"],
-                "content": _sanitize_message_content(message["content"]),
-            }
-            for message in messages
-        ]
-
-        # Route through Azure AI Foundry if configured
-        if self.use_azure and self.azure_endpoint and self.azure_api_key:
-            yield from self._stream_azure_foundry(provider, model, sanitized)
+        sanitized = _sanitize_messages(messages)
+        deadline = deadline or self.new_deadline()
+
+        cache_key = self._cache_key(provider, model, sanitized) if use_cache else None
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield from self.response_cache.replay(cached)
+                yield LLMResult(cached, cached=True)
+                return
+
+        def upstream():
+            return self._stream_and_store(provider, model, sanitized, api_key, deadline, cache_key)
+
+        if self.single_flight is None:
+            yield from upstream()
             return
+        flight_key = self._flight_key(provider, model, sanitized, api_key)
+        yield from self.single_flight.stream(flight_key, upstream)
 
-        if provider == "openai":
-            yield from self._stream_openai(model, sanitized, api_key)
-        elif provider == "anthropic":
-            yield from self._stream_anthropic(model, sanitized, api_key)
-        elif provider == "gemini":
-            yield from self._stream_gemini(model, sanitized, api_key)
-        elif provider == "mistral":
-            yield from self._stream_mistral(model, sanitized, api_key)
-        else:
-            raise AppError(f"Unsupported provider '{provider}'")
-
-    def _stream_openai(self, model: str, messages, api_key: str):
-        """Stream response from OpenAI API."""
-        # GPT-5+ models use max_completion_tokens, older models use max_tokens
-        token_param = (
-            "max_completion_tokens" if model.startswith(("gpt-5", "o3", "o4")) else "max_tokens"
-        )
+    def _stream_and_store(
+        self,
+        provider: str,
+        model: str,
+        sanitized: List[dict],
+        api_key: str,
+        deadline: Deadline,
+        cache_key: Optional[str],
+    ):
+        if cache_key is None:
+            yield from self._stream_uncached(provider, model, sanitized, api_key, deadline)
+            return
 
-        response = self.session.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": model,
-                "messages": messages,
-                token_param: self.max_tokens,
-                "stream": True,
-            },
-            timeout=30,
-            stream=True,
-        )
+        for chunk in self._stream_uncached(provider, model, sanitized, api_key, deadline):
+            if isinstance(chunk, LLMResult):
+                self.response_cache.set(cache_key, chunk.text)
+            yield chunk
 
-        if not response.ok:
-            self._parse_json(response, "OpenAI")
-
-        for line in response.iter_lines():
-            if not line:
-                continue
-            line_str = line.decode("utf-8")
-            if line_str.startswith("data: "):
-                data_str = line_str[6:]
-                if data_str == "[DONE]":
-                    break
-                try:
-                    data = json.loads(data_str)
-                    if (
-                        data.get("choices")
-                        and data["choices"][0].get("delta")
-                        and data["choices"][0]["delta"].get("content")
-                    ):
-                        yield data["choices"][0]["delta"]["content"]
-                except (ValueError, KeyError, IndexError):
-                    continue
-
-    def _stream_anthropic(self, model: str, messages, api_key: str):
-        """Stream response from Anthropic Claude API."""
-        system_message = next((m for m in messages if m["role"] == "system"), None)
-        filtered = [m for m in messages if m["role"] != "system"]
-
-        payload = {
-            "model": model,
-            "max_tokens": self.max_tokens,
-            "messages": filtered,
-            "stream": True,
-        }
-        if system_message:
-            payload["system"] = system_message["content"]
-
-        response = self.session.post(
-            "https://api.anthropic.com/v1/messages",
-            headers={
-                "x-api-key": api_key,
-                "Content-Type": "application/json",
-                "anthropic-version": "2023-06-01",
-            },
-            json=payload,
-            timeout=30,
-            stream=True,
-        )
+    def _stream_uncached(
+        self, provider: str, model: str, sanitized: List[dict], api_key: str, deadline: Deadline
+    ):
+        stream = self._dispatch_stream(provider, model, sanitized, api_key, deadline)
+        if self.circuit_breakers is None:
+            return stream
+        return self.circuit_breakers.get(provider, model).guard_stream(stream)
 
-        if not response.ok:
-            self._parse_json(response, "Anthropic")
+    def _dispatch_stream(
+        self, provider: str, model: str, sanitized: List[dict], api_key: str, deadline: Deadline
+    ):
+        adapter = self.providers.get(provider)
+        if not adapter.supports_streaming:
+            # Answer in one chunk from a plain call
+            result = self._dispatch_invoke(provider, model, sanitized, api_key, deadline)
+            yield result.text
+            yield result
+            return
 
-        for line in response.iter_lines():
-            if not line:
-                continue
-            line_str = line.decode("utf-8")
-            if line_str.startswith("data: "):
-                data_str = line_str[6:]
-                try:
-                    data = json.loads(data_str)
-                    if data.get("type") == "content_block_delta":
-                        if data.get("delta", {}).get("text"):
-                            yield data["delta"]["text"]
-                except (ValueError, KeyError):
-                    continue
-
-    def _stream_gemini(self, model: str, messages, api_key: str):
-        """Stream response from Google Gemini API."""
-        contents = []
-        for message in messages:
-            if message["role"] == "system":
-                continue
-            contents.append(
-                {
-                    "role": "model" if message["role"] == "assistant" else "user",
-                    "parts": [{"text": message["content"]}],
-                }
+        if self.async_engine is not None:
+            yield from self.async_engine.invoke_stream(
+                provider, model, sanitized, api_key, deadline
             )
+            return
 
-        url = (
-            "https://generativelanguage.googleapis.com/v1beta/models/"
-            f"{model}:streamGenerateContent"
-        )
-        response = self.session.post(
-            url,
-            headers={"Content-Type": "application/json"},
-            params={"key": api_key, "alt": "sse"},
-            json={"contents": contents},
-            timeout=30,
-            stream=True,
-        )
-
-        if not response.ok:
-            self._parse_json(response, "Gemini")
-
-        for line in response.iter_lines():
-            if not line:
-                continue
-            line_str = line.decode("utf-8")
-            if line_str.startswith("data: "):
-                data_str = line_str[6:]
-                try:
-                    data = json.loads(data_str)
-                    candidates = data.get("candidates") or []
-                    if candidates:
-                        content = candidates[0].get("content", {})
-                        parts = content.get("parts") or []
-                        if parts:
-                            text = parts[0].get("text")
-                            if text:
-                                yield text
-                except (ValueError, KeyError, IndexError):
-                    continue
-
-    def _stream_mistral(self, model: str, messages, api_key: str):
-        """Stream response from Mistral API."""
-        response = self.session.post(
-            "https://api.mistral.ai/v1/chat/completions",
-            headers={
-                "Authorization": f"Bearer {api_key}",
-                "Content-Type": "application/json",
-            },
-            json={
-                "model": model,
-                "messages": messages,
-                "max_tokens": self.max_tokens,
-                "stream": True,
-            },
-            timeout=30,
-            stream=True,
-        )
-
-        if not response.ok:
-            self._parse_json(response, "Mistral")
-
-        for line in response.iter_lines():
-            if not line:
-                continue
-            line_str = line.decode("utf-8")
-            if line_str.startswith("data: "):
-                data_str = line_str[6:]
-                if data_str == "[DONE]":
-                    break
-                try:
-                    data = json.loads(data_str)
-                    if (
-                        data.get("choices")
-                        and data["choices"][0].get("delta")
-                        and data["choices"][0]["delta"].get("content")
-                    ):
-                        yield data["choices"][0]["delta"]["content"]
-                except (ValueError, KeyError, IndexError):
-                    continue
-
-    def _get_azure_deployment_name(self, model: str) -> str:
-        """Get Azure deployment name for a given model.
-
-        Args:
-            model: The model name (e.g., 'gpt-4', 'claude-3-5-sonnet-20241022')
-
-        Returns:
-            The Azure deployment name
-
-        Raises:
-            AppError: If no deployment mapping found
+        spec = adapter.build_request(model, sanitized, api_key, stream=True)
+        start = monotonic()
+        response = self._post(spec, deadline, stream=True)
+        try:
+            if not response.ok:
+                self._parse_json(response, spec.label)
+            result = LLMResult("")
+            parts = []
+            for text in self._iter_stream_text(response, spec.kind, spec.label, result):
+                parts.append(text)
+                yield text
+        finally:
+            response.close()
+        result.text = "".join(parts)
+        result.latency = monotonic() - start
+        yield result
+
+    async def ainvoke(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Mapping[str, str]],
+        api_key: str,
+        *,
+        use_cache: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> LLMResult:
+        """Async counterpart of ``invoke`` for the ASGI streaming handlers.
+
+        Uses the async engine directly when it is enabled; otherwise the blocking
+        adapter runs in a worker thread. Either way identical concurrent calls share
+        one upstream call when single-flight is enabled.
         """
-        deployment = self.azure_deployment_mappings.get(model)
-        if not deployment:
-            raise AppError(
-                f"No Azure deployment mapping found for model '{model}'. "
-                f"Please configure the deployment in your environment variables."
+        deadline = deadline or self.new_deadline()
+        if self.async_engine is None:
+            return await self._in_bridge(
+                self.invoke,
+                provider,
+                model,
+                messages,
+                api_key,
+                use_cache=use_cache,
+                deadline=deadline,
             )
-        return deployment
-
-    def _call_azure_foundry(
-        self, provider: str, model: str, messages: List[Mapping[str, str]]
-    ) -> str:
-        """Call Azure AI Foundry unified API.
-
-        Azure AI Foundry provides OpenAI-compatible endpoints for all providers
-        (OpenAI, Anthropic, Gemini, Mistral) through a single interface.
-
-        Args:
-            provider: The provider name (used for error messages)
-            model: The model name to map to Azure deployment
-            messages: List of message dictionaries
-
-        Returns:
-            The response text
+        sanitized = _sanitize_messages(messages)
+
+        cache_key = self._cache_key(provider, model, sanitized) if use_cache else None
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return LLMResult(cached, cached=True)
+
+        async def fetch():
+            if self.circuit_breakers is None:
+                result = await self._ahedged_invoke(provider, model, sanitized, api_key, deadline)
+            else:
+                result = await self.circuit_breakers.get(provider, model).acall(
+                    self._ahedged_invoke, provider, model, sanitized, api_key, deadline
+                )
+            if cache_key is not None:
+                self.response_cache.set(cache_key, result.text)
+            return result
+
+        if self.single_flight is None:
+            return await fetch()
+        flight_key = self._flight_key(provider, model, sanitized, api_key)
+        return await self.single_flight.ado(flight_key, fetch)
+
+    async def ainvoke_stream(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Mapping[str, str]],
+        api_key: str,
+        *,
+        use_cache: bool = True,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[Union[str, LLMResult]]:
+        """Async counterpart of ``invoke_stream``.
+
+        Without the async engine each chunk of the blocking stream is pulled on the
+        blocking bridge's threads, so the event loop is never blocked. Identical
+        concurrent streams share one upstream call when single-flight is enabled.
         """
-        deployment_name = self._get_azure_deployment_name(model)
-
-        # Azure AI Foundry uses OpenAI-compatible format for all providers
-        url = (
-            f"{self.azure_endpoint}/openai/deployments/{deployment_name}"
-            f"/chat/completions?api-version={self.azure_api_version}"
-        )
-
-        response = self.session.post(
-            url,
-            headers={
-                "api-key": self.azure_api_key,
-                "Content-Type": "application/json",
-            },
-            json={
-                "messages": messages,
-                "max_tokens": self.max_tokens,
-            },
-            timeout=30,
-        )
-
-        if not response.ok:
-            self._parse_json(response, f"Azure AI Foundry ({provider})")
+        deadline = deadline or self.new_deadline()
+        if self.async_engine is None:
+            stream = self.invoke_stream(
+                provider, model, messages, api_key, use_cache=use_cache, deadline=deadline
+            )
+            done = object()
+            try:
+                while True:
+                    chunk = await self._in_bridge(next, stream, done)
+                    if chunk is done:
+                        return
+                    yield chunk
+            finally:
+                try:
+                    stream.close()
+                except ValueError:
+                    # Cancelled while a worker thread is still inside next(); the
+                    # generator is released once that call returns.
+                    pass
+
+        sanitized = _sanitize_messages(messages)
+
+        cache_key = self._cache_key(provider, model, sanitized) if use_cache else None
+        cached = self.response_cache.get(cache_key) if cache_key is not None else None
+        if cached is not None:
+            for chunk in self.response_cache.replay(cached):
+                yield chunk
+            yield LLMResult(cached, cached=True)
+            return
 
-        return self._handle_response(response, f"Azure AI Foundry ({provider})")
+        def upstream():
+            return self._astream_and_store(provider, model, sanitized, api_key, deadline, cache_key)
 
-    def _stream_azure_foundry(self, provider: str, model: str, messages: List[Mapping[str, str]]):
-        """Stream response from Azure AI Foundry unified API.
+        if self.single_flight is None:
+            stream = upstream()
+        else:
+            flight_key = self._flight_key(provider, model, sanitized, api_key)
+            stream = self.single_flight.astream(flight_key, upstream)
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            # Leave the shared stream now rather than when the generator is collected
+            await stream.aclose()
 
-        Args:
-            provider: The provider name (used for error messages)
-            model: The model name to map to Azure deployment
-            messages: List of message dictionaries
+    async def _astream_and_store(
+        self,
+        provider: str,
+        model: str,
+        sanitized: List[dict],
+        api_key: str,
+        deadline: Deadline,
+        cache_key: Optional[str],
+    ) -> AsyncIterator[Union[str, LLMResult]]:
+        stream = self.async_engine.ainvoke_stream(provider, model, sanitized, api_key, deadline)
+        if self.circuit_breakers is not None:
+            stream = self.circuit_breakers.get(provider, model).aguard_stream(stream)
+        async for chunk in stream:
+            if cache_key is not None and isinstance(chunk, LLMResult):
+                self.response_cache.set(cache_key, chunk.text)
+            yield chunk
+
+    def close(self) -> None:
+        """Stop the blocking bridge's threads (the async engine is closed separately)."""
+        if self._bridge is not None:
+            self._bridge.shutdown(wait=False, cancel_futures=True)
+
+    async def _in_bridge(self, func: Callable, *args, **kwargs):
+        """Run blocking ``func`` on the bridge's threads, like ``asyncio.to_thread``."""
+        if self._bridge is None:
+            with self._bridge_lock:
+                if self._bridge is None:
+                    self._bridge = ThreadPoolExecutor(
+                        max_workers=self.blocking_bridge_workers, thread_name_prefix="llm-bridge"
+                    )
+        call = functools.partial(contextvars.copy_context().run, func, *args, **kwargs)
+        return await asyncio.get_running_loop().run_in_executor(self._bridge, call)
+
+    def _request_params(self) -> dict:
+        return {
+            "max_tokens": self.max_tokens,
+            "azure": bool(self.use_azure and self.azure_endpoint and self.azure_api_key),
+        }
 
-        Yields:
-            str: Chunks of the response as they arrive
+    def _cache_key(self, provider: str, model: str, sanitized: List[dict]) -> Optional[str]:
+        if self.response_cache is None:
+            return None
+        return response_cache_key(provider, model, sanitized, self._request_params())
+
+    def _flight_key(self, provider: str, model: str, sanitized: List[dict], api_key: str) -> str:
+        # Unlike the cache, only callers using the same key share a call, so one
+        # user's invalid key never fails another user's request
+        params = {**self._request_params(), "api_key": api_key}
+        return response_cache_key(provider, model, sanitized, params)
+
+    def _post(
+        self, spec: ProviderRequest, deadline: Deadline, stream: bool = False
+    ) -> requests.Response:
+        """POST a provider request with per-attempt timeouts and retries bounded by ``deadline``.
+
+        Failures to connect and ``RETRY_STATUSES`` responses are retried, the same
+        policy as the async engine's; a request that failed after it was sent is
+        not, since the provider may already be working on it. Other error statuses
+        are returned for the caller to raise.
         """
-        deployment_name = self._get_azure_deployment_name(model)
-
-        # Azure AI Foundry uses OpenAI-compatible format for all providers
-        url = (
-            f"{self.azure_endpoint}/openai/deployments/{deployment_name}"
-            f"/chat/completions?api-version={self.azure_api_version}"
-        )
-
-        response = self.session.post(
-            url,
-            headers={
-                "api-key": self.azure_api_key,
-                "Content-Type": "application/json",
-            },
-            json={
-                "messages": messages,
-                "max_tokens": self.max_tokens,
-                "stream": True,
-            },
-            timeout=30,
-            stream=True,
-        )
-
-        if not response.ok:
-            self._parse_json(response, f"Azure AI Foundry ({provider})")
-
-        # Azure returns OpenAI-compatible streaming format
-        for line in response.iter_lines():
-            if not line:
-                continue
-            line_str = line.decode("utf-8")
-            if line_str.startswith("data: "):
-                data_str = line_str[6:]
-                if data_str == "[DONE]":
-                    break
-                try:
-                    data = json.loads(data_str)
-                    if (
-                        data.get("choices")
-                        and data["choices"][0].get("delta")
-                        and data["choices"][0]["delta"].get("content")
-                    ):
-                        yield data["choices"][0]["delta"]["content"]
-                except (ValueError, KeyError, IndexError):
-                    continue
+        label = spec.label
+        kwargs = {"headers": spec.headers, "json": spec.payload}
+        if spec.params:
+            kwargs["params"] = spec.params
+        if stream:
+            kwargs["stream"] = True
+        attempt = 0
+        while True:
+            deadline.check(label)
+            delay = self.backoff_factor * (2**attempt)
+            can_retry = attempt < self.max_retries and deadline.allows(delay)
+            try:
+                response = self.session.post(
+                    spec.url, timeout=self.timeouts.for_attempt(deadline, stream), **kwargs
+                )
+            except requests.ConnectionError as exc:
+                if not _connect_failed(exc) or attempt >= self.max_retries:
+                    raise AppError(f"{label} API unreachable") from exc
+                if not can_retry:
+                    raise deadline.exceeded(label) from exc
+            except requests.Timeout as exc:
+                if deadline.expired:
+                    raise deadline.exceeded(label) from exc
+                raise ProviderTimeoutError(f"{label} API timed out") from exc
+            else:
+                if response.status_code not in RETRY_STATUSES or not can_retry:
+                    return response
+                response.close()
+            sleep(delay)
+            attempt += 1
+
+    def _iter_stream_text(
+        self,
+        response: requests.Response,
+        kind: str,
+        label: str,
+        result: Optional[LLMResult] = None,
+    ) -> Iterator[str]:
+        """Yield text deltas from an SSE response in the given wire format.
+
+        Reported usage is recorded on ``result``. The read timeout set in ``_post``
+        applies to every socket read, so a stream that goes quiet for longer than
+        the idle timeout fails here.
+        """
+        chunks = response.iter_content(chunk_size=None)
+        try:
+            for data in iter_sse_json(chunks, *STREAM_EVENT_FILTERS[kind]):
+                text = extract_stream_delta(kind, data, result)
+                if text:
+                    yield text
+        except requests.ConnectionError as exc:
+            if exc.args and isinstance(exc.args[0], ReadTimeoutError):
+                raise stream_stalled(label, self.timeouts.stream_idle) from exc
+            raise
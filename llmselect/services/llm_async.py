@@ -0,0 +1,337 @@
+"""Asyncio provider engine for LLMService built on httpx.
+
+All provider I/O runs on one background event loop, with one pooled
+``httpx.AsyncClient`` per upstream host. Sync callers (the Flask routes) reach it
+through ``invoke``/``invoke_stream``, which block only on the result, so many
+concurrent streams share the loop instead of each holding a socket-bound thread.
+Async callers can use ``ainvoke``/``ainvoke_stream`` directly.
+
+Calls return an ``LLMResult``; streams yield text chunks followed by one
+``LLMResult`` carrying the whole answer and its usage.
+"""
+
+import asyncio
+import threading
+from time import monotonic
+from typing import AsyncIterator, Dict, Iterator, List, Mapping, Optional, Union
+from urllib.parse import urlsplit
+
+import httpx
+
+from ..utils.errors import AppError, ProviderTimeoutError
+from .deadline import Deadline, ProviderTimeouts, stream_stalled
+from .providers import LLMResult, ProviderRegistry, ProviderRequest
+from .sse import aiter_sse_json
+
+# Statuses retried by both engines, alongside failures to connect
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Per wire format, the (byte marker, event types) filter passed to the SSE decoder.
+# Only Anthropic names its events, so pings and block start/stop events skip JSON
+# parsing. OpenAI and Gemini have no event that is safe to skip: the ones without
+# content report usage or the finish reason (Gemini's every event carries running
+# usage totals), so no marker is set and every data event is parsed.
+STREAM_EVENT_FILTERS = {
+    "openai": (None, None),
+    "anthropic": (None, frozenset({"message_start", "content_block_delta", "message_delta"})),
+    "gemini": (None, None),
+}
+
+
+def extract_stream_delta(
+    kind: str, data: dict, result: Optional[LLMResult] = None
+) -> Optional[str]:
+    """Return the text carried by one parsed stream event, if any.
+
+    Usage and the finish reason found in the event are recorded on ``result``.
+    """
+    try:
+        if kind == "anthropic":
+            event_type = data.get("type")
+            if event_type == "content_block_delta":
+                return data.get("delta", {}).get("text")
+            if result is not None:
+                if event_type == "message_start":
+                    usage = data.get("message", {}).get("usage") or {}
+                    result.prompt_tokens = usage.get("input_tokens", result.prompt_tokens)
+                elif event_type == "message_delta":
+                    usage = data.get("usage") or {}
+                    result.completion_tokens = usage.get("output_tokens")
+                    result.finish_reason = data.get("delta", {}).get("stop_reason")
+            return None
+        if kind == "gemini":
+            candidates = data.get("candidates") or []
+            if result is not None:
+                # Every event carries the running totals
+                usage = data.get("usageMetadata")
+                if usage:
+                    result.prompt_tokens = usage.get("promptTokenCount")
+                    result.completion_tokens = usage.get("candidatesTokenCount")
+                if candidates and candidates[0].get("finishReason"):
+                    result.finish_reason = candidates[0]["finishReason"]
+            if not candidates:
+                return None
+            parts = candidates[0].get("content", {}).get("parts") or []
+            return parts[0].get("text") if parts else None
+        choices = data.get("choices") or []
+        if result is not None:
+            usage = data.get("usage")
+            if usage:
+                result.prompt_tokens = usage.get("prompt_tokens")
+                result.completion_tokens = usage.get("completion_tokens")
+            if choices and choices[0].get("finish_reason"):
+                result.finish_reason = choices[0]["finish_reason"]
+        if not choices:
+            return None
+        return (choices[0].get("delta") or {}).get("content")
+    except (AttributeError, KeyError, IndexError, TypeError):
+        return None
+
+
+class _EventLoopThread:
+    """A daemon thread running an event loop that sync code can submit work to."""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="llm-async-engine", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def stop(self) -> None:
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout=5)
+
+
+async def _anext(iterator):
+    return await iterator.__anext__()
+
+
+class AsyncLLMEngine:
+    def __init__(
+        self,
+        providers: Optional[ProviderRegistry] = None,
+        timeouts: Optional[ProviderTimeouts] = None,
+        request_deadline: float = 60.0,
+        max_connections_per_host: int = 100,
+        max_keepalive_per_host: int = 20,
+        keepalive_expiry: float = 30.0,
+        max_retries: int = 3,
+        backoff_factor: float = 0.3,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.providers = providers or ProviderRegistry.default()
+        self.timeouts = timeouts or ProviderTimeouts()
+        self.request_deadline = request_deadline
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._transport = transport
+
+        # Only touched from the event loop thread, so no locking is needed
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._loop_thread: Optional[_EventLoopThread] = None
+        self._loop_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Sync bridge
+    # ------------------------------------------------------------------
+
+    def _runner(self) -> _EventLoopThread:
+        if self._loop_thread is None:
+            with self._loop_lock:
+                if self._loop_thread is None:
+                    self._loop_thread = _EventLoopThread()
+        return self._loop_thread
+
+    def run(self, coro):
+        """Run a coroutine on the engine's event loop and wait for its result."""
+        return self._runner().run(coro)
+
+    def invoke(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Mapping[str, str]],
+        api_key: str,
+        deadline: Optional[Deadline] = None,
+    ) -> LLMResult:
+        return self.run(self.ainvoke(provider, model, messages, api_key, deadline))
+
+    def invoke_stream(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Mapping[str, str]],
+        api_key: str,
+        deadline: Optional[Deadline] = None,
+    ) -> Iterator[Union[str, LLMResult]]:
+        """Iterate an async provider stream from sync code, one chunk at a time."""
+        runner = self._runner()
+        stream = self.ainvoke_stream(provider, model, messages, api_key, deadline)
+        try:
+            while True:
+                try:
+                    chunk = runner.run(_anext(stream))
+                except StopAsyncIteration:
+                    return
+                yield chunk
+        finally:
+            runner.run(stream.aclose())
+
+    def close(self) -> None:
+        """Close pooled connections and stop the background loop."""
+        if self._loop_thread is None:
+            return
+        self._loop_thread.run(self.aclose())
+        self._loop_thread.stop()
+        self._loop_thread = None
+
+    # ------------------------------------------------------------------
+    # Async API
+    # ------------------------------------------------------------------
+
+    async def ainvoke(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Mapping[str, str]],
+        api_key: str,
+        deadline: Optional[Deadline] = None,
+    ) -> LLMResult:
+        adapter = self.providers.get(provider)
+        spec = adapter.build_request(model, messages, api_key, stream=False)
+        start = monotonic()
+        response = await self._send(spec, deadline or Deadline(self.request_deadline), False)
+        try:
+            await response.aread()
+        except httpx.TimeoutException as exc:
+            raise ProviderTimeoutError(f"{spec.label} API timed out") from exc
+        finally:
+            await response.aclose()
+        data = self._parse_json(response, spec.label)
+        return adapter.extract_result(data, latency=monotonic() - start)
+
+    async def ainvoke_stream(
+        self,
+        provider: str,
+        model: str,
+        messages: List[Mapping[str, str]],
+        api_key: str,
+        deadline: Optional[Deadline] = None,
+    ) -> AsyncIterator[Union[str, LLMResult]]:
+        """Stream response chunks; retries apply only until the first byte is read."""
+        spec = self.providers.get(provider).build_request(model, messages, api_key, stream=True)
+        start = monotonic()
+        response = await self._send(spec, deadline or Deadline(self.request_deadline), True)
+        try:
+            if not response.is_success:
+                await response.aread()
+                self._parse_json(response, spec.label)
+
+            result = LLMResult("")
+            parts = []
+            chunks = response.aiter_bytes()
+            async for data in aiter_sse_json(chunks, *STREAM_EVENT_FILTERS[spec.kind]):
+                text = extract_stream_delta(spec.kind, data, result)
+                if text:
+                    parts.append(text)
+                    yield text
+            result.text = "".join(parts)
+            result.latency = monotonic() - start
+            yield result
+        except httpx.ReadTimeout as exc:
+            raise stream_stalled(spec.label, self.timeouts.stream_idle) from exc
+        finally:
+            await response.aclose()
+
+    async def _send(
+        self, spec: ProviderRequest, deadline: Deadline, stream: bool
+    ) -> httpx.Response:
+        """Send ``spec`` until it gets a final response, within the deadline.
+
+        Failures to connect and ``RETRY_STATUSES`` responses are retried. Each
+        attempt's connect and read timeouts are capped by what is left of the
+        deadline, and a retry is only made if its backoff still fits. The body is
+        not read, so a stream's read timeout is the idle time between chunks.
+        """
+        client = self._client_for(spec.url)
+
+        attempt = 0
+        while True:
+            deadline.check(spec.label)
+            connect, read = self.timeouts.for_attempt(deadline, stream)
+            request = client.build_request(
+                "POST",
+                spec.url,
+                headers=spec.headers,
+                params=spec.params,
+                json=spec.payload,
+                timeout=httpx.Timeout(read, connect=connect),
+            )
+            delay = self.backoff_factor * (2**attempt)
+            can_retry = attempt < self.max_retries and deadline.allows(delay)
+            try:
+                response = await client.send(request, stream=True)
+            except httpx.TransportError as exc:
+                # Only resent if it never reached the provider, as in LLMService._post
+                connect_failed = isinstance(exc, (httpx.ConnectError, httpx.ConnectTimeout))
+                if not (connect_failed and can_retry):
+                    if (connect_failed and attempt < self.max_retries) or deadline.expired:
+                        # Stopped by the deadline rather than the retry limit
+                        raise deadline.exceeded(spec.label) from exc
+                    if isinstance(exc, httpx.TimeoutException):
+                        raise ProviderTimeoutError(f"{spec.label} API timed out") from exc
+                    raise AppError(f"{spec.label} API unreachable") from exc
+            else:
+                if response.status_code not in RETRY_STATUSES or not can_retry:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        clients, self._clients = self._clients, {}
+        for client in clients.values():
+            await client.aclose()
+
+    # ------------------------------------------------------------------
+    # HTTP helpers
+    # ------------------------------------------------------------------
+
+    def _client_for(self, url: str) -> httpx.AsyncClient:
+        host = urlsplit(url).netloc
+        client = self._clients.get(host)
+        if client is None:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeouts.read, connect=self.timeouts.connect),
+                limits=self.limits,
+                transport=self._transport,
+            )
+            self._clients[host] = client
+        return client
+
+    @staticmethod
+    def _parse_json(response: httpx.Response, provider_name: str) -> dict:
+        if response.is_success:
+            try:
+                return response.json()
+            except ValueError as exc:
+                raise AppError(f"Unable to parse {provider_name} response") from exc
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {"message": response.text}
+
+        raise AppError(
+            f"{provider_name} API error",
+            extra={"status_code": response.status_code, "payload": payload},
+        )
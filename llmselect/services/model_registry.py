@@ -6,7 +6,7 @@ up-to-date model information.
 """
 
 import os
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import requests
 from requests.adapters import HTTPAdapter
@@ -15,7 +15,6 @@ from urllib3.util.retry import Retry
 from ..extensions import cache
 from ..utils.errors import AppError
 
-
 # Static model definitions for providers
 OPENAI_MODELS = [
     # GPT-5 Series (2025)
@@ -284,6 +283,13 @@ MISTRAL_MODELS = [
     },
 ]
 
+STATIC_MODELS = {
+    "openai": OPENAI_MODELS,
+    "anthropic": ANTHROPIC_MODELS,
+    "gemini": GEMINI_MODELS,
+    "mistral": MISTRAL_MODELS,
+}
+
 
 class ModelRegistryService:
     """Service for managing LLM model registry with Flask-Caching integration."""
@@ -331,14 +337,41 @@ class ModelRegistryService:
         all_models = []
         for p in ["openai", "anthropic", "gemini", "mistral"]:
             all_models.extend(self._get_provider_models(p))
-        
+
         # Cache for 24 hours
         cache.set(cache_key, all_models, timeout=86400)
         return all_models
 
+    def get_model_limits(self, provider: str, model: str) -> Optional[Tuple[int, int]]:
+        """Get ``(contextWindow, maxTokens)`` of a model from the static definitions.
+
+        Never queries a provider API. Dated or suffixed ids (``gpt-4o-2024-08-06``)
+        match the longest known id they start with.
+
+        Args:
+            provider: Provider name (openai, anthropic, gemini, mistral)
+            model: Model ID
+
+        Returns:
+            The limits, or None for unknown models
+        """
+        best = None
+        for definition in STATIC_MODELS.get(provider, []):
+            model_id = definition["id"]
+            if model == model_id:
+                best = definition
+                break
+            if model.startswith(model_id + "-") and (
+                best is None or len(model_id) > len(best["id"])
+            ):
+                best = definition
+        if best is None:
+            return None
+        return best["contextWindow"], best["maxTokens"]
+
     def _get_provider_models(self, provider: str) -> List[Dict]:
         """Get models for a specific provider with caching.
-        
+
         Automatically attempts to verify models with environment API keys if available.
 
         Args:
@@ -356,7 +389,7 @@ class ModelRegistryService:
 
         # Check if we have an environment API key for verification
         env_api_key = self._get_env_api_key(provider)
-        
+
         # Get fresh data (with verification if API key available)
         if provider == "openai":
             static_models = OPENAI_MODELS.copy()
@@ -390,13 +423,13 @@ class ModelRegistryService:
         cache.set(cache_key, models, timeout=cache_timeout)
 
         return models
-    
+
     def _get_env_api_key(self, provider: str) -> Optional[str]:
         """Get API key from environment variables.
-        
+
         Args:
             provider: Provider name (openai, anthropic, gemini, mistral)
-            
+
         Returns:
             API key from environment or None if not found
         """
@@ -406,28 +439,28 @@ class ModelRegistryService:
             "gemini": ["GEMINI_API_KEY", "GOOGLE_API_KEY"],  # Try both
             "mistral": "MISTRAL_API_KEY",
         }
-        
+
         env_vars = env_var_map.get(provider)
         if not env_vars:
             return None
-        
+
         # Handle both single string and list of strings
         if isinstance(env_vars, str):
             env_vars = [env_vars]
-        
+
         for env_var in env_vars:
             key = os.environ.get(env_var)
             if key and key.strip():
                 return key.strip()
-        
+
         return None
 
     def _fetch_openai_models_from_api(self, api_key: str) -> List[str]:
         """Fetch available OpenAI models from the API.
-        
+
         Args:
             api_key: OpenAI API key
-            
+
         Returns:
             List of available model IDs
         """
@@ -439,7 +472,7 @@ class ModelRegistryService:
             )
             response.raise_for_status()
             data = response.json()
-            
+
             # Filter for chat models (gpt and o-series)
             models = [
                 m["id"]
@@ -452,10 +485,10 @@ class ModelRegistryService:
 
     def _fetch_gemini_models_from_api(self, api_key: str) -> List[str]:
         """Fetch available Gemini models from the API.
-        
+
         Args:
             api_key: Google API key
-            
+
         Returns:
             List of available model IDs
         """
@@ -466,7 +499,7 @@ class ModelRegistryService:
             )
             response.raise_for_status()
             data = response.json()
-            
+
             # Filter for generateContent models
             models = [
                 m["name"].replace("models/", "")
@@ -479,10 +512,10 @@ class ModelRegistryService:
 
     def _fetch_mistral_models_from_api(self, api_key: str) -> List[str]:
         """Fetch available Mistral models from the API.
-        
+
         Args:
             api_key: Mistral API key
-            
+
         Returns:
             List of available model IDs
         """
@@ -502,11 +535,11 @@ class ModelRegistryService:
         self, static_models: List[Dict], available_ids: List[str]
     ) -> List[Dict]:
         """Filter static model list to only include models available via API.
-        
+
         Args:
             static_models: Static list of model definitions
             available_ids: List of model IDs available from the API
-            
+
         Returns:
             Filtered list of model definitions
         """
@@ -528,24 +561,24 @@ class ModelRegistryService:
         self, provider: str, api_key: Optional[str] = None
     ) -> List[Dict]:
         """Get models for a provider with API verification.
-        
+
         This queries the provider's API to verify which models are actually available
         and filters the static list accordingly.
-        
+
         Args:
             provider: Provider name (openai, gemini, mistral)
             api_key: API key for the provider (optional, uses static list if not provided)
-            
+
         Returns:
             List of verified model dictionaries
         """
         cache_key = f"models_verified_{provider}"
-        
+
         # Try cache first
         cached = cache.get(cache_key)
         if cached is not None:
             return cached
-        
+
         # Get static models
         if provider == "openai":
             static_models = OPENAI_MODELS.copy()
@@ -573,12 +606,11 @@ class ModelRegistryService:
             models = ANTHROPIC_MODELS.copy()
         else:
             raise AppError(f"Unsupported provider: {provider}")
-        
+
         # Cache for 1 hour (shorter than static cache since we verified)
         cache.set(cache_key, models, timeout=3600)
-        
-        return models
 
+        return models
 
     def clear_cache(self, provider: Optional[str] = None):
         """Clear the model cache.
@@ -0,0 +1,230 @@
+"""App-wide bounded executor for provider calls.
+
+One pool of worker threads is shared by every comparison, so a request no
+longer pays for creating and tearing down its own ``ThreadPoolExecutor`` and the
+total number of in-flight provider calls is bounded across requests.
+
+Admission is two-level:
+
+- A global capacity (``max_workers`` running plus ``max_queue`` waiting) gives
+  back-pressure: ``submit`` blocks for up to ``queue_timeout`` seconds for a slot
+  and then raises ``ProviderBusyError`` instead of queueing without bound.
+- Per-provider caps keep one slow upstream from occupying every worker. Jobs over
+  their provider's cap wait in a per-provider FIFO and are handed to the pool as
+  that provider's calls finish, so they never hold a worker while waiting.
+
+Provider streams served by the ASGI entry point run as tasks on the event loop
+rather than as pool jobs. ``admit`` takes their slots from the same global
+capacity and per-provider counts as ``submit``, so threaded comparisons and
+streams share one set of limits; a stream over its provider's cap waits in the
+same FIFO and is woken when a slot is handed to it. Coroutines hold no worker
+thread, so ``max_workers`` itself does not apply to them.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from time import monotonic
+from typing import AsyncIterator, Callable, Deque, Dict, Mapping, Optional, Tuple
+
+from ..utils.errors import ProviderBusyError
+
+# A job whose callable is None is an ``admit`` caller waiting for its provider's cap
+_Job = Tuple[Future, str, Optional[Callable], tuple, dict, float]
+
+# How often ``admit`` retries the global capacity while the executor is full
+_ADMIT_POLL_INTERVAL = 0.01
+
+
+class ProviderExecutor:
+    def __init__(
+        self,
+        max_workers: int = 32,
+        max_queue: int = 128,
+        queue_timeout: float = 5.0,
+        provider_limits: Optional[Mapping[str, int]] = None,
+        default_provider_limit: Optional[int] = None,
+    ):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.provider_limits = dict(provider_limits or {})
+        self.default_provider_limit = default_provider_limit or max_workers
+
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="provider")
+        self._capacity = threading.BoundedSemaphore(max_workers + max_queue)
+        self._lock = threading.Lock()
+        self._running: Dict[str, int] = {}
+        self._waiting: Dict[str, Deque[_Job]] = {}
+        # Jobs admitted but not yet started, whether held per provider or in the pool queue
+        self._queued = 0
+        self._active = 0
+
+        self._submitted = 0
+        self._rejected = 0
+        self._started = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def limit_for(self, provider: str) -> int:
+        return self.provider_limits.get(provider, self.default_provider_limit)
+
+    def submit(self, provider: str, fn: Callable, *args, **kwargs) -> Future:
+        """Schedule ``fn(*args, **kwargs)`` as a call to ``provider``.
+
+        Raises:
+            ProviderBusyError: If no capacity frees up within ``queue_timeout``
+        """
+        if not self._capacity.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._rejected += 1
+            raise ProviderBusyError(
+                "Too many provider requests in progress. Please try again shortly.",
+                extra={"provider": provider},
+            )
+
+        future: Future = Future()
+        job = (future, provider, fn, args, kwargs, monotonic())
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            if self._running.get(provider, 0) < self.limit_for(provider):
+                self._running[provider] = self._running.get(provider, 0) + 1
+            else:
+                self._waiting.setdefault(provider, deque()).append(job)
+                return future
+        self._dispatch(job)
+        return future
+
+    @asynccontextmanager
+    async def admit(self, provider: str) -> AsyncIterator[None]:
+        """Hold a slot for a call to ``provider`` made by a task on the running event loop.
+
+        Raises:
+            ProviderBusyError: If no capacity frees up within ``queue_timeout``
+        """
+        enqueued_at = monotonic()
+        deadline = enqueued_at + self.queue_timeout
+        # Polled rather than waited on, so a full executor never blocks the loop
+        while not self._capacity.acquire(blocking=False):
+            if monotonic() >= deadline:
+                with self._lock:
+                    self._rejected += 1
+                raise ProviderBusyError(
+                    "Too many provider requests in progress. Please try again shortly.",
+                    extra={"provider": provider},
+                )
+            await asyncio.sleep(_ADMIT_POLL_INTERVAL)
+
+        slot: Optional[Future] = None
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            if self._running.get(provider, 0) < self.limit_for(provider):
+                self._running[provider] = self._running.get(provider, 0) + 1
+            else:
+                slot = Future()
+                self._waiting.setdefault(provider, deque()).append(
+                    (slot, provider, None, (), {}, enqueued_at)
+                )
+        if slot is not None:
+            try:
+                await asyncio.wrap_future(slot)
+            except BaseException:
+                with self._lock:
+                    self._queued -= 1
+                self._capacity.release()
+                # A slot handed over before the cancel landed is ours to pass on
+                if not slot.cancel():
+                    self._hand_off(provider)
+                raise
+
+        waited = monotonic() - enqueued_at
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._started += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        try:
+            yield
+        finally:
+            self._release(provider)
+
+    def stats(self) -> dict:
+        """Queue depth, concurrency and wait-time counters for monitoring."""
+        with self._lock:
+            started = self._started
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "running": self._active,
+                "queued": self._queued,
+                "queued_by_provider": {
+                    provider: len(jobs) for provider, jobs in self._waiting.items() if jobs
+                },
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "wait_ms": {
+                    "avg": (self._total_wait / started * 1000) if started else 0.0,
+                    "max": self._max_wait * 1000,
+                },
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            waiting = [job for jobs in self._waiting.values() for job in jobs]
+            self._waiting.clear()
+        for future, *_ in waiting:
+            future.cancel()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _dispatch(self, job: _Job) -> None:
+        future, provider, fn = job[:3]
+        if fn is None:
+            # An ``admit`` caller: wake it with the slot, unless it gave up waiting
+            if future.set_running_or_notify_cancel():
+                future.set_result(None)
+            else:
+                self._hand_off(provider)
+            return
+        self._pool.submit(self._run, job)
+
+    def _run(self, job: _Job) -> None:
+        future, provider, fn, args, kwargs, enqueued_at = job
+        waited = monotonic() - enqueued_at
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._started += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+        try:
+            # Skipped if the caller cancelled the future while it was queued
+            if future.set_running_or_notify_cancel():
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as exc:  # noqa: BLE001 - handed to the caller
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+        finally:
+            self._release(provider)
+
+    def _release(self, provider: str) -> None:
+        with self._lock:
+            self._active -= 1
+        self._capacity.release()
+        self._hand_off(provider)
+
+    def _hand_off(self, provider: str) -> None:
+        # A freed provider slot passes straight to the next waiting job
+        with self._lock:
+            waiting = self._waiting.get(provider)
+            next_job = waiting.popleft() if waiting else None
+            if next_job is None:
+                self._running[provider] -= 1
+        if next_job is not None:
+            self._dispatch(next_job)
@@ -0,0 +1,368 @@
+"""Provider adapters for LLMService.
+
+Each provider's wire format lives in one adapter. A call's request is built by
+the same code whether it streams or not, and both HTTP engines (requests and
+httpx) send what ``build_request`` returns. The parts of a request that only
+depend on the model (URL, static headers and query parameters, which max-token
+parameter to use) are computed once per model and cached on the adapter, so a
+call only adds the API key and the payload.
+
+Adapters are looked up by provider name in a ``ProviderRegistry``; a new
+provider plugs in by registering an adapter, without touching LLMService or the
+routes. Every built-in adapter can be given another ``base_url``, e.g. to send
+all calls to the mock provider server (``llmselect.mock_provider``).
+
+Adapters also read the token usage and finish reason a provider reports, so
+callers get an ``LLMResult`` rather than bare text.
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Mapping, NamedTuple, Optional, Tuple
+
+from ..utils.errors import AppError
+
+# LLMResult attributes reported alongside an answer's text
+USAGE_FIELDS = ("prompt_tokens", "completion_tokens", "finish_reason", "latency", "cached")
+
+# Bound on cached endpoints per adapter; model names come from request payloads
+_MAX_CACHED_ENDPOINTS = 256
+
+
+class ProviderRequest(NamedTuple):
+    """Everything needed to send one provider call."""
+
+    label: str
+    kind: str  # wire format: "openai" (also Mistral/Azure), "anthropic" or "gemini"
+    url: str
+    headers: Dict[str, str]
+    params: Dict[str, str]
+    payload: dict
+
+
+@dataclass
+class LLMResult:
+    """An answer with the usage the provider reported for it.
+
+    Counts are ``None`` when the provider did not report them, and always for
+    answers served from the response cache, which cost no provider tokens.
+    """
+
+    text: str
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    finish_reason: Optional[str] = None
+    # Seconds from sending the request to the end of the answer
+    latency: Optional[float] = None
+    cached: bool = False
+
+    @property
+    def total_tokens(self) -> Optional[int]:
+        if self.prompt_tokens is None or self.completion_tokens is None:
+            return None
+        return self.prompt_tokens + self.completion_tokens
+
+    def usage(self) -> dict:
+        return {name: getattr(self, name) for name in USAGE_FIELDS}
+
+
+class Endpoint(NamedTuple):
+    """The per-model, call-independent part of a provider request."""
+
+    url: str
+    headers: Dict[str, str]
+    params: Dict[str, str]
+    token_param: str
+
+
+class ProviderAdapter:
+    name = ""
+    label = ""
+    kind = "openai"
+
+    # Capability flags
+    supports_streaming = True
+    supports_system_prompt = True
+    requires_api_key = True
+    # Whether streaming is requested with ``"stream": true`` in the payload
+    stream_flag = True
+    # Sent with streaming requests to have the final event report usage
+    stream_options: Optional[dict] = None
+    # Root of the provider's public API
+    base_url = ""
+
+    def __init__(self, max_tokens: int = 1000, base_url: Optional[str] = None):
+        self.max_tokens = max_tokens
+        if base_url:
+            self.base_url = base_url.rstrip("/")
+        self._endpoints: Dict[Tuple[str, bool], Endpoint] = {}
+
+    @property
+    def capabilities(self) -> dict:
+        return {
+            "streaming": self.supports_streaming,
+            "system_prompt": self.supports_system_prompt,
+            "requires_api_key": self.requires_api_key,
+        }
+
+    def build_request(
+        self, model: str, messages: List[Mapping[str, str]], api_key: str, stream: bool
+    ) -> ProviderRequest:
+        key = (model, stream)
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = self.endpoint(model, stream)
+            if len(self._endpoints) >= _MAX_CACHED_ENDPOINTS:
+                self._endpoints.clear()
+            self._endpoints[key] = endpoint
+        headers, params = self.authenticate(endpoint, api_key)
+        payload = self.payload(endpoint, model, messages)
+        if stream and self.stream_flag:
+            payload["stream"] = True
+            if self.stream_options:
+                payload["stream_options"] = self.stream_options
+        return ProviderRequest(self.label, self.kind, endpoint.url, headers, params, payload)
+
+    def endpoint(self, model: str, stream: bool) -> Endpoint:
+        """Build the cacheable part of a request for ``model``."""
+        raise NotImplementedError
+
+    def authenticate(self, endpoint: Endpoint, api_key: str) -> Tuple[dict, dict]:
+        """Return the headers and query parameters of a call made with ``api_key``."""
+        return {**endpoint.headers, "Authorization": f"Bearer {api_key}"}, endpoint.params
+
+    def payload(self, endpoint: Endpoint, model: str, messages: List[Mapping[str, str]]) -> dict:
+        return {"model": model, "messages": messages, endpoint.token_param: self.max_tokens}
+
+    def extract_text(self, data: dict) -> str:
+        """Return the answer text of a non-streaming response body."""
+        try:
+            return self._text(data)
+        except (KeyError, IndexError, TypeError) as exc:
+            raise AppError(f"Malformed response from {self.label}") from exc
+
+    def extract_result(self, data: dict, latency: Optional[float] = None) -> LLMResult:
+        """Return the answer of a non-streaming response body with its usage."""
+        text = self.extract_text(data)
+        try:
+            prompt_tokens, completion_tokens, finish_reason = self._usage(data)
+        except (AttributeError, KeyError, IndexError, TypeError):
+            prompt_tokens = completion_tokens = finish_reason = None
+        return LLMResult(text, prompt_tokens, completion_tokens, finish_reason, latency)
+
+    @staticmethod
+    def _text(data: dict) -> str:
+        return data["choices"][0]["message"]["content"]
+
+    @staticmethod
+    def _usage(data: dict) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+        usage = data.get("usage") or {}
+        return (
+            usage.get("prompt_tokens"),
+            usage.get("completion_tokens"),
+            data["choices"][0].get("finish_reason"),
+        )
+
+
+class OpenAIAdapter(ProviderAdapter):
+    name = "openai"
+    label = "OpenAI"
+    base_url = "https://api.openai.com"
+    stream_options = {"include_usage": True}
+
+    def endpoint(self, model: str, stream: bool) -> Endpoint:
+        # GPT-5+ models use max_completion_tokens, older models use max_tokens
+        token_param = (
+            "max_completion_tokens" if model.startswith(("gpt-5", "o3", "o4")) else "max_tokens"
+        )
+        url = f"{self.base_url}/v1/chat/completions"
+        return Endpoint(url, {"Content-Type": "application/json"}, {}, token_param)
+
+
+class MistralAdapter(OpenAIAdapter):
+    name = "mistral"
+    label = "Mistral"
+    base_url = "https://api.mistral.ai"
+    # Mistral reports usage on its last stream event unasked
+    stream_options = None
+
+    def endpoint(self, model: str, stream: bool) -> Endpoint:
+        url = f"{self.base_url}/v1/chat/completions"
+        return Endpoint(url, {"Content-Type": "application/json"}, {}, "max_tokens")
+
+
+class AnthropicAdapter(ProviderAdapter):
+    name = "anthropic"
+    label = "Anthropic"
+    kind = "anthropic"
+    base_url = "https://api.anthropic.com"
+
+    def endpoint(self, model: str, stream: bool) -> Endpoint:
+        headers = {"Content-Type": "application/json", "anthropic-version": "2023-06-01"}
+        return Endpoint(f"{self.base_url}/v1/messages", headers, {}, "max_tokens")
+
+    def authenticate(self, endpoint: Endpoint, api_key: str) -> Tuple[dict, dict]:
+        return {**endpoint.headers, "x-api-key": api_key}, endpoint.params
+
+    def payload(self, endpoint: Endpoint, model: str, messages: List[Mapping[str, str]]) -> dict:
+        system_message = next((m for m in messages if m["role"] == "system"), None)
+        payload = {
+            "model": model,
+            "max_tokens": self.max_tokens,
+            "messages": [m for m in messages if m["role"] != "system"],
+        }
+        if system_message:
+            payload["system"] = system_message["content"]
+        return payload
+
+    @staticmethod
+    def _text(data: dict) -> str:
+        return data["content"][0]["text"]
+
+    @staticmethod
+    def _usage(data: dict) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+        usage = data.get("usage") or {}
+        return usage.get("input_tokens"), usage.get("output_tokens"), data.get("stop_reason")
+
+
+class GeminiAdapter(ProviderAdapter):
+    name = "gemini"
+    label = "Gemini"
+    kind = "gemini"
+    base_url = "https://generativelanguage.googleapis.com"
+    # System messages are dropped rather than mapped to ``systemInstruction``
+    supports_system_prompt = False
+    # Streaming is selected by the URL rather than a payload flag
+    stream_flag = False
+
+    def endpoint(self, model: str, stream: bool) -> Endpoint:
+        method = "streamGenerateContent" if stream else "generateContent"
+        url = f"{self.base_url}/v1beta/models/{model}:{method}"
+        params = {"alt": "sse"} if stream else {}
+        # No output cap is sent: on thinking models it would also cut reasoning tokens
+        return Endpoint(url, {"Content-Type": "application/json"}, params, "")
+
+    def authenticate(self, endpoint: Endpoint, api_key: str) -> Tuple[dict, dict]:
+        return endpoint.headers, {**endpoint.params, "key": api_key}
+
+    def payload(self, endpoint: Endpoint, model: str, messages: List[Mapping[str, str]]) -> dict:
+        contents = [
+            {
+                "role": "model" if m["role"] == "assistant" else "user",
+                "parts": [{"text": m["content"]}],
+            }
+            for m in messages
+            if m["role"] != "system"
+        ]
+        return {"contents": contents}
+
+    @staticmethod
+    def _text(data: dict) -> str:
+        return data["candidates"][0]["content"]["parts"][0]["text"]
+
+    @staticmethod
+    def _usage(data: dict) -> Tuple[Optional[int], Optional[int], Optional[str]]:
+        usage = data.get("usageMetadata") or {}
+        return (
+            usage.get("promptTokenCount"),
+            usage.get("candidatesTokenCount"),
+            data["candidates"][0].get("finishReason"),
+        )
+
+
+class AzureFoundryAdapter(ProviderAdapter):
+    """Azure AI Foundry's OpenAI-compatible endpoint, serving one provider's models.
+
+    The deployment comes from the model name and the key is the app's Azure key,
+    so the whole endpoint, auth included, is precomputed per model.
+    """
+
+    requires_api_key = False
+
+    def __init__(
+        self,
+        provider: str,
+        endpoint: str,
+        api_key: str,
+        api_version: str,
+        deployment_mappings: Mapping[str, str],
+        max_tokens: int = 1000,
+    ):
+        super().__init__(max_tokens)
+        self.name = provider
+        self.label = f"Azure AI Foundry ({provider})"
+        self.azure_endpoint = endpoint
+        self.azure_api_key = api_key
+        self.api_version = api_version
+        self.deployment_mappings = deployment_mappings
+
+    def endpoint(self, model: str, stream: bool) -> Endpoint:
+        deployment_name = self.deployment_mappings.get(model)
+        if not deployment_name:
+            raise AppError(
+                f"No Azure deployment mapping found for model '{model}'. "
+                f"Please configure the deployment in your environment variables."
+            )
+        return Endpoint(
+            f"{self.azure_endpoint}/openai/deployments/{deployment_name}/chat/completions",
+            {"api-key": self.azure_api_key, "Content-Type": "application/json"},
+            {"api-version": self.api_version},
+            "max_tokens",
+        )
+
+    def authenticate(self, endpoint: Endpoint, api_key: str) -> Tuple[dict, dict]:
+        return endpoint.headers, endpoint.params
+
+    def payload(self, endpoint: Endpoint, model: str, messages: List[Mapping[str, str]]) -> dict:
+        return {"messages": messages, "max_tokens": self.max_tokens}
+
+
+DEFAULT_ADAPTERS = (OpenAIAdapter, AnthropicAdapter, GeminiAdapter, MistralAdapter)
+
+
+class ProviderRegistry:
+    def __init__(self, adapters: Optional[List[ProviderAdapter]] = None):
+        self._adapters: Dict[str, ProviderAdapter] = {}
+        for adapter in adapters or ():
+            self.register(adapter)
+
+    @classmethod
+    def default(
+        cls,
+        max_tokens: int = 1000,
+        azure_endpoint: Optional[str] = None,
+        azure_api_key: Optional[str] = None,
+        azure_api_version: Optional[str] = None,
+        azure_deployment_mappings: Optional[Mapping[str, str]] = None,
+        base_url: Optional[str] = None,
+    ) -> "ProviderRegistry":
+        """The built-in providers, all routed through Azure AI Foundry when it is configured.
+
+        ``base_url`` replaces every provider's API root (or the Azure endpoint).
+        """
+        if azure_endpoint and azure_api_key:
+            return cls(
+                [
+                    AzureFoundryAdapter(
+                        adapter.name,
+                        (base_url or azure_endpoint).rstrip("/"),
+                        azure_api_key,
+                        azure_api_version or "2024-02-15-preview",
+                        azure_deployment_mappings or {},
+                        max_tokens=max_tokens,
+                    )
+                    for adapter in DEFAULT_ADAPTERS
+                ]
+            )
+        return cls([adapter(max_tokens, base_url) for adapter in DEFAULT_ADAPTERS])
+
+    def register(self, adapter: ProviderAdapter) -> None:
+        self._adapters[adapter.name] = adapter
+
+    def get(self, provider: str) -> ProviderAdapter:
+        adapter = self._adapters.get(provider)
+        if adapter is None:
+            raise AppError(f"Unsupported provider '{provider}'")
+        return adapter
+
+    def capabilities(self) -> Dict[str, dict]:
+        return {name: adapter.capabilities for name, adapter in self._adapters.items()}
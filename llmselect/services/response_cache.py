@@ -0,0 +1,144 @@
+"""Exact-match cache for LLM responses.
+
+Entries are keyed on a SHA-256 of the canonical JSON of provider, model,
+sanitized messages and generation parameters, so only byte-identical requests
+hit. The API key is deliberately not part of the key: identical prompts to the
+same model share one answer regardless of whose key paid for it.
+"""
+
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Iterator, List, Mapping, Optional
+
+BACKENDS = ("memory", "flask")
+
+# Characters per chunk when a cached answer is replayed to a streaming caller
+REPLAY_CHUNK_CHARS = 64
+
+
+def response_cache_key(
+    provider: str, model: str, messages: List[Mapping[str, str]], params: Mapping
+) -> str:
+    canonical = json.dumps(
+        {"provider": provider, "model": model, "messages": messages, "params": params},
+        sort_keys=True,
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class MemoryCacheBackend:
+    """In-process LRU with per-entry expiry; safe to share between threads."""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        with self._lock:
+            self._entries[key] = (value, monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class FlaskCacheBackend:
+    """Store entries in the app's Flask-Caching backend, shared across workers.
+
+    Takes the underlying cachelib backend rather than the ``Cache`` extension so it
+    works from provider pool threads that have no application context. Size bound
+    and eviction are those of the configured cache (``CACHE_THRESHOLD``).
+    """
+
+    prefix = "llm-response:"
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def get(self, key: str) -> Optional[str]:
+        return self._backend.get(self.prefix + key)
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._backend.set(self.prefix + key, value, timeout=int(ttl))
+
+    def clear(self) -> None:
+        # Entries share the store with other caches; let them expire instead
+        pass
+
+
+class ResponseCache:
+    def __init__(self, backend, ttl: float = 3600, max_response_chars: int = 100_000):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_response_chars = max_response_chars
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.backend.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key: str, value: str) -> None:
+        if not value or len(value) > self.max_response_chars:
+            return
+        self.backend.set(key, value, self.ttl)
+        with self._lock:
+            self.stores += 1
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    @staticmethod
+    def replay(text: str) -> Iterator[str]:
+        for start in range(0, len(text), REPLAY_CHUNK_CHARS):
+            yield text[start : start + REPLAY_CHUNK_CHARS]
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            stats = {
+                "backend": type(self.backend).__name__,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+        if isinstance(self.backend, MemoryCacheBackend):
+            stats["entries"] = len(self.backend)
+            stats["max_entries"] = self.backend.max_entries
+            stats["evictions"] = self.backend.evictions
+        return stats
@@ -0,0 +1,233 @@
+"""Full-text search over message bodies.
+
+The index lives in a ``message_search`` table keyed by message id:
+
+- SQLite: an FTS5 virtual table (porter stemming) whose rowid is the message id,
+  ranked with ``bm25`` and highlighted with ``snippet``
+- PostgreSQL: a ``tsvector`` column with a GIN index, ranked with ``ts_rank_cd``
+  and highlighted with ``ts_headline``
+
+Other databases fall back to an unindexed ``LIKE`` scan. Rows are written by
+``ConversationService.append_message`` in the message's own transaction, and the
+table is created and dropped together with ``messages``. Databases that predate
+the index get it created and backfilled by ``ensure_index`` at startup.
+"""
+
+import html
+import re
+from typing import List, Optional, Tuple
+
+from sqlalchemy import event, inspect, text
+
+from ..extensions import db
+from ..models import Message
+
+SEARCH_TABLE = "message_search"
+TS_CONFIG = "english"
+SNIPPET_WORDS = 16
+
+# Private-use code points mark highlights until the snippet has been HTML escaped
+_MARK_START = "\ue000"
+_MARK_END = "\ue001"
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+_DDL = {
+    "sqlite": [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} "
+        "USING fts5(content, tokenize='porter unicode61')",
+    ],
+    "postgresql": [
+        f"CREATE TABLE IF NOT EXISTS {SEARCH_TABLE} ("
+        "message_id INTEGER PRIMARY KEY REFERENCES messages(id) ON DELETE CASCADE, "
+        "document TSVECTOR NOT NULL)",
+        f"CREATE INDEX IF NOT EXISTS idx_message_search_document "
+        f"ON {SEARCH_TABLE} USING GIN (document)",
+    ],
+}
+
+_BACKFILL = {
+    "sqlite": f"INSERT INTO {SEARCH_TABLE} (rowid, content) SELECT id, content FROM messages",
+    "postgresql": (
+        f"INSERT INTO {SEARCH_TABLE} (message_id, document) "
+        f"SELECT id, to_tsvector('{TS_CONFIG}', content) FROM messages"
+    ),
+}
+
+_INSERT = {
+    "sqlite": f"INSERT INTO {SEARCH_TABLE} (rowid, content) VALUES (:id, :content)",
+    "postgresql": (
+        f"INSERT INTO {SEARCH_TABLE} (message_id, document) "
+        f"VALUES (:id, to_tsvector('{TS_CONFIG}', :content))"
+    ),
+}
+
+_DELETE_CONVERSATION = {
+    "sqlite": (
+        f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN "
+        "(SELECT id FROM messages WHERE conversation_id = :conversation_id)"
+    ),
+    "postgresql": (
+        f"DELETE FROM {SEARCH_TABLE} WHERE message_id IN "
+        "(SELECT id FROM messages WHERE conversation_id = :conversation_id)"
+    ),
+}
+
+_RESULT_COLUMNS = (
+    "m.id AS message_id, m.role, m.created_at, c.id AS conversation_id, "
+    "c.title, c.provider, c.model"
+)
+
+_SEARCH = {
+    "sqlite": (
+        f"SELECT {_RESULT_COLUMNS}, "
+        f"snippet({SEARCH_TABLE}, 0, :mark_start, :mark_end, '…', {SNIPPET_WORDS}) AS snippet, "
+        f"-bm25({SEARCH_TABLE}) AS score "
+        f"FROM {SEARCH_TABLE} "
+        f"JOIN messages m ON m.id = {SEARCH_TABLE}.rowid "
+        "JOIN conversations c ON c.id = m.conversation_id "
+        f"WHERE {SEARCH_TABLE} MATCH :query AND c.user_id = :user_id "
+        "ORDER BY score DESC, m.created_at DESC "
+        "LIMIT :limit OFFSET :offset"
+    ),
+    "postgresql": (
+        f"SELECT {_RESULT_COLUMNS}, "
+        f"ts_headline('{TS_CONFIG}', m.content, q.query, "
+        f"'StartSel=' || :mark_start || ', StopSel=' || :mark_end || "
+        f"', MaxWords={SNIPPET_WORDS}, MinWords=6') AS snippet, "
+        "ts_rank_cd(s.document, q.query) AS score "
+        f"FROM {SEARCH_TABLE} s "
+        f"CROSS JOIN websearch_to_tsquery('{TS_CONFIG}', :query) AS q(query) "
+        "JOIN messages m ON m.id = s.message_id "
+        "JOIN conversations c ON c.id = m.conversation_id "
+        "WHERE s.document @@ q.query AND c.user_id = :user_id "
+        "ORDER BY score DESC, m.created_at DESC "
+        "LIMIT :limit OFFSET :offset"
+    ),
+}
+
+_LIKE_SEARCH = (
+    f"SELECT {_RESULT_COLUMNS}, m.content AS snippet, 0.0 AS score "
+    "FROM messages m JOIN conversations c ON c.id = m.conversation_id "
+    "WHERE c.user_id = :user_id AND LOWER(m.content) LIKE :pattern "
+    "ORDER BY m.created_at DESC "
+    "LIMIT :limit OFFSET :offset"
+)
+
+
+def _dialect(bind) -> str:
+    return bind.dialect.name
+
+
+@event.listens_for(Message.__table__, "after_create")
+def _create_search_index(target, connection, **kw):
+    for statement in _DDL.get(_dialect(connection), []):
+        connection.execute(text(statement))
+
+
+@event.listens_for(Message.__table__, "before_drop")
+def _drop_search_index(target, connection, **kw):
+    if _dialect(connection) in _DDL:
+        connection.execute(text(f"DROP TABLE IF EXISTS {SEARCH_TABLE}"))
+
+
+def fts5_query(query: str) -> Optional[str]:
+    """Turn free text into an FTS5 expression: all words must match, the last as a prefix.
+
+    Quoting every word keeps FTS5 operators and punctuation in user input from
+    being parsed as query syntax. ``None`` when the text has no words.
+    """
+    words = _WORD.findall(query)
+    if not words:
+        return None
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def _highlight(snippet: str) -> str:
+    return html.escape(snippet).replace(_MARK_START, "<mark>").replace(_MARK_END, "</mark>")
+
+
+def _like_snippet(content: str, words: List[str]) -> str:
+    """Cut a window around the first matched word and mark every match."""
+    lowered = content.lower()
+    first = min((lowered.find(word) for word in words if word in lowered), default=0)
+    start = max(0, first - 60)
+    window = content[start : start + 200]
+    pattern = re.compile("|".join(re.escape(word) for word in words), re.IGNORECASE)
+    marked = pattern.sub(lambda match: f"{_MARK_START}{match.group(0)}{_MARK_END}", window)
+    return ("…" if start else "") + marked + ("…" if start + 200 < len(content) else "")
+
+
+class SearchService:
+    def ensure_index(self) -> None:
+        """Create and backfill the index on databases created before it existed."""
+        bind = db.engine
+        dialect = _dialect(bind)
+        if dialect not in _DDL or inspect(bind).has_table(SEARCH_TABLE):
+            return
+        with bind.begin() as connection:
+            for statement in _DDL[dialect]:
+                connection.execute(text(statement))
+            connection.execute(text(_BACKFILL[dialect]))
+
+    def index_message(self, message: Message) -> None:
+        """Add a flushed message to the index inside the caller's transaction."""
+        statement = _INSERT.get(_dialect(db.session.get_bind()))
+        if statement is not None:
+            db.session.execute(text(statement), {"id": message.id, "content": message.content})
+
+    def remove_conversation(self, conversation_id: str) -> None:
+        """Drop a conversation's messages from the index; call before deleting them."""
+        statement = _DELETE_CONVERSATION.get(_dialect(db.session.get_bind()))
+        if statement is not None:
+            db.session.execute(text(statement), {"conversation_id": conversation_id})
+
+    def search(
+        self, user_id: int, query: str, limit: int = 20, offset: int = 0
+    ) -> Tuple[List[dict], bool]:
+        """Rank the user's messages matching ``query``; returns one page and whether more follow.
+
+        Snippets are HTML escaped with matches wrapped in ``<mark>``.
+        """
+        dialect = _dialect(db.session.get_bind())
+        params = {"user_id": user_id, "limit": limit + 1, "offset": offset}
+        words = [word.lower() for word in _WORD.findall(query)]
+        if not words:
+            return [], False
+
+        if dialect == "sqlite":
+            statement = _SEARCH[dialect]
+            params.update(query=fts5_query(query), mark_start=_MARK_START, mark_end=_MARK_END)
+        elif dialect in _SEARCH:
+            statement = _SEARCH[dialect]
+            params.update(query=query, mark_start=_MARK_START, mark_end=_MARK_END)
+        else:
+            statement = _LIKE_SEARCH
+            params["pattern"] = f"%{words[0]}%"
+
+        rows = db.session.execute(text(statement), params).mappings().all()
+        results = [
+            {
+                "conversationId": row["conversation_id"],
+                "conversationTitle": row["title"] or f"{row['provider']} - {row['model']}",
+                "provider": row["provider"],
+                "model": row["model"],
+                "messageId": row["message_id"],
+                "role": row["role"],
+                "snippet": _highlight(
+                    row["snippet"]
+                    if statement is not _LIKE_SEARCH
+                    else _like_snippet(row["snippet"], words)
+                ),
+                "score": round(float(row["score"]), 4),
+                "createdAt": _isoformat(row["created_at"]),
+            }
+            for row in rows[:limit]
+        ]
+        return results, len(rows) > limit
+
+
+def _isoformat(value) -> str:
+    # Raw SQL on SQLite returns DATETIME columns as strings
+    if isinstance(value, str):
+        return value.replace(" ", "T") + "Z"
+    return value.isoformat() + "Z"
@@ -0,0 +1,266 @@
+"""Single-flight coalescing of identical in-flight LLM calls.
+
+While a call for a key is in progress, further callers with the same key attach
+to it instead of going upstream again. Blocking calls share the result (or the
+exception). Streams share a chunk buffer: a subscriber that joins late first
+gets the chunks already received replayed, then follows live. Whichever
+subscriber needs the next chunk pulls it from upstream, so the stream keeps going
+for everyone else if the first caller disconnects; it is closed once the last
+subscriber leaves.
+
+``ado`` and ``astream`` do the same for coroutines on an event loop. The upstream
+call runs in its own task, so a caller that is cancelled (a client disconnecting)
+never cancels it for the others; an abandoned stream is still closed once its
+last subscriber leaves. Blocking and async callers of one key do not share a call.
+
+Entries are dropped as soon as a call finishes, so this never serves stale
+results; pair it with ``ResponseCache`` for that.
+"""
+
+import asyncio
+import threading
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class _SharedStream:
+    def __init__(self, upstream: Iterator[str]):
+        self.upstream = upstream
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.pulling = False
+        self.subscribers = 0
+        self.cond = threading.Condition()
+
+
+class _AsyncSharedStream:
+    def __init__(self, upstream: AsyncIterator[str]):
+        self.upstream = upstream
+        self.chunks: List[str] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        # The task reading the next chunk from upstream, if one is in progress
+        self.pull: Optional[asyncio.Task] = None
+        self.subscribers = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _SharedStream] = {}
+        self._async_calls: Dict[str, asyncio.Task] = {}
+        self._async_streams: Dict[str, _AsyncSharedStream] = {}
+        self.upstream_calls = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], str]) -> str:
+        """Return ``fn()``, sharing one execution among concurrent callers of ``key``."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                leader = True
+                self.upstream_calls += 1
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stream(self, key: str, factory: Callable[[], Iterator[str]]) -> Iterator[str]:
+        """Iterate ``factory()``, sharing one upstream stream among subscribers of ``key``."""
+        with self._lock:
+            shared = self._streams.get(key)
+            if shared is None:
+                shared = self._streams[key] = _SharedStream(factory())
+                self.upstream_calls += 1
+            else:
+                self.coalesced += 1
+            with shared.cond:
+                shared.subscribers += 1
+        return self._subscribe(key, shared)
+
+    async def ado(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        """Async ``do``: await ``fn()``, sharing one task among concurrent callers of ``key``."""
+        with self._lock:
+            task = self._async_calls.get(key)
+            if task is None:
+                task = self._async_calls[key] = asyncio.ensure_future(self._arun(key, fn))
+                self.upstream_calls += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def astream(self, key: str, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """Async ``stream``: iterate ``factory()``, sharing it among subscribers of ``key``."""
+        with self._lock:
+            shared = self._async_streams.get(key)
+            if shared is None:
+                shared = self._async_streams[key] = _AsyncSharedStream(factory())
+                self.upstream_calls += 1
+            else:
+                self.coalesced += 1
+            shared.subscribers += 1
+        return self._asubscribe(key, shared)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "upstream_calls": self.upstream_calls,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._calls)
+                + len(self._streams)
+                + len(self._async_calls)
+                + len(self._async_streams),
+            }
+
+    def _subscribe(self, key: str, shared: _SharedStream) -> Iterator[str]:
+        index = 0
+        try:
+            while True:
+                chunk = self._next_chunk(key, shared, index)
+                if chunk is None:
+                    return
+                index += 1
+                yield chunk
+        finally:
+            self._unsubscribe(key, shared)
+
+    def _next_chunk(self, key: str, shared: _SharedStream, index: int) -> Optional[str]:
+        cond = shared.cond
+        with cond:
+            while True:
+                if index < len(shared.chunks):
+                    return shared.chunks[index]
+                if shared.error is not None:
+                    raise shared.error
+                if shared.finished:
+                    return None
+                if not shared.pulling:
+                    shared.pulling = True
+                    break
+                cond.wait()
+
+        # This subscriber pulls the next chunk for everyone
+        try:
+            chunk = next(shared.upstream)
+        except StopIteration:
+            self._finish(key, shared)
+            return None
+        except BaseException as exc:
+            self._finish(key, shared, exc)
+            raise
+        with cond:
+            shared.chunks.append(chunk)
+            shared.pulling = False
+            cond.notify_all()
+        return chunk
+
+    def _finish(self, key: str, shared: _SharedStream, error=None) -> None:
+        with self._lock:
+            if self._streams.get(key) is shared:
+                del self._streams[key]
+        with shared.cond:
+            shared.finished = True
+            shared.error = error
+            shared.pulling = False
+            shared.cond.notify_all()
+
+    def _unsubscribe(self, key: str, shared: _SharedStream) -> None:
+        # Held across the check and the removal so nobody joins an abandoned stream
+        with self._lock:
+            with shared.cond:
+                shared.subscribers -= 1
+                abandoned = shared.subscribers == 0 and not shared.finished
+                if abandoned:
+                    shared.finished = True
+            if abandoned and self._streams.get(key) is shared:
+                del self._streams[key]
+        if abandoned:
+            # Last subscriber left mid-stream: stop the upstream call
+            shared.upstream.close()
+
+    async def _arun(self, key: str, fn: Callable[[], Awaitable[str]]) -> str:
+        try:
+            return await fn()
+        finally:
+            with self._lock:
+                del self._async_calls[key]
+
+    async def _asubscribe(self, key: str, shared: _AsyncSharedStream) -> AsyncIterator[str]:
+        index = 0
+        try:
+            while True:
+                if index < len(shared.chunks):
+                    yield shared.chunks[index]
+                    index += 1
+                    continue
+                if shared.error is not None:
+                    raise shared.error
+                if shared.finished:
+                    return
+                if shared.pull is None:
+                    # This subscriber starts the next read for everyone
+                    shared.pull = asyncio.ensure_future(self._apull(key, shared))
+                await asyncio.shield(shared.pull)
+        finally:
+            await self._aunsubscribe(key, shared)
+
+    async def _apull(self, key: str, shared: _AsyncSharedStream) -> None:
+        try:
+            chunk = await shared.upstream.__anext__()
+        except StopAsyncIteration:
+            self._afinish(key, shared)
+        except BaseException as exc:  # noqa: BLE001 - raised to every subscriber
+            self._afinish(key, shared, exc)
+        else:
+            shared.chunks.append(chunk)
+        finally:
+            shared.pull = None
+
+    def _afinish(self, key: str, shared: _AsyncSharedStream, error=None) -> None:
+        with self._lock:
+            if self._async_streams.get(key) is shared:
+                del self._async_streams[key]
+        shared.finished = True
+        shared.error = error
+
+    async def _aunsubscribe(self, key: str, shared: _AsyncSharedStream) -> None:
+        with self._lock:
+            shared.subscribers -= 1
+            abandoned = shared.subscribers == 0 and not shared.finished
+            if abandoned:
+                shared.finished = True
+                if self._async_streams.get(key) is shared:
+                    del self._async_streams[key]
+        if abandoned:
+            # Last subscriber left mid-stream: stop the upstream call
+            if shared.pull is not None:
+                shared.pull.cancel()
+            else:
+                await shared.upstream.aclose()
@@ -0,0 +1,238 @@
+"""Incremental Server-Sent Events decoder shared by all provider streams.
+
+The decoder works on raw byte chunks exactly as they arrive from the socket:
+frames may be split anywhere, including in the middle of a line or a ``\\r\\n``.
+Complete frames are cut out with C-level ``bytes.split`` and the common single-line
+``data:`` frame is sliced out directly, so the Python-level work is per event
+rather than per line or per byte. ``feed_json`` drops comment and keep-alive
+frames without parsing them, and, for formats that name their events (Anthropic),
+events of uninteresting types such as pings with a substring check before paying
+for a JSON parse. OpenAI and Gemini events all carry content, usage or the finish
+reason, so each of their data events is parsed. A payload must be exactly one JSON
+value: trailing data after it drops the event.
+"""
+
+import json
+from typing import (
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+)
+
+DONE = b"[DONE]"
+
+_DATA_SP = b"data: "
+_EVENT_SP = b"event: "
+# The C scanner behind json.loads, minus its encoding detection and whitespace regexes
+_scan_json = json.JSONDecoder().scan_once
+
+
+class SSEEvent(NamedTuple):
+    event: Optional[str]
+    data: bytes
+    id: Optional[str]
+
+
+class SSEDecoder:
+    """Turn a byte stream into ``SSEEvent`` tuples, one ``feed`` call per network chunk.
+
+    Supports multi-line ``data:`` fields, ``event:``/``id:`` fields, comments and
+    ``\\n`` or ``\\r\\n`` line endings.
+    """
+
+    __slots__ = ("_pending", "_last_id")
+
+    def __init__(self):
+        self._pending = b""
+        self._last_id: Optional[str] = None
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        events = []
+        for frame in self._frames(chunk):
+            event = self._parse_frame(frame)
+            if event is not None:
+                events.append(event)
+        return events
+
+    def feed_json(
+        self,
+        chunk: bytes,
+        marker: Optional[bytes] = None,
+        event_types: Optional[frozenset] = None,
+    ) -> Tuple[List[dict], bool]:
+        """Parse the events completed by ``chunk`` that may carry content.
+
+        Frames whose ``event:`` type is not in ``event_types`` or that lack
+        ``marker`` are dropped with substring checks, without building an event or
+        parsing JSON. Returns the parsed payloads and whether the ``[DONE]``
+        sentinel was reached.
+        """
+        payloads = []
+        if (
+            b"\n\n" not in chunk
+            and b"\n\r\n" not in chunk
+            and not self._pending.endswith((b"\n", b"\r"))
+        ):
+            # Mid-frame chunk: nothing can complete, so skip the split machinery
+            self._pending += chunk
+            return payloads, False
+        for frame in self._frames(chunk):
+            if frame.startswith(_DATA_SP) and b"\n" not in frame:
+                # Fast path: the usual single "data: {...}" frame
+                data = frame[6:]
+                event_type = None
+            elif frame.startswith(_EVENT_SP) and frame.count(b"\n") == 1 and b"\ndata: " in frame:
+                # Anthropic's "event: <type>\ndata: {...}" pair
+                head, _, data = frame.partition(b"\n")
+                if marker is not None and marker not in data:
+                    continue
+                data = data[6:]
+                event_type = head[7:].decode("utf-8") if event_types is not None else None
+            else:
+                if (
+                    marker is not None
+                    and marker not in frame
+                    and DONE not in frame
+                    and b"id:" not in frame
+                ):
+                    continue
+                event = self._parse_frame(frame)
+                if event is None:
+                    continue
+                data = event.data
+                event_type = event.event
+            if data == DONE:
+                return payloads, True
+            if event_types is not None and event_type is not None and event_type not in event_types:
+                continue
+            if marker is not None and marker not in data:
+                continue
+            payload = _loads(data)
+            if payload is not None:
+                payloads.append(payload)
+        return payloads, False
+
+    def flush(self) -> List[SSEEvent]:
+        """Dispatch whatever is pending once the stream has ended."""
+        frame, self._pending = self._pending, b""
+        event = self._parse_frame(frame.replace(b"\r\n", b"\n").rstrip(b"\r\n"))
+        return [event] if event is not None else []
+
+    def flush_json(
+        self, marker: Optional[bytes] = None, event_types: Optional[frozenset] = None
+    ) -> List[dict]:
+        """``feed_json`` counterpart of ``flush``."""
+        payloads, _ = self.feed_json(b"\n\n", marker, event_types)
+        return payloads
+
+    def _frames(self, chunk: bytes) -> List[bytes]:
+        buffer = self._pending + chunk if self._pending else chunk
+        if b"\r" in buffer:
+            # A trailing "\r" stays pending and is normalised with the next chunk
+            buffer = buffer.replace(b"\r\n", b"\n")
+        frames = buffer.split(b"\n\n")
+        self._pending = frames.pop()
+        return frames
+
+    def _parse_frame(self, frame: bytes) -> Optional[SSEEvent]:
+        if frame.startswith(_DATA_SP) and b"\n" not in frame:
+            return SSEEvent(None, frame[6:], self._last_id)
+        data = []
+        event_type = None
+        for line in frame.split(b"\n"):
+            if not line or line[0] == 0x3A:  # blank line or ":" comment / keep-alive
+                continue
+            name, colon, value = line.partition(b":")
+            if colon and value[:1] == b" ":
+                value = value[1:]
+            if name == b"data":
+                data.append(value)
+            elif name == b"event":
+                event_type = value.decode("utf-8")
+            elif name == b"id":
+                self._last_id = value.decode("utf-8")
+            # retry: and unknown fields are ignored
+        if not data:
+            return None
+        payload = data[0] if len(data) == 1 else b"\n".join(data)
+        return SSEEvent(event_type, payload, self._last_id)
+
+
+def _loads(data: bytes):
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    try:
+        payload, end = _scan_json(text, 0)
+    except StopIteration:
+        pass
+    else:
+        if end == len(text):
+            return payload
+    # Leading or trailing whitespace, trailing garbage or invalid JSON: let the full
+    # parser decide, which rejects anything but one JSON value
+    try:
+        return json.loads(text)
+    except ValueError:
+        return None
+
+
+def iter_sse_json(
+    chunks: Iterable[bytes],
+    marker: Optional[bytes] = None,
+    event_types: Optional[frozenset] = None,
+) -> Iterator[dict]:
+    """Yield JSON payloads of content-bearing events from a byte chunk iterator."""
+    decoder = SSEDecoder()
+    feed_json = decoder.feed_json
+    held = []
+    for chunk in chunks:
+        if b"\n" not in chunk:
+            # Cannot complete a frame; batch it with the next chunk that can
+            held.append(chunk)
+            continue
+        if held:
+            held.append(chunk)
+            chunk = b"".join(held)
+            held.clear()
+        payloads, done = feed_json(chunk, marker, event_types)
+        if payloads:
+            yield from payloads
+        if done:
+            return
+    if held:
+        feed_json(b"".join(held), marker, event_types)
+    yield from decoder.flush_json(marker, event_types)
+
+
+async def aiter_sse_json(
+    chunks: AsyncIterable[bytes],
+    marker: Optional[bytes] = None,
+    event_types: Optional[frozenset] = None,
+) -> AsyncIterator[dict]:
+    """Async counterpart of ``iter_sse_json``."""
+    decoder = SSEDecoder()
+    held = []
+    async for chunk in chunks:
+        if b"\n" not in chunk:
+            held.append(chunk)
+            continue
+        if held:
+            held.append(chunk)
+            chunk = b"".join(held)
+            held.clear()
+        payloads, done = decoder.feed_json(chunk, marker, event_types)
+        for payload in payloads:
+            yield payload
+        if done:
+            return
+    if held:
+        decoder.feed_json(b"".join(held), marker, event_types)
+    for payload in decoder.flush_json(marker, event_types):
+        yield payload
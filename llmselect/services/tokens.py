@@ -0,0 +1,245 @@
+"""Token counting for usage fallbacks, context budgeting and rate limiting.
+
+Models are counted with byte-pair encodings loaded from vocab files vendored in
+``llmselect/tokenizer_data`` (fetched at build time by
+``scripts/fetch_tokenizer_vocab.py``); nothing is downloaded at runtime. The
+``tiktoken`` package, when installed, is used as a faster engine over the same
+vocab files; otherwise a pure-Python BPE counts with an approximation of the
+encoding's pre-tokenizer regex. Models without a known encoding, and encodings
+whose vocab file is missing, fall back to ``estimate_tokens``; missing files are
+reported once, when the service container is built.
+
+Anthropic, Gemini and Mistral publish no offline vocab files, so their models are
+counted with ``cl100k_base``, which tracks their tokenizers far more closely than
+a characters-per-token ratio does on code and non-English text.
+
+Counts are memoized per (encoding, content hash) in a bounded LRU shared by all
+threads.
+"""
+
+import base64
+import hashlib
+import logging
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+try:
+    import tiktoken
+except ImportError:  # optional: faster engine over the same vocab files
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+VOCAB_DIR = Path(__file__).resolve().parent.parent / "tokenizer_data"
+HEURISTIC = "heuristic"
+
+# Exact pre-tokenizer patterns, as used by tiktoken (need \p{..} support)
+_CL100K_PATTERN = (
+    r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}++|\p{N}{1,3}+| ?[^\s\p{L}\p{N}]++[\r\n]*+"""
+    r"""|\s++$|\s*[\r\n]|\s+(?!\S)|\s"""
+)
+_O200K_PATTERN = "|".join(
+    [
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+"""
+        r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*"""
+        r"""(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+        r"""\p{N}{1,3}""",
+        r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+        r"""\s*[\r\n]+""",
+        r"""\s+(?!\S)""",
+        r"""\s+""",
+    ]
+)
+# Standard-library approximation of both: letters are [^\W\d_], numbers \d
+_APPROXIMATE_PATTERN = re.compile(
+    r"""'(?i:[sdmt]|ll|ve|re)|(?:[^\r\n\w]|_)?[^\W\d_]+|\d{1,3}| ?(?:[^\s\w]|_)+[\r\n/]*"""
+    r"""|\s+$|\s*[\r\n]+|\s+(?!\S)|\s+"""
+)
+
+# name -> (vocab file, sha256, tiktoken pattern); the hashes match tiktoken's registry
+ENCODINGS: Dict[str, Tuple[str, str, str]] = {
+    "cl100k_base": (
+        "cl100k_base.tiktoken",
+        "223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7",
+        _CL100K_PATTERN,
+    ),
+    "o200k_base": (
+        "o200k_base.tiktoken",
+        "446a9538cb6c348e3516120d7c08b09f57c36495e2acfffe59a5bf8b0cfb1a2d",
+        _O200K_PATTERN,
+    ),
+}
+
+# (provider, model id prefix) -> encoding; the longest matching prefix wins
+MODEL_ENCODINGS: Dict[Tuple[str, str], str] = {
+    ("openai", "gpt-5"): "o200k_base",
+    ("openai", "gpt-4.1"): "o200k_base",
+    ("openai", "gpt-4o"): "o200k_base",
+    ("openai", "o1"): "o200k_base",
+    ("openai", "o3"): "o200k_base",
+    ("openai", "o4"): "o200k_base",
+    ("openai", "gpt-4"): "cl100k_base",
+    ("openai", "gpt-3.5"): "cl100k_base",
+    ("anthropic", ""): "cl100k_base",
+    ("gemini", ""): "cl100k_base",
+    ("mistral", ""): "cl100k_base",
+}
+
+DEFAULT_MEMO_SIZE = 20000
+# Pre-tokenizer pieces longer than this are merged in windows of this size: the
+# merge loop is quadratic in piece length, and real tokens are far shorter
+MAX_PIECE_BYTES = 256
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimation: ~4 characters per token for English text.
+
+    The fallback for models without a known encoding. Note: This is a simple
+    heuristic that may be less accurate for:
+    - Non-English languages (especially CJK languages)
+    - Code and technical content
+    - Text with many special characters
+    """
+    return max(1, len(text) // 4)
+
+
+def load_vocab(path: Path) -> Dict[bytes, int]:
+    """Read a tiktoken-format vocab file: one ``<base64 token> <rank>`` per line."""
+    ranks = {}
+    with open(path, "rb") as handle:
+        for line in handle:
+            if line.strip():
+                token, rank = line.split()
+                ranks[base64.b64decode(token)] = int(rank)
+    return ranks
+
+
+class BPETokenizer:
+    """Counts tokens of a byte-level BPE vocabulary."""
+
+    def __init__(self, name: str, ranks: Dict[bytes, int], pattern: str):
+        self.name = name
+        self.ranks = ranks
+        self._encoding = None
+        if tiktoken is not None:
+            self._encoding = tiktoken.Encoding(
+                name=name, pat_str=pattern, mergeable_ranks=ranks, special_tokens={}
+            )
+
+    def count(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode_ordinary(text))
+        return sum(
+            self._count_piece(piece.encode("utf-8")) for piece in _APPROXIMATE_PATTERN.findall(text)
+        )
+
+    def _count_piece(self, piece: bytes) -> int:
+        if piece in self.ranks:
+            return 1
+        if len(piece) > MAX_PIECE_BYTES:
+            return sum(
+                self._count_piece(piece[start : start + MAX_PIECE_BYTES])
+                for start in range(0, len(piece), MAX_PIECE_BYTES)
+            )
+        # Repeatedly merge the adjacent pair with the lowest rank
+        parts = [piece[i : i + 1] for i in range(len(piece))]
+        while len(parts) > 1:
+            best_rank = None
+            best_index = 0
+            for index in range(len(parts) - 1):
+                rank = self.ranks.get(parts[index] + parts[index + 1])
+                if rank is not None and (best_rank is None or rank < best_rank):
+                    best_rank, best_index = rank, index
+            if best_rank is None:
+                break
+            parts[best_index : best_index + 2] = [parts[best_index] + parts[best_index + 1]]
+        return len(parts)
+
+
+class TokenCounter:
+    """Per-model token counts over the vendored vocab files, memoized per content hash."""
+
+    def __init__(self, vocab_dir: Optional[Path] = None, memo_size: int = DEFAULT_MEMO_SIZE):
+        self.vocab_dir = Path(vocab_dir) if vocab_dir else VOCAB_DIR
+        self.memo_size = memo_size
+        self._tokenizers: Dict[str, Optional[BPETokenizer]] = {}
+        self._memo: "OrderedDict[Tuple[str, bytes], int]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def encoding_for(self, provider: str, model: str) -> str:
+        """Name of the encoding used for ``model``, or ``HEURISTIC``."""
+        best = None
+        for (known_provider, prefix), encoding in MODEL_ENCODINGS.items():
+            if known_provider == provider and model.startswith(prefix):
+                if best is None or len(prefix) > len(best[0]):
+                    best = (prefix, encoding)
+        if best is None or self._tokenizer(best[1]) is None:
+            return HEURISTIC
+        return best[1]
+
+    def count(self, provider: str, model: str, text: str) -> int:
+        return self.count_many(provider, model, [text])[0]
+
+    def count_many(self, provider: str, model: str, texts: Iterable[str]) -> List[int]:
+        """Count a batch of texts (e.g. a whole history) with one encoding lookup."""
+        encoding = self.encoding_for(provider, model)
+        if encoding == HEURISTIC:
+            return [estimate_tokens(text) for text in texts]
+        tokenizer = self._tokenizers[encoding]
+        counts = []
+        for text in texts:
+            key = (encoding, hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest())
+            with self._lock:
+                count = self._memo.get(key)
+                if count is not None:
+                    self._memo.move_to_end(key)
+            if count is None:
+                count = tokenizer.count(text)
+                with self._lock:
+                    self._memo[key] = count
+                    if len(self._memo) > self.memo_size:
+                        self._memo.popitem(last=False)
+            counts.append(count)
+        return counts
+
+    def check_vocab(self) -> List[str]:
+        """Warn about missing vocab files up front; returns the encodings counted heuristically.
+
+        Called once at startup, so the warning is not deferred to the first request
+        that needs the encoding (and is not repeated there).
+        """
+        with self._lock:
+            for encoding in ENCODINGS:
+                if encoding not in self._tokenizers and not self._vocab_path(encoding).exists():
+                    # Cached as missing (None), so later lookups skip the warning
+                    self._tokenizers[encoding] = self._load(encoding)
+            return [
+                encoding for encoding, tokenizer in self._tokenizers.items() if tokenizer is None
+            ]
+
+    def _tokenizer(self, encoding: str) -> Optional[BPETokenizer]:
+        if encoding in self._tokenizers:
+            return self._tokenizers[encoding]
+        with self._lock:
+            if encoding not in self._tokenizers:
+                self._tokenizers[encoding] = self._load(encoding)
+            return self._tokenizers[encoding]
+
+    def _load(self, encoding: str) -> Optional[BPETokenizer]:
+        path = self._vocab_path(encoding)
+        if not path.exists():
+            logger.warning(
+                "Tokenizer vocab %s not found; counting %s models heuristically. "
+                "Run scripts/fetch_tokenizer_vocab.py to vendor it.",
+                path,
+                encoding,
+            )
+            return None
+        return BPETokenizer(encoding, load_vocab(path), ENCODINGS[encoding][2])
+
+    def _vocab_path(self, encoding: str) -> Path:
+        return self.vocab_dir / ENCODINGS[encoding][0]
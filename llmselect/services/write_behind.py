@@ -0,0 +1,217 @@
+"""Write-behind persistence for rows produced at the end of SSE streams.
+
+A finished stream hands its assistant reply or comparison results to the queue
+and sends its ``done`` event straight away instead of waiting on the database. One
+background worker drains the queue, committing every write it has collected in a
+single transaction (up to ``batch_size``), retrying transient database errors with
+exponential backoff, and applying the writes of a batch one by one when the batch
+as a whole keeps failing, so one bad write cannot sink the others.
+
+Reads that must observe a pending write (the next turn of a conversation, its
+transcript) call ``wait_for`` with the write's key first. ``close`` drains the
+queue on shutdown. Without an app, or with ``enabled=False``, writes are applied
+inline by ``submit``.
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Any, List, Optional
+
+from sqlalchemy.exc import OperationalError
+
+from ..extensions import db
+
+logger = logging.getLogger(__name__)
+
+_CLOSE = object()
+
+
+class PendingWrite:
+    """A unit of work for the queue.
+
+    ``stage`` adds its rows to the session without committing (flushing is fine)
+    and returns the value its future resolves to; ``after_commit`` runs once the
+    transaction holding it has committed, e.g. to invalidate caches.
+    """
+
+    # Writes sharing a key (e.g. a conversation id) are what ``wait_for`` waits on
+    key: Optional[str] = None
+    future: Optional[Future] = None
+
+    def stage(self) -> Any:
+        raise NotImplementedError
+
+    def after_commit(self) -> None:
+        pass
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        app=None,
+        enabled: bool = True,
+        batch_size: int = 50,
+        max_retries: int = 3,
+        retry_backoff: float = 0.2,
+        wait_timeout: float = 5.0,
+    ):
+        self.app = app
+        self.enabled = enabled and app is not None
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.wait_timeout = wait_timeout
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._closed = False
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        self._pending = 0
+        self._pending_keys: Counter = Counter()
+
+        self._committed = 0
+        self._failed = 0
+        self._retries = 0
+        self._batches = 0
+
+    def submit(self, write: PendingWrite) -> Future:
+        """Queue ``write``; its future resolves to ``stage``'s value once committed."""
+        write.future = Future()
+        if not self.enabled or self._closed:
+            self._apply([write])
+            return write.future
+
+        with self._lock:
+            self._pending += 1
+            if write.key is not None:
+                self._pending_keys[write.key] += 1
+            if self._worker is None:
+                # Started lazily so a forking server starts it in each worker process
+                self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._worker.start()
+        self._queue.put(write)
+        return write.future
+
+    def wait_for(self, key: str, timeout: Optional[float] = None) -> bool:
+        """Block until no write with ``key`` is pending; ``False`` on timeout."""
+        timeout = self.wait_timeout if timeout is None else timeout
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending_keys[key], timeout)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Block until every queued write has been applied; ``False`` on timeout."""
+        with self._idle:
+            return self._idle.wait_for(lambda: not self._pending, timeout)
+
+    def close(self, timeout: Optional[float] = 30.0) -> None:
+        """Apply what is queued, then stop the worker. Later writes are applied inline."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            worker = self._worker
+        if worker is not None:
+            self._queue.put(_CLOSE)
+            worker.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "pending": self._pending,
+                "committed": self._committed,
+                "failed": self._failed,
+                "retries": self._retries,
+                "batches": self._batches,
+            }
+
+    def _run(self) -> None:
+        while True:
+            write = self._queue.get()
+            if write is _CLOSE:
+                return
+            batch = [write]
+            closing = False
+            while len(batch) < self.batch_size:
+                try:
+                    write = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if write is _CLOSE:
+                    closing = True
+                    break
+                batch.append(write)
+
+            try:
+                with self.app.app_context():
+                    self._apply(batch)
+            finally:
+                self._done(batch)
+            if closing:
+                return
+
+    def _done(self, batch: List[PendingWrite]) -> None:
+        with self._idle:
+            self._pending -= len(batch)
+            for write in batch:
+                if write.key is not None:
+                    self._pending_keys[write.key] -= 1
+                    if not self._pending_keys[write.key]:
+                        del self._pending_keys[write.key]
+            self._idle.notify_all()
+
+    def _apply(self, batch: List[PendingWrite]) -> None:
+        try:
+            results = self._commit(batch)
+        except Exception as exc:  # noqa: BLE001
+            if len(batch) == 1:
+                self._fail(batch[0], exc)
+                return
+            # Isolate the write that keeps failing the batch
+            for write in batch:
+                self._apply([write])
+            return
+
+        with self._lock:
+            self._committed += len(batch)
+            self._batches += 1
+        for write, result in zip(batch, results):
+            try:
+                write.after_commit()
+            except Exception:  # noqa: BLE001
+                logger.exception("Write-behind after-commit hook failed")
+            write.future.set_result(result)
+
+    def _commit(self, batch: List[PendingWrite]) -> list:
+        """Stage and commit ``batch`` in one transaction, retrying transient errors."""
+        attempt = 0
+        while True:
+            try:
+                results = [write.stage() for write in batch]
+                db.session.commit()
+                return results
+            except OperationalError:
+                db.session.rollback()
+                if attempt >= self.max_retries:
+                    raise
+                with self._lock:
+                    self._retries += 1
+                time.sleep(self.retry_backoff * (2**attempt))
+                attempt += 1
+            except Exception:
+                db.session.rollback()
+                raise
+
+    def _fail(self, write: PendingWrite, exc: Exception) -> None:
+        with self._lock:
+            self._failed += 1
+        logger.error(
+            "Write-behind write failed",
+            exc_info=exc,
+            extra={"event": "write_behind_failed", "write": type(write).__name__},
+        )
+        write.future.set_exception(exc)
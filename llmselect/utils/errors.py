@@ -46,6 +46,26 @@ class NotFoundError(AppError):
     error_code = "not_found"
 
 
+class ProviderBusyError(AppError):
+    status_code = HTTPStatus.SERVICE_UNAVAILABLE
+    error_code = "provider_busy"
+
+
+class ProviderUnavailableError(AppError):
+    status_code = HTTPStatus.SERVICE_UNAVAILABLE
+    error_code = "provider_unavailable"
+
+
+class ProviderTimeoutError(AppError):
+    status_code = HTTPStatus.GATEWAY_TIMEOUT
+    error_code = "provider_timeout"
+
+
+class ContextLengthError(AppError):
+    status_code = HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    error_code = "context_length_exceeded"
+
+
 def register_error_handlers(app):
     @app.errorhandler(AppError)
     def handle_app_error(err: AppError):
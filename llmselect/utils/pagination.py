@@ -0,0 +1,55 @@
+"""Keyset (cursor) pagination for newest-first listings.
+
+A page is read with ``WHERE (sort, id) < (last sort, last id)`` on an index that
+matches the ordering, so every page costs the same however deep it is, unlike
+``OFFSET`` which scans and discards every earlier row. The position is handed to
+clients as an opaque cursor: base64 encoded JSON of the last row's sort key and
+id.
+"""
+
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+from .errors import AppError
+
+
+def encode_cursor(sort_value: datetime, row_id: Any) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, Any]:
+    """Inverse of ``encode_cursor``; raises ``AppError`` for anything it did not produce."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, row_id = json.loads(raw)
+        return datetime.fromisoformat(sort_value), row_id
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise AppError("Invalid pagination cursor", extra={"field": "cursor"}) from None
+
+
+def keyset_page(
+    query, sort_column, id_column, limit: int, cursor: Optional[str] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """Return one newest-first page of ``query`` and the cursor of the next page.
+
+    ``sort_column``/``id_column`` must be the ORM attributes whose values the rows
+    carry under the same names. The next cursor is ``None`` on the last page.
+    """
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(sort_column < sort_value, and_(sort_column == sort_value, id_column < row_id))
+        )
+    # One extra row tells whether another page follows without a COUNT
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor(getattr(last, sort_column.key), getattr(last, id_column.key))
@@ -0,0 +1,9 @@
+-- Migration: Add provider usage columns to messages table
+-- Created: 2026-10-17
+-- Description: Stores the token usage, finish reason and latency reported by the
+-- provider for assistant replies, for throughput and cost accounting
+
+ALTER TABLE messages ADD COLUMN prompt_tokens INTEGER;
+ALTER TABLE messages ADD COLUMN completion_tokens INTEGER;
+ALTER TABLE messages ADD COLUMN finish_reason VARCHAR(32);
+ALTER TABLE messages ADD COLUMN latency FLOAT;
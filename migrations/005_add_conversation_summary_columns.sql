@@ -0,0 +1,28 @@
+-- Migration: Denormalize message count and previews onto conversations
+-- Created: 2026-10-17
+-- Description: Lets the conversation list read counts and previews from the
+-- conversations table instead of loading every message of every conversation.
+-- ConversationService.append_message keeps the columns up to date.
+
+ALTER TABLE conversations ADD COLUMN message_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE conversations ADD COLUMN last_user_preview VARCHAR(100);
+ALTER TABLE conversations ADD COLUMN last_message_role VARCHAR(20);
+
+-- Backfill from existing messages (latest by created_at, then id)
+UPDATE conversations SET message_count = (
+    SELECT COUNT(*) FROM messages WHERE messages.conversation_id = conversations.id
+);
+
+UPDATE conversations SET last_user_preview = (
+    SELECT SUBSTR(messages.content, 1, 100) FROM messages
+    WHERE messages.conversation_id = conversations.id AND messages.role = 'user'
+    ORDER BY messages.created_at DESC, messages.id DESC
+    LIMIT 1
+);
+
+UPDATE conversations SET last_message_role = (
+    SELECT messages.role FROM messages
+    WHERE messages.conversation_id = conversations.id
+    ORDER BY messages.created_at DESC, messages.id DESC
+    LIMIT 1
+);
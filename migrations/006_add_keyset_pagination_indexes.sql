@@ -0,0 +1,14 @@
+-- Migration: Indexes for keyset (cursor) pagination
+-- Created: 2026-10-17
+-- Description: Composite indexes matching the newest-first ordering of the
+-- conversation list (last_message_at, id) and the comparison history
+-- (created_at, id), so each page is a bounded index range scan
+
+CREATE INDEX IF NOT EXISTS idx_conversations_user_last_message
+ON conversations(user_id, last_message_at, id);
+
+-- Supersedes idx_comparison_user_created, which is a prefix of it
+CREATE INDEX IF NOT EXISTS idx_comparison_user_created_id
+ON comparison_results(user_id, created_at, id);
+
+DROP INDEX IF EXISTS idx_comparison_user_created;
@@ -0,0 +1,12 @@
+-- Migration: Full-text search index over message bodies
+-- Created: 2026-10-17
+-- Description: FTS5 table behind GET /api/v1/conversations/search, keyed by
+-- message id (rowid). The app also creates and backfills it at startup
+-- (SearchService.ensure_index); PostgreSQL uses a tsvector table instead
+
+CREATE VIRTUAL TABLE IF NOT EXISTS message_search
+USING fts5(content, tokenize='porter unicode61');
+
+INSERT INTO message_search (rowid, content)
+SELECT id, content FROM messages
+WHERE id NOT IN (SELECT rowid FROM message_search);
@@ -0,0 +1,7 @@
+-- Migration: Add cached token count to messages table
+-- Created: 2026-10-17
+-- Description: Token count of each message's content, written when the message is
+-- stored and used to fit histories into the model's context window. Existing rows
+-- stay NULL and are counted when they are next read into a history
+
+ALTER TABLE messages ADD COLUMN token_count INTEGER;
@@ -0,0 +1,18 @@
+-- Migration: Stream assistant replies into checkpointed draft messages
+-- Created: 2026-10-17
+-- Description: A chat stream's reply is stored as a "streaming" draft message when the
+-- stream starts. Its text is checkpointed as appended message_chunks rows and folded
+-- into the message's content when it finishes ("complete") or breaks off ("aborted"),
+-- so an interrupted generation is not lost. Existing messages are complete
+
+ALTER TABLE messages ADD COLUMN status VARCHAR(16) NOT NULL DEFAULT 'complete';
+
+CREATE TABLE IF NOT EXISTS message_chunks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    message_id INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    FOREIGN KEY (message_id) REFERENCES messages(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_message_chunks_message_id ON message_chunks(message_id);
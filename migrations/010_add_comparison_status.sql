@@ -0,0 +1,9 @@
+-- Migration: Keep reserved comparisons out of the history until they are complete
+-- Created: 2026-10-17
+-- Description: A streamed comparison's row is reserved with status "pending" while its
+-- providers stream, so its id can be sent in the done event, and marked "complete" when
+-- its results are stored. Listings, counts and votes only see complete comparisons;
+-- pending rows left behind by a dead process are deleted at startup. Existing
+-- comparisons are complete
+
+ALTER TABLE comparison_results ADD COLUMN status VARCHAR(16) NOT NULL DEFAULT 'complete';
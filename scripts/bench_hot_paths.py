@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks for per-request hot paths, with stored regression baselines.
+
+Benchmarks:
+
+- sanitize_message: ``_sanitize_message_content`` on a 2 KB message
+- chat_schema_load: ``ChatRequestSchema.load`` of a 10 message chat request
+- json_log_format: ``JsonFormatter.format`` of a request log record with extras
+- sse_event: SSE frame serialization of a comparison chunk event (``_sse_event``)
+- key_decrypt: ``KeyEncryptionService.decrypt`` of a stored API key
+- get_api_key: ``get_api_key`` lookup + decrypt for a user's stored key
+- list_conversations[N]: ``GET /api/v1/conversations?limit=100`` for a user with
+  N = 10/100/1000 conversations (query + serialization, response cache cleared)
+
+Each benchmark is calibrated to run for at least ``--min-time`` per round and
+timed over ``--rounds`` rounds; min/median/mean/stddev are per call. Baselines
+live in scripts/fixtures/bench/hot_paths.json and are machine specific: record
+them on the machine that runs the comparison.
+
+Usage:
+    python scripts/bench_hot_paths.py [--filter sse] [--rounds 7] [--output run.json]
+    python scripts/bench_hot_paths.py --save-baseline
+    python scripts/bench_hot_paths.py --compare [--threshold 0.25]
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+# Set environment variables before imports
+os.environ.setdefault("FLASK_ENV", "testing")
+os.environ.setdefault("SECRET_KEY", "bench-secret-key-0123456789abcdef0123")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-jwt-secret-0123456789abcdef01234")
+os.environ.setdefault("ENCRYPTION_KEY", "V9itAn6qCAdzBsZIxwQhO_coouCcjn0H0vCv2UEd8hY=")
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+
+from llmselect import create_app  # noqa: E402
+from llmselect.extensions import cache, db  # noqa: E402
+from llmselect.models import Conversation, Message, User  # noqa: E402
+from llmselect.routes.chat import _provider_chunk_event, _sse_event  # noqa: E402
+from llmselect.schemas import ChatRequestSchema  # noqa: E402
+from llmselect.services.api_keys import get_api_key, set_api_keys  # noqa: E402
+from llmselect.services.llm import _sanitize_message_content  # noqa: E402
+from llmselect.utils.logging import JsonFormatter  # noqa: E402
+
+BASELINE = Path(__file__).parent / "fixtures" / "bench" / "hot_paths.json"
+CONVERSATION_COUNTS = (10, 100, 1000)
+
+Benchmark = Tuple[str, Callable[[], object]]
+
+
+# ----------------------------------------------------------------------
+# Benchmarks
+# ----------------------------------------------------------------------
+
+
+def pure_benchmarks(app) -> List[Benchmark]:
+    message = (" Explain the trade-offs of eager vs lazy loading.\x07\t" * 40).strip()
+
+    chat_schema = ChatRequestSchema()
+    chat_payload = {
+        "provider": "openai",
+        "model": "gpt-4o-mini",
+        "messages": [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"Message {i}: " + "x" * 200}
+            for i in range(10)
+        ],
+        "conversationId": "0b0e7d55-3b0c-4a36-9c4b-2d7c3f1f1a11",
+    }
+
+    formatter = JsonFormatter()
+    record = logging.LogRecord("llmselect", logging.INFO, __file__, 1, "response_sent", None, None)
+    record.__dict__.update(
+        {"event": "response_sent", "method": "POST", "path": "/api/v1/chat", "status_code": 200}
+    )
+
+    chunk_event = _provider_chunk_event("openai", "gpt-4o-mini", "lorem ipsum ", 0.4321, False)
+
+    encryptor = app.extensions["key_encryption"]
+    token = encryptor.encrypt("sk-bench-" + "k" * 40)
+
+    return [
+        ("sanitize_message", lambda: _sanitize_message_content(message)),
+        ("chat_schema_load", lambda: chat_schema.load(chat_payload)),
+        ("json_log_format", lambda: formatter.format(record)),
+        ("sse_event", lambda: _sse_event(chunk_event)),
+        ("key_decrypt", lambda: encryptor.decrypt(token)),
+    ]
+
+
+def seed_user(username: str, conversations: int) -> User:
+    user = User(username=username)
+    user.set_password("bench-password")
+    db.session.add(user)
+    db.session.flush()
+    start = datetime.utcnow() - timedelta(days=1)
+    for index in range(conversations):
+        conversation = Conversation(
+            user_id=user.id,
+            provider="openai",
+            model="gpt-4o-mini",
+            title=f"Conversation {index}",
+            last_message_at=start + timedelta(seconds=index),
+        )
+        question = f"Question {index}: " + "q" * 150
+        conversation.messages = [
+            Message(role="user", content=question),
+            Message(role="assistant", content=f"Answer {index}: " + "a" * 600),
+        ]
+        # What ConversationService.append_message would have recorded
+        conversation.message_count = 2
+        conversation.last_user_preview = question[:100]
+        conversation.last_message_role = "assistant"
+        db.session.add(conversation)
+    db.session.commit()
+    return user
+
+
+def database_benchmarks(app) -> List[Benchmark]:
+    encryptor = app.extensions["key_encryption"]
+    benchmarks = []
+
+    key_user = seed_user("bench-keys", 0)
+    set_api_keys(key_user, {"openai": "sk-bench-key", "openai_override": True}, encryptor)
+    benchmarks.append(("get_api_key", lambda: get_api_key(key_user, "openai", encryptor)))
+
+    for count in CONVERSATION_COUNTS:
+        user = seed_user(f"bench-{count}", count)
+        client = app.test_client()
+        client.set_cookie("access_token_cookie", create_access_token(identity=str(user.id)))
+
+        def list_conversations(client=client):
+            cache.clear()
+            response = client.get("/api/v1/conversations?limit=100")
+            assert response.status_code == 200, response.get_data(as_text=True)
+            return response
+
+        benchmarks.append((f"list_conversations[{count}]", list_conversations))
+    return benchmarks
+
+
+# ----------------------------------------------------------------------
+# Timing
+# ----------------------------------------------------------------------
+
+
+def calibrate(fn: Callable[[], object], min_time: float) -> int:
+    """Smallest power-of-ten iteration count whose round takes at least ``min_time``."""
+    iterations = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        if time.perf_counter() - start >= min_time or iterations >= 10**7:
+            return iterations
+        iterations *= 10
+
+
+def measure(fn: Callable[[], object], rounds: int, min_time: float) -> Dict[str, float]:
+    fn()  # warm up caches, lazy imports and the SQLAlchemy statement cache
+    iterations = calibrate(fn, min_time)
+    per_call = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        per_call.append((time.perf_counter() - start) / iterations)
+    median = statistics.median(per_call)
+    return {
+        "min_us": round(min(per_call) * 1e6, 3),
+        "median_us": round(median * 1e6, 3),
+        "mean_us": round(statistics.mean(per_call) * 1e6, 3),
+        "stddev_us": round(statistics.pstdev(per_call) * 1e6, 3),
+        "ops": round(1 / median, 1),
+        "iterations": iterations,
+        "rounds": rounds,
+    }
+
+
+def run(args) -> Dict[str, Dict[str, float]]:
+    app = create_app()
+    results = {}
+    with app.app_context():
+        db.create_all()
+        benchmarks = pure_benchmarks(app)
+        with app.test_request_context():
+            benchmarks += database_benchmarks(app)
+        for name, fn in benchmarks:
+            if args.filter and args.filter not in name:
+                continue
+            results[name] = measure(fn, args.rounds, args.min_time)
+            stats = results[name]
+            print(
+                f"{name:<26} {stats['median_us']:>12.2f} {stats['min_us']:>12.2f} "
+                f"{stats['stddev_us']:>10.2f} {stats['ops']:>12.1f}"
+            )
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: dict, threshold: float) -> List[str]:
+    """Print median deltas against ``baseline``; return the benchmarks that regressed."""
+    print(f"\nvs baseline ({baseline['meta'].get('recorded_at', '?')}), threshold {threshold:.0%}:")
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline["benchmarks"].get(name)
+        if previous is None:
+            print(f"  {name:<26} (no baseline)")
+            continue
+        change = stats["median_us"] / previous["median_us"] - 1
+        flag = ""
+        if change > threshold:
+            flag = "  ✗ REGRESSION"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  ✓ faster"
+        print(
+            f"  {name:<26} {previous['median_us']:>10.2f} -> {stats['median_us']:>10.2f} us "
+            f"({change:+.1%}){flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--rounds", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="seconds per round")
+    parser.add_argument("--output", help="write the results as JSON to this file")
+    parser.add_argument("--baseline", default=str(BASELINE), help="baseline JSON file")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite the baseline")
+    parser.add_argument("--compare", action="store_true", help="fail on regressions")
+    parser.add_argument(
+        "--threshold", type=float, default=0.25, help="allowed median slowdown, e.g. 0.25 = 25%%"
+    )
+    args = parser.parse_args()
+
+    print(f"{'benchmark':<26} {'median us':>12} {'min us':>12} {'stddev us':>10} {'ops/s':>12}")
+    results = run(args)
+    report = {
+        "meta": {
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "rounds": args.rounds,
+            "min_time": args.min_time,
+        },
+        "benchmarks": results,
+    }
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        baseline_path = Path(args.baseline)
+        if baseline_path.exists() and args.filter:
+            # Keep the entries of benchmarks that were filtered out
+            previous = json.loads(baseline_path.read_text())
+            report["benchmarks"] = {**previous["benchmarks"], **results}
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nBaseline written to {baseline_path}")
+    if args.compare:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressions:
+            print(f"\n✗ {len(regressions)} regression(s): {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark for provider SSE stream parsing.
+
+Replays the provider streams in scripts/fixtures/sse/ through two parsers and
+reports throughput in MB/s:
+
+- legacy: the previous per-provider loop (``iter_lines`` + decode + ``json.loads``
+  on every event)
+- decoder: ``LLMService._iter_stream_text`` on top of ``llmselect.services.sse``
+
+Both paths run over a real ``requests.Response`` replaying the recording in
+network-sized chunks, and must produce identical text.
+
+Usage:
+    python scripts/bench_sse.py [--chunk-size 1024] [--repeat 200]
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import requests
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from llmselect.services.llm import LLMService  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures" / "sse"
+FIXTURE_KINDS = {"openai": "openai", "anthropic": "anthropic", "gemini": "gemini"}
+
+
+class ReplayRaw:
+    """Stand-in for a urllib3 response that delivers a recording in fixed network chunks."""
+
+    def __init__(self, data: bytes, chunk_size: int):
+        self._data = data
+        self._chunk_size = chunk_size
+
+    def stream(self, amt=None, decode_content=None):
+        view = memoryview(self._data)
+        for start in range(0, len(view), self._chunk_size):
+            yield bytes(view[start : start + self._chunk_size])
+
+
+def make_response(data: bytes, chunk_size: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = 200
+    response.raw = ReplayRaw(data, chunk_size)
+    return response
+
+
+def legacy_openai(response):
+    for line in response.iter_lines():
+        if not line:
+            continue
+        line_str = line.decode("utf-8")
+        if line_str.startswith("data: "):
+            data_str = line_str[6:]
+            if data_str == "[DONE]":
+                break
+            try:
+                data = json.loads(data_str)
+                if (
+                    data.get("choices")
+                    and data["choices"][0].get("delta")
+                    and data["choices"][0]["delta"].get("content")
+                ):
+                    yield data["choices"][0]["delta"]["content"]
+            except (ValueError, KeyError, IndexError):
+                continue
+
+
+def legacy_anthropic(response):
+    for line in response.iter_lines():
+        if not line:
+            continue
+        line_str = line.decode("utf-8")
+        if line_str.startswith("data: "):
+            data_str = line_str[6:]
+            try:
+                data = json.loads(data_str)
+                if data.get("type") == "content_block_delta":
+                    if data.get("delta", {}).get("text"):
+                        yield data["delta"]["text"]
+            except (ValueError, KeyError):
+                continue
+
+
+def legacy_gemini(response):
+    for line in response.iter_lines():
+        if not line:
+            continue
+        line_str = line.decode("utf-8")
+        if line_str.startswith("data: "):
+            data_str = line_str[6:]
+            try:
+                data = json.loads(data_str)
+                candidates = data.get("candidates") or []
+                if candidates:
+                    content = candidates[0].get("content", {})
+                    parts = content.get("parts") or []
+                    if parts:
+                        text = parts[0].get("text")
+                        if text:
+                            yield text
+            except (ValueError, KeyError, IndexError):
+                continue
+
+
+LEGACY_PARSERS = {
+    "openai": legacy_openai,
+    "anthropic": legacy_anthropic,
+    "gemini": legacy_gemini,
+}
+
+
+def decoder_path(kind):
+    service = LLMService()
+    return lambda response: service._iter_stream_text(response, kind, kind)
+
+
+def measure(parse, data: bytes, chunk_size: int, repeat: int):
+    text = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        text = "".join(parse(make_response(data, chunk_size)))
+    elapsed = time.perf_counter() - start
+    return text, (len(data) * repeat) / elapsed / 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chunk-size", type=int, default=1024)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'stream':<10} {'bytes':>8} {'legacy MB/s':>12} {'decoder MB/s':>13} {'speedup':>8}")
+    for name, kind in FIXTURE_KINDS.items():
+        data = (FIXTURES / f"{name}.sse").read_bytes()
+        legacy_text, legacy_rate = measure(LEGACY_PARSERS[name], data, args.chunk_size, args.repeat)
+        new_text, new_rate = measure(decoder_path(kind), data, args.chunk_size, args.repeat)
+        if legacy_text != new_text:
+            print(f"✗ {name}: parsers disagree on the streamed text")
+            sys.exit(1)
+        print(
+            f"{name:<10} {len(data):>8} {legacy_rate:>12.1f} {new_rate:>13.1f} "
+            f"{new_rate / legacy_rate:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+"""
+Vendor the BPE vocab files used for offline token counting.
+
+Downloads each encoding listed in llmselect.services.tokens.ENCODINGS into
+llmselect/tokenizer_data/ and verifies it against the pinned sha256. Run it once
+at build time; the application never downloads vocab files itself.
+"""
+
+import hashlib
+import sys
+import urllib.request
+from pathlib import Path
+
+# Add parent directory to path for imports
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from llmselect.services.tokens import ENCODINGS, VOCAB_DIR  # noqa: E402
+
+BASE_URL = "https://openaipublic.blob.core.windows.net/encodings/"
+
+
+def fetch_vocab(target_dir: Path = VOCAB_DIR) -> None:
+    """Download and verify every missing or corrupt vocab file."""
+    target_dir.mkdir(parents=True, exist_ok=True)
+    for name, (filename, sha256, _pattern) in ENCODINGS.items():
+        path = target_dir / filename
+        if path.exists() and hashlib.sha256(path.read_bytes()).hexdigest() == sha256:
+            print(f"✓ {name} already present")
+            continue
+
+        print(f"Downloading {name}...")
+        with urllib.request.urlopen(BASE_URL + filename, timeout=60) as response:
+            data = response.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != sha256:
+            raise SystemExit(f"✗ {filename}: sha256 {digest} does not match {sha256}")
+
+        path.write_bytes(data)
+        print(f"✓ {name} saved to {path}")
+
+
+if __name__ == "__main__":
+    fetch_vocab()
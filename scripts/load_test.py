@@ -0,0 +1,619 @@
+#!/usr/bin/env python
+"""
+End-to-end load test for the chat and comparison endpoints.
+
+Starts the mock provider (``llmselect.mock_provider``) and the app server as
+subprocesses, then runs concurrent virtual users against:
+
+- chat: POST /api/v1/chat
+- chat_stream: POST /api/v1/chat/stream
+- compare: POST /api/v1/compare
+- compare_stream: POST /api/v1/compare/stream
+
+Each virtual user registers, logs in, stores (fake) provider keys and then loops
+over the selected scenarios with its own cookie jar and CSRF header until the
+duration is up. Prompts are unique per request so the response cache and
+single-flight never collapse the load.
+
+Reported per scenario: requests/sec, error rate, total latency and time to first
+token (streams: first content event) percentiles. The app server's CPU time and
+peak RSS (including gunicorn workers) are read from /proc. Results are written as
+JSON; pass an earlier results file as ``--baseline`` to print the deltas.
+
+Usage:
+    python scripts/load_test.py [--users 20] [--duration 30] [--server wsgi|asgi]
+        [--scenarios chat,chat_stream,compare,compare_stream]
+        [--output results.json] [--baseline previous.json]
+
+    # Against servers that are already running (rate limiting must be off there):
+    python scripts/load_test.py --base-url http://127.0.0.1:3044 --mock-url ""
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from secrets import token_hex
+from typing import Dict, List, NamedTuple, Optional
+
+import httpx
+from cryptography.fernet import Fernet
+
+ROOT = Path(__file__).parent.parent
+
+CHAT_TARGET = {"provider": "openai", "model": "gpt-4o-mini"}
+COMPARE_TARGETS = [
+    {"provider": "openai", "model": "gpt-4o-mini"},
+    {"provider": "anthropic", "model": "claude-3-5-haiku-20241022"},
+    {"provider": "gemini", "model": "gemini-1.5-flash"},
+    {"provider": "mistral", "model": "mistral-small-latest"},
+]
+FAKE_KEYS = {name: f"load-test-{name}-key" for name in ("openai", "anthropic", "gemini", "mistral")}
+PERCENTILES = (50, 90, 95, 99)
+
+
+class Sample(NamedTuple):
+    scenario: str
+    ok: bool
+    status: Optional[int]
+    latency: float
+    ttft: Optional[float]
+    finished: float
+
+
+# ----------------------------------------------------------------------
+# Scenarios
+# ----------------------------------------------------------------------
+
+
+def _sse_event(line: str):
+    if line.startswith("data: "):
+        return json.loads(line[6:])
+    return None
+
+
+async def run_chat(client: httpx.AsyncClient, prompt: str):
+    payload = {**CHAT_TARGET, "messages": [{"role": "user", "content": prompt}], "cache": False}
+    response = await client.post("/api/v1/chat", json=payload)
+    return response.status_code, response.status_code == 200, None
+
+
+async def run_chat_stream(client: httpx.AsyncClient, prompt: str):
+    payload = {**CHAT_TARGET, "messages": [{"role": "user", "content": prompt}], "cache": False}
+    start = time.perf_counter()
+    ttft = None
+    ok = False
+    async with client.stream("POST", "/api/v1/chat/stream", json=payload) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return response.status_code, False, None
+        async for line in response.aiter_lines():
+            event = _sse_event(line)
+            if event is None:
+                continue
+            if event.get("content") and ttft is None:
+                ttft = time.perf_counter() - start
+            elif "error" in event:
+                break
+            elif event.get("done"):
+                ok = True
+    return response.status_code, ok, ttft
+
+
+async def run_compare(client: httpx.AsyncClient, prompt: str):
+    payload = {"providers": COMPARE_TARGETS, "prompt": prompt, "cache": False}
+    response = await client.post("/api/v1/compare", json=payload)
+    if response.status_code != 200:
+        return response.status_code, False, None
+    results = response.json().get("results", [])
+    return response.status_code, all(not result.get("error") for result in results), None
+
+
+async def run_compare_stream(client: httpx.AsyncClient, prompt: str):
+    payload = {"providers": COMPARE_TARGETS, "prompt": prompt, "cache": False}
+    start = time.perf_counter()
+    ttft = None
+    ok = False
+    failed = False
+    async with client.stream("POST", "/api/v1/compare/stream", json=payload) as response:
+        if response.status_code != 200:
+            await response.aread()
+            return response.status_code, False, None
+        async for line in response.aiter_lines():
+            event = _sse_event(line)
+            if event is None:
+                continue
+            kind = event.get("event")
+            if kind == "chunk" and event.get("chunk") and ttft is None:
+                ttft = time.perf_counter() - start
+            elif kind == "error":
+                failed = True
+            elif kind == "done":
+                ok = not failed
+    return response.status_code, ok, ttft
+
+
+SCENARIOS = {
+    "chat": run_chat,
+    "chat_stream": run_chat_stream,
+    "compare": run_compare,
+    "compare_stream": run_compare_stream,
+}
+
+
+# ----------------------------------------------------------------------
+# Virtual users
+# ----------------------------------------------------------------------
+
+
+async def login_user(client: httpx.AsyncClient, username: str) -> None:
+    credentials = {"username": username, "password": "load-test-password"}
+    response = await client.post("/api/v1/auth/register", json=credentials)
+    if response.status_code not in (201, 400):
+        response.raise_for_status()
+    response = await client.post("/api/v1/auth/login", json=credentials)
+    response.raise_for_status()
+    client.headers["X-CSRF-Token"] = client.cookies.get("csrf_access_token", "")
+    response = await client.post("/api/v1/keys", json=FAKE_KEYS)
+    response.raise_for_status()
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    index: int,
+    run_id: str,
+    scenarios: List[str],
+    samples: List[Sample],
+    stop_at: float,
+) -> None:
+    # Stagger the scenario order so every scenario runs at every point of the test
+    offset = index % len(scenarios)
+    order = itertools.cycle(scenarios[offset:] + scenarios[:offset])
+    for count in itertools.count():
+        if time.perf_counter() >= stop_at:
+            break
+        scenario = next(order)
+        prompt = f"[{run_id} vu{index} #{count}] Summarize the benefits of load testing."
+        start = time.perf_counter()
+        try:
+            status, ok, ttft = await SCENARIOS[scenario](client, prompt)
+        except httpx.HTTPError:
+            status, ok, ttft = None, False, None
+        finished = time.perf_counter()
+        samples.append(Sample(scenario, ok, status, finished - start, ttft, finished))
+
+
+# ----------------------------------------------------------------------
+# Processes and resource sampling
+# ----------------------------------------------------------------------
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, process: Optional[subprocess.Popen], timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{url} exited with status {process.returncode} during startup")
+        try:
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def stop_process(process: subprocess.Popen) -> None:
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def server_command(args, port: int) -> List[str]:
+    if args.server == "asgi":
+        return [
+            sys.executable, "-m", "uvicorn", "asgi:app",
+            "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        ]  # fmt: skip
+    return [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--bind", f"127.0.0.1:{port}", "--workers", str(args.workers),
+        "--worker-class", "gthread", "--threads", str(args.threads),
+        "--timeout", str(int(args.timeout)), "--log-level", "warning",
+    ]  # fmt: skip
+
+
+def server_env(database_url: str, mock_url: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update(
+        {
+            "FLASK_ENV": "production",
+            "SECRET_KEY": token_hex(32),
+            "JWT_SECRET_KEY": token_hex(32),
+            "ENCRYPTION_KEY": Fernet.generate_key().decode(),
+            "DATABASE_URL": database_url,
+            "ALLOW_OPEN_REGISTRATION": "true",
+            "RATELIMIT_ENABLED": "false",
+            "LOG_LEVEL": env.get("LOG_LEVEL", "WARNING"),
+        }
+    )
+    if mock_url:
+        env["LLM_PROVIDER_BASE_URL"] = mock_url
+    return env
+
+
+class ProcessSampler:
+    """Samples CPU time and RSS of a process and its children from /proc (Linux only)."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        self.pid = pid
+        self.interval = interval
+        self.rss_peak = 0
+        self._cpu_start = None
+        self._cpu_end = None
+        self._rss_end = 0
+        self._wall_start = None
+        self._wall_end = None
+        self._ticks = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+        self._page_size = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+    @staticmethod
+    def available() -> bool:
+        return Path("/proc/self/stat").exists()
+
+    def _pids(self) -> List[int]:
+        pids = [self.pid]
+        for entry in Path("/proc").iterdir():
+            if entry.name.isdigit() and self._ppid(int(entry.name)) == self.pid:
+                pids.append(int(entry.name))
+        return pids
+
+    @staticmethod
+    def _stat(pid: int) -> Optional[List[str]]:
+        try:
+            raw = Path(f"/proc/{pid}/stat").read_text()
+        except OSError:
+            return None
+        # Fields after the parenthesised command name, which may contain spaces
+        return raw[raw.rindex(")") + 2 :].split()
+
+    def _ppid(self, pid: int) -> Optional[int]:
+        fields = self._stat(pid)
+        return int(fields[1]) if fields else None
+
+    def sample(self):
+        cpu = 0.0
+        rss = 0
+        for pid in self._pids():
+            fields = self._stat(pid)
+            if fields:
+                # utime and stime are fields 14 and 15, rss is 24 (1-based, see proc(5))
+                cpu += (int(fields[11]) + int(fields[12])) / self._ticks
+                rss += int(fields[21]) * self._page_size
+        self.rss_peak = max(self.rss_peak, rss)
+        return cpu, rss
+
+    def start(self) -> None:
+        self._cpu_start, _ = self.sample()
+        self._wall_start = time.perf_counter()
+
+    def stop(self) -> None:
+        self._cpu_end, self._rss_end = self.sample()
+        self._wall_end = time.perf_counter()
+
+    async def run(self, stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            self.sample()
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def summary(self) -> dict:
+        cpu_seconds = self._cpu_end - self._cpu_start
+        wall = self._wall_end - self._wall_start
+        return {
+            "cpu_seconds": round(cpu_seconds, 3),
+            "cpu_percent": round(100 * cpu_seconds / wall, 1) if wall else None,
+            "rss_peak_mb": round(self.rss_peak / 2**20, 1),
+            "rss_end_mb": round(self._rss_end / 2**20, 1),
+        }
+
+
+# ----------------------------------------------------------------------
+# Statistics and reporting
+# ----------------------------------------------------------------------
+
+
+def percentile(values: List[float], percent: float) -> Optional[float]:
+    """Nearest-rank percentile; ``None`` for an empty sample."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, int(-(-percent * len(ordered) // 100)))
+    return ordered[rank - 1]
+
+
+def distribution(values: List[float]) -> Optional[dict]:
+    if not values:
+        return None
+    stats = {f"p{p}": round(percentile(values, p) * 1000, 2) for p in PERCENTILES}
+    stats["mean"] = round(sum(values) / len(values) * 1000, 2)
+    stats["max"] = round(max(values) * 1000, 2)
+    return stats
+
+
+def summarize(samples: List[Sample], wall: float) -> dict:
+    errors = [sample for sample in samples if not sample.ok]
+    statuses: Dict[str, int] = {}
+    for sample in errors:
+        key = str(sample.status) if sample.status is not None else "connection"
+        statuses[key] = statuses.get(key, 0) + 1
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "error_rate": round(len(errors) / len(samples), 4) if samples else 0.0,
+        "error_statuses": statuses,
+        "rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "latency_ms": distribution([sample.latency for sample in samples if sample.ok]),
+        "ttft_ms": distribution([s.ttft for s in samples if s.ok and s.ttft is not None]),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        output = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip() or None
+
+
+def print_report(report: dict) -> None:
+    print(
+        f"\n{'scenario':<16} {'reqs':>6} {'rps':>8} {'err%':>6} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'ttft p50':>9} {'ttft p95':>9}"
+    )
+    rows = dict(report["scenarios"], total=report["total"])
+    for name, stats in rows.items():
+        latency = stats["latency_ms"] or {}
+        ttft = stats["ttft_ms"] or {}
+        print(
+            f"{name:<16} {stats['requests']:>6} {stats['rps']:>8.2f} "
+            f"{stats['error_rate'] * 100:>6.2f} "
+            + " ".join(
+                f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+                for value in (
+                    latency.get("p50"),
+                    latency.get("p95"),
+                    latency.get("p99"),
+                    ttft.get("p50"),
+                    ttft.get("p95"),
+                )
+            )
+        )
+    server = report.get("server")
+    if server:
+        print(
+            f"\nserver: {server['cpu_seconds']:.2f}s CPU ({server['cpu_percent']}% of one core), "
+            f"peak RSS {server['rss_peak_mb']} MB"
+        )
+
+
+def _delta(current, previous) -> str:
+    if current is None or previous is None:
+        return "-"
+    if not previous:
+        return f"{current:g}"
+    return f"{current:g} ({(current - previous) / previous * 100:+.1f}%)"
+
+
+def print_baseline_diff(report: dict, baseline: dict) -> None:
+    print(f"\nvs baseline {baseline['meta'].get('git_revision') or '?'}:")
+    rows = dict(report["scenarios"], total=report["total"])
+    previous_rows = dict(baseline.get("scenarios", {}), total=baseline.get("total", {}))
+    for name, stats in rows.items():
+        previous = previous_rows.get(name)
+        if not previous:
+            continue
+        latency = stats["latency_ms"] or {}
+        old_latency = previous.get("latency_ms") or {}
+        ttft = stats["ttft_ms"] or {}
+        old_ttft = previous.get("ttft_ms") or {}
+        print(
+            f"  {name:<16} rps {_delta(stats['rps'], previous.get('rps'))}, "
+            f"p95 {_delta(latency.get('p95'), old_latency.get('p95'))} ms, "
+            f"ttft p95 {_delta(ttft.get('p95'), old_ttft.get('p95'))} ms, "
+            f"errors {_delta(stats['error_rate'], previous.get('error_rate'))}"
+        )
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+
+async def run_load(args, scenarios: List[str], server_pid: Optional[int]) -> dict:
+    run_id = token_hex(3)
+    samples: List[Sample] = []
+    limits = httpx.Limits(max_connections=4, max_keepalive_connections=4)
+    clients = [
+        httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits)
+        for _ in range(args.users)
+    ]
+    try:
+        # Sign every user in before the clock starts; logins are not part of the results
+        await asyncio.gather(
+            *(login_user(client, f"load-{run_id}-{index}") for index, client in enumerate(clients))
+        )
+
+        sampler = None
+        if server_pid and ProcessSampler.available():
+            sampler = ProcessSampler(server_pid)
+        sampler_stop = asyncio.Event()
+        if sampler is not None:
+            sampler.start()
+            sampler_task = asyncio.ensure_future(sampler.run(sampler_stop))
+
+        started = time.perf_counter()
+        stop_at = started + args.duration
+        await asyncio.gather(
+            *(
+                virtual_user(client, index, run_id, scenarios, samples, stop_at)
+                for index, client in enumerate(clients)
+            )
+        )
+        wall = time.perf_counter() - started
+
+        if sampler is not None:
+            sampler_stop.set()
+            await sampler_task
+            sampler.stop()
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+
+    return {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "server": args.server if server_pid else "external",
+            "users": args.users,
+            "duration": args.duration,
+            "wall_time": round(wall, 3),
+            "scenarios": scenarios,
+            "workers": args.workers,
+            "threads": args.threads,
+            "mock": {
+                "ttft": args.mock_ttft,
+                "token_delay": args.mock_token_delay,
+                "response_tokens": args.mock_response_tokens,
+                "error_rate": args.mock_error_rate,
+            },
+        },
+        "scenarios": {
+            name: summarize([sample for sample in samples if sample.scenario == name], wall)
+            for name in scenarios
+        },
+        "total": summarize(samples, wall),
+        "server": sampler.summary() if sampler is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"comma separated subset of: {', '.join(SCENARIOS)}",
+    )
+    parser.add_argument("--server", choices=("wsgi", "asgi"), default="wsgi")
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers (wsgi)")
+    parser.add_argument("--threads", type=int, default=32, help="threads per worker (wsgi)")
+    parser.add_argument("--base-url", help="load an already running app server instead")
+    parser.add_argument("--mock-url", help="use an already running mock provider instead")
+    parser.add_argument("--timeout", type=float, default=120.0, help="per request timeout")
+    parser.add_argument("--mock-ttft", type=float, default=0.2)
+    parser.add_argument("--mock-token-delay", type=float, default=0.02)
+    parser.add_argument("--mock-response-tokens", type=int, default=50)
+    parser.add_argument("--mock-error-rate", type=float, default=0.0)
+    parser.add_argument("--output", help="write the JSON results to this file")
+    parser.add_argument("--baseline", help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in scenarios if name not in SCENARIOS]
+    if unknown or not scenarios:
+        parser.error(f"unknown scenarios: {', '.join(unknown) or '(none)'}")
+
+    processes = []
+    server_pid = None
+    workdir = tempfile.TemporaryDirectory(prefix="llmselect-load-")
+    log = open(Path(workdir.name) / "server.log", "w")
+    try:
+        if args.mock_url is None:
+            mock_port = free_port()
+            args.mock_url = f"http://127.0.0.1:{mock_port}"
+            mock = subprocess.Popen(
+                [
+                    sys.executable, "-m", "llmselect.mock_provider", "--port", str(mock_port),
+                    "--ttft", str(args.mock_ttft), "--token-delay", str(args.mock_token_delay),
+                    "--response-tokens", str(args.mock_response_tokens),
+                    "--error-rate", str(args.mock_error_rate),
+                ],  # fmt: skip
+                cwd=ROOT,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+            processes.append(mock)
+            wait_ready(f"{args.mock_url}/health", mock)
+
+        if args.base_url is None:
+            port = free_port()
+            args.base_url = f"http://127.0.0.1:{port}"
+            database_url = f"sqlite:///{Path(workdir.name) / 'load.db'}"
+            server = subprocess.Popen(
+                server_command(args, port),
+                cwd=ROOT,
+                env=server_env(database_url, args.mock_url),
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+            processes.append(server)
+            server_pid = server.pid
+            wait_ready(f"{args.base_url}/health", server)
+
+        print(
+            f"Load test: {args.users} users x {args.duration:g}s on {args.base_url} "
+            f"({', '.join(scenarios)})"
+        )
+        report = asyncio.run(run_load(args, scenarios, server_pid))
+        if args.mock_url:
+            try:
+                report["mock_stats"] = httpx.get(f"{args.mock_url}/stats", timeout=5).json()
+            except httpx.HTTPError:
+                report["mock_stats"] = None
+    finally:
+        for process in reversed(processes):
+            stop_process(process)
+        log.close()
+        if processes and any(process.returncode not in (0, -15) for process in processes):
+            print((Path(workdir.name) / "server.log").read_text()[-4000:], file=sys.stderr)
+        workdir.cleanup()
+
+    print_report(report)
+    if args.baseline:
+        print_baseline_diff(report, json.loads(Path(args.baseline).read_text()))
+    if args.output:
+        Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"\nResults written to {args.output}")
+    if report["total"]["requests"] == 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
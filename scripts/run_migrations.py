@@ -41,10 +41,9 @@ def run_migrations():
             with open(migration_file, "r") as f:
                 sql = f.read()
 
-            # Split by semicolons and execute each statement
-            statements = [
-                s.strip() for s in sql.split(";") if s.strip() and not s.strip().startswith("--")
-            ]
+            # Drop comment lines, then split by semicolons and execute each statement
+            sql = "\n".join(line for line in sql.splitlines() if not line.strip().startswith("--"))
+            statements = [s.strip() for s in sql.split(";") if s.strip()]
 
             for statement in statements:
                 if statement:
@@ -29,17 +29,15 @@ export const useStreamingChat = () => {
         headers['X-CSRF-Token'] = csrfToken;
       }
 
-      // Build messages array
-      const messages = [{ role: 'user', content: message }];
-
       // Send POST request to initiate stream
       const response = await fetch(url, {
         method: 'POST',
         headers,
         credentials: 'include',
+        // Delta mode: only the new message, the server assembles the history
         body: JSON.stringify({
           conversationId: conversationId,
-          messages,
+          message,
           provider,
           model,
         }),
@@ -0,0 +1,219 @@
+"""Tests for the ASGI serving mode of the streaming endpoints."""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+from llmselect.asgi import create_asgi_app
+from llmselect.models import Conversation
+
+
+def _login_cookie(client, username="asgiuser", password="asgi-password"):
+    client.post("/api/v1/auth/register", json={"username": username, "password": password})
+    response = client.post("/api/v1/auth/login", json={"username": username, "password": password})
+    cookies = [header.split(";", 1)[0] for header in response.headers.getlist("Set-Cookie")]
+    return "; ".join(cookies)
+
+
+async def _exchange(asgi_app, method, path, body=None, cookie=None):
+    """Send one request through ``asgi_app`` and collect the messages it sends back."""
+    raw_body = json.dumps(body).encode() if body is not None else b""
+    headers = [(b"content-type", b"application/json")]
+    if cookie:
+        headers.append((b"cookie", cookie.encode()))
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": headers,
+        "server": ("testserver", 80),
+        "client": ("127.0.0.1", 1234),
+    }
+    messages = []
+    body_sent = asyncio.Event()
+    response_done = asyncio.Event()
+
+    async def receive():
+        if not body_sent.is_set():
+            body_sent.set()
+            return {"type": "http.request", "body": raw_body, "more_body": False}
+        await response_done.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        messages.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            response_done.set()
+
+    await asyncio.wait_for(asgi_app(scope, receive, send), timeout=10)
+    return messages
+
+
+def _response(messages):
+    status = messages[0]["status"]
+    body = b"".join(m.get("body", b"") for m in messages[1:]).decode()
+    headers = {name.decode(): value.decode() for name, value in messages[0]["headers"]}
+    return status, body, headers
+
+
+def _call(asgi_app, method, path, body=None, cookie=None):
+    return _response(asyncio.run(_exchange(asgi_app, method, path, body, cookie)))
+
+
+def test_asgi_chat_stream_runs_natively(client, app, monkeypatch):
+    cookie = _login_cookie(client)
+    client.post(
+        "/api/v1/keys",
+        json={"openai": "sk-test", "anthropic": "", "gemini": "", "mistral": ""},
+    )
+
+    async def fake_stream(provider, model, messages, api_key, **kwargs):
+        for chunk in ("Hello", " async"):
+            yield chunk
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "ainvoke_stream", fake_stream)
+
+    status, body, headers = _call(
+        create_asgi_app(app),
+        "POST",
+        "/api/v1/chat/stream",
+        {
+            "provider": "openai",
+            "model": "gpt-4",
+            "messages": [{"role": "user", "content": "Hi"}],
+        },
+        cookie=cookie,
+    )
+
+    assert status == 200
+    assert headers["content-type"].startswith("text/event-stream")
+    assert "content-length" not in headers
+    assert '"content": "Hello"' in body
+    assert '"done": true' in body
+
+    with app.app_context():
+        conversation = Conversation.query.one()
+        assert [m.content for m in conversation.messages] == ["Hi", "Hello async"]
+
+
+def test_asgi_stream_requires_auth(app):
+    status, body, _ = _call(
+        create_asgi_app(app),
+        "POST",
+        "/api/v1/compare/stream",
+        {"providers": [{"provider": "openai", "model": "gpt-4"}], "prompt": "x"},
+    )
+    assert status == 401
+    assert json.loads(body)["error"] == "authentication_error"
+
+
+def test_asgi_mounts_flask_for_other_routes(app):
+    status, body, headers = _call(create_asgi_app(app), "GET", "/health")
+    assert status == 200
+    assert headers["content-length"] == str(len(body))
+    assert json.loads(body)["status"] == "ok"
+
+
+def test_asgi_compare_stream_is_admitted_by_the_provider_executor(client, app, monkeypatch):
+    cookie = _login_cookie(client)
+    client.post(
+        "/api/v1/keys",
+        json={"openai": "sk-test", "anthropic": "sk-ant", "gemini": "", "mistral": ""},
+    )
+
+    async def fake_stream(provider, model, messages, api_key, **kwargs):
+        yield f"{provider} answer"
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "ainvoke_stream", fake_stream)
+    submitted = services.provider_executor.stats()["submitted"]
+
+    status, body, _ = _call(
+        create_asgi_app(app),
+        "POST",
+        "/api/v1/compare/stream",
+        {
+            "providers": [
+                {"provider": "openai", "model": "gpt-4"},
+                {"provider": "anthropic", "model": "claude-3-opus"},
+            ],
+            "prompt": "Compare",
+        },
+        cookie=cookie,
+    )
+
+    assert status == 200
+    assert '"chunk": "openai answer"' in body
+    assert '"chunk": "anthropic answer"' in body
+    stats = services.provider_executor.stats()
+    assert stats["submitted"] == submitted + 2
+    assert stats["running"] == 0
+
+
+def test_asgi_routes_answer_while_sync_engine_streams_are_open(client, app, monkeypatch):
+    cookie = _login_cookie(client)
+    client.post(
+        "/api/v1/keys",
+        json={"openai": "sk-test", "anthropic": "", "gemini": "", "mistral": ""},
+    )
+    release = threading.Event()
+    started = []
+
+    def blocking_stream(provider, model, messages, api_key, **kwargs):
+        started.append(True)
+        release.wait(timeout=10)
+        yield "late"
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "invoke_stream", blocking_stream)
+    # More open streams than the event loop's default executor has threads
+    streams = min(32, (os.cpu_count() or 1) + 4) + 2
+    asgi_app = create_asgi_app(app)
+    chat = {"provider": "openai", "model": "gpt-4", "message": "Hi"}
+
+    async def run():
+        tasks = []
+        for opened in range(1, streams + 1):
+            tasks.append(
+                asyncio.create_task(
+                    _exchange(asgi_app, "POST", "/api/v1/chat/stream", chat, cookie)
+                )
+            )
+            deadline = time.monotonic() + 5
+            while len(started) < opened and time.monotonic() < deadline:
+                await asyncio.sleep(0.005)
+        try:
+            assert len(started) == streams
+            health = await asyncio.wait_for(_exchange(asgi_app, "GET", "/health"), timeout=5)
+        finally:
+            release.set()
+        return health, await asyncio.gather(*tasks)
+
+    health, finished = asyncio.run(run())
+
+    assert _response(health)[0] == 200
+    assert all('"content": "late"' in _response(messages)[1] for messages in finished)
+
+
+def test_asgi_rejects_websocket_connections(app):
+    sent = []
+
+    async def receive():
+        return {"type": "websocket.connect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "websocket", "path": "/ws", "headers": []}
+    asyncio.run(create_asgi_app(app)(scope, receive, send))
+
+    assert sent == [{"type": "websocket.close", "code": 1000}]
@@ -1,4 +1,8 @@
-from llmselect.models import APIKey, Conversation
+from sqlalchemy import event
+
+from llmselect.extensions import db
+from llmselect.models import APIKey, Conversation, Message, MessageChunk, User
+from llmselect.services.providers import LLMResult
 
 
 def register_and_login(client, username="chatuser", password="chat-password"):
@@ -19,9 +23,14 @@ def test_chat_creates_and_reuses_conversation(client, app, monkeypatch):
     response = client.post("/api/v1/keys", json=payload)
     assert response.status_code == 200
 
-    responses = iter(["First reply", "Follow-up reply"])
+    responses = iter(
+        [
+            LLMResult("First reply", 12, 2, "stop", 0.4),
+            LLMResult("Follow-up reply", 20, 3, "stop", 0.5),
+        ]
+    )
 
-    def fake_invoke(provider, model, messages, api_key):
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
         assert provider == "openai"
         assert model == "gpt-4"
         assert messages[-1]["role"] == "user"
@@ -39,6 +48,7 @@ def test_chat_creates_and_reuses_conversation(client, app, monkeypatch):
     assert first_response.status_code == 200
     first_data = first_response.get_json()
     assert first_data["response"] == "First reply"
+    assert first_data["usage"]["completion_tokens"] == 2
     conversation_id = first_data["conversationId"]
     assert conversation_id
 
@@ -60,6 +70,40 @@ def test_chat_creates_and_reuses_conversation(client, app, monkeypatch):
         assert len(conversation.messages) == 4
         assert conversation.messages[0].role == "user"
         assert conversation.messages[-1].role == "assistant"
+        # Usage reported by the provider is stored on assistant replies only
+        assert conversation.messages[0].usage() is None
+        assert conversation.messages[-1].usage() == {
+            "promptTokens": 20,
+            "completionTokens": 3,
+            "finishReason": "stop",
+            "latency": 0.5,
+        }
+        # Denormalized summary kept up to date by append_message
+        assert conversation.message_count == 4
+        assert conversation.last_message_role == "assistant"
+        assert conversation.last_user_preview == "And another thing"
+
+    listing = client.get("/api/v1/conversations?includeTotal=true").get_json()
+    assert listing["total"] == 1
+    assert listing["conversations"][0]["messageCount"] == 4
+    assert listing["conversations"][0]["preview"] == "And another thing"
+
+
+def test_conversation_summary_preview_is_truncated(app):
+    services = app.extensions["services"]
+    with app.app_context():
+        user = User(username="previewuser")
+        user.set_password("preview-password")
+        db.session.add(user)
+        db.session.commit()
+
+        conversation = services.conversations.create_conversation(user.id, "openai", "gpt-4")
+        services.conversations.append_message(conversation, "user", "x" * 500)
+        services.conversations.append_message(conversation, "assistant", "reply")
+
+        assert conversation.message_count == 2
+        assert conversation.last_user_preview == "x" * 100
+        assert conversation.last_message_role == "assistant"
 
 
 def test_api_key_storage(client, app):
@@ -89,11 +133,12 @@ def test_chat_stream_endpoint(client, app, monkeypatch):
     assert response.status_code == 200
 
     # Mock LLM service to return chunks
-    def fake_stream_invoke(provider, model, messages, api_key):
+    def fake_stream_invoke(provider, model, messages, api_key, **kwargs):
         yield "Hello"
         yield " "
         yield "world"
         yield "!"
+        yield LLMResult("Hello world!", 4, 3, "stop", 0.2)
 
     services = app.extensions["services"]
     monkeypatch.setattr(services.llm, "invoke_stream", fake_stream_invoke)
@@ -117,3 +162,208 @@ def test_chat_stream_endpoint(client, app, monkeypatch):
     assert "world" in data
     assert '"done": true' in data
     assert '"conversationId"' in data
+    # The final usage result is stored, not sent as content
+    assert data.count('"content"') == 4
+
+    with app.app_context():
+        conversation = Conversation.query.one()
+        reply = conversation.messages[-1]
+        assert reply.content == "Hello world!"
+        assert (reply.prompt_tokens, reply.completion_tokens) == (4, 3)
+
+
+def test_chat_delta_mode_assembles_history_server_side(client, app, monkeypatch):
+    register_and_login(client)
+    client.post("/api/v1/keys", json={"openai": "sk-test-fake-key"})
+
+    sent = []
+    replies = iter(["First reply", "Second reply", "Third reply"])
+
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
+        sent.append(messages)
+        return LLMResult(next(replies))
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "invoke", fake_invoke)
+    monkeypatch.setattr(services.conversations, "history_window", 3)
+
+    payload = {"provider": "openai", "model": "gpt-4", "message": "One"}
+    conversation_id = client.post("/api/v1/chat", json=payload).get_json()["conversationId"]
+    payload["conversationId"] = conversation_id
+    client.post("/api/v1/chat", json={**payload, "message": "Two"})
+
+    # The third turn's history comes from the cached window, not message rows
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = client.post("/api/v1/chat", json={**payload, "message": "Three"})
+    finally:
+        with app.app_context():
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    assert response.get_json()["response"] == "Third reply"
+    assert [[m["content"] for m in messages] for messages in sent] == [
+        ["One"],
+        ["One", "First reply", "Two"],
+        # The last history_window messages, minus the reply that would open them
+        ["Two", "Second reply", "Three"],
+    ]
+    assert not any(s.lstrip().startswith("SELECT") and "FROM messages" in s for s in statements)
+
+
+def test_chat_requires_exactly_one_of_messages_and_message(client):
+    register_and_login(client)
+    base = {"provider": "openai", "model": "gpt-4"}
+
+    neither = client.post("/api/v1/chat", json=base)
+    both = client.post(
+        "/api/v1/chat",
+        json={**base, "message": "Hi", "messages": [{"role": "user", "content": "Hi"}]},
+    )
+
+    assert (neither.status_code, both.status_code) == (422, 422)
+    assert "messages" in both.get_json()["details"]
+
+
+def test_chat_trims_history_to_the_context_window(client, app, monkeypatch):
+    register_and_login(client)
+    client.post("/api/v1/keys", json={"openai": "sk-test-fake-key"})
+
+    sent = []
+
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
+        sent.append(messages)
+        return LLMResult("Reply")
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "invoke", fake_invoke)
+
+    # gpt-4: 8192 token window, 1000 reserved for the reply
+    old_turns = [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": "w" * 4000} for i in range(8)
+    ]
+    payload = {
+        "provider": "openai",
+        "model": "gpt-4",
+        "messages": old_turns + [{"role": "user", "content": "Latest question"}],
+    }
+    data = client.post("/api/v1/chat", json=payload).get_json()
+
+    assert [m["content"] for m in sent[0]][-1] == "Latest question"
+    assert data["context"]["droppedMessages"] == 2
+    assert data["context"]["droppedTokens"] == 2 * (1000 + 4)
+    assert data["context"]["promptTokens"] <= 8192 - 1000
+
+    # The newest message alone is over budget: rejected before dispatch, not stored
+    payload = {"provider": "openai", "model": "gpt-4", "message": "z" * 4000}
+    monkeypatch.setattr(services.model_registry, "get_model_limits", lambda *args: (1500, 1000))
+    response = client.post("/api/v1/chat", json=payload)
+
+    assert response.status_code == 413
+    assert response.get_json()["error"] == "context_length_exceeded"
+    assert len(sent) == 1
+    with app.app_context():
+        latest = Conversation.query.order_by(Conversation.created_at.desc()).first()
+        assert latest.message_count == 0
+
+
+def test_chat_stream_checkpoints_a_draft_that_survives_a_provider_failure(client, app, monkeypatch):
+    register_and_login(client)
+    client.post("/api/v1/keys", json={"openai": "sk-test-fake-key"})
+
+    services = app.extensions["services"]
+    seen = {}
+
+    def fake_stream(provider, model, messages, api_key, **kwargs):
+        yield "Hel"
+        yield "lo"
+        # Both chunks are checkpointed by the time the stream asks for more
+        conversation = Conversation.query.one()
+        seen["chunks"] = [chunk.content for chunk in MessageChunk.query.order_by("seq")]
+        seen["draft"] = services.conversations.get_conversation_view(
+            conversation.id, conversation.user_id
+        ).messages[-1]
+        raise RuntimeError("provider dropped the connection")
+
+    monkeypatch.setattr(services.llm, "invoke_stream", fake_stream)
+    monkeypatch.setattr(services.conversations, "checkpoint_bytes", 1)
+
+    response = client.post(
+        "/api/v1/chat/stream", json={"provider": "openai", "model": "gpt-4", "message": "Hi"}
+    )
+
+    assert '"error"' in response.get_data(as_text=True)
+    assert seen["chunks"] == ["Hel", "lo"]
+    assert (seen["draft"].content, seen["draft"].status) == ("Hello", "streaming")
+
+    with app.app_context():
+        conversation = Conversation.query.one()
+        conversation_id = conversation.id
+        assert conversation.message_count == 2
+        assert MessageChunk.query.count() == 0
+    messages = client.get(f"/api/v1/conversations/{conversation_id}").get_json()["messages"]
+    assert [(m["content"], m["status"]) for m in messages] == [
+        ("Hi", "complete"),
+        ("Hello", "aborted"),
+    ]
+
+
+def test_cached_transcript_shows_each_checkpoint_of_a_streaming_draft(client, app, monkeypatch):
+    register_and_login(client)
+    client.post("/api/v1/keys", json={"openai": "sk-test-fake-key"})
+
+    services = app.extensions["services"]
+    seen = []
+
+    def draft_content():
+        conversation = Conversation.query.one()
+        view = services.conversations.get_conversation_view(conversation.id, conversation.user_id)
+        return view.messages[-1].content
+
+    def fake_stream(provider, model, messages, api_key, **kwargs):
+        # Caches the transcript while the draft is still empty
+        seen.append(draft_content())
+        yield "Hel"
+        seen.append(draft_content())
+        yield "lo"
+        seen.append(draft_content())
+        raise RuntimeError("worker died mid-stream")
+
+    monkeypatch.setattr(services.llm, "invoke_stream", fake_stream)
+    monkeypatch.setattr(services.conversations, "checkpoint_bytes", 1)
+
+    response = client.post(
+        "/api/v1/chat/stream", json={"provider": "openai", "model": "gpt-4", "message": "Hi"}
+    )
+
+    assert '"error"' in response.get_data(as_text=True)
+    assert seen == ["", "Hel", "Hello"]
+
+
+def test_chat_stream_keeps_partial_reply_when_client_disconnects(client, app, monkeypatch):
+    register_and_login(client)
+    client.post("/api/v1/keys", json={"openai": "sk-test-fake-key"})
+
+    def fake_stream(provider, model, messages, api_key, **kwargs):
+        yield "Partial"
+        yield " answer"
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "invoke_stream", fake_stream)
+
+    response = client.post(
+        "/api/v1/chat/stream",
+        json={"provider": "openai", "model": "gpt-4", "message": "Hi"},
+        buffered=False,
+    )
+    assert b"Partial" in next(iter(response.response))
+    response.close()
+
+    with app.app_context():
+        reply = Message.query.filter_by(role="assistant").one()
+        assert (reply.content, reply.status) == ("Partial", "aborted")
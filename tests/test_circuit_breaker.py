@@ -0,0 +1,169 @@
+"""Tests for the per provider/model circuit breaker."""
+
+import pytest
+
+from llmselect.services.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitBreakerRegistry,
+)
+from llmselect.services.llm import LLMService
+from llmselect.services.providers import LLMResult
+from llmselect.utils.errors import AppError, ProviderUnavailableError
+
+from test_comparisons import make_authenticated_post, register_and_login
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fail():
+    raise AppError("OpenAI API unreachable")
+
+
+def _breaker(clock, **options):
+    defaults = dict(min_requests=4, error_rate=0.5, open_seconds=30, half_open_probes=2)
+    defaults.update(options)
+    return CircuitBreaker("openai", "gpt-4", clock=clock, **defaults)
+
+
+def test_opens_on_error_rate_and_recovers_through_half_open_probes():
+    clock = FakeClock()
+    breaker = _breaker(clock)
+
+    breaker.call(lambda: "ok")
+    breaker.call(lambda: "ok")
+    for _ in range(2):
+        with pytest.raises(AppError):
+            breaker.call(_fail)
+    assert breaker.state == OPEN
+
+    with pytest.raises(ProviderUnavailableError):
+        breaker.call(lambda: "never called")
+
+    clock.now += 31
+    assert breaker.call(lambda: "probe") == "probe"
+    assert breaker.state == HALF_OPEN
+    breaker.call(lambda: "probe")
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe_failure_reopens_and_limits_concurrent_probes():
+    clock = FakeClock()
+    breaker = _breaker(clock, half_open_probes=1)
+    for _ in range(4):
+        with pytest.raises(AppError):
+            breaker.call(_fail)
+    clock.now += 31
+
+    stream = breaker.guard_stream(iter(["a", "b"]))
+    assert next(stream) == "a"  # the single probe is in flight
+    with pytest.raises(ProviderUnavailableError):
+        breaker.call(lambda: "second probe")
+    stream.close()  # abandoned by the client: neutral, frees the probe slot
+
+    with pytest.raises(AppError):
+        breaker.call(_fail)
+    assert breaker.state == OPEN
+
+
+def test_client_errors_and_slow_calls():
+    clock = FakeClock()
+    breaker = _breaker(clock, slow_call_seconds=5, slow_call_rate=0.5)
+
+    def invalid_key():
+        raise AppError("OpenAI API error", extra={"status_code": 401})
+
+    for _ in range(4):
+        with pytest.raises(AppError):
+            breaker.call(invalid_key)
+    assert breaker.snapshot()["window_requests"] == 0
+
+    def slow():
+        clock.now += 6
+        return "slow"
+
+    for _ in range(4):
+        breaker.call(slow)
+    assert breaker.state == OPEN
+
+
+def test_compare_fails_fast_for_open_provider(client, app, monkeypatch):
+    register_and_login(client)
+    make_authenticated_post(
+        client,
+        "/api/v1/keys",
+        json={"openai": "sk-test", "anthropic": "sk-ant-test", "gemini": "", "mistral": ""},
+    )
+
+    services = app.extensions["services"]
+    registry = CircuitBreakerRegistry(min_requests=1, open_seconds=60)
+    monkeypatch.setattr(services.llm, "circuit_breakers", registry)
+    with pytest.raises(AppError):
+        registry.get("openai", "gpt-4").call(_fail)
+
+    invoked = []
+
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
+        invoked.append(provider)
+        return LLMResult("fine")
+
+    monkeypatch.setattr(services.llm, "invoke", fake_invoke)
+
+    response = make_authenticated_post(
+        client,
+        "/api/v1/compare",
+        json={
+            "providers": [
+                {"provider": "openai", "model": "gpt-4"},
+                {"provider": "anthropic", "model": "claude-3-5-sonnet-20241022"},
+            ],
+            "prompt": "Is anyone there?",
+        },
+    )
+
+    assert response.status_code == 200
+    results = {result["provider"]: result for result in response.get_json()["results"]}
+    assert results["openai"]["error"] is True
+    assert "temporarily unavailable" in results["openai"]["response"]
+    assert results["anthropic"]["response"] == "fine"
+    assert invoked == ["anthropic"]
+
+
+def test_registry_evicts_least_recently_used_closed_breakers():
+    registry = CircuitBreakerRegistry(max_breakers=3, min_requests=1, open_seconds=60)
+    with pytest.raises(AppError):
+        registry.get("openai", "failing").call(_fail)
+    registry.get("openai", "old")
+    registry.get("openai", "recent")
+    registry.get("openai", "old")  # Touched again, so "recent" is now the oldest closed one
+
+    registry.get("openai", "new")
+
+    assert [(item["model"], item["state"]) for item in registry.stats()] == [
+        ("failing", "open"),
+        ("old", "closed"),
+        ("new", "closed"),
+    ]
+
+
+def test_llm_service_guards_upstream_calls(monkeypatch):
+    service = LLMService(circuit_breakers=CircuitBreakerRegistry(min_requests=1))
+
+    def down(provider, model, messages, api_key, deadline):
+        raise AppError("OpenAI API unreachable")
+
+    monkeypatch.setattr(service, "_dispatch_invoke", down)
+    messages = [{"role": "user", "content": "hi"}]
+    with pytest.raises(AppError):
+        service.invoke("openai", "gpt-4", messages, "key")
+    with pytest.raises(ProviderUnavailableError):
+        service.invoke("openai", "gpt-4", messages, "key")
+    assert service.circuit_breakers.stats()[0]["state"] == OPEN
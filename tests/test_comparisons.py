@@ -2,6 +2,8 @@
 
 import time
 
+from llmselect.services.providers import LLMResult
+
 
 def register_and_login(client, username="testuser", password="testpassword"):
     """Helper to register and login a test user."""
@@ -43,12 +45,17 @@ def make_authenticated_post(client, url, json=None):
 def test_compare_saves_to_database(client, app, monkeypatch):
     """Comparison results are persisted to database."""
     register_and_login(client)
+    make_authenticated_post(
+        client,
+        "/api/v1/keys",
+        json={"openai": "sk-test", "anthropic": "sk-ant-test", "gemini": "", "mistral": ""},
+    )
 
     # Mock LLM service to avoid real API calls
-    def fake_invoke(provider, model, messages, api_key):
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
         if provider == "openai":
-            return "Response from GPT-4"
-        return "Response from Claude"
+            return LLMResult("Response from GPT-4", 6, 4, "stop", 1.5)
+        return LLMResult("Response from Claude", 7, 4, "end_turn", 1.1)
 
     services = app.extensions["services"]
     monkeypatch.setattr(services.llm, "invoke", fake_invoke)
@@ -93,6 +100,12 @@ def test_compare_saves_to_database(client, app, monkeypatch):
         assert comparison is not None
         assert comparison.prompt == "Test prompt for comparison"
         assert len(comparison.results) == 2
+        # Reported usage is stored instead of a length-based estimate
+        saved = {entry["provider"]: entry for entry in comparison.results}
+        assert saved["openai"]["tokens"] == 4
+        assert saved["openai"]["prompt_tokens"] == 6
+        assert saved["anthropic"]["finish_reason"] == "end_turn"
+        assert saved["anthropic"]["latency"] == 1.1
 
 
 def test_get_comparison_history(client, app, monkeypatch):
@@ -100,8 +113,8 @@ def test_get_comparison_history(client, app, monkeypatch):
     register_and_login(client)
 
     # Create some comparisons
-    def fake_invoke(provider, model, messages, api_key):
-        return "Mock response"
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
+        return LLMResult("Mock response")
 
     services = app.extensions["services"]
     monkeypatch.setattr(services.llm, "invoke", fake_invoke)
@@ -137,10 +150,10 @@ def test_vote_on_comparison(client, app, monkeypatch):
     register_and_login(client)
 
     # Create comparison
-    def fake_invoke(provider, model, messages, api_key):
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
         if provider == "openai":
-            return "Response from GPT-4"
-        return "Response from Claude"
+            return LLMResult("Response from GPT-4")
+        return LLMResult("Response from Claude")
 
     services = app.extensions["services"]
     monkeypatch.setattr(services.llm, "invoke", fake_invoke)
@@ -158,6 +171,7 @@ def test_vote_on_comparison(client, app, monkeypatch):
     )
 
     comparison_id = compare_response.get_json()["id"]
+    assert client.get("/api/v1/comparisons").get_json()["comparisons"][0]["preferred_index"] is None
 
     # Vote for first response
     vote_response = make_authenticated_post(
@@ -181,14 +195,18 @@ def test_vote_on_comparison(client, app, monkeypatch):
     data2 = vote_response2.get_json()
     assert data2["preferred_index"] == 1
 
+    # The cached history page was invalidated by the votes
+    history = client.get("/api/v1/comparisons").get_json()["comparisons"]
+    assert history[0]["preferred_index"] == 1
+
 
 def test_vote_invalid_index(client, app, monkeypatch):
     """Voting with invalid index returns error."""
     register_and_login(client)
 
     # Create comparison with 2 results
-    def fake_invoke(provider, model, messages, api_key):
-        return f"Response from {provider}"
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
+        return LLMResult(f"Response from {provider}")
 
     services = app.extensions["services"]
     monkeypatch.setattr(services.llm, "invoke", fake_invoke)
@@ -235,8 +253,8 @@ def test_comparison_pagination(client, app, monkeypatch):
     register_and_login(client)
 
     # Create 10 comparisons
-    def fake_invoke(provider, model, messages, api_key):
-        return "Mock response"
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
+        return LLMResult("Mock response")
 
     services = app.extensions["services"]
     monkeypatch.setattr(services.llm, "invoke", fake_invoke)
@@ -268,15 +286,51 @@ def test_comparison_pagination(client, app, monkeypatch):
     assert data["comparisons"][0]["id"] != data2["comparisons"][0]["id"]
 
 
+def test_comparison_cursor_pagination(client, app, monkeypatch):
+    """Comparison history pages follow opaque keyset cursors."""
+    register_and_login(client)
+
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
+        return LLMResult("Mock response")
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "invoke", fake_invoke)
+
+    for i in range(5):
+        make_authenticated_post(
+            client,
+            "/api/v1/compare",
+            json={
+                "providers": [{"provider": "openai", "model": "gpt-4"}],
+                "prompt": f"Prompt {i}",
+            },
+        )
+
+    prompts = []
+    url = "/api/v1/comparisons?limit=2&includeTotal=true"
+    while url:
+        data = client.get(url).get_json()
+        assert data["total"] == 5
+        prompts += [c["prompt"] for c in data["comparisons"]]
+        cursor = data["nextCursor"]
+        url = f"/api/v1/comparisons?limit=2&includeTotal=true&cursor={cursor}" if cursor else None
+
+    assert prompts == [f"Prompt {i}" for i in reversed(range(5))]
+
+    response = client.get("/api/v1/comparisons?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert response.get_json()["details"]["field"] == "cursor"
+
+
 def test_comparison_with_error_handling(client, app, monkeypatch):
     """Comparison handles errors gracefully when a provider fails."""
     register_and_login(client)
 
     # Mock one success and one failure
-    responses = iter(["Successful response", None])
+    responses = iter([LLMResult("Successful response"), None])
     errors = iter([None, Exception("Provider failed")])
 
-    def fake_invoke(provider, model, messages, api_key):
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
         error = next(errors)
         if error:
             raise error
@@ -314,8 +368,8 @@ def test_delete_comparison(client, app, monkeypatch):
     register_and_login(client)
 
     # Mock LLM service
-    def fake_invoke(provider, model, messages, api_key):
-        return "Test response"
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
+        return LLMResult("Test response")
 
     services = app.extensions["services"]
     monkeypatch.setattr(services.llm, "invoke", fake_invoke)
@@ -345,3 +399,67 @@ def test_delete_comparison(client, app, monkeypatch):
     list_response2 = client.get("/api/v1/comparisons")
     assert list_response2.status_code == 200
     assert len(list_response2.get_json()["comparisons"]) == 0
+
+
+def test_compare_stream_interleaves_providers(client, app, monkeypatch):
+    """Provider streams run concurrently and their chunks are interleaved."""
+    import json
+    import threading
+
+    register_and_login(client)
+    make_authenticated_post(
+        client,
+        "/api/v1/keys",
+        json={"openai": "sk-test", "anthropic": "sk-ant-test", "gemini": "", "mistral": ""},
+    )
+
+    second_started = threading.Event()
+
+    def fake_stream(provider, model, messages, api_key, **kwargs):
+        if provider == "openai":
+            yield "slow-1"
+            # Only completes promptly if the other provider is streaming concurrently
+            second_started.wait(timeout=2)
+            yield "slow-2"
+        else:
+            second_started.set()
+            yield "fast-1"
+            yield LLMResult("fast-1", 3, 1, "stop", 0.2)
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "invoke_stream", fake_stream)
+
+    response = make_authenticated_post(
+        client,
+        "/api/v1/compare/stream",
+        json={
+            "providers": [
+                {"provider": "openai", "model": "gpt-4"},
+                {"provider": "anthropic", "model": "claude-3-5-sonnet-20241022"},
+            ],
+            "prompt": "Race",
+        },
+    )
+    assert response.status_code == 200
+
+    events = [
+        json.loads(line[len("data: ") :])
+        for line in response.get_data(as_text=True).splitlines()
+        if line.startswith("data: ")
+    ]
+    chunks = [event.get("chunk") for event in events if event.get("event") == "chunk"]
+    assert chunks.index("fast-1") < chunks.index("slow-2")
+    completed = {
+        event["provider"]: event["data"] for event in events if event.get("event") == "complete"
+    }
+    # Usage comes from the stream's final result when the provider reported it
+    assert completed["anthropic"]["completion_tokens"] == 1
+    assert completed["anthropic"]["tokens"] == 1
+    assert completed["openai"]["completion_tokens"] is None
+
+    done = events[-1]
+    assert done["event"] == "done"
+    assert "comparisonId" in done
+    provider_metrics = done["metrics"]["providers"]
+    assert [entry["provider"] for entry in provider_metrics] == ["openai", "anthropic"]
+    assert all(entry["ttft"] is not None for entry in provider_metrics)
@@ -0,0 +1,100 @@
+"""Tests for fitting chat histories into model context windows."""
+
+import pytest
+
+from llmselect.services.context_budget import MESSAGE_OVERHEAD_TOKENS, ContextBudget
+from llmselect.services.model_registry import ModelRegistryService
+from llmselect.utils.errors import ContextLengthError
+
+
+class FixedLimits(ModelRegistryService):
+    def __init__(self, limits):
+        super().__init__()
+        self.limits = limits
+
+    def get_model_limits(self, provider, model):
+        return self.limits
+
+
+class LengthCounter:
+    def count_many(self, provider, model, texts):
+        return [len(text) for text in texts]
+
+
+def _message(role, tokens):
+    return {"role": role, "content": "x", "tokens": tokens}
+
+
+def test_history_that_fits_is_sent_unchanged():
+    budget = ContextBudget(FixedLimits((1000, 100)), max_tokens=200)
+    messages = [_message("user", 100), _message("assistant", 100), _message("user", 100)]
+
+    fit = budget.fit("openai", "gpt-4o", messages)
+
+    assert fit.messages == messages
+    assert fit.report() == {
+        "promptTokens": 300 + 3 * MESSAGE_OVERHEAD_TOKENS,
+        "droppedMessages": 0,
+        "droppedTokens": 0,
+        "contextWindow": 1000,
+    }
+
+
+def test_oldest_turns_are_dropped_keeping_system_prompt_and_latest_message():
+    # Budget: 1000 - min(max_tokens, model maxTokens) = 650
+    budget = ContextBudget(FixedLimits((1000, 350)), max_tokens=500)
+    messages = [
+        _message("system", 96),
+        _message("user", 196),
+        _message("assistant", 196),
+        _message("user", 196),
+        _message("assistant", 196),
+        _message("user", 196),
+    ]
+
+    fit = budget.fit("openai", "gpt-4o", messages)
+
+    # Dropping three messages fits, but the fourth goes too rather than opening the
+    # history with an assistant reply
+    assert [m["role"] for m in fit.messages] == ["system", "user"]
+    assert fit.messages[0] is messages[0] and fit.messages[-1] is messages[-1]
+    assert (fit.dropped_messages, fit.dropped_tokens) == (4, 800)
+    assert fit.prompt_tokens == 300
+
+
+def test_unknown_models_use_the_default_window_and_counts_missing_tokens():
+    budget = ContextBudget(
+        FixedLimits(None),
+        max_tokens=100,
+        default_context_window=300,
+        token_counter=LengthCounter(),
+    )
+    messages = [
+        {"role": "user", "content": "a" * 150},
+        {"role": "assistant", "content": "b" * 50},
+        {"role": "user", "content": "c" * 50},
+    ]
+
+    fit = budget.fit("openai", "custom-model", messages)
+
+    assert [m["content"][0] for m in fit.messages] == ["c"]
+    assert fit.dropped_tokens == 150 + 50 + 2 * MESSAGE_OVERHEAD_TOKENS
+    assert fit.context_window == 300
+
+
+def test_message_that_cannot_fit_fails_before_dispatch():
+    budget = ContextBudget(FixedLimits((1000, 100)), max_tokens=100)
+
+    with pytest.raises(ContextLengthError) as excinfo:
+        budget.fit("openai", "gpt-4o", [_message("user", 10), _message("user", 2000)])
+
+    assert excinfo.value.status_code == 413
+    assert excinfo.value.extra["budgetTokens"] == 900
+
+
+def test_registry_limits_match_dated_model_ids():
+    registry = ModelRegistryService()
+
+    assert registry.get_model_limits("openai", "gpt-4o-2024-08-06") == (128000, 4096)
+    assert registry.get_model_limits("openai", "gpt-4o-mini") == (128000, 16384)
+    assert registry.get_model_limits("openai", "unknown") is None
@@ -0,0 +1,208 @@
+"""Tests for the conversation list and search endpoints."""
+
+import pickle
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+
+from llmselect.extensions import cache, db
+from llmselect.models import Conversation, User
+from llmselect.utils.cache_namespace import CacheNamespace
+
+
+def _login(client, username="listuser", password="list-password"):
+    client.post("/api/v1/auth/register", json={"username": username, "password": password})
+    client.post("/api/v1/auth/login", json={"username": username, "password": password})
+    with client.application.app_context():
+        return User.query.filter_by(username=username).one().id
+
+
+def _seed(app, user_id, count, start=None):
+    start = start or datetime(2026, 1, 1)
+    with app.app_context():
+        for index in range(count):
+            # Pairs share a timestamp so the id tie-breaker is exercised
+            db.session.add(
+                Conversation(
+                    user_id=user_id,
+                    provider="openai",
+                    model="gpt-4",
+                    title=f"Conversation {index}",
+                    last_message_at=start + timedelta(minutes=index // 2),
+                )
+            )
+        db.session.commit()
+        return [
+            conversation.id
+            for conversation in Conversation.query.filter_by(user_id=user_id).order_by(
+                Conversation.last_message_at.desc(), Conversation.id.desc()
+            )
+        ]
+
+
+def test_conversation_list_follows_cursors(client, app):
+    user_id = _login(client)
+    expected = _seed(app, user_id, 7)
+
+    seen = []
+    cursor = None
+    while True:
+        url = "/api/v1/conversations?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        data = client.get(url).get_json()
+        assert "total" not in data
+        seen += [conversation["id"] for conversation in data["conversations"]]
+        cursor = data["nextCursor"]
+        if cursor is None:
+            break
+
+    assert seen == expected
+
+
+def test_conversation_list_total_and_offset_mode(client, app):
+    user_id = _login(client)
+    expected = _seed(app, user_id, 5)
+
+    data = client.get("/api/v1/conversations?limit=2&includeTotal=true").get_json()
+    assert data["total"] == 5
+    assert len(data["conversations"]) == 2
+
+    # The page parameter keeps the older OFFSET response shape
+    data = client.get("/api/v1/conversations?page=3&limit=2").get_json()
+    assert (data["total"], data["totalPages"], data["page"]) == (5, 3, 3)
+    assert [conversation["id"] for conversation in data["conversations"]] == expected[4:]
+
+
+def test_conversation_list_rejects_malformed_cursor(client, app):
+    _login(client)
+    response = client.get("/api/v1/conversations?cursor=%%%")
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "bad_request"
+
+
+def _seed_messages(app, user_id, title, contents):
+    with app.app_context():
+        services = app.extensions["services"]
+        conversation = services.conversations.create_conversation(user_id, "openai", "gpt-4")
+        conversation.title = title
+        for index, content in enumerate(contents):
+            services.conversations.append_message(
+                conversation, "user" if index % 2 == 0 else "assistant", content
+            )
+        return conversation.id
+
+
+def test_search_ranks_and_highlights_messages(client, app):
+    user_id = _login(client)
+    best = _seed_messages(
+        app,
+        user_id,
+        "Indexes",
+        ["How do database indexes work?", "Indexes speed up indexed lookups <fast>."],
+    )
+    other = _seed_messages(app, user_id, "Misc", ["Tell me about cooking", "An index of recipes"])
+
+    data = client.get("/api/v1/conversations/search?q=index").get_json()
+
+    assert data["nextOffset"] is None
+    assert [result["conversationId"] for result in data["results"]][0] == best
+    assert {result["conversationId"] for result in data["results"]} == {best, other}
+    assistant = next(r for r in data["results"] if r["snippet"].startswith("<mark>Indexes"))
+    assert assistant["role"] == "assistant"
+    assert assistant["conversationTitle"] == "Indexes"
+    # Message text is escaped, only the highlight markup is HTML
+    assert "&lt;fast&gt;" in assistant["snippet"]
+    assert "<mark>indexed</mark>" in assistant["snippet"]
+
+
+def test_search_paginates_and_is_scoped_to_the_user(client, app):
+    user_id = _login(client)
+    _seed_messages(app, user_id, "Mine", [f"kubernetes question {i}" for i in range(3)])
+    with app.app_context():
+        stranger = User(username="stranger")
+        stranger.set_password("stranger-password")
+        db.session.add(stranger)
+        db.session.commit()
+        stranger_id = stranger.id
+    _seed_messages(app, stranger_id, "Theirs", ["kubernetes secrets"])
+
+    first = client.get("/api/v1/conversations/search?q=Kubernetes&limit=2").get_json()
+    second = client.get("/api/v1/conversations/search?q=kubernetes&limit=2&offset=2").get_json()
+
+    assert (len(first["results"]), first["nextOffset"]) == (2, 2)
+    assert (len(second["results"]), second["nextOffset"]) == (1, None)
+    titles = {r["conversationTitle"] for r in first["results"] + second["results"]}
+    assert titles == {"Mine"}
+
+
+def test_search_drops_deleted_conversations_and_rejects_empty_queries(client, app):
+    user_id = _login(client)
+    conversation_id = _seed_messages(app, user_id, "Doomed", ["ephemeral thoughts"])
+    assert len(client.get("/api/v1/conversations/search?q=ephemeral").get_json()["results"]) == 1
+
+    client.delete(f"/api/v1/conversations/{conversation_id}")
+
+    assert client.get("/api/v1/conversations/search?q=ephemeral").get_json()["results"] == []
+    response = client.get("/api/v1/conversations/search?q=%20")
+    assert response.status_code == 400
+    # FTS5 query syntax in user input is treated as plain words
+    response = client.get('/api/v1/conversations/search?q=NEAR("a" OR')
+    assert response.status_code == 200
+
+
+def test_conversation_list_cache_is_per_user_and_invalidated_on_change(client, app):
+    user_id = _login(client)
+    conversation_id = _seed_messages(app, user_id, "Cached", ["first question"])
+    other = app.test_client()
+    _login(other, "otheruser", "other-password")
+
+    assert len(client.get("/api/v1/conversations").get_json()["conversations"]) == 1
+    # Same query string, different user: must not be served the first user's page
+    assert other.get("/api/v1/conversations").get_json()["conversations"] == []
+
+    with app.app_context():
+        services = app.extensions["services"]
+        conversation = services.conversations.get_conversation(conversation_id, user_id)
+        services.conversations.append_message(conversation, "user", "second question")
+
+    listed = client.get("/api/v1/conversations").get_json()["conversations"]
+    assert (listed[0]["messageCount"], listed[0]["preview"]) == (2, "second question")
+
+    client.patch(f"/api/v1/conversations/{conversation_id}", json={"title": "Renamed"})
+    assert client.get("/api/v1/conversations").get_json()["conversations"][0]["title"] == "Renamed"
+
+
+def test_cache_namespace_invalidation_orphans_keys(app):
+    with app.app_context():
+        namespace = CacheNamespace("test")
+        cache.set(namespace.key(1, "page"), "stale")
+        cache.set(namespace.key(2, "page"), "kept")
+
+        namespace.invalidate(1)
+
+        assert cache.get(namespace.key(1, "page")) is None
+        assert cache.get(namespace.key(2, "page")) == "kept"
+
+
+def test_cached_conversation_view_skips_the_database(client, app):
+    user_id = _login(client)
+    conversation_id = _seed_messages(app, user_id, "Projected", ["hello", "hi there"])
+    first = client.get(f"/api/v1/conversations/{conversation_id}").get_json()
+
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", record)
+        try:
+            view = app.extensions["services"].conversations.get_conversation_view(
+                conversation_id, user_id
+            )
+        finally:
+            event.remove(db.engine, "before_cursor_execute", record)
+
+    assert statements == []
+    assert pickle.loads(pickle.dumps(view)) == view
+    assert {**view.to_json(), "messageCount": 2} == first
+    assert [m["content"] for m in first["messages"]] == ["hello", "hi there"]
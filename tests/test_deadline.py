@@ -0,0 +1,143 @@
+"""Tests for request deadlines and provider timeouts."""
+
+import httpx
+import pytest
+import requests
+
+from llmselect.services.deadline import Deadline, ProviderTimeouts
+from llmselect.services.llm import LLMService
+from llmselect.utils.errors import AppError, ProviderTimeoutError
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class OkResponse:
+    ok = True
+    status_code = 200
+
+    def json(self):
+        return {"choices": [{"message": {"content": "done"}}]}
+
+
+def test_deadline_caps_timeouts_to_remaining_budget():
+    clock = FakeClock()
+    deadline = Deadline(10, clock=clock)
+    timeouts = ProviderTimeouts(connect=5, read=30, stream_idle=15)
+
+    assert timeouts.for_attempt(deadline, stream=False) == (5, 10)
+    assert timeouts.for_attempt(deadline, stream=True) == (5, 10)
+    clock.now += 8
+    assert timeouts.for_attempt(deadline, stream=False) == (2, 2)
+    assert deadline.allows(1) and not deadline.allows(3)
+
+    clock.now += 2
+    with pytest.raises(ProviderTimeoutError) as excinfo:
+        deadline.check("OpenAI")
+    assert excinfo.value.status_code == 504
+
+
+def test_connect_failures_are_retried_with_split_timeouts(monkeypatch):
+    service = LLMService(timeouts=ProviderTimeouts(connect=2, read=20), backoff_factor=0)
+    timeouts = []
+
+    def flaky_post(url, timeout=None, **kwargs):
+        timeouts.append(timeout)
+        if len(timeouts) < 3:
+            raise requests.ConnectTimeout("connect timed out")
+        return OkResponse()
+
+    monkeypatch.setattr(service.session, "post", flaky_post)
+
+    assert service.invoke("openai", "gpt-4", MESSAGES, "key").text == "done"
+    assert len(timeouts) == 3
+    connect, read = timeouts[-1]
+    assert connect == pytest.approx(2, abs=0.5)
+    assert read == pytest.approx(20, abs=0.5)
+
+
+def test_retries_stop_when_the_deadline_runs_out(monkeypatch):
+    service = LLMService(max_retries=10, backoff_factor=0.05)
+    attempts = []
+
+    def unreachable(url, **kwargs):
+        attempts.append(url)
+        raise requests.ConnectTimeout("connect timed out")
+
+    monkeypatch.setattr(service.session, "post", unreachable)
+
+    with pytest.raises(ProviderTimeoutError):
+        service.invoke("openai", "gpt-4", MESSAGES, "key", deadline=Deadline(0.2))
+    # 0.05 + 0.1 of backoff fit in the budget, the next 0.2 does not
+    assert len(attempts) == 3
+
+
+def test_read_timeout_is_not_retried(monkeypatch):
+    service = LLMService(backoff_factor=0)
+    attempts = []
+
+    def slow(url, **kwargs):
+        attempts.append(url)
+        raise requests.ReadTimeout("read timed out")
+
+    monkeypatch.setattr(service.session, "post", slow)
+
+    with pytest.raises(ProviderTimeoutError):
+        service.invoke("openai", "gpt-4", MESSAGES, "key")
+    assert len(attempts) == 1
+
+
+def test_async_engine_retries_connect_failures_but_not_read_timeouts():
+    attempts = []
+
+    def handler(request):
+        attempts.append(request)
+        if len(attempts) == 1:
+            raise httpx.ConnectError("refused")
+        raise httpx.ReadTimeout("read timed out")
+
+    service = LLMService(
+        engine="async",
+        async_engine_options={"transport": httpx.MockTransport(handler), "backoff_factor": 0},
+    )
+    try:
+        with pytest.raises(ProviderTimeoutError):
+            service.invoke("openai", "gpt-4", MESSAGES, "key")
+    finally:
+        service.async_engine.close()
+    assert len(attempts) == 2
+
+
+def test_stream_idle_timeout_fails_stalled_stream():
+    class StallingStream(httpx.AsyncByteStream):
+        async def __aiter__(self):
+            yield b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+            raise httpx.ReadTimeout("idle")
+
+    def handler(request):
+        assert request.extensions["timeout"]["read"] == pytest.approx(1.0, abs=0.1)
+        return httpx.Response(200, stream=StallingStream())
+
+    service = LLMService(
+        engine="async",
+        timeouts=ProviderTimeouts(stream_idle=1.0),
+        async_engine_options={"transport": httpx.MockTransport(handler)},
+    )
+    chunks = []
+    try:
+        with pytest.raises(AppError) as excinfo:
+            for chunk in service.invoke_stream("openai", "gpt-4", MESSAGES, "key"):
+                chunks.append(chunk)
+    finally:
+        service.async_engine.close()
+
+    assert chunks == ["Hel"]
+    assert isinstance(excinfo.value, ProviderTimeoutError)
+    assert excinfo.value.extra == {"idle_timeout": 1.0}
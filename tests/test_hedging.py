@@ -0,0 +1,153 @@
+"""Tests for hedged non-streaming LLM calls."""
+
+import asyncio
+import threading
+import time
+
+from llmselect.services.hedging import Hedger, LatencyTracker
+from llmselect.services.llm import LLMService
+from llmselect.services.providers import LLMResult
+
+
+def _warm(hedger, latency=0.01, count=20):
+    tracker = hedger._tracker("openai", "gpt-4")
+    for _ in range(count):
+        tracker.record(latency)
+
+
+def test_latency_tracker_percentiles():
+    tracker = LatencyTracker(size=100)
+    for value in range(1, 101):
+        tracker.record(value / 100)
+    assert tracker.percentile(50) == 0.51
+    assert tracker.percentile(99) == 0.99
+    assert tracker.percentiles(50, 99) == [0.51, 0.99]
+    assert LatencyTracker().percentiles(50, 99) == [None, None]
+
+
+def test_trackers_are_bounded_by_least_recent_use():
+    hedger = Hedger(max_trackers=2)
+    hedger.call("openai", "old", lambda: "ok")
+    hedger.call("openai", "recent", lambda: "ok")
+    hedger.call("openai", "old", lambda: "ok")
+    hedger.call("openai", "new", lambda: "ok")
+
+    models = [(item["model"], item["samples"]) for item in hedger.stats()["models"]]
+    assert models == [("old", 2), ("new", 1)]
+
+
+def test_slow_call_is_hedged_and_fastest_attempt_wins():
+    hedger = Hedger(budget=1.0, min_samples=20, min_delay=0.01)
+    _warm(hedger)
+    attempts = []
+    release_first = threading.Event()
+
+    def attempt():
+        attempts.append(time.monotonic())
+        if len(attempts) == 1:
+            release_first.wait(timeout=2)  # the primary stalls
+            return "slow"
+        return "fast"
+
+    try:
+        assert hedger.call("openai", "gpt-4", attempt) == "fast"
+    finally:
+        release_first.set()
+        hedger.shutdown()
+    assert len(attempts) == 2
+    assert hedger.hedges == 1 and hedger.hedge_wins == 1
+
+
+def test_hedges_respect_budget():
+    hedger = Hedger(budget=0.05, min_samples=1, min_delay=0.001)
+    _warm(hedger, latency=0.001, count=1)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.01)
+        return "ok"
+
+    try:
+        for _ in range(10):
+            hedger.call("openai", "gpt-4", slow)
+    finally:
+        hedger.shutdown()
+    # 11 calls tracked (including warm-up) allow no hedge at a 5% budget
+    assert hedger.hedges == 0
+    assert len(calls) == 10
+
+
+def test_calls_run_unhedged_in_place_when_every_hedge_worker_is_busy():
+    hedger = Hedger(budget=1.0, min_samples=20, min_delay=0.01, max_workers=1)
+    _warm(hedger)
+    release = threading.Event()
+    threads = []
+
+    def attempt():
+        threads.append(threading.current_thread().name)
+        if len(threads) == 1:
+            release.wait(timeout=2)  # holds the only hedge worker
+        return "ok"
+
+    background = threading.Thread(target=hedger.call, args=("openai", "gpt-4", attempt))
+    background.start()
+    try:
+        while not threads:
+            time.sleep(0.001)
+        # Not queued behind the busy worker, and never hedged
+        assert hedger.call("openai", "gpt-4", attempt) == "ok"
+        assert threads[1] == threading.current_thread().name
+        assert hedger.hedges == 0
+    finally:
+        release.set()
+        background.join()
+        hedger.shutdown()
+
+
+def test_async_hedge_cancels_loser():
+    hedger = Hedger(budget=1.0, min_samples=20, min_delay=0.01)
+    _warm(hedger)
+    cancelled = []
+    started = []
+
+    async def attempt():
+        started.append(True)
+        if len(started) == 1:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return "hedged"
+
+    async def run():
+        result = await hedger.acall("openai", "gpt-4", attempt)
+        await asyncio.sleep(0)  # let the cancelled primary unwind
+        return result
+
+    assert asyncio.run(run()) == "hedged"
+    assert cancelled == [True]
+
+
+def test_llm_service_hedges_invoke(monkeypatch):
+    hedger = Hedger(budget=1.0, min_samples=20, min_delay=0.01)
+    _warm(hedger)
+    service = LLMService(hedger=hedger)
+    release = threading.Event()
+    calls = []
+
+    def fake_call(provider, model, messages, api_key, deadline):
+        calls.append(model)
+        if len(calls) == 1:
+            release.wait(timeout=2)
+        return LLMResult(f"answer {len(calls)}")
+
+    monkeypatch.setattr(service, "_dispatch_invoke", fake_call)
+    try:
+        result = service.invoke("openai", "gpt-4", [{"role": "user", "content": "hi"}], "key")
+    finally:
+        release.set()
+        hedger.shutdown()
+    assert result.text == "answer 2"
+    assert hedger.stats()["models"][0]["p50"] is not None
@@ -1,3 +1,5 @@
+import json
+
 import pytest
 
 from llmselect.services.llm import LLMService
@@ -16,6 +18,9 @@ class DummyResponse:
             raise ValueError("No JSON available")
         return self._json
 
+    def close(self):
+        pass
+
 
 def test_openai_request_sanitises_messages(monkeypatch):
     service = LLMService()
@@ -31,9 +36,11 @@ def test_openai_request_sanitises_messages(monkeypatch):
                     {
                         "message": {
                             "content": "sanitised response",
-                        }
+                        },
+                        "finish_reason": "stop",
                     }
-                ]
+                ],
+                "usage": {"prompt_tokens": 9, "completion_tokens": 3, "total_tokens": 12},
             },
             status=200,
         )
@@ -47,15 +54,20 @@ def test_openai_request_sanitises_messages(monkeypatch):
         api_key="fake-key",
     )
 
-    assert result == "sanitised response"
+    assert result.text == "sanitised response"
+    assert (result.prompt_tokens, result.completion_tokens) == (9, 3)
+    assert result.finish_reason == "stop"
+    assert result.latency is not None
     assert "\x00" not in captured["json"]["messages"][0]["content"]
     assert captured["url"].endswith("/v1/chat/completions")
 
 
 def test_provider_error_raises_app_error(monkeypatch):
-    service = LLMService()
+    service = LLMService(backoff_factor=0)
+    attempts = []
 
     def failing_post(*args, **kwargs):
+        attempts.append(kwargs["json"])
         return DummyResponse(
             ok=False,
             json_data={"error": "invalid"},
@@ -71,3 +83,118 @@ def test_provider_error_raises_app_error(monkeypatch):
     error = excinfo.value
     assert error.error_code == "bad_request"
     assert error.extra["status_code"] == 429
+    # Retried like the async engine would, then surfaced
+    assert len(attempts) == 1 + service.max_retries
+
+
+def test_client_errors_are_not_retried(monkeypatch):
+    service = LLMService(backoff_factor=0)
+    attempts = []
+
+    def rejecting_post(*args, **kwargs):
+        attempts.append(kwargs["json"])
+        return DummyResponse(ok=False, json_data={"error": "bad key"}, status=401)
+
+    monkeypatch.setattr(service.session, "post", rejecting_post)
+
+    with pytest.raises(AppError):
+        service.invoke("openai", "gpt-4", [{"role": "user", "content": "test"}], api_key="fake")
+    assert len(attempts) == 1
+
+
+def _async_service(handler):
+    import httpx
+
+    return LLMService(
+        engine="async",
+        async_engine_options={"transport": httpx.MockTransport(handler), "backoff_factor": 0},
+    )
+
+
+def test_async_engine_invoke_and_retry():
+    import httpx
+
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            return httpx.Response(503, json={"error": "busy"})
+        return httpx.Response(
+            200,
+            json={
+                "content": [{"text": "async reply"}],
+                "stop_reason": "end_turn",
+                "usage": {"input_tokens": 7, "output_tokens": 2},
+            },
+        )
+
+    service = _async_service(handler)
+    try:
+        result = service.invoke(
+            "anthropic",
+            "claude-3-5-haiku-20241022",
+            [
+                {"role": "system", "content": "be brief"},
+                {"role": "user", "content": "hi\x00"},
+            ],
+            api_key="fake-key",
+        )
+    finally:
+        service.async_engine.close()
+
+    assert result.text == "async reply"
+    assert (result.prompt_tokens, result.completion_tokens, result.total_tokens) == (7, 2, 9)
+    assert result.finish_reason == "end_turn"
+    assert len(calls) == 2
+    assert calls[-1].headers["x-api-key"] == "fake-key"
+    sent = json.loads(calls[-1].content)
+    assert sent["system"] == "be brief"
+    assert sent["messages"] == [{"role": "user", "content": "hi"}]
+
+
+def test_async_engine_streams_chunks():
+    import httpx
+
+    body = (
+        b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n'
+        b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+        b'data: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+        b'data: {"choices": [{"delta": {}, "finish_reason": "stop"}],'
+        b' "usage": {"prompt_tokens": 4, "completion_tokens": 2}}\n\n'
+        b"data: [DONE]\n\n"
+    )
+
+    def handler(request):
+        assert request.url.host == "api.mistral.ai"
+        return httpx.Response(200, content=body, headers={"content-type": "text/event-stream"})
+
+    service = _async_service(handler)
+    try:
+        *chunks, result = service.invoke_stream(
+            "mistral", "mistral-small-latest", [{"role": "user", "content": "hi"}], "key"
+        )
+    finally:
+        service.async_engine.close()
+
+    assert chunks == ["Hel", "lo"]
+    assert result.text == "Hello"
+    assert (result.prompt_tokens, result.completion_tokens) == (4, 2)
+    assert result.finish_reason == "stop"
+
+
+def test_async_engine_error_raises_app_error():
+    import httpx
+
+    service = _async_service(lambda request: httpx.Response(401, json={"error": "bad key"}))
+    try:
+        with pytest.raises(AppError) as excinfo:
+            list(
+                service.invoke_stream(
+                    "gemini", "gemini-1.5-flash", [{"role": "user", "content": "hi"}], "key"
+                )
+            )
+    finally:
+        service.async_engine.close()
+
+    assert excinfo.value.extra["status_code"] == 401
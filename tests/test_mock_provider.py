@@ -0,0 +1,92 @@
+"""Tests for the mock provider server, driven through LLMService's async engine."""
+
+import httpx
+import pytest
+
+from llmselect.mock_provider import MockProviderApp, MockProviderConfig
+from llmselect.services.llm import LLMService
+from llmselect.utils.errors import AppError
+
+MESSAGES = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "Say hi"}]
+
+
+def _service(config, **options):
+    mock = MockProviderApp(config)
+    service = LLMService(
+        engine="async",
+        provider_base_url="http://mock.test",
+        async_engine_options={"transport": httpx.ASGITransport(app=mock), "backoff_factor": 0},
+        **options,
+    )
+    return service, mock
+
+
+@pytest.mark.parametrize(
+    "provider, model, finish_reason",
+    [
+        ("openai", "gpt-4o", "stop"),
+        ("mistral", "mistral-small-latest", "stop"),
+        ("anthropic", "claude-3-5-haiku-20241022", "end_turn"),
+        ("gemini", "gemini-1.5-flash", "STOP"),
+    ],
+)
+def test_mock_speaks_each_wire_format(provider, model, finish_reason):
+    service, mock = _service(MockProviderConfig(ttft=0, token_delay=0, response_tokens=6))
+    try:
+        result = service.invoke(provider, model, MESSAGES, "any-key")
+        *chunks, streamed = service.invoke_stream(provider, model, MESSAGES, "any-key")
+    finally:
+        service.async_engine.close()
+
+    assert result.text == streamed.text == "".join(chunks)
+    assert len(chunks) == 6
+    assert (result.completion_tokens, streamed.completion_tokens) == (6, 6)
+    assert result.prompt_tokens and streamed.prompt_tokens
+    assert result.finish_reason == streamed.finish_reason == finish_reason
+    assert mock.stats() == {"requests": 2, "streams": 1, "errors": 0, "in_flight": 0}
+
+
+def test_mock_honours_max_tokens_and_serves_azure_deployments():
+    service, mock = _service(
+        MockProviderConfig(ttft=0, token_delay=0, response_tokens=50),
+        max_tokens=10,
+        use_azure=True,
+        azure_endpoint="https://example.openai.azure.com",
+        azure_api_key="azure-key",
+        azure_deployment_mappings={"gpt-4o": "gpt-4o-deployment"},
+    )
+    try:
+        result = service.invoke("openai", "gpt-4o", MESSAGES, "")
+    finally:
+        service.async_engine.close()
+
+    assert (result.completion_tokens, result.finish_reason) == (10, "length")
+    assert mock.stats()["requests"] == 1
+
+
+def test_mock_error_rate_fails_requests_with_configured_status():
+    service, mock = _service(
+        MockProviderConfig(ttft=0, token_delay=0, error_rate=1.0, error_status=429),
+        max_retries=0,
+    )
+    try:
+        with pytest.raises(AppError) as excinfo:
+            service.invoke("anthropic", "claude-3-5-haiku-20241022", MESSAGES, "any-key")
+    finally:
+        service.async_engine.close()
+
+    assert excinfo.value.extra["status_code"] == 429
+    assert excinfo.value.extra["payload"]["error"]["type"] == "rate_limit_error"
+    assert mock.stats()["errors"] == 1
+
+
+def test_config_from_env():
+    config = MockProviderConfig.from_env(
+        {
+            "MOCK_PROVIDER_TTFT": "0.5",
+            "MOCK_PROVIDER_RESPONSE_TOKENS": "12",
+            "MOCK_PROVIDER_SEED": "7",
+        }
+    )
+    assert (config.ttft, config.response_tokens, config.seed) == (0.5, 12, 7)
+    assert config.token_delay == MockProviderConfig.token_delay
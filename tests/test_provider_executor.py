@@ -0,0 +1,216 @@
+"""Tests for the shared provider executor."""
+
+import asyncio
+import threading
+
+import pytest
+
+from llmselect.services.provider_executor import ProviderExecutor
+from llmselect.services.providers import LLMResult
+from llmselect.utils.errors import ProviderBusyError
+
+from test_comparisons import make_authenticated_post, register_and_login
+
+
+def test_per_provider_cap_queues_without_holding_workers():
+    executor = ProviderExecutor(max_workers=4, max_queue=4, provider_limits={"openai": 1})
+    release = threading.Event()
+    try:
+        blocked = executor.submit("openai", release.wait, 2)
+        queued = executor.submit("openai", lambda: "second")
+        # The capped provider's backlog does not stop other providers
+        assert executor.submit("anthropic", lambda: "other").result(timeout=2) == "other"
+
+        stats = executor.stats()
+        assert stats["queued_by_provider"] == {"openai": 1}
+        assert not queued.done()
+
+        release.set()
+        assert blocked.result(timeout=2) is True
+        assert queued.result(timeout=2) == "second"
+        assert executor.stats()["queued"] == 0
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_submit_rejects_when_capacity_is_exhausted():
+    executor = ProviderExecutor(max_workers=1, max_queue=1, queue_timeout=0.01)
+    release = threading.Event()
+    try:
+        executor.submit("openai", release.wait, 2)
+        waiting = executor.submit("openai", lambda: None)
+        with pytest.raises(ProviderBusyError):
+            executor.submit("openai", lambda: None)
+        assert executor.stats()["rejected"] == 1
+
+        # A cancelled job never runs but still frees its slot
+        waiting.cancel()
+        release.set()
+        executor.submit("openai", lambda: None).result(timeout=2)
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_event_loop_calls_share_the_executor_limits():
+    executor = ProviderExecutor(
+        max_workers=4, max_queue=1, queue_timeout=0.05, provider_limits={"openai": 1}
+    )
+    order = []
+
+    async def call(provider, name, release):
+        async with executor.admit(provider):
+            order.append(name)
+            await release.wait()
+
+    async def run():
+        release = asyncio.Event()
+        tasks = [
+            asyncio.create_task(call("openai", "first", release)),
+            asyncio.create_task(call("openai", "second", release)),
+            asyncio.create_task(call("anthropic", "other", release)),
+        ]
+        await asyncio.sleep(0.01)
+        assert order == ["first", "other"]
+        stats = executor.stats()
+        assert (stats["running"], stats["queued_by_provider"]) == (2, {"openai": 1})
+
+        # Four running or waiting plus one queued use up the capacity
+        tasks.append(asyncio.create_task(call("gemini", "fourth", release)))
+        tasks.append(asyncio.create_task(call("mistral", "fifth", release)))
+        await asyncio.sleep(0.01)
+        with pytest.raises(ProviderBusyError):
+            async with executor.admit("gemini"):
+                pass
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+    try:
+        asyncio.run(run())
+        stats = executor.stats()
+        assert (stats["running"], stats["queued"], stats["rejected"]) == (0, 0, 1)
+        assert stats["submitted"] == 5
+    finally:
+        executor.shutdown()
+
+
+def test_pool_jobs_and_event_loop_calls_share_one_provider_cap():
+    executor = ProviderExecutor(max_workers=4, queue_timeout=1, provider_limits={"openai": 1})
+    release = threading.Event()
+    order = []
+
+    def pooled(name):
+        order.append(name)
+        release.wait(timeout=2)
+
+    async def admitted(name, hold):
+        async with executor.admit("openai"):
+            order.append(name)
+            await hold.wait()
+
+    async def run():
+        # A pool job holds the cap, so the event-loop call waits behind it
+        hold = asyncio.Event()
+        job = executor.submit("openai", pooled, "pool")
+        await asyncio.sleep(0.05)
+        waiter = asyncio.create_task(admitted("loop", hold))
+        await asyncio.sleep(0.05)
+        assert order == ["pool"]
+        assert executor.stats()["queued_by_provider"] == {"openai": 1}
+
+        release.set()
+        await asyncio.wrap_future(job)
+        await asyncio.sleep(0.05)
+        assert order == ["pool", "loop"]
+
+        # Now the event-loop call holds the cap, so a new pool job waits behind it
+        second = executor.submit("openai", pooled, "pool again")
+        await asyncio.sleep(0.05)
+        assert order == ["pool", "loop"]
+        assert executor.stats()["running"] == 1
+
+        hold.set()
+        await waiter
+        await asyncio.wrap_future(second)
+        assert order == ["pool", "loop", "pool again"]
+
+    try:
+        asyncio.run(run())
+        stats = executor.stats()
+        assert (stats["running"], stats["queued"], stats["submitted"]) == (0, 0, 3)
+    finally:
+        executor.shutdown()
+
+
+def test_event_loop_call_cancelled_while_waiting_gives_up_its_place():
+    executor = ProviderExecutor(max_workers=2, queue_timeout=1, provider_limits={"openai": 1})
+    release = threading.Event()
+
+    async def run():
+        job = executor.submit("openai", release.wait, 2)
+        await asyncio.sleep(0.05)
+
+        async def admitted():
+            async with executor.admit("openai"):
+                pass
+
+        waiter = asyncio.create_task(admitted())
+        await asyncio.sleep(0.05)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        release.set()
+        await asyncio.wrap_future(job)
+        # The cap is free again once the cancelled waiter is skipped
+        await asyncio.wait_for(admitted(), 1)
+
+    try:
+        asyncio.run(run())
+        stats = executor.stats()
+        assert (stats["running"], stats["queued"], stats["queued_by_provider"]) == (0, 0, {})
+    finally:
+        executor.shutdown()
+
+
+def test_compare_runs_providers_on_shared_executor(client, app, monkeypatch):
+    register_and_login(client)
+    make_authenticated_post(
+        client,
+        "/api/v1/keys",
+        json={"openai": "sk-test", "anthropic": "sk-ant-test", "gemini": "", "mistral": ""},
+    )
+
+    threads = set()
+
+    def fake_invoke(provider, model, messages, api_key, **kwargs):
+        threads.add(threading.current_thread().name)
+        return LLMResult(f"{provider} reply")
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "invoke", fake_invoke)
+    submitted = services.provider_executor.stats()["submitted"]
+
+    response = make_authenticated_post(
+        client,
+        "/api/v1/compare",
+        json={
+            "providers": [
+                {"provider": "openai", "model": "gpt-4"},
+                {"provider": "anthropic", "model": "claude-3-5-sonnet-20241022"},
+            ],
+            "prompt": "Pool",
+        },
+    )
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert not any(result.get("error") for result in results)
+    assert sorted(result["response"] for result in results) == [
+        "anthropic reply",
+        "openai reply",
+    ]
+    assert all(name.startswith("provider") for name in threads)
+    assert services.provider_executor.stats()["submitted"] == submitted + 2
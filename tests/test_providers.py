@@ -0,0 +1,197 @@
+"""Tests for the provider adapter registry."""
+
+from llmselect.services.llm import LLMService
+from llmselect.services.llm_async import extract_stream_delta
+from llmselect.services.providers import (
+    AnthropicAdapter,
+    AzureFoundryAdapter,
+    Endpoint,
+    GeminiAdapter,
+    LLMResult,
+    MistralAdapter,
+    OpenAIAdapter,
+    ProviderAdapter,
+    ProviderRegistry,
+)
+
+MESSAGES = [{"role": "system", "content": "be brief"}, {"role": "user", "content": "hi"}]
+
+
+class FakeResponse:
+    ok = True
+    status_code = 200
+
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+def test_non_streaming_calls_use_configured_max_tokens(monkeypatch):
+    service = LLMService(max_tokens=256)
+    sent = []
+
+    def fake_post(url, headers=None, json=None, timeout=None, params=None):
+        sent.append(json)
+        return FakeResponse(
+            {"choices": [{"message": {"content": "ok"}}], "content": [{"text": "ok"}]}
+        )
+
+    monkeypatch.setattr(service.session, "post", fake_post)
+    for provider, model in (
+        ("openai", "gpt-4o"),
+        ("openai", "gpt-5"),
+        ("anthropic", "claude-3-5-haiku-20241022"),
+        ("mistral", "mistral-small-latest"),
+    ):
+        service.invoke(provider, model, MESSAGES, "key")
+
+    assert sent[0]["max_tokens"] == 256
+    assert sent[1]["max_completion_tokens"] == 256
+    assert sent[2]["max_tokens"] == 256 and sent[2]["system"] == "be brief"
+    assert sent[3]["max_tokens"] == 256
+
+
+def test_endpoints_are_built_once_per_model():
+    adapter = OpenAIAdapter(max_tokens=100)
+    first = adapter.build_request("gpt-4o", MESSAGES, "key-1", stream=False)
+    second = adapter.build_request("gpt-4o", MESSAGES, "key-2", stream=True)
+
+    assert len(adapter._endpoints) == 2
+    assert adapter.build_request("gpt-4o", MESSAGES, "key-3", stream=False).url is first.url
+    assert second.headers["Authorization"] == "Bearer key-2"
+    assert second.payload["stream"] is True and "stream" not in first.payload
+
+
+def test_gemini_streams_through_url_and_query():
+    adapter = ProviderRegistry.default().get("gemini")
+    request = adapter.build_request("gemini-1.5-flash", MESSAGES, "gkey", stream=True)
+
+    assert request.url.endswith("gemini-1.5-flash:streamGenerateContent")
+    assert request.params == {"alt": "sse", "key": "gkey"}
+    assert request.payload == {"contents": [{"role": "user", "parts": [{"text": "hi"}]}]}
+    assert adapter.capabilities["system_prompt"] is False
+
+
+def test_azure_registry_serves_every_builtin_provider():
+    registry = ProviderRegistry.default(
+        max_tokens=50,
+        azure_endpoint="https://example.azure.com",
+        azure_api_key="azure-key",
+        azure_deployment_mappings={"claude-3-5-haiku-20241022": "haiku"},
+    )
+    adapter = registry.get("anthropic")
+    request = adapter.build_request("claude-3-5-haiku-20241022", MESSAGES, "", stream=False)
+
+    assert isinstance(adapter, AzureFoundryAdapter)
+    assert request.label == "Azure AI Foundry (anthropic)"
+    assert request.url == "https://example.azure.com/openai/deployments/haiku/chat/completions"
+    assert request.headers["api-key"] == "azure-key"
+    assert request.payload == {"messages": MESSAGES, "max_tokens": 50}
+    assert registry.capabilities()["openai"]["requires_api_key"] is False
+
+
+def test_registered_adapter_plugs_into_llm_service(monkeypatch):
+    class EchoAdapter(ProviderAdapter):
+        name = "echo"
+        label = "Echo"
+        supports_streaming = False
+
+        def endpoint(self, model, stream):
+            return Endpoint("https://echo.invalid/v1/chat", {}, {}, "max_tokens")
+
+    registry = ProviderRegistry.default()
+    registry.register(EchoAdapter())
+    service = LLMService(providers=registry)
+    urls = []
+
+    def fake_post(url, headers=None, json=None, timeout=None):
+        urls.append(url)
+        echoed = json["messages"][-1]["content"]
+        return FakeResponse({"choices": [{"message": {"content": echoed}}]})
+
+    monkeypatch.setattr(service.session, "post", fake_post)
+
+    *chunks, result = service.invoke_stream("echo", "any", MESSAGES, "key")
+    assert chunks == ["hi"]
+    assert result.text == "hi"
+    assert urls == ["https://echo.invalid/v1/chat"]
+
+
+def test_adapters_read_reported_usage():
+    openai = OpenAIAdapter().extract_result(
+        {
+            "choices": [{"message": {"content": "a"}, "finish_reason": "length"}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+        },
+        latency=0.5,
+    )
+    assert (openai.prompt_tokens, openai.completion_tokens, openai.finish_reason) == (
+        10,
+        5,
+        "length",
+    )
+    assert openai.latency == 0.5
+
+    anthropic = AnthropicAdapter().extract_result(
+        {
+            "content": [{"text": "b"}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": 8, "output_tokens": 3},
+        }
+    )
+    assert (anthropic.text, anthropic.total_tokens, anthropic.finish_reason) == (
+        "b",
+        11,
+        "end_turn",
+    )
+
+    gemini = GeminiAdapter().extract_result(
+        {
+            "candidates": [{"content": {"parts": [{"text": "c"}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": 4, "candidatesTokenCount": 2},
+        }
+    )
+    assert (gemini.prompt_tokens, gemini.completion_tokens, gemini.finish_reason) == (
+        4,
+        2,
+        "STOP",
+    )
+
+    # Responses without a usage block still give the text
+    bare = OpenAIAdapter().extract_result({"choices": [{"message": {"content": "d"}}]})
+    assert (bare.text, bare.prompt_tokens, bare.total_tokens) == ("d", None, None)
+
+
+def test_stream_usage_comes_from_final_events():
+    stream_payload = OpenAIAdapter().build_request("gpt-4", MESSAGES, "key", stream=True).payload
+    assert stream_payload["stream_options"] == {"include_usage": True}
+    mistral_payload = MistralAdapter().build_request("m", MESSAGES, "key", stream=True).payload
+    assert "stream_options" not in mistral_payload
+
+    result = LLMResult("")
+    events = [
+        {"type": "message_start", "message": {"usage": {"input_tokens": 12, "output_tokens": 1}}},
+        {"type": "content_block_delta", "delta": {"type": "text_delta", "text": "Hi"}},
+        {
+            "type": "message_delta",
+            "delta": {"stop_reason": "end_turn"},
+            "usage": {"output_tokens": 6},
+        },
+    ]
+    texts = [extract_stream_delta("anthropic", event, result) for event in events]
+    assert texts == [None, "Hi", None]
+    assert (result.prompt_tokens, result.completion_tokens, result.finish_reason) == (
+        12,
+        6,
+        "end_turn",
+    )
+
+    result = LLMResult("")
+    event = {
+        "candidates": [{"content": {"parts": [{"text": "!"}]}, "finishReason": "STOP"}],
+        "usageMetadata": {"promptTokenCount": 3, "candidatesTokenCount": 9},
+    }
+    assert extract_stream_delta("gemini", event, result) == "!"
+    assert (result.prompt_tokens, result.completion_tokens, result.finish_reason) == (3, 9, "STOP")
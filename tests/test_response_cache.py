@@ -0,0 +1,93 @@
+"""Tests for the exact-match LLM response cache."""
+
+import pytest
+
+from llmselect.services.llm import LLMService
+from llmselect.services.providers import LLMResult
+from llmselect.services.response_cache import (
+    REPLAY_CHUNK_CHARS,
+    MemoryCacheBackend,
+    ResponseCache,
+)
+
+MESSAGES = [{"role": "user", "content": "Same prompt"}]
+
+
+@pytest.fixture
+def cached_service(monkeypatch):
+    service = LLMService(response_cache=ResponseCache(MemoryCacheBackend(max_entries=10)))
+    calls = []
+
+    def fake_call(provider, model, messages, api_key, deadline):
+        calls.append(("invoke", model))
+        return LLMResult("cached answer", 5, 2, "stop", 0.3)
+
+    def fake_stream(provider, model, messages, api_key, deadline):
+        calls.append(("stream", model))
+        yield "streamed "
+        yield "answer " * 20
+        yield LLMResult("streamed " + "answer " * 20, 5, 41, "stop", 0.9)
+
+    monkeypatch.setattr(service, "_dispatch_invoke", fake_call)
+    monkeypatch.setattr(service, "_dispatch_stream", fake_stream)
+    return service, calls
+
+
+def test_invoke_hits_cache_for_identical_requests(cached_service):
+    service, calls = cached_service
+
+    first = service.invoke("openai", "gpt-4", MESSAGES, "key-a")
+    assert first.text == "cached answer"
+    assert (first.completion_tokens, first.cached) == (2, False)
+    # Different key and whitespace that sanitization strips: same cache entry
+    padded = [{"role": "user", "content": "  Same prompt\x00 "}]
+    hit = service.invoke("openai", "gpt-4", padded, "key-b")
+    assert hit.text == "cached answer"
+    # A cached answer cost no provider tokens
+    assert (hit.completion_tokens, hit.cached) == (None, True)
+    assert service.invoke("openai", "gpt-4o", MESSAGES, "key-a").text == "cached answer"
+    assert service.invoke("openai", "gpt-4", MESSAGES, "key-a", use_cache=False)
+
+    assert calls == [("invoke", "gpt-4"), ("invoke", "gpt-4o"), ("invoke", "gpt-4")]
+    stats = service.response_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["stores"]) == (1, 2, 2)
+
+
+def test_stream_replays_cached_text_as_chunks(cached_service):
+    service, calls = cached_service
+    expected = "streamed " + "answer " * 20
+
+    # An abandoned stream is not cached
+    partial = service.invoke_stream("openai", "gpt-4", MESSAGES, "key")
+    next(partial)
+    partial.close()
+
+    *chunks, result = service.invoke_stream("openai", "gpt-4", MESSAGES, "key")
+    assert "".join(chunks) == expected
+    assert (result.text, result.cached) == (expected, False)
+    *replayed, replay_result = service.invoke_stream("openai", "gpt-4", MESSAGES, "key")
+
+    assert "".join(replayed) == expected
+    assert all(len(chunk) <= REPLAY_CHUNK_CHARS for chunk in replayed)
+    assert len(replayed) > 1
+    assert (replay_result.text, replay_result.cached) == (expected, True)
+    # The streamed answer also serves non-streaming calls
+    assert service.invoke("openai", "gpt-4", MESSAGES, "key").text == expected
+    assert calls == [("stream", "gpt-4"), ("stream", "gpt-4")]
+
+
+def test_memory_backend_evicts_least_recently_used_and_expired(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr("llmselect.services.response_cache.monotonic", lambda: now[0])
+    backend = MemoryCacheBackend(max_entries=2)
+
+    backend.set("a", "1", ttl=60)
+    backend.set("b", "2", ttl=60)
+    assert backend.get("a") == "1"  # "b" is now least recently used
+    backend.set("c", "3", ttl=60)
+    assert backend.get("b") is None
+    assert backend.evictions == 1
+
+    now[0] += 61
+    assert backend.get("a") is None
+    assert backend.get("c") is None
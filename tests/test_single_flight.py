@@ -0,0 +1,215 @@
+"""Tests for single-flight coalescing of identical LLM calls."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from llmselect.services.llm import LLMService
+from llmselect.services.providers import LLMResult
+from llmselect.services.single_flight import SingleFlight
+
+MESSAGES = [{"role": "user", "content": "Burst"}]
+
+
+def test_concurrent_identical_invokes_share_one_upstream_call(monkeypatch):
+    service = LLMService(single_flight=SingleFlight())
+    release = threading.Event()
+    calls = []
+
+    def fake_call(provider, model, messages, api_key, deadline):
+        calls.append(model)
+        release.wait(timeout=2)
+        return LLMResult("shared")
+
+    monkeypatch.setattr(service, "_dispatch_invoke", fake_call)
+
+    results = []
+    threads = [
+        threading.Thread(
+            target=lambda: results.append(service.invoke("openai", "gpt-4", MESSAGES, "key"))
+        )
+        for _ in range(3)
+    ]
+    for thread in threads:
+        thread.start()
+    # Let every caller attach before the upstream call returns
+    deadline = time.monotonic() + 2
+    while service.single_flight.stats()["coalesced"] < 2 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    assert [result.text for result in results] == ["shared"] * 3
+    assert calls == ["gpt-4"]
+    # Different API keys never share a call
+    service.invoke("openai", "gpt-4", MESSAGES, "other-key")
+    assert len(calls) == 2
+
+
+def test_stream_late_joiner_gets_replay_and_survives_first_disconnect():
+    flight = SingleFlight()
+    upstream_started = []
+    closed = []
+
+    def upstream():
+        upstream_started.append(True)
+        try:
+            yield from ("a", "b", "c")
+        finally:
+            closed.append(True)
+
+    first = flight.stream("key", upstream)
+    assert next(first) == "a"
+
+    late = flight.stream("key", upstream)
+    first.close()  # The first subscriber goes away mid-stream
+
+    assert list(late) == ["a", "b", "c"]
+    assert len(upstream_started) == 1
+    assert closed == [True]
+    assert flight.stats() == {"upstream_calls": 1, "coalesced": 1, "in_flight": 0}
+
+
+def test_stream_error_reaches_every_subscriber():
+    flight = SingleFlight()
+
+    def upstream():
+        yield "partial"
+        raise RuntimeError("upstream failed")
+
+    first = flight.stream("key", upstream)
+    second = flight.stream("key", upstream)
+
+    assert next(first) == "partial"
+    with pytest.raises(RuntimeError):
+        next(first)
+    assert next(second) == "partial"
+    with pytest.raises(RuntimeError):
+        next(second)
+
+
+def test_abandoned_stream_closes_upstream():
+    flight = SingleFlight()
+    closed = []
+
+    def upstream():
+        try:
+            yield "a"
+            yield "b"
+        finally:
+            closed.append(True)
+
+    only = flight.stream("key", upstream)
+    next(only)
+    only.close()
+
+    assert closed == [True]
+    # A new subscriber starts a fresh call instead of joining the abandoned one
+    assert list(flight.stream("key", upstream)) == ["a", "b"]
+
+
+def _async_engine_service(monkeypatch, **fakes):
+    service = LLMService(engine="async", single_flight=SingleFlight())
+    for name, fake in fakes.items():
+        monkeypatch.setattr(service.async_engine, name, fake)
+    return service
+
+
+def test_async_engine_identical_ainvokes_share_one_upstream_call(monkeypatch):
+    calls = []
+
+    async def fake_ainvoke(provider, model, messages, api_key, deadline):
+        calls.append(api_key)
+        await asyncio.sleep(0.05)
+        return LLMResult("shared")
+
+    service = _async_engine_service(monkeypatch, ainvoke=fake_ainvoke)
+
+    async def run():
+        first = asyncio.create_task(service.ainvoke("openai", "gpt-4", MESSAGES, "key"))
+        await asyncio.sleep(0)
+        # The first caller going away does not cancel the call for the others
+        first.cancel()
+        results = await asyncio.gather(
+            service.ainvoke("openai", "gpt-4", MESSAGES, "key"),
+            service.ainvoke("openai", "gpt-4", MESSAGES, "key"),
+            service.ainvoke("openai", "gpt-4", MESSAGES, "other-key"),
+        )
+        return [result.text for result in results]
+
+    try:
+        assert asyncio.run(run()) == ["shared"] * 3
+    finally:
+        service.async_engine.close()
+
+    assert calls == ["key", "other-key"]
+    assert service.single_flight.stats() == {"upstream_calls": 2, "coalesced": 2, "in_flight": 0}
+
+
+def test_async_engine_stream_late_joiner_gets_replay_and_survives_first_disconnect(monkeypatch):
+    started = []
+    closed = []
+
+    async def fake_stream(provider, model, messages, api_key, deadline):
+        started.append(True)
+        try:
+            for chunk in ("a", "b", "c"):
+                await asyncio.sleep(0.01)
+                yield chunk
+            yield LLMResult("abc")
+        finally:
+            closed.append(True)
+
+    service = _async_engine_service(monkeypatch, ainvoke_stream=fake_stream)
+
+    async def run():
+        first = service.ainvoke_stream("openai", "gpt-4", MESSAGES, "key", use_cache=False)
+        assert await first.__anext__() == "a"
+
+        late = service.ainvoke_stream("openai", "gpt-4", MESSAGES, "key", use_cache=False)
+        assert await late.__anext__() == "a"
+        await first.aclose()  # The first subscriber goes away mid-stream
+
+        return ["a"] + [chunk async for chunk in late]
+
+    try:
+        *chunks, result = asyncio.run(run())
+    finally:
+        service.async_engine.close()
+
+    assert chunks == ["a", "b", "c"]
+    assert result.text == "abc"
+    assert (len(started), closed) == (1, [True])
+    assert service.single_flight.stats() == {"upstream_calls": 1, "coalesced": 1, "in_flight": 0}
+
+
+def test_async_abandoned_stream_closes_upstream():
+    flight = SingleFlight()
+    closed = []
+
+    async def upstream():
+        try:
+            yield "a"
+            await asyncio.sleep(1)
+            yield "b"
+        finally:
+            closed.append(True)
+
+    async def run():
+        only = flight.astream("key", upstream)
+        assert await only.__anext__() == "a"
+        # Leave while the next chunk is still being read
+        pending = asyncio.create_task(only.__anext__())
+        await asyncio.sleep(0.01)
+        pending.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+        await only.aclose()
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert closed == [True]
+    assert flight.stats()["in_flight"] == 0
@@ -0,0 +1,79 @@
+"""Tests for the incremental SSE decoder."""
+
+from llmselect.services.sse import SSEDecoder, iter_sse_json
+
+STREAM = (
+    b": keep-alive\r\n\r\n"
+    b'event: message_start\r\nid: 1\r\ndata: {"type": "message_start"}\r\n\r\n'
+    b"event: content_block_delta\r\n"
+    b'data: {"type": "content_block_delta",\r\n'
+    b'data:  "delta": {"text": "Hi"}}\r\n\r\n'
+    b"data: [DONE]\r\n\r\n"
+)
+
+
+def _feed_in_pieces(data, size):
+    decoder = SSEDecoder()
+    events = []
+    for start in range(0, len(data), size):
+        events.extend(decoder.feed(data[start : start + size]))
+    return events + decoder.flush()
+
+
+def test_decoder_handles_frames_split_at_any_byte():
+    expected = _feed_in_pieces(STREAM, len(STREAM))
+    for size in range(1, 12):
+        assert _feed_in_pieces(STREAM, size) == expected
+
+    assert [event.event for event in expected] == ["message_start", "content_block_delta", None]
+    assert expected[1].data == b'{"type": "content_block_delta",\n "delta": {"text": "Hi"}}'
+    # id persists until the next id field
+    assert expected[1].id == "1"
+
+
+def test_decoder_flushes_unterminated_event():
+    decoder = SSEDecoder()
+    assert decoder.feed(b"data: tail") == []
+    assert [event.data for event in decoder.flush()] == [b"tail"]
+
+
+def test_iter_sse_json_skips_events_without_marker_and_stops_at_done():
+    chunks = [
+        b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n',
+        b'data: {"choices": [{"delta": {"content": "a"}}]}\n\ndata: not-json "content"\n\n',
+        b"data: [DONE]\n\n",
+        b'data: {"choices": [{"delta": {"content": "late"}}]}\n\n',
+    ]
+    payloads = list(iter_sse_json(chunks, marker=b'"content"'))
+    assert payloads == [{"choices": [{"delta": {"content": "a"}}]}]
+
+
+def test_iter_sse_json_drops_payloads_with_trailing_data():
+    chunks = [
+        b'data: {"text": "ok"}\n\n',
+        b'data: {"text": "cut"}{"text": "glued"}\n\n',
+        b'data: {"text": "tail"} trailing\n\n',
+        b'data:  {"text": "padded"} \n\n',
+    ]
+    payloads = list(iter_sse_json(chunks))
+    assert payloads == [{"text": "ok"}, {"text": "padded"}]
+
+
+def test_iter_sse_json_filters_event_types_across_split_chunks():
+    stream = (
+        b'event: ping\r\ndata: {"type": "ping"}\r\n\r\n'
+        b"event: content_block_delta\r\n"
+        b'data: {"type": "content_block_delta", "delta": {"text": "a"}}\r\n\r\n'
+        b"event: other\r\n"
+        b'data: {"type": "content_block_delta", "delta": {"text": "b"}}\r\n\r\n'
+        b"event: content_block_delta\r\n"
+        b'data: {"type": "content_block_delta", "delta": {"text": "c"}}'
+    )
+    for size in (1, 3, 7, len(stream)):
+        chunks = [stream[start : start + size] for start in range(0, len(stream), size)]
+        payloads = iter_sse_json(
+            chunks,
+            marker=b'"content_block_delta"',
+            event_types=frozenset({"content_block_delta"}),
+        )
+        assert [payload["delta"]["text"] for payload in payloads] == ["a", "c"]
@@ -0,0 +1,140 @@
+"""Tests for offline per-model token counting."""
+
+import base64
+import logging
+
+import pytest
+
+from llmselect.container import create_service_container
+from llmselect.routes.chat import _request_token_cost
+from llmselect.services.tokens import (
+    HEURISTIC,
+    MAX_PIECE_BYTES,
+    TokenCounter,
+    estimate_tokens,
+)
+
+MERGES = [b"he", b"ll", b"hell", b"hello"]
+
+
+@pytest.fixture()
+def vocab_dir(tmp_path):
+    tokens = [bytes([value]) for value in range(256)] + MERGES
+    lines = [
+        base64.b64encode(token) + b" " + str(rank).encode() for rank, token in enumerate(tokens)
+    ]
+    (tmp_path / "cl100k_base.tiktoken").write_bytes(b"\n".join(lines) + b"\n")
+    return tmp_path
+
+
+def test_models_are_counted_with_their_encoding(vocab_dir):
+    counter = TokenCounter(vocab_dir)
+
+    assert counter.encoding_for("anthropic", "claude-3-5-sonnet") == "cl100k_base"
+    assert counter.encoding_for("openai", "gpt-4-turbo") == "cl100k_base"
+    assert counter.count("openai", "gpt-4", "hello") == 1
+    # "he" merges, then no pair of ["he", "l", "p"] is in the vocab
+    assert counter.count("openai", "gpt-4", "help") == 3
+
+
+def test_missing_vocab_and_unknown_models_fall_back_to_the_estimate(vocab_dir):
+    counter = TokenCounter(vocab_dir)
+    text = "hello there, general kenobi"
+
+    # o200k_base is not vendored in vocab_dir
+    assert counter.encoding_for("openai", "gpt-4o") == HEURISTIC
+    assert counter.count("openai", "gpt-4o", text) == estimate_tokens(text)
+    assert counter.encoding_for("custom", "local-model") == HEURISTIC
+
+
+def test_missing_vocab_is_reported_once_at_startup(vocab_dir, caplog):
+    counter = TokenCounter(vocab_dir)
+
+    with caplog.at_level(logging.WARNING, logger="llmselect.services.tokens"):
+        assert counter.check_vocab() == ["o200k_base"]
+        assert counter.count("openai", "gpt-4o", "hello there") == estimate_tokens("hello there")
+        assert counter.check_vocab() == ["o200k_base"]
+
+    warnings = [record.getMessage() for record in caplog.records]
+    assert len(warnings) == 1
+    assert "o200k_base.tiktoken not found" in warnings[0]
+
+
+def test_container_counts_with_the_configured_vocab(app, vocab_dir, monkeypatch):
+    monkeypatch.setitem(app.config, "TOKENIZER_VOCAB_DIR", str(vocab_dir))
+
+    tokens = create_service_container(app).tokens
+
+    assert tokens.encoding_for("openai", "gpt-4") == "cl100k_base"
+    # Byte-pair merges from the fixture vocab: "help" is ["he", "l", "p"] and
+    # " help" is [" ", "he", "l", "p"], where the estimate would give 2
+    assert tokens.count("openai", "gpt-4", "help help") == 7
+
+
+def test_counts_are_memoized_per_content(vocab_dir):
+    counter = TokenCounter(vocab_dir)
+    tokenizer = counter._tokenizer("cl100k_base")
+    calls = []
+    original = tokenizer.count
+
+    def spy(text):
+        calls.append(text)
+        return original(text)
+
+    tokenizer.count = spy
+
+    counts = counter.count_many("openai", "gpt-4", ["hello", "help", "hello"])
+    counter.count("anthropic", "claude-3-opus", "help")
+
+    assert counts == [1, 3, 1]
+    assert calls == ["hello", "help"]
+
+
+def test_long_pieces_are_merged_in_windows(vocab_dir):
+    counter = TokenCounter(vocab_dir)
+
+    # One 64 KB "word": each window of repeated "hello" merges on its own
+    word = "hello" * (64 * 1024 // 5)
+    windows = [
+        word[start : start + MAX_PIECE_BYTES] for start in range(0, len(word), MAX_PIECE_BYTES)
+    ]
+
+    assert counter.count("openai", "gpt-4", word) == sum(
+        counter.count("openai", "gpt-4", window) for window in windows
+    )
+
+
+def test_memo_is_bounded(vocab_dir):
+    counter = TokenCounter(vocab_dir, memo_size=2)
+
+    counter.count_many("openai", "gpt-4", ["a", "b", "c"])
+
+    assert len(counter._memo) == 2
+
+
+def test_request_cost_counts_prompt_per_compared_model(app):
+    body = {
+        "prompt": "hello " * 40,
+        "providers": [
+            {"provider": "openai", "model": "gpt-4o"},
+            {"provider": "anthropic", "model": "claude-3-opus"},
+        ],
+    }
+    tokens = app.extensions["services"].tokens
+
+    with app.test_request_context("/api/v1/compare", method="POST", json=body):
+        cost = _request_token_cost()
+
+    assert cost == tokens.count("openai", "gpt-4o", body["prompt"]) + tokens.count(
+        "anthropic", "claude-3-opus", body["prompt"]
+    )
+
+    with app.test_request_context("/api/v1/chat", method="POST", data="not json"):
+        assert _request_token_cost() == 1
+
+
+def test_request_cost_skips_bodies_over_the_schema_limits(app):
+    body = {"prompt": "x" * 100000, "providers": [{"provider": "openai", "model": "gpt-4"}] * 50}
+
+    with app.test_request_context("/api/v1/compare", method="POST", json=body):
+        assert _request_token_cost() == 1
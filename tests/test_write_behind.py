@@ -0,0 +1,235 @@
+"""Tests for write-behind persistence of stream results."""
+
+import json
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from llmselect.extensions import db
+from llmselect.models import ComparisonResult, Conversation, Message, User
+from llmselect.services.providers import LLMResult
+from llmselect.services.write_behind import PendingWrite, WriteBehindQueue
+from llmselect.utils.errors import NotFoundError
+
+
+class BlockingWrite(PendingWrite):
+    """Holds the worker until released, so later writes queue up into one batch."""
+
+    def __init__(self):
+        self.release = threading.Event()
+
+    def stage(self):
+        self.release.wait(timeout=5)
+        return "released"
+
+
+class FlakyWrite(PendingWrite):
+    def __init__(self, failures):
+        self.failures = failures
+
+    def stage(self):
+        if self.failures:
+            self.failures -= 1
+            raise OperationalError("INSERT", {}, Exception("database is locked"))
+        return "flaky"
+
+
+class BrokenWrite(PendingWrite):
+    def stage(self):
+        raise ValueError("not persistable")
+
+
+@pytest.fixture()
+def write_behind(app, monkeypatch):
+    services = app.extensions["services"]
+    persistence = WriteBehindQueue(app, retry_backoff=0)
+    monkeypatch.setattr(services, "persistence", persistence)
+    yield persistence
+    persistence.close()
+
+
+def register_and_login(client, username="writer", password="writer-password"):
+    client.post("/api/v1/auth/register", json={"username": username, "password": password})
+    client.post("/api/v1/auth/login", json={"username": username, "password": password})
+    client.post("/api/v1/keys", json={"openai": "sk-test-fake-key", "anthropic": "sk-ant"})
+
+
+def _events(response):
+    return [
+        json.loads(line[len("data: ") :])
+        for line in response.get_data(as_text=True).splitlines()
+        if line.startswith("data: ")
+    ]
+
+
+def test_chat_stream_sends_done_before_the_reply_is_committed(
+    client, app, monkeypatch, write_behind
+):
+    register_and_login(client)
+
+    def fake_stream(provider, model, messages, api_key, **kwargs):
+        yield "Hello"
+        yield LLMResult("Hello", 4, 1, "stop", 0.1)
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "invoke_stream", fake_stream)
+
+    blocker = BlockingWrite()
+    write_behind.submit(blocker)
+    response = client.post(
+        "/api/v1/chat/stream",
+        json={"provider": "openai", "model": "gpt-4", "message": "Hi"},
+    )
+
+    done = _events(response)[-1]
+    assert done["done"] is True
+    # The reply's draft and final text are still queued behind the blocked write
+    assert write_behind.stats()["pending"] == 3
+
+    blocker.release.set()
+    # What a follow-up turn or transcript read waits on
+    assert write_behind.wait_for(done["conversationId"], timeout=5)
+
+    with app.app_context():
+        conversation = Conversation.query.one()
+        assert [m.role for m in conversation.messages] == ["user", "assistant"]
+        assert conversation.messages[-1].completion_tokens == 1
+        assert conversation.message_count == 2
+
+
+def test_batch_retries_transient_errors_and_isolates_failing_writes(app, write_behind):
+    with app.app_context():
+        user = User(username="batcher", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        conversation = app.extensions["services"].conversations.create_conversation(
+            user.id, "openai", "gpt-4"
+        )
+        conversation_id, user_id = conversation.id, user.id
+
+    reply = app.extensions["services"].conversations.reply_write(
+        conversation_id, user_id, "Stored", None
+    )
+    blocker = BlockingWrite()
+    write_behind.submit(blocker)
+    flaky = write_behind.submit(FlakyWrite(failures=1))
+    broken = write_behind.submit(BrokenWrite())
+    stored = write_behind.submit(reply)
+    blocker.release.set()
+
+    assert write_behind.flush(timeout=5)
+    assert flaky.result() == "flaky"
+    assert isinstance(broken.exception(), ValueError)
+    stats = write_behind.stats()
+    assert (stats["committed"], stats["failed"], stats["retries"]) == (3, 1, 1)
+
+    with app.app_context():
+        assert db.session.get(Message, stored.result()).content == "Stored"
+
+
+def test_compare_stream_hands_out_a_reserved_comparison_id(client, app, monkeypatch, write_behind):
+    register_and_login(client)
+
+    def fake_stream(provider, model, messages, api_key, **kwargs):
+        yield f"{provider} answer"
+
+    services = app.extensions["services"]
+    monkeypatch.setattr(services.llm, "invoke_stream", fake_stream)
+
+    response = client.post(
+        "/api/v1/compare/stream",
+        json={
+            "prompt": "Compare",
+            "providers": [
+                {"provider": "openai", "model": "gpt-4"},
+                {"provider": "anthropic", "model": "claude-3-opus"},
+            ],
+        },
+    )
+    done = _events(response)[-1]
+    assert write_behind.flush(timeout=5)
+
+    with app.app_context():
+        comparison = ComparisonResult.query.one()
+        assert done["comparisonId"] == comparison.id
+        assert [r["response"] for r in comparison.results] == ["openai answer", "anthropic answer"]
+
+
+def test_reservation_without_results_is_removed(app):
+    comparisons = app.extensions["services"].comparisons
+    persistence = WriteBehindQueue(enabled=False)
+
+    with app.app_context():
+        user = User(username="reserver", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        reservation = comparisons.reserve_comparison(user.id, "Nobody answered")
+        assert persistence.submit(reservation).result() is not None
+        persistence.submit(
+            comparisons.comparison_write(user.id, "Nobody answered", [], reservation)
+        )
+
+        assert ComparisonResult.query.count() == 0
+
+
+def test_pending_reservation_stays_out_of_the_history(app):
+    comparisons = app.extensions["services"].comparisons
+    persistence = WriteBehindQueue(enabled=False)
+    results = [{"provider": "openai", "model": "gpt-4", "response": "Done"}]
+
+    with app.app_context():
+        user = User(username="historian", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        reservation = comparisons.reserve_comparison(user.id, "Still streaming")
+        reserved_id = persistence.submit(reservation).result()
+
+        assert comparisons.get_user_comparisons(user.id) == []
+        assert comparisons.get_user_comparisons_page(user.id) == ([], None)
+        assert comparisons.count_user_comparisons(user.id) == 0
+        with pytest.raises(NotFoundError):
+            comparisons.vote_preference(reserved_id, user.id, 0)
+
+        persistence.submit(
+            comparisons.comparison_write(user.id, "Still streaming", results, reservation)
+        )
+
+        assert [c.id for c in comparisons.get_user_comparisons(user.id)] == [reserved_id]
+        assert [c.id for c in comparisons.get_user_comparisons_page(user.id)[0]] == [reserved_id]
+        assert comparisons.count_user_comparisons(user.id) == 1
+
+
+def test_stale_reservations_are_deleted(app):
+    comparisons = app.extensions["services"].comparisons
+    persistence = WriteBehindQueue(enabled=False)
+
+    with app.app_context():
+        user = User(username="abandoner", password_hash="x")
+        db.session.add(user)
+        db.session.commit()
+        stale_id = persistence.submit(comparisons.reserve_comparison(user.id, "Died")).result()
+        fresh_id = persistence.submit(comparisons.reserve_comparison(user.id, "Live")).result()
+        db.session.get(ComparisonResult, stale_id).created_at = datetime.utcnow() - timedelta(
+            hours=2
+        )
+        db.session.commit()
+
+        assert comparisons.delete_stale_reservations(3600) == 1
+        assert [c.id for c in ComparisonResult.query] == [fresh_id]
+
+
+def test_close_drains_the_queue(app):
+    persistence = WriteBehindQueue(app)
+    blocker = BlockingWrite()
+    persistence.submit(blocker)
+    futures = [persistence.submit(FlakyWrite(failures=0)) for _ in range(3)]
+
+    threading.Timer(0.05, blocker.release.set).start()
+    persistence.close()
+
+    assert all(future.result(timeout=0) == "flaky" for future in futures)
+    # Writes after shutdown are applied inline
+    with app.app_context():
+        assert persistence.submit(FlakyWrite(failures=0)).result(timeout=0) == "flaky"